@@ -0,0 +1,6 @@
+"""Pipeline code for the aviation crash / stock market event study.
+
+The notebooks in ``data/`` remain the exploratory record; the modules here hold
+the reusable pieces (ingest, feature store, event-study math) so the notebooks
+and ``dashboard.py`` can share one implementation.
+"""
@@ -0,0 +1,358 @@
+"""Read-only HTTP/JSON query service over the event-study results.
+
+::
+
+    python -m aviation.api --port 8765              # published caches
+    python -m aviation.api --synthetic 20000        # generated data
+
+    GET /health
+    GET /v1/mae?category=severe,moderate&manufacturer=boeing&years=2015-2023
+    GET /v1/ttr?stock_type=operator&group_by=category
+    GET /v1/caar?tkr=BA&tkr=DAL&group_by=tkr
+
+Filters (repeat a parameter or comma-separate values; matching is
+case-insensitive): ``category``, ``manufacturer``, ``tkr``, ``stock_type``,
+``years`` (``2019`` or ``2015-2023``). ``group_by`` splits the answer by one
+field (``year`` too, for MAE / TTR).
+
+Answers come from a :class:`~aviation.results.ResultSet` held in memory.
+Every query is normalized (sorted, lower-cased values, defaults dropped) and
+its JSON body kept in an LRU cache keyed by (dataset version, endpoint,
+normalized query), so repeated dashboard-style queries cost one dict lookup.
+The server is a small HTTP/1.1 implementation on ``asyncio`` streams with
+keep-alive; cache misses are computed in a thread pool so slow queries do
+not stall other connections, and concurrent misses on the same query wait
+for one computation. See ``benchmarks/load_test.py``.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import polars as pl
+
+from .cache import LRUCache
+from .instrument import RECORDER, timed
+from .results import FIELDS, ResultSet, load_results, synthetic_results
+from .survival import km_summary
+
+ENDPOINTS = ("mae", "ttr", "caar")
+GROUPS = {
+    "mae": (*FIELDS, "year"),
+    "ttr": (*FIELDS, "year"),
+    "caar": FIELDS,
+}
+MAX_HEADER = 16 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class QueryError(ValueError):
+    """A malformed query (answered with HTTP 400)."""
+
+
+# ---- queries ----
+
+
+def normalize_query(endpoint: str, params: dict[str, list[str]]) -> tuple:
+    """Canonical, hashable form of a query string.
+
+    ``category=Severe,minor`` and ``category=minor&category=severe`` give the
+    same key; unknown parameters raise :class:`QueryError`.
+    """
+    allowed = {*FIELDS, "years", "group_by"}
+    unknown = set(params) - allowed
+    if unknown:
+        raise QueryError(f"unknown parameters {sorted(unknown)}")
+    norm = []
+    for field in FIELDS:
+        values = {
+            v.strip().lower()
+            for raw in params.get(field, [])
+            for v in raw.split(",")
+            if v.strip()
+        }
+        if values:
+            norm.append((field, tuple(sorted(values))))
+    if "years" in params:
+        text = params["years"][-1]
+        try:
+            lo, _, hi = text.partition("-")
+            years = (int(lo), int(hi or lo))
+        except ValueError:
+            raise QueryError(f"years must look like 2019 or 2015-2023, got {text!r}")
+        norm.append(("years", (min(years), max(years))))
+    if "group_by" in params:
+        group = params["group_by"][-1].strip().lower()
+        if group not in GROUPS[endpoint]:
+            raise QueryError(
+                f"group_by must be one of {list(GROUPS[endpoint])}, got {group!r}"
+            )
+        norm.append(("group_by", group))
+    return (endpoint, tuple(norm))
+
+
+def _stats(s: pl.Expr, prefix: str) -> list[pl.Expr]:
+    return [
+        s.mean().alias(f"{prefix}_mean"),
+        s.median().alias(f"{prefix}_median"),
+        s.std().alias(f"{prefix}_std"),
+        s.quantile(0.1).alias(f"{prefix}_p10"),
+        s.quantile(0.9).alias(f"{prefix}_p90"),
+    ]
+
+
+def _aggs(endpoint: str) -> list[pl.Expr]:
+    if endpoint == "mae":
+        return [pl.len().alias("n"), *_stats(pl.col("MAE_signed"), "MAE")]
+    # a censored TTR is ttr_default, not a recovery time: the moments only
+    # cover recovered pairs, and _ttr_table adds Kaplan-Meier medians
+    return [
+        pl.len().alias("n"),
+        *_stats(
+            pl.col("TTR_full").filter(~pl.col("censored_full")), "TTR_full_recovered"
+        ),
+        *_stats(
+            pl.col("TTR_half").filter(~pl.col("censored_half")), "TTR_half_recovered"
+        ),
+        pl.col("censored_full").mean().alias("censored_full_share"),
+        pl.col("censored_half").mean().alias("censored_half_share"),
+    ]
+
+
+def _ttr_table(rows: pl.DataFrame, group: str | None) -> pl.DataFrame:
+    """TTR aggregates plus censoring-aware medians, per ``group`` value."""
+    by = [] if group is None else [group]
+    out = (
+        rows.group_by(by).agg(_aggs("ttr")).sort(by)
+        if by
+        else rows.select(_aggs("ttr"))
+    )
+    for metric in ("full", "half"):
+        km = km_summary(rows, by, f"TTR_{metric}", f"censored_{metric}")
+        out = (
+            out.join(km, on=by, how="left")
+            if by
+            else pl.concat([out, km], how="horizontal")
+        )
+    return out
+
+
+def _filter(pairs: pl.DataFrame, q: dict, value: str) -> pl.DataFrame:
+    cond = pl.col(value).is_not_null()
+    for field in FIELDS:
+        if field in q:
+            cond &= pl.col(field).str.to_lowercase().is_in(list(q[field]))
+    if "years" in q:
+        cond &= pl.col("year").is_between(*q["years"])
+    return pairs.filter(cond)
+
+
+def _records(df: pl.DataFrame) -> list[dict]:
+    return df.fill_nan(None).to_dicts()
+
+
+def run_query(results: ResultSet, key: tuple) -> dict:
+    """Answer a normalized query (see :func:`normalize_query`)."""
+    endpoint, items = key
+    q = dict(items)
+    group = q.get("group_by")
+    out = {
+        "endpoint": endpoint,
+        "query": {k: list(v) if isinstance(v, tuple) else v for k, v in items},
+        "version": results.version,
+    }
+    if endpoint == "ttr":
+        table = _ttr_table(_filter(results.pairs, q, "TTR_full"), group)
+        if group is None:
+            out.update(_records(table)[0])
+        else:
+            out["groups"] = _records(table)
+        return out
+    if endpoint == "mae":
+        rows = _filter(results.pairs, q, "MAE_signed")
+        if group is None:
+            out.update(_records(rows.select(_aggs(endpoint)))[0])
+        else:
+            out["groups"] = _records(
+                rows.group_by(group).agg(_aggs(endpoint)).sort(group)
+            )
+        return out
+
+    m = results.matrix
+    mask = m.select(
+        tickers=q.get("tkr"),
+        stock_types=q.get("stock_type"),
+        categories=q.get("category"),
+        manufacturers=q.get("manufacturer"),
+        years=q.get("years"),
+    )
+    out["n_pairs"] = int(mask.sum())
+    if group is None:
+        out.update(m.caar(mask).to_dict(as_series=False))
+    else:
+        wanted = q.get(group)
+        values = (
+            None
+            if wanted is None
+            else [lab for lab in m.labels[group] if lab.lower() in wanted]
+        )
+        curves = m.caar_by(group, mask, values)
+        out["groups"] = [
+            {group: g, **df.drop(group).to_dict(as_series=False)}
+            for (g,), df in curves.partition_by(group, as_dict=True).items()
+        ]
+    return out
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+# ---- server ----
+
+
+class QueryServer:
+    """Serves a :class:`ResultSet`; :meth:`answer` is usable without sockets."""
+
+    def __init__(self, results: ResultSet, cache_size: int = 4096, threads: int = 4):
+        self.results = results
+        self.cache = LRUCache(cache_size, name="api.cache")
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix="api")
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+    def _compute(self, key: tuple) -> bytes:
+        with timed(f"api.{key[0]}"):
+            body = run_query(self.results, key)
+        return json.dumps(body, default=_json_default).encode()
+
+    def _health(self) -> bytes:
+        body = {
+            "status": "ok",
+            "version": self.results.version,
+            "pairs": self.results.pairs.height,
+            "car_pairs": len(self.results.matrix),
+            "cache": self.cache.info(),
+            "latency_ms": RECORDER.percentiles().to_dicts(),
+        }
+        return json.dumps(body, default=_json_default).encode()
+
+    async def answer(self, method: str, target: str) -> tuple[int, bytes]:
+        if method != "GET":
+            return 405, b'{"error": "only GET is supported"}'
+        url = urlsplit(target)
+        path = url.path.rstrip("/")
+        if path == "/health":
+            return 200, self._health()
+        endpoint = path.removeprefix("/v1/")
+        if path != f"/v1/{endpoint}" or endpoint not in ENDPOINTS:
+            return 404, json.dumps({"error": f"no route {url.path}"}).encode()
+        try:
+            key = normalize_query(endpoint, parse_qs(url.query))
+        except QueryError as e:
+            return 400, json.dumps({"error": str(e)}).encode()
+
+        cache_key = (self.results.version, key)
+        body = self.cache.get(cache_key)
+        if body is None:
+            # concurrent misses on one key share a single computation
+            pending = self._inflight.get(cache_key)
+            if pending is None:
+                loop = asyncio.get_running_loop()
+                pending = loop.run_in_executor(self._pool, self._compute, key)
+                self._inflight[cache_key] = pending
+                pending.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+            body = await asyncio.shield(pending)
+            self.cache.put(cache_key, body)
+        return 200, body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """One connection: HTTP/1.1 requests until close (keep-alive)."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length") or 0):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                status, body = await self.answer(method, target)
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                writer.write(
+                    f"{version} {status} {_REASONS[status]}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    "\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await asyncio.start_server(
+            self.handle, host, port, limit=MAX_HEADER, backlog=1024
+        )
+        print(
+            f"serving {self.results.pairs.height:,} result rows on http://{host}:{port}"
+        )
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m aviation.api",
+        description="Read-only HTTP/JSON API over MAE / TTR / CAAR results.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=None,
+        metavar="N_EVENTS",
+        help="serve generated results instead of the published caches",
+    )
+    args = parser.parse_args(argv)
+
+    results = (
+        synthetic_results(args.synthetic)
+        if args.synthetic is not None
+        else load_results()
+    )
+    server = QueryServer(results, args.cache_size, args.threads)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""Public attention (Google Trends) per event, and its lead/lag against CAR.
+
+data/aryan.ipynb pulls ``pytrends`` interest for one crash and one keyword
+list, merges it with one ticker's CAR and reports a zero-lag ``.corr()``.
+Here search interest is kept in a persistent per-event store
+(``data/attention/<ev_id>.parquet``) filled from a pluggable source:
+
+* :class:`TrendsSource` - live Google Trends via ``pytrends`` (optional dep);
+* :class:`FileSource`   - offline stand-in reading saved CSV/parquet files.
+
+:func:`attention_xcorr` then computes the normalized cross-correlation between
+every (event, keyword) attention series and every (event, ticker) AR/CAR
+series over all lags at once, with one batched FFT.
+"""
+
+import os
+import time
+from datetime import timedelta
+
+import numpy as np
+import polars as pl
+
+from .config import DATA_ROOT, EVT_WINDOW
+
+ATTENTION_DIR = os.path.join(DATA_ROOT, "attention")
+
+# calendar days around ev_date to pull (daily granularity needs < 270 days)
+ATTENTION_WINDOW = (-30, 60)
+
+# pytrends accepts at most five keywords per payload
+_TRENDS_BATCH = 5
+
+ATTENTION_SCHEMA = {
+    "ev_id": pl.Utf8,
+    "keyword": pl.Utf8,
+    "date": pl.Date,
+    "interest": pl.Float32,
+}
+
+
+def event_keywords(row: dict) -> list[str]:
+    """Default search terms for one event (operator, aircraft, generic)."""
+    oper, make, model = (
+        row.get("oper_name"),
+        row.get("acft_make"),
+        row.get("acft_model"),
+    )
+    kws = []
+    if oper:
+        kws.append(f"{str(oper).title()} crash")
+    if make and model:
+        kws.append(f"{str(make).title()} {model}")
+    elif make:
+        kws.append(f"{str(make).title()} crash")
+    kws.append("plane crash")
+    return list(dict.fromkeys(kws))
+
+
+def _long(df: pl.DataFrame, keywords: list[str]) -> pl.DataFrame:
+    """pytrends-style wide (date + one column per keyword) or long -> long."""
+    if "keyword" not in df.columns:
+        present = [k for k in keywords if k in df.columns]
+        df = df.unpivot(
+            index="date", on=present, variable_name="keyword", value_name="interest"
+        )
+    return df.select(
+        pl.col("date").cast(pl.Date),
+        pl.col("keyword").cast(pl.Utf8),
+        pl.col("interest").cast(pl.Float32),
+    ).filter(pl.col("keyword").is_in(keywords))
+
+
+class TrendsSource:
+    """Live Google Trends through ``pytrends`` (imported on first use).
+
+    Interest is rescaled 0-100 within each request, so keywords in the same
+    batch of five are comparable with each other but not across batches.
+    """
+
+    def __init__(
+        self, hl: str = "en-US", tz: int = 0, geo: str = "", pause: float = 1.0
+    ):
+        from pytrends.request import TrendReq
+
+        self._client = TrendReq(hl=hl, tz=tz)
+        self.geo = geo
+        self.pause = pause
+
+    def fetch(self, ev_id: str, keywords: list[str], start, end) -> pl.DataFrame:
+        frames = []
+        for i in range(0, len(keywords), _TRENDS_BATCH):
+            batch = keywords[i : i + _TRENDS_BATCH]
+            self._client.build_payload(
+                kw_list=batch, timeframe=f"{start} {end}", geo=self.geo
+            )
+            df = self._client.interest_over_time()
+            if not df.empty:
+                wide = pl.from_pandas(
+                    df.drop(columns="isPartial", errors="ignore").reset_index()
+                )
+                frames.append(_long(wide, batch))
+            time.sleep(self.pause)
+        if not frames:
+            return pl.DataFrame(
+                schema={k: v for k, v in ATTENTION_SCHEMA.items() if k != "ev_id"}
+            )
+        return pl.concat(frames)
+
+
+class FileSource:
+    """Offline stand-in for :class:`TrendsSource`.
+
+    Reads ``<root>/<ev_id>.parquet`` or ``<root>/<ev_id>.csv``, either long
+    (date, keyword, interest) or pytrends-wide (date + one column per keyword).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def fetch(self, ev_id: str, keywords: list[str], start, end) -> pl.DataFrame:
+        for ext in (".parquet", ".csv"):
+            path = os.path.join(self.root, f"{ev_id}{ext}")
+            if not os.path.exists(path):
+                continue
+            if ext == ".csv":
+                raw = pl.read_csv(path, try_parse_dates=True)
+            else:
+                raw = pl.read_parquet(path)
+            return _long(raw, keywords).filter(pl.col("date").is_between(start, end))
+        raise FileNotFoundError(f"no attention file for {ev_id} in {self.root}")
+
+
+class AttentionStore:
+    """Per-event parquet files of daily search interest."""
+
+    def __init__(self, root: str = ATTENTION_DIR):
+        self.root = root
+
+    def path(self, ev_id: str) -> str:
+        return os.path.join(self.root, f"{ev_id}.parquet")
+
+    def has(self, ev_id: str) -> bool:
+        return os.path.exists(self.path(ev_id))
+
+    def write(self, ev_id: str, df: pl.DataFrame):
+        os.makedirs(self.root, exist_ok=True)
+        df.with_columns(ev_id=pl.lit(ev_id)).select(ATTENTION_SCHEMA.keys()).cast(
+            ATTENTION_SCHEMA
+        ).write_parquet(self.path(ev_id))
+
+    def scan(self) -> pl.LazyFrame:
+        if not os.path.isdir(self.root) or not any(
+            f.endswith(".parquet") for f in os.listdir(self.root)
+        ):
+            return pl.LazyFrame(schema=ATTENTION_SCHEMA)
+        return pl.scan_parquet(os.path.join(self.root, "*.parquet"))
+
+    def read(self, ev_ids: list[str] | None = None) -> pl.DataFrame:
+        lf = self.scan()
+        if ev_ids is not None:
+            lf = lf.filter(pl.col("ev_id").is_in(ev_ids))
+        return lf.collect()
+
+    def fill(
+        self,
+        events: pl.DataFrame,
+        source: TrendsSource | FileSource,
+        keywords=event_keywords,
+        window: tuple[int, int] = ATTENTION_WINDOW,
+        refresh: bool = False,
+    ) -> list[str]:
+        """Fetch and store attention for every event not yet in the store.
+
+        ``keywords`` maps an event row to its search terms. Returns the
+        ev_ids that could not be fetched. An empty answer (a rate-limited or
+        blank Trends response) is not stored, so the event is fetched again
+        on the next run.
+        """
+        failed = []
+        for row in events.unique("ev_id", keep="first").iter_rows(named=True):
+            ev_id = row["ev_id"]
+            if self.has(ev_id) and not refresh:
+                continue
+            day = pl.Series([row["ev_date"]]).cast(pl.Date)[0]
+            start = day + timedelta(days=window[0])
+            end = day + timedelta(days=window[1])
+            try:
+                df = source.fetch(ev_id, keywords(row), start, end)
+            except Exception as e:  # pytrends raises its own errors (429s etc.)
+                print(f"⚠️  Skipping attention for {ev_id}: {e}")
+                failed.append(ev_id)
+                continue
+            if df.is_empty():
+                print(f"⚠️  Skipping attention for {ev_id}: empty answer")
+                failed.append(ev_id)
+                continue
+            self.write(ev_id, df)
+        return failed
+
+
+def _dense(df: pl.DataFrame, keys: list[str], value: str, lo: int, hi: int):
+    """Distinct ``keys`` rows + [S, hi - lo + 1] values on the rel_day grid."""
+    index = df.select(keys).unique(maintain_order=True).with_row_index("_s")
+    df = df.join(index, on=keys).filter(pl.col("rel_day").is_between(lo, hi))
+    out = np.full((index.height, hi - lo + 1), np.nan)
+    out[df["_s"].to_numpy(), df["rel_day"].to_numpy() - lo] = df[value].to_numpy()
+    return index.drop("_s"), out
+
+
+def _centered(a: np.ndarray) -> np.ndarray:
+    """Demean each series over its observed days; missing days become 0."""
+    seen = ~np.isnan(a)
+    mean = np.nan_to_num(a).sum(axis=1, keepdims=True) / np.maximum(
+        seen.sum(axis=1, keepdims=True), 1
+    )
+    return np.where(seen, a - mean, 0.0)
+
+
+def attention_xcorr(
+    attention: pl.DataFrame,
+    car: pl.DataFrame,
+    events: pl.DataFrame,
+    value: str = "AR",
+    window: tuple[int, int] = EVT_WINDOW,
+    max_lag: int = 10,
+) -> pl.DataFrame:
+    """Cross-correlation of attention vs. AR/CAR for every lag, all pairs at once.
+
+    Parameters
+    ----------
+    attention : pl.DataFrame
+        ev_id, keyword, date, interest (:meth:`AttentionStore.read`).
+    car : pl.DataFrame
+        CAR_CACHE-style rows (date, AR, CAR, tkr, ev_id, stock_type).
+    events : pl.DataFrame
+        ev_id, ev_date.
+    value : str
+        "AR" or "CAR".
+    window : tuple[int, int]
+        rel_day grid (calendar days) both series are placed on.
+    max_lag : int
+        Lags -max_lag..max_lag; ``lag > 0`` means attention leads returns.
+
+    Returns
+    -------
+    pl.DataFrame
+        ev_id, keyword, tkr, stock_type, lag, xcorr (normalized to [-1, 1];
+        days where a series is missing count at its mean).
+    """
+    lo, hi = window
+    ev = events.select("ev_id", ev_date=pl.col("ev_date").cast(pl.Date)).unique("ev_id")
+    rel = (
+        (pl.col("date").cast(pl.Date) - pl.col("ev_date"))
+        .dt.total_days()
+        .cast(pl.Int64)
+    )
+    att = attention.join(ev, on="ev_id").with_columns(rel_day=rel)
+    ret = car.join(ev, on="ev_id").with_columns(rel_day=rel)
+
+    a_keys, A = _dense(att, ["ev_id", "keyword"], "interest", lo, hi)
+    x_keys, X = _dense(ret, ["ev_id", "tkr", "stock_type"], value, lo, hi)
+
+    # every (event, keyword) x (event, ticker) pair of the same event
+    pairs = a_keys.with_row_index("_a").join(x_keys.with_row_index("_x"), on="ev_id")
+    ia, ix = pairs["_a"].to_numpy(), pairs["_x"].to_numpy()
+
+    # ---- batched FFT cross-correlation: c[k] = sum_t a[t] * x[t + k] ----
+    A, X = _centered(A), _centered(X)
+    L = A.shape[1]
+    n = 1 << int(np.ceil(np.log2(max(2 * L, 2))))
+    FA, FX = np.fft.rfft(A, n), np.fft.rfft(X, n)
+    cc = np.fft.irfft(np.conj(FA[ia]) * FX[ix], n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cc /= np.sqrt((A**2).sum(axis=1)[ia] * (X**2).sum(axis=1)[ix])[:, None]
+
+    max_lag = min(max_lag, L - 1)
+    lags = np.arange(-max_lag, max_lag + 1)
+    xc = cc[:, lags % n]
+    return (
+        pairs.drop("_a", "_x")
+        .with_columns(lag=pl.lit(lags.tolist()), xcorr=pl.Series(xc.tolist()))
+        .explode(["lag", "xcorr"])
+        .with_columns(pl.col("lag").cast(pl.Int16))
+        .fill_nan(None)
+    )
+
+
+def peak_lags(xcorr: pl.DataFrame) -> pl.DataFrame:
+    """Per (event, keyword, ticker): the lag with the largest |xcorr|."""
+    return (
+        xcorr.drop_nulls("xcorr")
+        .sort(pl.col("xcorr").abs(), descending=True)
+        .group_by(["ev_id", "keyword", "tkr", "stock_type"], maintain_order=True)
+        .first()
+        .rename({"lag": "peak_lag", "xcorr": "peak_xcorr"})
+    )
@@ -0,0 +1,656 @@
+"""Sharded, resumable CAR batch runs over a file-based work queue.
+
+``compute_car_all`` in data/final.ipynb walks the events serially and keeps
+failures in an in-memory ``err`` list. Here the (event, ticker, stock_type)
+work list is split into shards in a queue directory that any number of
+worker processes - on one machine or several nodes sharing the directory -
+pull from::
+
+    <root>/plan.json               parameters, shard / item counts
+    <root>/exclusions.parquet      overlap exclusions (``--overlap exclude``)
+    <root>/shards/<sid>.parquet    work items (event_ticker_pairs rows)
+    <root>/leases/<sid>.json       who holds the shard, until when
+    <root>/attempts/<sid>.json     shard-level failures so far
+    <root>/done/<sid>/             car.parquet, state.parquet, failed.parquet
+
+A lease is taken by creating its file with ``O_EXCL``; an expired lease is
+stolen by renaming it away first (only one contender's rename succeeds).
+While a shard runs, a heartbeat thread pushes its lease's expiry forward
+every third of the lease length, so the lease length bounds how long a dead
+worker blocks a shard, not how long a shard may take. A
+finished shard is written to a temp directory and renamed into ``done/`` in
+one step, so a killed worker leaves either nothing or a complete shard and a
+rerun of ``work`` resumes where the queue stands. Items that cannot be
+estimated (no prices, empty estimation window, ...) are recorded with their
+reason in the shard's ``failed.parquet``; ``retry`` requeues them. A shard
+that raises is retried up to ``max_attempts`` times, then run item by item
+so a single bad item cannot block it.
+
+Leases rely on atomic ``O_EXCL`` create and rename, i.e. a local disk or
+NFSv4-style shared storage. Run ``python -m aviation.batch --help``.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import polars as pl
+
+from .config import DATA_ROOT, EST_WINDOW, EVT_WINDOW
+from .features import event_ticker_pairs
+from .incremental import CAR_SCHEMA, KEY, STATE_SCHEMA, add_events, empty_state, update
+from .instrument import count, timed
+from .overlap import EXCLUSION_SCHEMA, POLICIES, resolve_overlaps
+from .panel import long_prices
+
+BATCH_DIR = os.path.join(DATA_ROOT, "batch")
+PLAN = "plan.json"
+EXCLUSIONS = "exclusions.parquet"
+LEASE_SECONDS = 900
+MAX_ATTEMPTS = 3
+
+ITEM_COLUMNS = [*KEY, "market_tkr", "ev_date", "horizon_end"]
+FAILED_SCHEMA = {
+    "ev_id": pl.Utf8,
+    "tkr": pl.Utf8,
+    "stock_type": pl.Utf8,
+    "market_tkr": pl.Utf8,
+    "ev_date": pl.Date,
+    "horizon_end": pl.Date,
+    "reason": pl.Utf8,
+    "shard": pl.Utf8,
+}
+
+
+def _now() -> float:
+    return time.time()
+
+
+def _write_json(path: str, obj):
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str, default=None):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _dir(root: str, kind: str) -> str:
+    return os.path.join(root, kind)
+
+
+# ---- planning ----
+
+
+def plan_batch(
+    root: str,
+    items: pl.DataFrame,
+    price_paths: tuple[str, ...] | None = None,
+    shard_size: int = 500,
+    est_window: tuple[int, int] = EST_WINDOW,
+    evt_window: tuple[int, int] = EVT_WINDOW,
+    horizon: int | None = None,
+    max_attempts: int = MAX_ATTEMPTS,
+    overlap_policy: str | None = None,
+) -> dict:
+    """Split the work list into shards under ``root`` (which must be unplanned).
+
+    Parameters
+    ----------
+    items : pl.DataFrame
+        event_ticker_pairs rows (ev_id, ev_date, stock_type, tkr, market_tkr)
+        or df_ev_anal-style events, which are expanded to pairs.
+    price_paths : tuple[str] or None
+        Price parquets every worker reads (:func:`aviation.panel.long_prices`;
+        default: the stored prices, market index and price cache).
+    shard_size : int
+        Items per shard. Items are ordered by ticker before splitting, so a
+        shard needs prices for only a few tickers.
+    overlap_policy : str or None
+        ``overlap.resolve_overlaps`` policy, applied to the whole work list
+        before it is split (overlaps cross shard boundaries); its exclusions
+        are saved next to the plan for every worker.
+    """
+    if os.path.exists(os.path.join(root, PLAN)):
+        raise FileExistsError(
+            f"{root} already holds a plan; use another root or remove it"
+        )
+    pairs = items if "tkr" in items.columns else event_ticker_pairs(items)
+    os.makedirs(_dir(root, "shards"), exist_ok=True)
+    if overlap_policy is not None:
+        pairs, exclusions = resolve_overlaps(
+            pairs, overlap_policy, est_window, evt_window
+        )
+        exclusions.write_parquet(os.path.join(root, EXCLUSIONS))
+    if "horizon_end" not in pairs.columns:
+        pairs = pairs.with_columns(horizon_end=pl.lit(None, dtype=pl.Date))
+    pairs = (
+        pairs.with_columns(pl.col("ev_date").cast(pl.Date))
+        .unique(KEY, keep="first")
+        .select(ITEM_COLUMNS)
+        .sort(["tkr", "market_tkr", "ev_date", "ev_id", "stock_type"])
+    )
+    n_shards = 0
+    for start in range(0, pairs.height, shard_size):
+        shard = pairs.slice(start, shard_size)
+        shard.write_parquet(
+            os.path.join(_dir(root, "shards"), f"{n_shards:05d}.parquet")
+        )
+        n_shards += 1
+    plan = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "items": pairs.height,
+        "shards": n_shards,
+        "shard_size": shard_size,
+        "price_paths": list(price_paths) if price_paths is not None else None,
+        "est_window": list(est_window),
+        "evt_window": list(evt_window),
+        "horizon": horizon,
+        "overlap_policy": overlap_policy,
+        "max_attempts": max_attempts,
+        "retries": 0,
+    }
+    _write_json(os.path.join(root, PLAN), plan)
+    return plan
+
+
+def read_plan(root: str) -> dict:
+    plan = _read_json(os.path.join(root, PLAN))
+    if plan is None:
+        raise FileNotFoundError(f"no batch plan in {root}; run `plan` first")
+    return plan
+
+
+def read_exclusions(root: str) -> pl.DataFrame:
+    """The plan's overlap exclusions (empty unless planned with "exclude")."""
+    path = os.path.join(root, EXCLUSIONS)
+    if not os.path.exists(path):
+        return pl.DataFrame(schema=EXCLUSION_SCHEMA)
+    return pl.read_parquet(path)
+
+
+def _shard_ids(root: str) -> list[str]:
+    return sorted(f[: -len(".parquet")] for f in os.listdir(_dir(root, "shards")))
+
+
+def _is_done(root: str, sid: str) -> bool:
+    return os.path.isdir(os.path.join(_dir(root, "done"), sid))
+
+
+# ---- leases ----
+
+
+def _lease_path(root: str, sid: str) -> str:
+    return os.path.join(_dir(root, "leases"), f"{sid}.json")
+
+
+def try_lease(root: str, sid: str, worker: str, seconds: int = LEASE_SECONDS) -> bool:
+    """Take the shard's lease if it is free or expired."""
+    os.makedirs(_dir(root, "leases"), exist_ok=True)
+    path = _lease_path(root, sid)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                held = _read_json(path, {})
+            except ValueError:  # just created, its holder is still writing it
+                return False
+            if held.get("expires", 0) > _now():
+                return False
+            # expired: move it out of the way; only one contender's rename wins
+            stale = f"{path}.stale-{uuid.uuid4().hex[:8]}"
+            try:
+                os.rename(path, stale)
+            except FileNotFoundError:
+                return False
+            moved = _read_json(stale, {})
+            if moved.get("expires", 0) > _now():
+                # lost the race: we moved the winner's fresh lease, put it back
+                try:
+                    os.link(stale, path)
+                except FileExistsError:
+                    pass
+                os.remove(stale)
+                return False
+            print(
+                f"⚠️  Reclaiming shard {sid} from {held.get('worker')} (lease expired)"
+            )
+            continue
+        with os.fdopen(fd, "w") as f:
+            json.dump(
+                {"worker": worker, "taken": _now(), "expires": _now() + seconds}, f
+            )
+        return True
+    return False
+
+
+def renew_lease(root: str, sid: str, worker: str, seconds: int = LEASE_SECONDS) -> bool:
+    """Move the lease's expiry ``seconds`` ahead; False if ``worker`` lost it."""
+    path = _lease_path(root, sid)
+    held = _read_json(path, {})
+    if held.get("worker") != worker:
+        return False
+    _write_json(path, {**held, "expires": _now() + seconds})
+    return True
+
+
+@contextmanager
+def _heartbeat(root: str, sid: str, worker: str, seconds: int):
+    """Renew the shard's lease every ``seconds / 3`` until the block exits."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(seconds / 3):
+            if not renew_lease(root, sid, worker, seconds):
+                count("batch.lease_lost")
+                print(f"⚠️  Lost the lease on shard {sid}; another worker may rerun it")
+                return
+            count("batch.lease_renewed")
+
+    thread = threading.Thread(target=beat, name=f"lease-{sid}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _release(root: str, sid: str, worker: str):
+    path = _lease_path(root, sid)
+    if _read_json(path, {}).get("worker") == worker:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    for f in os.listdir(_dir(root, "leases")):
+        if f.startswith(f"{sid}.json.stale-"):
+            try:
+                os.remove(os.path.join(_dir(root, "leases"), f))
+            except FileNotFoundError:
+                pass
+
+
+# ---- one shard ----
+
+
+def _diagnose(items: pl.DataFrame, state: pl.DataFrame, car: pl.DataFrame, have: set):
+    """The items that produced no CAR rows, each with a failure reason."""
+    produced = car.select(KEY).unique()
+    fits = state.select(*KEY, "beta", "n_est")
+    n_est = pl.col("n_est").fill_null(0)
+    reason = (
+        pl.when(~pl.col("tkr").is_in(list(have)))
+        .then(pl.format("no price data for {}", "tkr"))
+        .when(~pl.col("market_tkr").is_in(list(have)))
+        .then(pl.format("no price data for market {}", "market_tkr"))
+        .when(n_est == 0)
+        .then(pl.lit("no estimation-window returns"))
+        .when(pl.col("beta").is_null())
+        .then(pl.format("degenerate estimation window (n_est={})", n_est))
+        .otherwise(pl.lit("no event-window returns"))
+    )
+    return (
+        items.join(produced, on=KEY, how="anti")
+        .join(fits, on=KEY, how="left")
+        .with_columns(reason=reason)
+        .select(*ITEM_COLUMNS, "reason")
+    )
+
+
+def run_items(
+    items: pl.DataFrame,
+    prices: pl.DataFrame,
+    plan: dict,
+    exclusions: pl.DataFrame | None = None,
+):
+    """CAR for ``items`` -> (state, car rows, failed items with reasons)."""
+    tickers = set(items["tkr"]) | set(items["market_tkr"])
+    prices = prices.filter(pl.col("tkr").is_in(list(tickers)))
+    est, evt = tuple(plan["est_window"]), tuple(plan["evt_window"])
+    state = add_events(
+        empty_state(), items, prices, est, evt, plan["horizon"], exclusions
+    )
+    state, car = update(state, prices)
+    failed = _diagnose(items, state, car, set(prices["tkr"].unique()))
+    bad = failed.select(KEY)
+    return (
+        state.join(bad, on=KEY, how="anti"),
+        car.join(bad, on=KEY, how="anti"),
+        failed,
+    )
+
+
+def _run_isolated(
+    items: pl.DataFrame,
+    prices: pl.DataFrame,
+    plan: dict,
+    exclusions: pl.DataFrame | None = None,
+):
+    """Item by item, so an exception fails one item instead of the shard."""
+    states, cars, failed = [], [], []
+    for i in range(items.height):
+        item = items.slice(i, 1)
+        try:
+            state, car, bad = run_items(item, prices, plan, exclusions)
+        except Exception as e:
+            bad = item.with_columns(reason=pl.lit(f"{type(e).__name__}: {e}"))
+            state, car = empty_state(), pl.DataFrame(schema=CAR_SCHEMA)
+        states.append(state)
+        cars.append(car)
+        failed.append(bad)
+    return pl.concat(states), pl.concat(cars), pl.concat(failed)
+
+
+def _checkpoint(root: str, sid: str, worker: str, state, car, failed) -> bool:
+    """Publish a finished shard atomically; False if another worker beat us."""
+    done = _dir(root, "done")
+    os.makedirs(done, exist_ok=True)
+    tmp = os.path.join(done, f".{sid}.tmp-{worker}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    state.select(pl.col(c).cast(t) for c, t in STATE_SCHEMA.items()).write_parquet(
+        os.path.join(tmp, "state.parquet")
+    )
+    car.select(pl.col(c).cast(t) for c, t in CAR_SCHEMA.items()).write_parquet(
+        os.path.join(tmp, "car.parquet")
+    )
+    failed.with_columns(shard=pl.lit(sid)).select(
+        pl.col(c).cast(t) for c, t in FAILED_SCHEMA.items()
+    ).write_parquet(os.path.join(tmp, "failed.parquet"))
+    _write_json(
+        os.path.join(tmp, "manifest.json"),
+        {
+            "worker": worker,
+            "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "pairs": state.height,
+            "car_rows": car.height,
+            "failed": failed.height,
+        },
+    )
+    try:
+        os.rename(tmp, os.path.join(done, sid))
+    except OSError:  # already done by a worker that reclaimed our lease
+        shutil.rmtree(tmp, ignore_errors=True)
+        return False
+    return True
+
+
+# ---- workers ----
+
+
+def run_worker(
+    root: str = BATCH_DIR,
+    worker: str | None = None,
+    lease_seconds: int = LEASE_SECONDS,
+    max_shards: int | None = None,
+) -> int:
+    """Pull shards until none is claimable; returns the number completed."""
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    plan = read_plan(root)
+    exclusions = read_exclusions(root)
+    prices = None
+    completed, tried = 0, Counter()
+    while max_shards is None or completed < max_shards:
+        # untried shards first; a shard that raised is retried after the rest
+        todo = sorted(
+            (
+                s
+                for s in _shard_ids(root)
+                if tried[s] <= plan["max_attempts"] and not _is_done(root, s)
+            ),
+            key=lambda s: (tried[s], s),
+        )
+        sid = next((s for s in todo if try_lease(root, s, worker, lease_seconds)), None)
+        if sid is None:
+            break
+        tried[sid] += 1
+        if _is_done(root, sid):  # finished while we were taking the lease
+            _release(root, sid, worker)
+            continue
+        attempts_path = os.path.join(_dir(root, "attempts"), f"{sid}.json")
+        attempts = _read_json(attempts_path, {"attempts": 0, "errors": []})
+        try:
+            # keep the lease while the shard runs, however long it takes
+            with _heartbeat(root, sid, worker, lease_seconds):
+                if prices is None:
+                    paths = plan["price_paths"]
+                    prices = (
+                        long_prices() if paths is None else long_prices(tuple(paths))
+                    )
+                items = pl.read_parquet(
+                    os.path.join(_dir(root, "shards"), f"{sid}.parquet")
+                )
+                with timed("batch.shard", rows=items.height, shard=sid):
+                    if attempts["attempts"] >= plan["max_attempts"]:
+                        state, car, failed = _run_isolated(
+                            items, prices, plan, exclusions
+                        )
+                    else:
+                        state, car, failed = run_items(items, prices, plan, exclusions)
+                if _checkpoint(root, sid, worker, state, car, failed):
+                    completed += 1
+                    count("batch.items_done", state.height)
+                    count("batch.items_failed", failed.height)
+                    print(
+                        f"✓ shard {sid}: {state.height} pairs, {car.height} CAR rows, "
+                        f"{failed.height} failed"
+                    )
+        except Exception as e:
+            attempts["attempts"] += 1
+            attempts["errors"].append(f"{worker}: {type(e).__name__}: {e}")
+            os.makedirs(_dir(root, "attempts"), exist_ok=True)
+            _write_json(attempts_path, attempts)
+            print(
+                f"⚠️  Shard {sid} failed (attempt {attempts['attempts']}/"
+                f"{plan['max_attempts']}): {e}"
+            )
+        finally:
+            _release(root, sid, worker)
+    return completed
+
+
+def run_workers(root: str = BATCH_DIR, processes: int = 1, **kwargs) -> int:
+    """``processes`` local workers on the same queue; returns shards completed."""
+    if processes <= 1:
+        return run_worker(root, **kwargs)
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        results = [
+            pool.apply_async(run_worker, (root,), kwargs) for _ in range(processes)
+        ]
+        return sum(r.get() for r in results)
+
+
+# ---- results ----
+
+
+def _scan_done(root: str, name: str, schema: dict) -> pl.DataFrame:
+    done = _dir(root, "done")
+    files = (
+        [
+            os.path.join(done, s, name)
+            for s in sorted(os.listdir(done))
+            if not s.startswith(".")
+        ]
+        if os.path.isdir(done)
+        else []
+    )
+    if not files:
+        return pl.DataFrame(schema=schema)
+    return pl.concat([pl.read_parquet(f) for f in files], how="vertical")
+
+
+def collect(root: str = BATCH_DIR) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+    """(state, CAR_CACHE rows, failed items) over every finished shard."""
+    state = _scan_done(root, "state.parquet", STATE_SCHEMA).sort(KEY)
+    car = _scan_done(root, "car.parquet", CAR_SCHEMA).sort(
+        ["ev_id", "stock_type", "date"]
+    )
+    failed = _scan_done(root, "failed.parquet", FAILED_SCHEMA).sort(KEY)
+    return state, car, failed
+
+
+def retry_failed(root: str = BATCH_DIR, shard_size: int | None = None) -> int:
+    """Requeue every failed item (e.g. after fetching missing prices).
+
+    The items move into new ``r<n>-*`` shards and are cleared from the
+    failed lists of their old shards. Returns the number of items requeued.
+    """
+    plan = read_plan(root)
+    done = _dir(root, "done")
+    failed = _scan_done(root, "failed.parquet", FAILED_SCHEMA)
+    if failed.height == 0:
+        return 0
+    gen = plan["retries"] + 1
+    size = shard_size or plan["shard_size"]
+    items = failed.select(ITEM_COLUMNS).sort(["tkr", "market_tkr", "ev_date"])
+    for i, start in enumerate(range(0, items.height, size)):
+        items.slice(start, size).write_parquet(
+            os.path.join(_dir(root, "shards"), f"r{gen}-{i:05d}.parquet")
+        )
+    for sid in failed["shard"].unique().to_list():
+        path = os.path.join(done, sid, "failed.parquet")
+        tmp = f"{path}.tmp"
+        pl.DataFrame(schema=FAILED_SCHEMA).write_parquet(tmp)
+        os.replace(tmp, path)
+    plan["retries"] = gen
+    plan["items_retried"] = plan.get("items_retried", 0) + items.height
+    _write_json(os.path.join(root, PLAN), plan)
+    return items.height
+
+
+def batch_status(root: str = BATCH_DIR) -> pl.DataFrame:
+    """One row per shard: status, items, failed items, attempts, lease holder."""
+    rows = []
+    for sid in _shard_ids(root):
+        manifest = _read_json(os.path.join(_dir(root, "done"), sid, "manifest.json"))
+        lease = _read_json(_lease_path(root, sid))
+        attempts = _read_json(os.path.join(_dir(root, "attempts"), f"{sid}.json"), {})
+        if manifest is not None:
+            status = "done"
+        elif lease is not None and lease["expires"] > _now():
+            status = "leased"
+        else:
+            status = "failing" if attempts.get("attempts") else "pending"
+        rows.append(
+            {
+                "shard": sid,
+                "status": status,
+                "pairs": manifest["pairs"] if manifest else None,
+                "failed": manifest["failed"] if manifest else None,
+                "attempts": attempts.get("attempts", 0),
+                "worker": (manifest or lease or {}).get("worker"),
+            }
+        )
+    return pl.DataFrame(
+        rows,
+        schema={
+            "shard": pl.Utf8,
+            "status": pl.Utf8,
+            "pairs": pl.Int64,
+            "failed": pl.Int64,
+            "attempts": pl.Int64,
+            "worker": pl.Utf8,
+        },
+    )
+
+
+# ---- CLI ----
+
+
+def _window(text: str) -> tuple[int, int]:
+    lo, hi = (int(v) for v in text.split(","))
+    return lo, hi
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m aviation.batch",
+        description="Sharded, resumable CAR batch runs over a file-based queue.",
+    )
+    parser.add_argument("--root", default=BATCH_DIR, help="queue directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("plan", help="split a work list into shards")
+    p.add_argument("items", help="pairs.parquet or df_ev_anal-style events parquet")
+    p.add_argument("--shard-size", type=int, default=500)
+    p.add_argument("--prices", nargs="*", default=None, metavar="PARQUET")
+    p.add_argument("--est-window", type=_window, default=EST_WINDOW, metavar="LO,HI")
+    p.add_argument("--evt-window", type=_window, default=EVT_WINDOW, metavar="LO,HI")
+    p.add_argument("--horizon", type=int, default=None)
+    p.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    p.add_argument("--overlap", choices=POLICIES, default=None)
+
+    w = sub.add_parser("work", help="pull and run shards until the queue is drained")
+    w.add_argument("--processes", type=int, default=1)
+    w.add_argument("--lease", type=int, default=LEASE_SECONDS, help="seconds")
+    w.add_argument("--max-shards", type=int, default=None)
+
+    sub.add_parser("status", help="per-shard progress")
+    r = sub.add_parser("retry", help="requeue failed items")
+    r.add_argument("--shard-size", type=int, default=None)
+    c = sub.add_parser("collect", help="write the merged results")
+    c.add_argument("--out", default=None, help="default: <root>/results")
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        plan = plan_batch(
+            args.root,
+            pl.read_parquet(args.items),
+            price_paths=args.prices,
+            shard_size=args.shard_size,
+            est_window=args.est_window,
+            evt_window=args.evt_window,
+            horizon=args.horizon,
+            max_attempts=args.max_attempts,
+            overlap_policy=args.overlap,
+        )
+        print(f"planned {plan['items']:,} items in {plan['shards']} shards")
+    elif args.command == "work":
+        n = run_workers(
+            args.root,
+            args.processes,
+            lease_seconds=args.lease,
+            max_shards=args.max_shards,
+        )
+        print(f"completed {n} shards")
+    elif args.command == "status":
+        status = batch_status(args.root)
+        with pl.Config(tbl_rows=-1):
+            print(status.group_by("status").agg(shards=pl.len()).sort("status"))
+            print(status.filter(pl.col("status") != "done"))
+    elif args.command == "retry":
+        print(f"requeued {retry_failed(args.root, args.shard_size):,} items")
+    else:
+        out = args.out or os.path.join(args.root, "results")
+        os.makedirs(out, exist_ok=True)
+        state, car, failed = collect(args.root)
+        car.write_parquet(os.path.join(out, "car_cache.parquet"))
+        state.write_parquet(os.path.join(out, "car_state.parquet"))
+        failed.write_parquet(os.path.join(out, "failed.parquet"))
+        print(
+            f"{state.height:,} pairs, {car.height:,} CAR rows, {failed.height:,} failed -> {out}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""Bounded result caches: in-process LRU, and memory + disk tiers.
+
+:class:`LRUCache` keeps objects in one process. :class:`TieredCache` puts a
+size-bounded directory of serialized entries behind it, so results survive
+restarts and are shared by every process pointed at the same directory.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple
+
+import polars as pl
+
+from .instrument import count
+
+
+class LRUCache:
+    """Thread-safe least-recently-used map with at most ``maxsize`` entries.
+
+    Hits and misses are counted on the instrument recorder as
+    ``<name>.hit`` / ``<name>.miss`` (not at all when ``name`` is empty).
+    """
+
+    def __init__(self, maxsize: int = 1024, name: str = "lru"):
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                hit = False
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                hit = True
+        if self.name:
+            count(f"{self.name}.{'hit' if hit else 'miss'}")
+        return value if hit else default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# ---- memory + disk ----
+
+
+class Codec(NamedTuple):
+    """How a cached value is written to and read back from disk."""
+
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+    suffix: str
+
+
+def _frame_dumps(df: pl.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.write_ipc(buf, compression="zstd")
+    return buf.getvalue()
+
+
+FRAME = Codec(_frame_dumps, lambda b: pl.read_ipc(io.BytesIO(b)), ".arrow")
+JSON = Codec(lambda v: json.dumps(v).encode(), json.loads, ".json")
+
+_STRIPES = 64
+_LOW_WATER = 0.8  # eviction trims the disk tier to this share of max_bytes
+_STALE_TMP_SECONDS = 3600
+
+
+class TieredCache:
+    """Memory LRU in front of a size-bounded, LRU-evicted disk directory.
+
+    Entries are keyed by ``(version, key)``. ``version`` names the input data
+    (e.g. :func:`aviation.results.dataset_version`), so a changed dataset
+    simply misses; :meth:`prune` deletes the entries of other versions.
+    ``key`` must be built from values with a stable ``repr`` (str, int,
+    float, date, tuples of them), since its digest is the file name.
+
+    Disk entries live in ``<root>/<version>/<digest><suffix>``; reading one
+    bumps its mtime, and when the directory outgrows ``max_bytes`` the
+    least recently used files are deleted down to 80 % of it. Writes are
+    atomic, so several processes can share ``root``. Values returned from
+    the memory tier are shared between callers and must not be mutated.
+
+    Hits and misses are counted as ``<name>.memory.hit``,
+    ``<name>.disk.hit`` and ``<name>.miss``.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 256 * 1024**2,
+        max_items: int = 512,
+        name: str = "tiered",
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.name = name
+        self.memory = LRUCache(max_items, name="")
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_bytes = None  # scanned on first write
+        self._disk_lock = threading.Lock()
+        # one build per key at a time, without a lock per key
+        self._stripes = [threading.Lock() for _ in range(_STRIPES)]
+
+    def _path(self, version: str, key, codec: Codec) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+        return os.path.join(self.root, version, digest + codec.suffix)
+
+    def _read(self, path: str, codec: Codec):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            value = codec.loads(data)
+        except Exception:
+            # truncated or written by an incompatible version: rebuild it
+            _unlink(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def _write(self, path: str, data: bytes):
+        if len(data) > self.max_bytes * _LOW_WATER:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every entry; removes abandoned temp files."""
+        entries = []
+        now = time.time()
+        for dirpath, _, files in os.walk(self.root):
+            for fname in files:
+                path = os.path.join(dirpath, fname)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if fname.endswith(".tmp"):
+                    if now - st.st_mtime > _STALE_TMP_SECONDS:
+                        _unlink(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * _LOW_WATER
+        for _, size, path in entries:
+            if total <= target:
+                break
+            _unlink(path)
+            total -= size
+        self._disk_bytes = total
+
+    def get_or_build(self, version: str, key, build: Callable[[], Any], codec: Codec):
+        """The cached value for ``(version, key)``, calling ``build()`` on a miss."""
+        mem_key = (version, key)
+        value = self.memory.get(mem_key)
+        if value is not None:
+            count(f"{self.name}.memory.hit")
+            return value
+        path = self._path(version, key, codec)
+        with self._stripes[hash(mem_key) % _STRIPES]:
+            # another session may have finished the same build meanwhile
+            value = self.memory.get(mem_key)
+            if value is not None:
+                count(f"{self.name}.memory.hit")
+                return value
+            value = self._read(path, codec)
+            if value is not None:
+                self.disk_hits += 1
+                count(f"{self.name}.disk.hit")
+            else:
+                self.misses += 1
+                count(f"{self.name}.miss")
+                value = build()
+                self._write(path, codec.dumps(value))
+            self.memory.put(mem_key, value)
+        return value
+
+    def prune(self, keep: set[str] | frozenset[str]):
+        """Drop every entry whose version is not in ``keep``."""
+        with self.memory._lock:
+            for mem_key in [k for k in self.memory._data if k[0] not in keep]:
+                del self.memory._data[mem_key]
+        if os.path.isdir(self.root):
+            for version in os.listdir(self.root):
+                if version not in keep:
+                    shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+        with self._disk_lock:
+            self._disk_bytes = None
+
+    def info(self) -> dict:
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._scan())
+        return {
+            "memory_items": len(self.memory),
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_bytes": self._disk_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def _unlink(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,253 @@
+"""Dense (event x rel_day) CAR matrix for instant CAAR slicing.
+
+data/final.ipynb (and the dashboard's CAAR tab) rebuild CAAR with a
+``group_by("rel_day")`` over the long CAR_CACHE every time a filter changes.
+:func:`car_matrix` pivots those rows once into a [pairs, rel_day] array with
+per-row metadata codes (ticker, stock_type, category, manufacturer) and the
+event year. Any filter is then a boolean row mask, and CAAR / standard error /
+per-group curves are weighted sums over the matrix (a couple of mat-vec
+products) instead of a group-by over the long table.
+
+Means are taken over the rows observed at each rel_day, so an unfiltered
+:meth:`CarMatrix.caar` equals the notebook's ``group_by("rel_day").mean()``.
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import polars as pl
+
+from .config import EVT_WINDOW, MANUFACTURER_NAMES, TICKER_MAP
+from .features import severity_category
+from .instrument import current_span, timed
+
+META = ("tkr", "stock_type", "category", "manufacturer")
+
+
+@dataclass(frozen=True)
+class CarMatrix:
+    """CAR of every (event, ticker, stock_type) pair on a rel_day grid.
+
+    ``car[i, j]`` is the CAR of pair ``i`` on ``rel_days[j]`` (0 where
+    ``valid`` is False, i.e. no trading day). ``codes[f][i]`` indexes
+    ``labels[f]`` for each metadata field ``f`` in :data:`META`.
+    """
+
+    rel_days: np.ndarray  # int16 [L]
+    car: np.ndarray  # float64 [N, L]
+    valid: np.ndarray  # bool [N, L]
+    ev_ids: np.ndarray  # str [N]
+    year: np.ndarray  # int16 [N]
+    codes: dict  # field -> int16 [N]
+    labels: dict  # field -> tuple[str, ...]
+
+    def __len__(self):
+        return len(self.ev_ids)
+
+    @cached_property
+    def _n(self) -> np.ndarray:
+        return self.valid.astype(np.float64)
+
+    @cached_property
+    def _sq(self) -> np.ndarray:
+        return self.car * self.car
+
+    def select(
+        self,
+        tickers=None,
+        stock_types=None,
+        categories=None,
+        manufacturers=None,
+        years: tuple[int, int] | None = None,
+    ) -> np.ndarray:
+        """Boolean row mask; ``None`` leaves a field unfiltered.
+
+        Labels are matched case-insensitively, unknown labels match nothing.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        wanted = dict(zip(META, (tickers, stock_types, categories, manufacturers)))
+        for field, values in wanted.items():
+            if values is None:
+                continue
+            keys = {str(v).lower() for v in values}
+            lut = np.array(
+                [lab.lower() in keys for lab in self.labels[field]], dtype=bool
+            )
+            mask &= lut[self.codes[field]] if len(lut) else False
+        if years is not None:
+            mask &= (self.year >= years[0]) & (self.year <= years[1])
+        return mask
+
+    def _moments(self, W: np.ndarray):
+        """Per-row-weight sums -> (mean, se, n), each [G, L]."""
+        n = W @ self._n
+        s = W @ self.car
+        ss = W @ self._sq
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = s / n
+            var = (ss - n * mean**2) / (n - 1)
+            se = np.sqrt(np.maximum(var, 0.0) / n)
+        return mean, se, n.astype(np.int64)
+
+    def caar(self, mask: np.ndarray | None = None) -> pl.DataFrame:
+        """rel_day, CAAR, SE, n over the rows in ``mask`` (all rows if None)."""
+        w = np.ones(len(self)) if mask is None else mask.astype(np.float64)
+        mean, se, n = self._moments(w[None, :])
+        return pl.DataFrame(
+            {"rel_day": self.rel_days, "CAAR": mean[0], "SE": se[0], "n": n[0]}
+        ).fill_nan(None)
+
+    def caar_by(
+        self, field: str, mask: np.ndarray | None = None, values=None
+    ) -> pl.DataFrame:
+        """CAAR curves per label of ``field`` (e.g. "tkr"), one weight matrix.
+
+        Returns ``field``, rel_day, CAAR, SE, n; groups with no rows in
+        ``mask`` are left out.
+        """
+        labels = self.labels[field]
+        if values is not None:
+            keep = [labels.index(v) for v in values if v in labels]
+        else:
+            keep = list(range(len(labels)))
+        W = np.zeros((len(keep), len(self)))
+        pos = np.full(len(labels), -1)
+        pos[keep] = np.arange(len(keep))
+        g = pos[self.codes[field]]
+        rows = (g >= 0) if mask is None else (g >= 0) & mask
+        W[g[rows], np.flatnonzero(rows)] = 1.0
+        mean, se, n = self._moments(W)
+        present = W.sum(axis=1) > 0
+        G, L = mean[present].shape
+        return pl.DataFrame(
+            {
+                field: np.repeat(np.asarray(labels)[keep][present], L),
+                "rel_day": np.tile(self.rel_days, G),
+                "CAAR": mean[present].ravel(),
+                "SE": se[present].ravel(),
+                "n": n[present].ravel(),
+            }
+        ).fill_nan(None)
+
+    def save(self, path: str):
+        """Write arrays, codes and labels to one ``.npz`` file."""
+        np.savez_compressed(
+            path,
+            rel_days=self.rel_days,
+            car=self.car,
+            valid=self.valid,
+            ev_ids=self.ev_ids,
+            year=self.year,
+            **{f"code_{f}": self.codes[f] for f in META},
+            **{f"label_{f}": np.asarray(self.labels[f], dtype=str) for f in META},
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "CarMatrix":
+        with np.load(path) as z:
+            return cls(
+                rel_days=z["rel_days"],
+                car=z["car"],
+                valid=z["valid"],
+                ev_ids=z["ev_ids"],
+                year=z["year"],
+                codes={f: z[f"code_{f}"] for f in META},
+                labels={f: tuple(z[f"label_{f}"].tolist()) for f in META},
+            )
+
+
+def _encode(s: pl.Series) -> tuple[np.ndarray, tuple[str, ...]]:
+    labels = sorted(s.unique().to_list())
+    codes = s.cast(pl.Enum(labels)).to_physical().to_numpy().astype(np.int16)
+    return codes, tuple(labels)
+
+
+def event_meta(events: pl.DataFrame) -> pl.DataFrame:
+    """ev_id, ev_date, category, manufacturer, year from df_ev_anal-style events."""
+    if "category" not in events.columns and "inj_all_tot" in events.columns:
+        events = events.with_columns(severity_category())
+    make = (
+        pl.col("acft_make")
+        .cast(pl.Utf8)
+        .replace_strict(TICKER_MAP, default=None, return_dtype=pl.Utf8)
+        .replace_strict(MANUFACTURER_NAMES, default="Other", return_dtype=pl.Utf8)
+        if "acft_make" in events.columns
+        else pl.lit("Unknown")
+    )
+    category = (
+        pl.col("category").cast(pl.Utf8)
+        if "category" in events.columns
+        else pl.lit(None, dtype=pl.Utf8)
+    )
+    return events.select(
+        "ev_id",
+        ev_date=pl.col("ev_date").cast(pl.Date),
+        category=category.fill_null("unknown"),
+        manufacturer=make.fill_null("Other"),
+    ).unique("ev_id", keep="first")
+
+
+@timed("caar.matrix_build")
+def car_matrix(
+    car: pl.DataFrame,
+    events: pl.DataFrame,
+    window: tuple[int, int] = EVT_WINDOW,
+    value: str = "CAR",
+) -> CarMatrix:
+    """Pivot long CAR rows into a :class:`CarMatrix`.
+
+    Parameters
+    ----------
+    car : pl.DataFrame
+        CAR_CACHE-style rows: date (or rel_day), CAR, tkr, ev_id and
+        optionally stock_type.
+    events : pl.DataFrame
+        df_ev_anal-style events: ev_id, ev_date and, when available,
+        category (or inj_all_tot) and acft_make.
+    window : tuple[int, int]
+        rel_day grid in calendar days.
+    value : str
+        Column to pivot ("CAR" or "AR").
+    """
+    lo, hi = window
+    meta = event_meta(events)
+    rows = car.join(meta, on="ev_id", how="inner")
+    if "rel_day" not in rows.columns:
+        rows = rows.with_columns(
+            rel_day=(pl.col("date").cast(pl.Date) - pl.col("ev_date")).dt.total_days()
+        )
+    if "stock_type" not in rows.columns:
+        rows = rows.with_columns(stock_type=pl.lit("unknown"))
+    rows = rows.with_columns(
+        pl.col("tkr").cast(pl.Utf8), pl.col("stock_type").cast(pl.Utf8)
+    ).filter(pl.col("rel_day").is_between(lo, hi) & pl.col(value).is_not_null())
+
+    pairs = (
+        rows.select("ev_id", "tkr", "stock_type", "ev_date", *META[2:])
+        .unique(["ev_id", "tkr", "stock_type"], keep="first")
+        .sort(["ev_date", "ev_id", "tkr", "stock_type"])
+        .with_row_index("_i")
+    )
+    rows = rows.join(
+        pairs.select("_i", "ev_id", "tkr", "stock_type"),
+        on=["ev_id", "tkr", "stock_type"],
+    )
+
+    current_span().rows = rows.height
+    shape = (pairs.height, hi - lo + 1)
+    mat, valid = np.zeros(shape), np.zeros(shape, dtype=bool)
+    i, j = rows["_i"].to_numpy(), rows["rel_day"].to_numpy() - lo
+    mat[i, j] = rows[value].to_numpy()
+    valid[i, j] = True
+
+    encoded = {f: _encode(pairs[f]) for f in META}
+    return CarMatrix(
+        rel_days=np.arange(lo, hi + 1, dtype=np.int16),
+        car=mat,
+        valid=valid,
+        ev_ids=pairs["ev_id"].to_numpy().astype(str),
+        year=pairs["ev_date"].dt.year().to_numpy().astype(np.int16),
+        codes={f: c for f, (c, _) in encoded.items()},
+        labels={f: lab for f, (_, lab) in encoded.items()},
+    )
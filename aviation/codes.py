@@ -0,0 +1,237 @@
+"""Compiled NTSB code tables: coded columns as Enum dtypes + integer codes.
+
+The NTSB export stores occurrences, phases, findings and sequence-of-events
+subjects as numeric codes whose meaning lives in ``eADMSPUB_DataDictionary.csv``,
+``ct_seqevt.csv`` and ``ct_iaids.csv``. Instead of string-joining those lookups
+in every analysis, the ingest stage compiles each lookup once into a
+:class:`CodeTable`:
+
+* codes become a ``pl.Enum`` (physically a small unsigned int), so group-bys on
+  cause/phase run on integers;
+* labels become a second ``pl.Enum``, so decoded text is carried as a
+  dictionary index rather than a per-row string.
+
+Compiled tables are persisted as one long parquet file so later runs skip the
+CSV parsing entirely.
+"""
+
+import os
+from dataclasses import dataclass, field
+
+import polars as pl
+
+from .config import NTSB_DIR, NULL_VALUES
+
+CODE_TABLES_FILE = "code_tables.parquet"
+
+# (table, column) -> code table key; "seqevt" is ct_seqevt, other keys are
+# "<Table>.<Column>" entries of the data dictionary
+CODED_COLUMNS = {
+    ("Occurrences", "Occurrence_Code"): "Occurrences.Occurrence_Code",
+    ("Occurrences", "Phase_of_Flight"): "Occurrences.Phase_of_Flight",
+    ("Events_Sequence", "Occurrence_Code"): "Events_Sequence.Occurrence_Code",
+    ("Events_Sequence", "phase_no"): "Events_Sequence.phase_no",
+    ("Events_Sequence", "eventsoe_no"): "Events_Sequence.eventsoe_no",
+    ("Findings", "finding_code"): "Findings.finding_code",
+    ("seq_of_events", "Subj_Code"): "seqevt",
+    ("seq_of_events", "Modifier_Code"): "seqevt",
+}
+
+# code columns must be read as strings or leading zeros are lost
+CODE_SCHEMA = {column: pl.Utf8 for _, column in CODED_COLUMNS}
+
+_HEADER_ALIASES = {
+    "table": ("table", "table_name", "tablename"),
+    "column": ("column", "column_name", "columnname", "ct_name"),
+    "code": ("code_iaids", "code", "code_value"),
+    "meaning": ("meaning", "description", "code_meaning"),
+}
+
+
+@dataclass(frozen=True)
+class CodeTable:
+    """One compiled lookup: ``codes[i]`` decodes to ``labels[i]``."""
+
+    name: str
+    codes: tuple[str, ...]
+    labels: tuple[str, ...]
+    code_dtype: pl.Enum = field(init=False, repr=False, compare=False)
+    label_dtype: pl.Enum = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "code_dtype", pl.Enum(list(self.codes)))
+        # labels repeat across codes; the Enum keeps first-seen order
+        object.__setattr__(
+            self, "label_dtype", pl.Enum(list(dict.fromkeys(self.labels)))
+        )
+
+    def __len__(self):
+        return len(self.codes)
+
+    def encode(self, expr: str | pl.Expr) -> pl.Expr:
+        """Raw code column -> Enum of codes (unknown codes become null)."""
+        expr = pl.col(expr) if isinstance(expr, str) else expr
+        return (
+            expr.cast(pl.Utf8)
+            .str.strip_chars()
+            .replace_strict(
+                list(self.codes),
+                list(self.codes),
+                default=None,
+                return_dtype=self.code_dtype,
+            )
+        )
+
+    def decode(self, expr: str | pl.Expr) -> pl.Expr:
+        """Raw or encoded code column -> Enum of labels."""
+        expr = pl.col(expr) if isinstance(expr, str) else expr
+        return (
+            expr.cast(pl.Utf8)
+            .str.strip_chars()
+            .replace_strict(
+                list(self.codes),
+                list(self.labels),
+                default=None,
+                return_dtype=self.label_dtype,
+            )
+        )
+
+    def code_id(self, expr: str | pl.Expr) -> pl.Expr:
+        """Integer surrogate for a code column (the Enum's physical index)."""
+        return self.encode(expr).to_physical()
+
+
+def _normalize_headers(df: pl.DataFrame, needed: tuple[str, ...]) -> pl.DataFrame:
+    lower = {c.lower().strip(): c for c in df.columns}
+    rename = {}
+    for target in needed:
+        source = next((lower[a] for a in _HEADER_ALIASES[target] if a in lower), None)
+        if source is None:
+            raise ValueError(f"code table is missing a '{target}' column: {df.columns}")
+        rename[source] = target
+    return df.rename(rename).select(needed)
+
+
+def _read_lookup(path: str) -> pl.DataFrame:
+    return pl.read_csv(
+        path,
+        null_values=NULL_VALUES,
+        infer_schema=False,  # codes are text, keep leading zeros
+        ignore_errors=True,
+    )
+
+
+def _clean(df: pl.DataFrame) -> pl.DataFrame:
+    return (
+        df.with_columns(
+            pl.col("code").str.strip_chars(), pl.col("meaning").str.strip_chars()
+        )
+        .drop_nulls(["code", "meaning"])
+        .unique(subset=["key", "code"], keep="last", maintain_order=True)
+    )
+
+
+def read_code_tables(ntsb_dir: str = NTSB_DIR) -> pl.DataFrame:
+    """All lookups as one long (key, code, meaning) frame, straight from CSV."""
+    frames = []
+
+    path = os.path.join(ntsb_dir, "eADMSPUB_DataDictionary.csv")
+    if os.path.exists(path):
+        dd = _normalize_headers(
+            _read_lookup(path), ("table", "column", "code", "meaning")
+        )
+        frames.append(
+            dd.select(
+                key=pl.concat_str(
+                    [
+                        pl.col("table").str.strip_chars(),
+                        pl.col("column").str.strip_chars(),
+                    ],
+                    separator=".",
+                ),
+                code=pl.col("code"),
+                meaning=pl.col("meaning"),
+            )
+        )
+
+    path = os.path.join(ntsb_dir, "ct_seqevt.csv")
+    if os.path.exists(path):
+        seq = _normalize_headers(_read_lookup(path), ("code", "meaning"))
+        frames.append(seq.select(key=pl.lit("seqevt"), code="code", meaning="meaning"))
+
+    path = os.path.join(ntsb_dir, "ct_iaids.csv")
+    if os.path.exists(path):
+        ct = _normalize_headers(_read_lookup(path), ("column", "code", "meaning"))
+        frames.append(
+            ct.select(
+                key=pl.col("column").str.strip_chars(), code="code", meaning="meaning"
+            )
+        )
+
+    if not frames:
+        return pl.DataFrame(
+            schema={"key": pl.Utf8, "code": pl.Utf8, "meaning": pl.Utf8}
+        )
+    return _clean(pl.concat(frames, how="vertical"))
+
+
+def compile_code_tables(
+    ntsb_dir: str = NTSB_DIR, persist: bool = True
+) -> dict[str, CodeTable]:
+    """Parse the lookup CSVs once, persist them, and return compiled tables."""
+    long = read_code_tables(ntsb_dir)
+    if persist:
+        long.write_parquet(os.path.join(ntsb_dir, CODE_TABLES_FILE))
+    return _to_tables(long)
+
+
+def load_code_tables(ntsb_dir: str = NTSB_DIR) -> dict[str, CodeTable]:
+    """Compiled tables from the persisted parquet, compiling it if missing."""
+    path = os.path.join(ntsb_dir, CODE_TABLES_FILE)
+    if not os.path.exists(path):
+        return compile_code_tables(ntsb_dir)
+    return _to_tables(pl.read_parquet(path))
+
+
+def _to_tables(long: pl.DataFrame) -> dict[str, CodeTable]:
+    tables = {}
+    for (key,), grp in long.sort(["key", "code"]).group_by("key", maintain_order=True):
+        tables[key] = CodeTable(
+            name=key,
+            codes=tuple(grp["code"].to_list()),
+            labels=tuple(grp["meaning"].to_list()),
+        )
+    return tables
+
+
+def table_for(
+    tables: dict[str, CodeTable], table: str, column: str
+) -> CodeTable | None:
+    """Code table that decodes ``table.column``, if the lookups provide one."""
+    key = CODED_COLUMNS.get((table, column), f"{table}.{column}")
+    return tables.get(key)
+
+
+def encode_frame(
+    df: pl.DataFrame | pl.LazyFrame,
+    table: str,
+    tables: dict[str, CodeTable],
+    labels: bool = True,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Swap every known coded column of an NTSB table to its Enum form.
+
+    ``<col>`` becomes an Enum of codes and, with ``labels=True``, a
+    ``<col>_label`` Enum column is added next to it.
+    """
+    names = df.collect_schema().names() if isinstance(df, pl.LazyFrame) else df.columns
+    exprs = []
+    for (tbl, column), _ in CODED_COLUMNS.items():
+        if tbl != table or column not in names:
+            continue
+        ct = table_for(tables, tbl, column)
+        if ct is None or len(ct) == 0:
+            continue
+        exprs.append(ct.encode(column).alias(column))
+        if labels:
+            exprs.append(ct.decode(column).alias(f"{column}_label"))
+    return df.with_columns(exprs) if exprs else df
@@ -0,0 +1,288 @@
+"""Memory-compact storage types for the price, CAR, MAE/TTR and event frames.
+
+The caches written by data/final.ipynb keep ``tkr``, ``ev_id``, ``stock_type``
+and ``flavor`` as Utf8 on every daily row and every number as Float64. The
+compact mode here stores:
+
+* tickers, stock types and flavors as Enums (one small int per row);
+* ``ev_id`` as an integer surrogate ``ev_key`` with a separate lookup frame;
+* ``rel_day`` as Int16;
+* optionally AR/CAR/close as Float32.
+
+:func:`memory_report` measures the before/after footprint per dataset.
+
+:func:`compact_all` writes ``<name>_compact.parquet`` next to each cache.
+Loaders go through :func:`scan_cache` / :func:`read_cache`, which read that
+copy (and expand it back to the plain schema) while it is at least as new as
+the cache it was made from, and the plain cache otherwise. The plain schema
+(column order and dtypes) is recorded in each compact file's parquet metadata.
+"""
+
+import io
+import os
+
+import polars as pl
+
+from .config import STOCK_MARKET_MAP, STOCKS_DIR, TICKER_MAP
+
+STOCK_TYPES = ["manufacturer", "operator"]
+FLAVORS = ["short", "extended"]
+EV_INDEX_FILE = "ev_index.parquet"
+PLAIN_SCHEMA_KEY = "aviation.plain_schema"
+
+_FLOAT_COLUMNS = ("AR", "CAR", "close", "CAR_min", "CAR_max", "MAE_signed")
+
+
+def ticker_enum(*frames: pl.DataFrame, column: str = "tkr") -> pl.Enum:
+    """Enum over every mapped ticker/index plus any extra seen in ``frames``."""
+    known = set(TICKER_MAP.values()) | set(STOCK_MARKET_MAP.values())
+    for df in frames:
+        if column in df.columns:
+            known |= set(df[column].drop_nulls().unique().to_list())
+    return pl.Enum(sorted(known))
+
+
+def surrogate_dtype(n: int) -> pl.DataType:
+    """Smallest unsigned int that can index ``n`` events."""
+    return pl.UInt16 if n <= 2**16 - 1 else pl.UInt32
+
+
+def build_ev_index(*frames: pl.DataFrame) -> pl.DataFrame:
+    """(ev_key, ev_id) lookup covering every ev_id in ``frames``."""
+    ids = sorted(
+        set().union(*(set(df["ev_id"].drop_nulls().to_list()) for df in frames))
+    )
+    return pl.DataFrame(
+        {
+            "ev_key": pl.Series(range(len(ids)), dtype=surrogate_dtype(len(ids))),
+            "ev_id": ids,
+        }
+    )
+
+
+def _to_ev_key(df: pl.DataFrame, ev_index: pl.DataFrame) -> pl.DataFrame:
+    return (
+        df.join(ev_index, on="ev_id", how="left")
+        .drop("ev_id")
+        .select(["ev_key", *[c for c in df.columns if c != "ev_id"]])
+    )
+
+
+def _shrink(df: pl.DataFrame, tkr_dtype: pl.Enum, float32: bool) -> pl.DataFrame:
+    exprs = []
+    if "tkr" in df.columns:
+        exprs.append(pl.col("tkr").cast(tkr_dtype))
+    if "stock_type" in df.columns:
+        exprs.append(pl.col("stock_type").cast(pl.Enum(STOCK_TYPES)))
+    if "flavor" in df.columns:
+        exprs.append(pl.col("flavor").cast(pl.Enum(FLAVORS)))
+    if "rel_day" in df.columns:
+        exprs.append(pl.col("rel_day").cast(pl.Int16))
+    for c in ("TTR_full", "TTR_half"):
+        if c in df.columns:
+            exprs.append(pl.col(c).cast(pl.Int16))
+    if float32:
+        exprs += [pl.col(c).cast(pl.Float32) for c in _FLOAT_COLUMNS if c in df.columns]
+    return df.with_columns(exprs)
+
+
+def compact_prices(
+    prices: pl.DataFrame, tkr_dtype: pl.Enum | None = None, float32: bool = False
+) -> pl.DataFrame:
+    """PRICE_CACHE with an Enum ticker (and Float32 close if asked)."""
+    tkr_dtype = ticker_enum(prices) if tkr_dtype is None else tkr_dtype
+    return _shrink(prices, tkr_dtype, float32)
+
+
+def compact_car(
+    car: pl.DataFrame,
+    ev_index: pl.DataFrame,
+    events: pl.DataFrame | None = None,
+    tkr_dtype: pl.Enum | None = None,
+    float32: bool = False,
+) -> pl.DataFrame:
+    """CAR_CACHE with Enum labels, ``ev_key`` surrogate and Int16 ``rel_day``.
+
+    Parameters
+    ----------
+    car : pl.DataFrame
+        date, AR, CAR, tkr, ev_id, stock_type, flavor
+    ev_index : pl.DataFrame
+        from :func:`build_ev_index`.
+    events : pl.DataFrame or None
+        ev_id + ev_date; when given, ``rel_day`` is precomputed.
+    float32 : bool
+        Store AR/CAR as Float32 (~1e-7 relative precision, fine for plots
+        and averages; keep Float64 for re-estimation).
+    """
+    tkr_dtype = ticker_enum(car) if tkr_dtype is None else tkr_dtype
+    if events is not None and "rel_day" not in car.columns:
+        car = (
+            car.join(
+                events.select(["ev_id", "ev_date"]).unique("ev_id"),
+                on="ev_id",
+                how="left",
+            )
+            .with_columns(
+                rel_day=(
+                    pl.col("date") - pl.col("ev_date").cast(pl.Date)
+                ).dt.total_days()
+            )
+            .drop("ev_date")
+        )
+    return _shrink(_to_ev_key(car, ev_index), tkr_dtype, float32)
+
+
+def compact_summary(
+    df: pl.DataFrame,
+    ev_index: pl.DataFrame,
+    tkr_dtype: pl.Enum | None = None,
+    float32: bool = False,
+) -> pl.DataFrame:
+    """MAE_CACHE / TTR_CACHE in the same compact form as the CAR rows."""
+    tkr_dtype = ticker_enum(df) if tkr_dtype is None else tkr_dtype
+    return _shrink(_to_ev_key(df, ev_index), tkr_dtype, float32)
+
+
+def expand(
+    df: pl.DataFrame | pl.LazyFrame,
+    ev_index: pl.DataFrame,
+    schema: pl.Schema | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Undo the compaction: ev_key -> ev_id and Enums back to Utf8.
+
+    With the plain ``schema`` (:func:`plain_schema`) the original column
+    order and dtypes come back too and derived columns (``rel_day``) are
+    dropped; without it Float32 columns are widened to Float64.
+    """
+    compact = df.collect_schema()
+    if "ev_key" in compact:
+        if isinstance(df, pl.LazyFrame):
+            ev_index = ev_index.lazy()
+        df = df.join(ev_index, on="ev_key", how="left").drop("ev_key")
+    if schema is not None:
+        return df.select(pl.col(c).cast(dtype) for c, dtype in schema.items())
+    return df.with_columns(
+        pl.col(c).cast(pl.Utf8 if dtype != pl.Float32 else pl.Float64)
+        for c, dtype in compact.items()
+        if isinstance(dtype, (pl.Enum, pl.Categorical)) or dtype == pl.Float32
+    )
+
+
+def schema_metadata(plain: pl.DataFrame) -> dict[str, str]:
+    """Parquet metadata recording ``plain``'s schema in a compact copy of it."""
+    return {PLAIN_SCHEMA_KEY: plain.clear().serialize(format="json")}
+
+
+def plain_schema(compact_file: str) -> pl.Schema | None:
+    """The schema recorded by :func:`schema_metadata` (None for older files)."""
+    recorded = pl.read_parquet_metadata(compact_file).get(PLAIN_SCHEMA_KEY)
+    if recorded is None:
+        return None
+    return pl.DataFrame.deserialize(io.StringIO(recorded), format="json").schema
+
+
+# ---- read path ----
+
+
+def compact_path(path: str) -> str:
+    """``<dir>/<name>_compact.parquet`` for the cache ``<dir>/<name>.parquet``."""
+    return f"{path.removesuffix('.parquet')}_compact.parquet"
+
+
+def cache_files(path: str) -> list[str]:
+    """The files a :func:`scan_cache` of ``path`` may read (to watch / version)."""
+    ev_index = os.path.join(os.path.dirname(path), EV_INDEX_FILE)
+    return [path, compact_path(path), ev_index]
+
+
+def _compact_is_current(path: str) -> bool:
+    compact = compact_path(path)
+    if not os.path.exists(compact):
+        return False
+    if not os.path.exists(path):
+        return True
+    return os.path.getmtime(compact) >= os.path.getmtime(path)
+
+
+def cache_exists(path: str) -> bool:
+    """Whether ``path`` or a compact copy of it can be read."""
+    return os.path.exists(path) or os.path.exists(compact_path(path))
+
+
+def scan_cache(path: str) -> pl.LazyFrame:
+    """Lazy scan of a cache, through its compact copy when that is current.
+
+    The compact copy is expanded back to the schema it was made from (column
+    order, ``ev_id``, Utf8 labels, Float64 numbers) so callers see the
+    cache's usual columns; filters still run on the compact file.
+    """
+    if not _compact_is_current(path):
+        return pl.scan_parquet(path)
+    compact = compact_path(path)
+    ev_index = pl.read_parquet(os.path.join(os.path.dirname(path), EV_INDEX_FILE))
+    return expand(pl.scan_parquet(compact), ev_index, plain_schema(compact))
+
+
+def read_cache(path: str) -> pl.DataFrame:
+    """:func:`scan_cache`, collected."""
+    return scan_cache(path).collect()
+
+
+def memory_report(
+    datasets: dict[str, tuple[pl.DataFrame, pl.DataFrame]],
+) -> pl.DataFrame:
+    """Measured in-memory size per dataset, before and after compaction."""
+    rows = []
+    for name, (before, after) in datasets.items():
+        b, a = before.estimated_size(), after.estimated_size()
+        rows.append(
+            {
+                "dataset": name,
+                "rows": before.height,
+                "bytes_before": b,
+                "bytes_after": a,
+                "ratio": a / b if b else None,
+            }
+        )
+    return pl.DataFrame(rows)
+
+
+def compact_all(
+    stocks_dir: str = STOCKS_DIR,
+    events: pl.DataFrame | None = None,
+    float32: bool = False,
+    write: bool = True,
+) -> pl.DataFrame:
+    """Compact every cache under ``stocks_dir`` and report the savings.
+
+    Writes ``<name>_compact.parquet`` next to each cache plus the shared
+    ``ev_index.parquet`` when ``write`` is set. Each copy records the
+    cache's schema (:func:`schema_metadata`) for :func:`scan_cache`.
+    """
+    paths = {
+        name: os.path.join(stocks_dir, f"{name}.parquet")
+        for name in ("price_cache", "car_cache", "mae_cache", "ttr_cache")
+    }
+    frames = {k: pl.read_parquet(p) for k, p in paths.items() if os.path.exists(p)}
+
+    tkr_dtype = ticker_enum(*frames.values())
+    ev_index = build_ev_index(*(f for f in frames.values() if "ev_id" in f.columns))
+
+    compacted = {}
+    for name, df in frames.items():
+        if name == "price_cache":
+            compacted[name] = compact_prices(df, tkr_dtype, float32)
+        elif name == "car_cache":
+            compacted[name] = compact_car(df, ev_index, events, tkr_dtype, float32)
+        else:
+            compacted[name] = compact_summary(df, ev_index, tkr_dtype, float32)
+
+    if write:
+        ev_index.write_parquet(os.path.join(stocks_dir, EV_INDEX_FILE))
+        for name, df in compacted.items():
+            df.write_parquet(
+                compact_path(paths[name]), metadata=schema_metadata(frames[name])
+            )
+
+    return memory_report({k: (frames[k], compacted[k]) for k in compacted})
@@ -0,0 +1,170 @@
+"""Shared paths, thresholds and ticker maps (lifted from data/final.ipynb)."""
+
+import os
+
+# ---- paths ----
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_ROOT = os.environ.get("AVIATION_DATA_ROOT", os.path.join(REPO_ROOT, "data"))
+NTSB_DIR = os.path.join(DATA_ROOT, "ntbs")
+STOCKS_DIR = os.path.join(DATA_ROOT, "stocks")
+FINANCIALS_DIR = os.path.join(DATA_ROOT, "financials")
+
+PROCESSED_PATH = os.path.join(NTSB_DIR, "processed.parquet")
+FEATURE_STORE_PATH = os.path.join(NTSB_DIR, "event_features.parquet")
+PRICES_PATH = os.path.join(STOCKS_DIR, "prices.parquet")
+MARKET_INDEX_PATH = os.path.join(STOCKS_DIR, "market_index.parquet")
+PRICE_CACHE_PATH = os.path.join(STOCKS_DIR, "price_cache.parquet")
+CAR_CACHE_PATH = os.path.join(STOCKS_DIR, "car_cache.parquet")
+MAE_CACHE_PATH = os.path.join(STOCKS_DIR, "mae_cache.parquet")
+TTR_CACHE_PATH = os.path.join(STOCKS_DIR, "ttr_cache.parquet")
+RETURN_PANEL_DIR = os.path.join(STOCKS_DIR, "return_panel")
+CAR_MATRIX_PATH = os.path.join(STOCKS_DIR, "car_matrix.npz")
+CRASH_INDEX_PATH = os.path.join(STOCKS_DIR, "crash_days.parquet")
+MINUTE_BARS_DIR = os.path.join(STOCKS_DIR, "minute_bars")
+INTRADAY_DIR = os.path.join(STOCKS_DIR, "intraday")
+DASHBOARD_CACHE_DIR = os.path.join(DATA_ROOT, "cache", "dashboard")
+SNAPSHOT_DIR = os.path.join(DATA_ROOT, "cache", "snapshots")
+
+# null markers used by the mdb-export CSVs
+NULL_VALUES = ["null", "Null", "None", "none", "NA", "na"]
+
+# ---- severity thresholds (inj_all_tot) ----
+INJURY_COUNT_THRESH = 1
+SEVERE_THRESH = 77
+MODERATE_THRESH = 12
+CATEGORIES = ["minor", "moderate", "severe"]
+
+# ---- event-study windows (calendar days relative to ev_date) ----
+EST_WINDOW = (-120, -21)
+EVT_WINDOW = (-5, 20)
+SHORT_WINDOW = 5
+TTR_DEFAULT = 21
+
+# ---- intraday event study (trading minutes relative to the first bar at or
+# after the crash; 390 = one regular US session) ----
+INTRADAY_EST_WINDOW = (-10 * 390, -390)
+INTRADAY_EVT_WINDOW = (-60, 5 * 390)
+INTRADAY_SHORT_WINDOW = 390
+BARS_TZ = "America/New_York"  # zone of naive vendor timestamps and ev_time
+
+### ticker convertion maps
+MANUFACTURER = {"BOEING", "AIRBUS", "AIRBUS INDUSTRIE"}
+
+TICKER_MAP = {
+    "BOEING": "BA",
+    "AIRBUS": "EADSY",
+    "AIRBUS INDUSTRIE": "EADSY",
+    "AIR FRANCE": "AF.PA",
+    "ASIANA AIRLINES": "020560.KS",
+    "PEGASUS AIRLINES": "PGSUS.IS",
+    "JEJU AIR": "089590.KQ",
+    "LUFTHANSA": "LHA.DE",
+    "SOUTHWEST AIRLINES CO": "LUV",
+    "CHINA EASTERN AIRLINES": "CEA",
+    "AMERICAN AIRLINES INC.,": "AAL",
+    "AMERICAN AIRLINES INC": "AAL",
+    "UNITED AIRLINES": "UAL",
+    "UNITED AIR LINES INC": "UAL",
+    "JETBLUE AIRWAYS": "JBLU",
+    "LATAM": "LTM",
+    "AIR CANADA": "AC",
+    "SINGAPORE AIRLINES LTD": "C6L",
+    "SINGAPORE AIRLINES": "C6L",
+    "CHINA AIRLINES": "2610",
+    "AIR INDIA CHARTERS": "BLUEDART.NS",
+    # --- Appended airline tickers from larger list ---
+    "ALASKA AIRLINES INC": "ALK",
+    "NORWEGIAN AIR SHUTTLE SWEDEN A": "NAS.OL",
+    "SPIRIT AIRLINES LLC": "SAVEQ",
+    "SPIRIT AIRLINES": "SAVEQ",
+    "SPIRIT AIRLINES, INC.": "SAVEQ",
+    "SPIRIT AIRLINES INC.": "SAVEQ",
+    "SPIRIT AIRLINES INC": "SAVEQ",
+    "ALLEGIANT AIR, LLC": "ALGT",
+    "DELTA AIR LINES, INC.": "DAL",
+    "DELTA AIR LINES INC": "DAL",
+    "DELTA AIR LINES": "DAL",
+    "DELTA AIRLINES": "DAL",
+    "KLM ROYAL DUTCH AIRLINES": "AF.PA",
+    "JAPAN AIRLINES INTERNATIONAL": "9201.T",
+    "JAPAN AIRLINES INTERNATIONAL C": "9201.T",
+    "UNITED PARCEL SERVICE CO": "UPS",
+    "BRITISH AIRWAYS": "IAG.L",
+    "CATHAY PACIFIC AIRWAYS": "0293.HK",
+    "INTERNATIONAL LEASE FINANCE CO": "AER",
+    "UTAIR": "UTAR.ME",
+    "RYAN AIR": "RYAAY",
+    "ANA": "9202.T",
+    "ALL NIPPON AIRWAYS": "9202.T",
+    "ALL NIPPON AIRWAYS CO. LTD": "9202.T",
+}
+
+AIRLINES = sorted(TICKER_MAP.keys() - MANUFACTURER)
+
+# display names for the manufacturer tickers (dashboard filter values)
+MANUFACTURER_NAMES = {"BA": "Boeing", "EADSY": "Airbus"}
+
+STOCK_MARKET_MAP = {
+    "INDIGO.NS": "^NSEI",  # NIFTY 50 (India)
+    "BLUEDART.NS": "^NSEI",  # NIFTY 50 (India)
+    "BA": "^GSPC",  # S&P 500 (US)
+    "GE": "^GSPC",  # S&P 500 (US)
+    "EADSY": "^GSPC",  # Airbus ADR trades in US → S&P 500
+    "AF.PA": "^FCHI",  # CAC 40 (France)
+    "020560.KS": "^KS11",  # Asiana Airlines — KOSPI (Korea)
+    "LHA.DE": "^GDAXI",  # Lufthansa — DAX (Germany)
+    "LUV": "^GSPC",  # Southwest — S&P 500 (US)
+    "PGSUS.IS": "XU100.IS",  # Pegasus — BIST 100 (Turkey)
+    "CEA": "^GSPC",  # China Eastern ADR — S&P 500 (US)
+    "089590.KQ": "^KQ11",  # JEJU Air — KOSDAQ (Korea)
+    "AAL": "^GSPC",  # American Airlines — S&P 500 (US)
+    "UAL": "^GSPC",  # United Airlines — S&P 500 (US)
+    "JBLU": "^GSPC",  # JetBlue — S&P 500 (US)
+    "LTM": "^GSPC",  # LATAM ADR — S&P 500 (US)
+    "AC": "^GSPTSE",  # Air Canada — S&P/TSX Composite (Canada)
+    "C6L": "^STI",  # Singapore Airlines — Straits Times Index (Singapore)
+    "2610": "^TWII",  # China Airlines — TAIEX (Taiwan)
+    # --- Appended airline tickers from extended list ---
+    "ALK": "^GSPC",  # Alaska Air Group — US
+    "NAS.OL": "OBX.OL",  # Norwegian Air Shuttle — Oslo OBX Index
+    "SAVEQ": "^GSPC",  # Spirit Airlines — US (OTC but US index applies)
+    "ALGT": "^GSPC",  # Allegiant Travel Co — US
+    "DAL": "^GSPC",  # Delta Air Lines — US
+    "IAG.L": "^FTSE",  # International Airlines Group (British Airways/Aer Lingus) — FTSE 100
+    "0293.HK": "^HSI",  # Cathay Pacific — Hang Seng Index (HK)
+    "AER": "^GSPC",  # AerCap Holdings (ILFC acquirer) — US
+    "UTAR.ME": "IMOEX.ME",  # UTair Aviation — MOEX Russia Index
+    "RYAAY": "^GSPC",  # Ryanair ADR — US
+    "9202.T": "^N225",  # ANA Holdings — Nikkei 225
+    "9201.T": "^N225",  # Japan Airlines — Nikkei 225
+    "UPS": "^GSPC",  # United Parcel Service — US
+}
+
+# ---- extra factors for multi-factor expected returns ----
+AIRLINE_ETF = "JETS"  # U.S. Global Jets ETF
+AEROSPACE_ETF = "ITA"  # iShares U.S. Aerospace & Defense ETF
+
+SECTOR_MAP = {
+    tkr: AEROSPACE_ETF if tkr in {TICKER_MAP[m] for m in MANUFACTURER} else AIRLINE_ETF
+    for tkr in STOCK_MARKET_MAP
+}
+
+# local-currency listings -> USD rate (yfinance symbols); USD listings have no FX factor
+FX_MAP = {
+    "INDIGO.NS": "INRUSD=X",
+    "BLUEDART.NS": "INRUSD=X",
+    "AF.PA": "EURUSD=X",
+    "020560.KS": "KRWUSD=X",
+    "089590.KQ": "KRWUSD=X",
+    "LHA.DE": "EURUSD=X",
+    "PGSUS.IS": "TRYUSD=X",
+    "AC": "CADUSD=X",
+    "C6L": "SGDUSD=X",
+    "2610": "TWDUSD=X",
+    "NAS.OL": "NOKUSD=X",
+    "IAG.L": "GBPUSD=X",
+    "0293.HK": "HKDUSD=X",
+    "UTAR.ME": "RUBUSD=X",
+    "9202.T": "JPYUSD=X",
+    "9201.T": "JPYUSD=X",
+}
@@ -0,0 +1,235 @@
+"""Level-of-detail price series and crash markers for the dashboard.
+
+A ticker's full daily history is a few thousand points; every zoom level of
+the price panel only needs about one or two points per pixel. :func:`lttb`
+(Largest-Triangle-Three-Buckets) keeps the visual shape of a line with a
+fixed number of points, :func:`minmax_buckets` keeps every bucket's extremes
+(so a crash-day gap can never be smoothed away). :func:`price_view` slices the
+visible range out of the :class:`~aviation.panel.ReturnPanel` and decimates
+it, so the payload sent to the browser is bounded by the point budget at any
+zoom level.
+
+Crash markers come from :func:`crash_day_index`, which maps each (event,
+ticker) to its trading day on the panel calendar. The stored index
+(``crash_days.parquet``, written by the pipeline's ``aggregates`` stage) keeps
+only event dates, so it stays valid across panel rebuilds; positions are
+resolved against whichever panel :func:`read_crash_index` is given.
+"""
+
+import os
+
+import numpy as np
+import polars as pl
+
+from .config import CRASH_INDEX_PATH
+from .features import event_ticker_pairs
+from .panel import ReturnPanel
+
+METHODS = ("lttb", "minmax")
+
+CRASH_EVENTS_SCHEMA = {
+    "ev_id": pl.Utf8,
+    "tkr": pl.Utf8,
+    "stock_type": pl.Utf8,
+    "category": pl.Utf8,
+    "ev_date": pl.Date,
+}
+CRASH_INDEX_SCHEMA = {**CRASH_EVENTS_SCHEMA, "day_idx": pl.Int32}
+
+
+def minmax_buckets(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the min and max of ``y`` in each of ``(n_out - 2) // 2`` buckets.
+
+    Buckets are equal runs of consecutive points; the first and last points
+    are always kept. Returned indices are sorted, NaNs are never selected.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.flatnonzero(~np.isnan(y))
+    n_buckets = max((n_out - 2) // 2, 1)
+    b = (np.arange(n) * n_buckets) // n
+    ok = ~np.isnan(y)
+    i = np.flatnonzero(ok)
+    # sort by (bucket, y): the first row of each bucket is its min, the last its max
+    order = i[np.lexsort((y[i], b[i]))]
+    bo = b[order]
+    starts = np.flatnonzero(np.r_[True, bo[1:] != bo[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+    keep = np.concatenate([order[starts], order[ends], i[:1], i[-1:]])
+    return np.unique(keep)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of ``n_out`` representative points.
+
+    ``x`` must be increasing and numeric (e.g. epoch days). The first and
+    last points are kept; from every bucket in between the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    mean is chosen. A budget below 3 leaves no bucket in between: only the
+    first and last points are returned.
+    """
+    ok = np.flatnonzero(~np.isnan(y))
+    if len(ok) <= max(n_out, 2):
+        return ok
+    if n_out < 3:
+        return ok[[0, -1]]
+    x, y = np.asarray(x, dtype=np.float64)[ok], np.asarray(y, dtype=np.float64)[ok]
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * every).astype(np.int64) + 1
+
+    # next-bucket means only depend on the bucket layout, so do them up front
+    cx, cy = np.cumsum(np.r_[0.0, x]), np.cumsum(np.r_[0.0, y])
+    nxt_lo, nxt_hi = edges[1:], np.r_[edges[2:], n]
+    cnt = np.maximum(nxt_hi - nxt_lo, 1)
+    mx = (cx[nxt_hi] - cx[nxt_lo]) / cnt
+    my = (cy[nxt_hi] - cy[nxt_lo]) / cnt
+    mx[-1], my[-1] = x[-1], y[-1]
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for k in range(n_out - 2):
+        lo, hi = edges[k], edges[k + 1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - mx[k]) * (ys - y[a]) - (x[a] - xs) * (my[k] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[k + 1] = a
+    return ok[np.unique(out)]
+
+
+def decimate(x: np.ndarray, y: np.ndarray, n_out: int, method: str = "lttb"):
+    """Indices of at most ``n_out`` points of (x, y) chosen by ``method``."""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    if method == "lttb":
+        return lttb(x, y, n_out)
+    return minmax_buckets(y, n_out)
+
+
+def price_view(
+    panel: ReturnPanel,
+    tkr: str,
+    start=None,
+    end=None,
+    n_out: int = 2000,
+    method: str = "lttb",
+) -> pl.DataFrame:
+    """Decimated closes of ``tkr`` between ``start`` and ``end`` (inclusive).
+
+    Returns
+    -------
+    pl.DataFrame
+        day_idx (position on the panel calendar), date, close; at most
+        ``n_out`` rows whatever the range.
+    """
+    row = panel.index([tkr])[0]
+    if row < 0:
+        raise KeyError(f"{tkr} not in panel")
+    lo, hi = view_range(panel, start, end)
+    close = np.asarray(panel.close[row, lo:hi], dtype=np.float64)
+    keep = decimate(panel.days[lo:hi], close, n_out, method)
+    return pl.DataFrame(
+        {
+            "day_idx": (lo + keep).astype(np.int32),
+            "date": panel.dates[lo + keep],
+            "close": close[keep],
+        }
+    )
+
+
+def view_range(panel: ReturnPanel, start=None, end=None) -> tuple[int, int]:
+    """[lo, hi) calendar positions covering ``start``..``end`` (dates or None)."""
+    days = panel.days
+    lo = 0 if start is None else np.searchsorted(days, _epoch_day(start), "left")
+    hi = len(days) if end is None else np.searchsorted(days, _epoch_day(end), "right")
+    return int(lo), int(hi)
+
+
+def _epoch_day(d) -> int:
+    return int(np.datetime64(d, "D").astype(np.int64))
+
+
+def crash_events(events: pl.DataFrame) -> pl.DataFrame:
+    """(event, ticker) rows with their event date: the stored crash index."""
+    pairs = events if "tkr" in events.columns else event_ticker_pairs(events)
+    if "category" not in pairs.columns:
+        pairs = pairs.with_columns(category=pl.lit(None, dtype=pl.Utf8))
+    return (
+        pairs.select(CRASH_EVENTS_SCHEMA.keys())
+        .cast(CRASH_EVENTS_SCHEMA)
+        .unique(["ev_id", "tkr"], keep="first", maintain_order=True)
+    )
+
+
+def crash_day_index(events: pl.DataFrame, panel: ReturnPanel) -> pl.DataFrame:
+    """(event, ticker) -> first trading day on or after the event.
+
+    Events falling after the last panel date are dropped; tickers missing
+    from the panel are kept (the markers are only drawn for tickers shown).
+    """
+    pairs = crash_events(events)
+    ev_days = pairs["ev_date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    t = np.searchsorted(panel.days, ev_days, side="left")
+    return (
+        pairs.with_columns(day_idx=pl.Series(t, dtype=pl.Int32))
+        .filter(pl.col("day_idx") < len(panel.dates))
+        .select(CRASH_INDEX_SCHEMA.keys())
+        .cast(CRASH_INDEX_SCHEMA)
+        .sort(["tkr", "day_idx"])
+    )
+
+
+def write_crash_index(events: pl.DataFrame, path: str = CRASH_INDEX_PATH) -> str:
+    """Store the crash events (dates only, no panel positions)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    crash_events(events).sort(["tkr", "ev_date", "ev_id"]).write_parquet(tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def read_crash_index(panel: ReturnPanel, path: str = CRASH_INDEX_PATH) -> pl.DataFrame:
+    """The stored crash events, positioned on ``panel``'s calendar."""
+    if not os.path.exists(path):
+        return pl.DataFrame(schema=CRASH_INDEX_SCHEMA)
+    return crash_day_index(pl.read_parquet(path), panel)
+
+
+def crash_markers(
+    index: pl.DataFrame,
+    panel: ReturnPanel,
+    tkr: str,
+    start=None,
+    end=None,
+    max_markers: int = 500,
+) -> pl.DataFrame:
+    """Markers of ``tkr`` inside the view, placed on that day's close.
+
+    At most ``max_markers`` rows; when the view holds more events the most
+    severe are kept.
+    """
+    row = panel.index([tkr])[0]
+    if row < 0:
+        raise KeyError(f"{tkr} not in panel")
+    lo, hi = view_range(panel, start, end)
+    m = index.filter((pl.col("tkr") == tkr) & pl.col("day_idx").is_between(lo, hi - 1))
+    if m.height > max_markers:
+        rank = (
+            pl.col("category")
+            .str.to_lowercase()
+            .replace_strict(
+                {"severe": 0, "moderate": 1, "minor": 2},
+                default=3,
+                return_dtype=pl.Int8,
+            )
+        )
+        m = m.sort(rank, "day_idx").head(max_markers).sort("day_idx")
+    t = m["day_idx"].to_numpy()
+    # a ticker not traded that day is marked at its previous close
+    close = np.asarray(panel.close[row, t], dtype=np.float64)
+    at = np.where(np.isnan(close), panel.prev[row, t], t)
+    close = np.where(at >= 0, panel.close[row, np.maximum(at, 0)], np.nan)
+    return m.with_columns(
+        date=pl.Series(panel.dates[t]), close=pl.Series(close)
+    ).fill_nan(None)
@@ -0,0 +1,393 @@
+"""Columnar, ev_id-keyed event feature store built from the NTSB tables.
+
+``processed.parquet`` only carries the event/aircraft basics. The richer
+mdb-export tables (findings, occurrences, sequence of events, engines, crew,
+injuries) are aggregated to one row per ``ev_id`` here, joined once, and
+written as a single dictionary-encoded parquet file. Consumers read just the
+columns they need through :func:`load_features` / :func:`scan_features`.
+"""
+
+import os
+
+import polars as pl
+
+from .codes import CODE_SCHEMA, CodeTable, encode_frame, load_code_tables, table_for
+from .config import (
+    CATEGORIES,
+    FEATURE_STORE_PATH,
+    MODERATE_THRESH,
+    NTSB_DIR,
+    NULL_VALUES,
+    PROCESSED_PATH,
+    SEVERE_THRESH,
+    STOCK_MARKET_MAP,
+    TICKER_MAP,
+)
+
+# columns that stay plain strings even though they are Utf8
+_KEY_COLUMNS = {"ev_id"}
+
+# feature column -> (NTSB table, coded column) it was taken from
+_CODED_FEATURES = {
+    "primary_finding_code": ("Findings", "finding_code"),
+    "defining_occurrence_code": ("Events_Sequence", "Occurrence_Code"),
+    "first_occurrence_code": ("Occurrences", "Occurrence_Code"),
+    "occ_phase_code": ("Occurrences", "Phase_of_Flight"),
+}
+
+
+def severity_category(col: str = "inj_all_tot") -> pl.Expr:
+    """minor / moderate / severe bucket from the injury total (as in final.ipynb)."""
+    return (
+        pl.when(pl.col(col) > SEVERE_THRESH)
+        .then(pl.lit("severe"))
+        .when(pl.col(col) <= MODERATE_THRESH)
+        .then(pl.lit("minor"))
+        .otherwise(pl.lit("moderate"))
+        .cast(pl.Enum(CATEGORIES))
+        .alias("category")
+    )
+
+
+def map_tickers(df: pl.LazyFrame | pl.DataFrame) -> pl.LazyFrame | pl.DataFrame:
+    """Attach manufacturer/airline/market tickers without per-row Python calls."""
+    return df.with_columns(
+        manufacturer_tkr=pl.col("acft_make").replace_strict(
+            TICKER_MAP, default=None, return_dtype=pl.Utf8
+        ),
+        airline_tkr=pl.col("oper_name").replace_strict(
+            TICKER_MAP, default=None, return_dtype=pl.Utf8
+        ),
+    ).with_columns(
+        market_tkr=pl.col("airline_tkr").replace_strict(
+            STOCK_MARKET_MAP, default=None, return_dtype=pl.Utf8
+        )
+    )
+
+
+def event_ticker_pairs(events: pl.DataFrame) -> pl.DataFrame:
+    """Long (ev_id, ev_date, stock_type, tkr, market_tkr) work list.
+
+    One row per event and listed firm involved, mirroring the manufacturer /
+    operator pair that ``compute_car_all`` scores; rows whose ticker has no
+    market index are dropped as they are there.
+    """
+    if "manufacturer_tkr" not in events.columns:
+        events = map_tickers(events)
+    cols = [c for c in ("ev_id", "ev_date", "category") if c in events.columns]
+    return (
+        pl.concat(
+            [
+                events.select(
+                    *cols, stock_type=pl.lit("manufacturer"), tkr="manufacturer_tkr"
+                ),
+                events.select(*cols, stock_type=pl.lit("operator"), tkr="airline_tkr"),
+            ],
+            how="vertical_relaxed",
+        )
+        .with_columns(
+            pl.col("tkr").cast(pl.Utf8),
+            market_tkr=pl.col("tkr")
+            .cast(pl.Utf8)
+            .replace_strict(STOCK_MARKET_MAP, default=None, return_dtype=pl.Utf8),
+        )
+        .drop_nulls(["tkr", "market_tkr"])
+    )
+
+
+def read_ntsb_table(
+    name: str, columns: list[str], ntsb_dir: str = NTSB_DIR
+) -> pl.LazyFrame | None:
+    """Lazily scan one mdb-export CSV, keeping only ``columns`` that exist.
+
+    Returns None when the table file is missing so optional tables simply
+    drop out of the feature store instead of failing the build.
+    """
+    path = os.path.join(ntsb_dir, f"{name}.csv")
+    if not os.path.exists(path):
+        return None
+    lf = pl.scan_csv(
+        path,
+        null_values=NULL_VALUES,
+        ignore_errors=True,
+        infer_schema_length=10000,
+        schema_overrides={"ev_id": pl.Utf8, "Aircraft_Key": pl.Utf8, **CODE_SCHEMA},
+    )
+    present = [c for c in columns if c in lf.collect_schema().names()]
+    if "ev_id" not in present:
+        return None
+    return lf.select(present)
+
+
+def read_coded_table(
+    name: str,
+    columns: list[str],
+    ntsb_dir: str = NTSB_DIR,
+    code_tables: dict[str, CodeTable] | None = None,
+) -> pl.LazyFrame | None:
+    """Like :func:`read_ntsb_table`, with coded columns as Enum codes + labels.
+
+    Use this for the many-rows-per-event tables (Findings, Events_Sequence)
+    that get joined against CAR rows: grouping by cause then runs on the
+    Enum's integer index instead of strings.
+    """
+    lf = read_ntsb_table(name, columns, ntsb_dir)
+    if lf is None:
+        return None
+    tables = load_code_tables(ntsb_dir) if code_tables is None else code_tables
+    return encode_frame(lf, name, tables)
+
+
+# ---- per-table aggregations (one row per ev_id) ----
+
+
+def _findings(ntsb_dir: str) -> pl.LazyFrame | None:
+    lf = read_ntsb_table(
+        "Findings",
+        ["ev_id", "finding_no", "finding_code", "finding_description", "Cause_Factor"],
+        ntsb_dir,
+    )
+    if lf is None:
+        return None
+    # primary finding = first cause ("C") finding, else the first finding listed
+    return (
+        lf.with_columns(_is_cause=pl.col("Cause_Factor").eq("C").fill_null(False))
+        .sort(["ev_id", "_is_cause", "finding_no"], descending=[False, True, False])
+        .group_by("ev_id", maintain_order=True)
+        .agg(
+            n_findings=pl.len(),
+            n_cause_findings=pl.col("_is_cause").sum(),
+            primary_finding_code=pl.col("finding_code").first(),
+            primary_finding=pl.col("finding_description").first(),
+        )
+    )
+
+
+def _events_sequence(ntsb_dir: str) -> pl.LazyFrame | None:
+    lf = read_ntsb_table(
+        "Events_Sequence",
+        [
+            "ev_id",
+            "Occurrence_No",
+            "Occurrence_Code",
+            "Occurrence_Description",
+            "phase_no",
+            "Defining_ev",
+        ],
+        ntsb_dir,
+    )
+    if lf is None:
+        return None
+    # descriptions read "<phase>-<occurrence>", e.g. "Landing-Runway excursion"
+    defining = pl.col("Defining_ev").cast(pl.Utf8).is_in(["1", "true", "True", "Y"])
+    return (
+        lf.with_columns(_defining=defining.fill_null(False))
+        .sort(["ev_id", "_defining", "Occurrence_No"], descending=[False, True, False])
+        .group_by("ev_id", maintain_order=True)
+        .agg(
+            n_seq_events=pl.len(),
+            defining_occurrence_code=pl.col("Occurrence_Code").first(),
+            defining_occurrence=pl.col("Occurrence_Description").first(),
+            seq_phase=pl.col("Occurrence_Description")
+            .first()
+            .str.split("-")
+            .list.first()
+            .str.strip_chars(),
+        )
+    )
+
+
+def _occurrences(ntsb_dir: str) -> pl.LazyFrame | None:
+    # pre-2008 events carry occurrences + phase here instead of Events_Sequence
+    lf = read_ntsb_table(
+        "Occurrences",
+        ["ev_id", "Occurrence_No", "Occurrence_Code", "Phase_of_Flight"],
+        ntsb_dir,
+    )
+    if lf is None:
+        return None
+    return (
+        lf.sort(["ev_id", "Occurrence_No"])
+        .group_by("ev_id", maintain_order=True)
+        .agg(
+            n_occurrences=pl.len(),
+            first_occurrence_code=pl.col("Occurrence_Code").first(),
+            occ_phase_code=pl.col("Phase_of_Flight").first(),
+        )
+    )
+
+
+def _seq_of_events(ntsb_dir: str) -> pl.LazyFrame | None:
+    lf = read_ntsb_table("seq_of_events", ["ev_id", "Cause_Factor"], ntsb_dir)
+    if lf is None:
+        return None
+    return lf.group_by("ev_id").agg(
+        n_legacy_seq=pl.len(),
+        n_legacy_causes=pl.col("Cause_Factor").eq("C").fill_null(False).sum(),
+    )
+
+
+def _engines(ntsb_dir: str) -> pl.LazyFrame | None:
+    lf = read_ntsb_table(
+        "engines", ["ev_id", "eng_no", "eng_type", "eng_mfgr"], ntsb_dir
+    )
+    if lf is None:
+        return None
+    return (
+        lf.sort(["ev_id", "eng_no"])
+        .group_by("ev_id", maintain_order=True)
+        .agg(
+            n_engines=pl.len(),
+            eng_type=pl.col("eng_type").first(),
+            eng_mfgr=pl.col("eng_mfgr").first(),
+        )
+    )
+
+
+def _flight_crew(ntsb_dir: str) -> pl.LazyFrame | None:
+    lf = read_ntsb_table(
+        "Flight_Crew", ["ev_id", "crew_no", "crew_category", "crew_age"], ntsb_dir
+    )
+    if lf is None:
+        return None
+    is_pilot = pl.col("crew_category").str.strip_chars().eq("PLT")
+    return lf.group_by("ev_id").agg(
+        n_crew=pl.len(),
+        pilot_age=pl.col("crew_age").filter(is_pilot).first(),
+    )
+
+
+def _injury(ntsb_dir: str) -> pl.LazyFrame | None:
+    lf = read_ntsb_table(
+        "injury",
+        ["ev_id", "inj_person_category", "injury_level", "inj_person_count"],
+        ntsb_dir,
+    )
+    if lf is None:
+        return None
+    level = pl.col("injury_level").str.strip_chars()
+    person = pl.col("inj_person_category").str.strip_chars()
+    count = pl.col("inj_person_count").fill_null(0)
+    return lf.group_by("ev_id").agg(
+        inj_fatal=count.filter(level.eq("FATL")).sum(),
+        inj_serious=count.filter(level.eq("SERS")).sum(),
+        inj_minor=count.filter(level.eq("MINR")).sum(),
+        inj_crew_fatal=count.filter(level.eq("FATL") & person.eq("CREW")).sum(),
+        inj_pass_fatal=count.filter(level.eq("FATL") & person.eq("PASS")).sum(),
+    )
+
+
+_TABLE_FEATURES = (
+    _findings,
+    _events_sequence,
+    _occurrences,
+    _seq_of_events,
+    _engines,
+    _flight_crew,
+    _injury,
+)
+
+
+def _base_events(processed_path: str) -> pl.LazyFrame:
+    lf = pl.scan_parquet(processed_path)
+    names = lf.collect_schema().names()
+    lf = lf.with_columns(pl.col("oper_name").str.strip_chars().str.to_uppercase())
+    if "inj_all_tot" not in names:
+        lf = lf.with_columns(
+            inj_all_tot=pl.col("inj_tot_f") + pl.col("inj_tot_m") + pl.col("inj_tot_s")
+        )
+    # processed.parquet is aircraft-level; the store is event-level
+    return lf.unique(subset="ev_id", keep="first", maintain_order=True)
+
+
+def _decode_codes(lf: pl.LazyFrame, tables: dict[str, CodeTable]) -> pl.LazyFrame:
+    names = lf.collect_schema().names()
+    exprs = []
+    for col, (table, column) in _CODED_FEATURES.items():
+        ct = table_for(tables, table, column)
+        if col not in names or ct is None or len(ct) == 0:
+            continue
+        label = col.removesuffix("_code") + "_label"
+        exprs += [ct.encode(col).alias(col), ct.decode(col).alias(label)]
+    return lf.with_columns(exprs) if exprs else lf
+
+
+def _dictionary_encode(df: pl.DataFrame) -> pl.DataFrame:
+    return df.with_columns(
+        pl.col(c).cast(pl.Categorical)
+        for c, dtype in df.schema.items()
+        if dtype == pl.Utf8 and c not in _KEY_COLUMNS
+    )
+
+
+def build_feature_store(
+    processed_path: str = PROCESSED_PATH,
+    ntsb_dir: str = NTSB_DIR,
+    out_path: str | None = FEATURE_STORE_PATH,
+    code_tables: dict[str, CodeTable] | None = None,
+) -> pl.DataFrame:
+    """Join every NTSB table onto the processed events once and persist it.
+
+    Parameters
+    ----------
+    processed_path : str
+        Event/aircraft base table written by data/ntbs.ipynb.
+    ntsb_dir : str
+        Folder holding the mdb-export CSVs.
+    out_path : str or None
+        Parquet destination; None skips writing.
+    code_tables : dict or None
+        Compiled lookups from :mod:`aviation.codes`; loaded (and compiled on
+        first use) from ``ntsb_dir`` when omitted.
+
+    Returns
+    -------
+    pl.DataFrame
+        One row per ev_id with derived ``category``, ``phase_of_flight`` and
+        ``primary_finding`` columns; coded columns are Enums with a matching
+        ``*_label`` Enum, other string columns are Categorical.
+    """
+    if code_tables is None:
+        code_tables = load_code_tables(ntsb_dir)
+    lf = map_tickers(_base_events(processed_path)).with_columns(severity_category())
+
+    for table_features in _TABLE_FEATURES:
+        agg = table_features(ntsb_dir)
+        if agg is not None:
+            lf = lf.join(agg, on="ev_id", how="left")
+
+    lf = _decode_codes(lf, code_tables)
+    names = lf.collect_schema().names()
+    # post-2008 phase from the defining event, else the decoded legacy phase code
+    phase_sources = [
+        pl.col(c).cast(pl.Utf8)
+        for c in ("seq_phase", "occ_phase_label", "occ_phase_code")
+        if c in names
+    ]
+    if phase_sources:
+        lf = lf.with_columns(
+            phase_of_flight=pl.coalesce(phase_sources).str.to_uppercase()
+        )
+    if "primary_finding" not in names:
+        lf = lf.with_columns(primary_finding=pl.lit(None, dtype=pl.Utf8))
+
+    df = _dictionary_encode(lf.collect().sort("ev_id"))
+
+    if out_path is not None:
+        df.write_parquet(out_path, compression="zstd", statistics=True)
+    return df
+
+
+def scan_features(path: str = FEATURE_STORE_PATH) -> pl.LazyFrame:
+    """Lazy handle on the store so filters/projections push into the reader."""
+    return pl.scan_parquet(path)
+
+
+def load_features(
+    columns: list[str] | None = None, path: str = FEATURE_STORE_PATH
+) -> pl.DataFrame:
+    """Read only ``columns`` (ev_id is always included) from the feature store."""
+    lf = scan_features(path)
+    if columns is not None:
+        lf = lf.select(["ev_id", *[c for c in columns if c != "ev_id"]])
+    return lf.collect()
@@ -0,0 +1,506 @@
+"""Quarterly firm fundamentals from SEC XBRL ``companyconcept`` facts.
+
+Port of ``sec_quarterlies`` from data/financials.ipynb. The notebook issued one
+fresh ``requests.get`` per candidate concept, serially. Here every
+(CIK, concept) URL for every ticker is fetched concurrently through one
+pooled session under the SEC fair-access limit (10 requests/s), and responses
+live in an on-disk cache revalidated with ETag / Last-Modified.
+
+The cache mirrors the URL path (``<cache>/CIK0000012927/us-gaap/Assets.json``),
+so a cache directory doubles as an offline fixture set: :class:`FixtureSource`
+serves the same layout without touching the network.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import polars as pl
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import FINANCIALS_DIR, STOCK_MARKET_MAP
+
+SEC_BASE = "https://data.sec.gov/api/xbrl/companyconcept"
+SEC_CACHE_DIR = os.path.join(FINANCIALS_DIR, "sec_cache")
+
+# REQUIRED: SEC wants a real User-Agent (your name + email or site)
+USER_AGENT = os.environ.get("SEC_USER_AGENT", "your_name your_email")
+
+# SEC fair-access policy caps clients at 10 requests per second
+SEC_MAX_RATE = 10.0
+
+# US filers with us-gaap XBRL (add more if needed)
+CIK = {
+    "BA": 12927,  # Boeing
+    "LUV": 92380,  # Southwest
+    "AAL": 6201,  # American Airlines Group
+    "DAL": 27904,  # Delta Air Lines
+    "UAL": 100517,  # United Airlines Holdings
+    "JBLU": 1158463,  # JetBlue
+    "ALK": 766421,  # Alaska Air Group
+    "ALGT": 1362468,  # Allegiant Travel
+    "SAVEQ": 1498710,  # Spirit Airlines
+    "UPS": 1090727,  # United Parcel Service
+    "AER": 1378789,  # AerCap (20-F, us-gaap)
+}
+
+# For each "metric", give candidate us-gaap concept names (pick longest series)
+CONCEPTS = {
+    "revenue": [
+        "RevenueFromContractWithCustomerExcludingAssessedTax",
+        "SalesRevenueNet",
+        "Revenues",
+    ],
+    "oper_income": [
+        "OperatingIncomeLoss",
+        "IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest",
+    ],
+    "net_income": [
+        "NetIncomeLoss",
+        "ProfitLoss",
+    ],
+    "interest_expense": [
+        "InterestExpense",
+        "InterestExpenseDebt",
+    ],
+    "total_assets": [
+        "Assets",
+    ],
+    "total_liabilities": [
+        "Liabilities",
+    ],
+    "long_term_debt": [
+        "LongTermDebtNoncurrent",
+        "LongTermDebt",
+    ],
+    "short_term_debt": [
+        "ShortTermBorrowings",
+        "DebtCurrent",
+        "ShortTermDebt",
+    ],
+    "cash_and_equiv": [
+        "CashAndCashEquivalentsAtCarryingValue",
+        "CashCashEquivalentsAndShortTermInvestments",  # fallback if first is missing
+    ],
+    "cfo": [
+        "NetCashProvidedByUsedInOperatingActivities",
+        "NetCashProvidedByUsedInOperatingActivitiesContinuingOperations",
+    ],
+    "capex": [
+        "PaymentsToAcquirePropertyPlantAndEquipment",
+        "CapitalExpendituresIncurredButNotYetPaid",
+        "CapitalExpenditures",
+    ],
+}
+
+
+def concept_path(cik: int, concept: str) -> str:
+    """URL path below :data:`SEC_BASE`; also the cache/fixture layout."""
+    return f"CIK{cik:010d}/us-gaap/{concept}.json"
+
+
+class RateLimiter:
+    """Spaces calls ``1 / rate`` seconds apart across all threads."""
+
+    def __init__(self, rate: float = SEC_MAX_RATE):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SecClient:
+    """Pooled, rate-limited, disk-cached client for companyconcept JSON.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Where response bodies (and their ``.meta.json`` validators) live.
+    max_age : float
+        Seconds a cached response is trusted without revalidation. After
+        that a conditional GET is sent; a 304 reuses the cached body.
+    rate : float
+        Requests per second, shared by all worker threads.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = SEC_CACHE_DIR,
+        max_age: float = 24 * 3600,
+        rate: float = 8.0,
+        user_agent: str = USER_AGENT,
+        pool_size: int = 16,
+        timeout: float = 30,
+    ):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.timeout = timeout
+        self.limiter = RateLimiter(min(rate, SEC_MAX_RATE))
+        self.session = requests.Session()
+        self.session.headers.update(
+            {"User-Agent": user_agent, "Accept-Encoding": "gzip, deflate"}
+        )
+        retry = Retry(
+            total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session.mount("https://", adapter)
+
+    def _paths(self, rel: str) -> tuple[str, str]:
+        body = os.path.join(self.cache_dir, rel)
+        return body, body + ".meta.json"
+
+    def _read_meta(self, meta_path: str) -> dict:
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, rel: str, status: int, validators: dict, content: bytes | None):
+        body_path, meta_path = self._paths(rel)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        if content is not None:
+            tmp = f"{body_path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, body_path)
+        meta = {"status": status, "fetched": time.time(), **validators}
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+    def _read_body(self, rel: str) -> dict | None:
+        body_path, _ = self._paths(rel)
+        try:
+            with open(body_path, "rb") as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def fetch(self, cik: int, concept: str) -> dict | None:
+        """companyconcept JSON, or None if the firm does not report it."""
+        rel = concept_path(cik, concept)
+        meta = self._read_meta(self._paths(rel)[1])
+        fresh = time.time() - meta.get("fetched", 0) < self.max_age
+        if meta and fresh:
+            return self._read_body(rel) if meta.get("status") == 200 else None
+
+        headers = {}
+        if meta.get("status") == 200:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        self.limiter.wait()
+        r = self.session.get(f"{SEC_BASE}/{rel}", headers=headers, timeout=self.timeout)
+        validators = {
+            "etag": r.headers.get("ETag", meta.get("etag")),
+            "last_modified": r.headers.get("Last-Modified", meta.get("last_modified")),
+        }
+        if r.status_code == 304:
+            # unchanged upstream: keep the body, refresh the timestamp
+            self._write(rel, 200, validators, None)
+            return self._read_body(rel)
+        if r.status_code == 404:
+            self._write(rel, 404, {}, None)
+            return None
+        r.raise_for_status()
+        self._write(rel, 200, validators, r.content)
+        return r.json()
+
+
+class FixtureSource:
+    """Offline stand-in for :class:`SecClient` reading JSON fixtures.
+
+    Expects the same layout as the client cache, so
+    ``FixtureSource(SEC_CACHE_DIR)`` replays a previous online run.
+    """
+
+    def __init__(self, root: str = SEC_CACHE_DIR):
+        self.root = root
+
+    def fetch(self, cik: int, concept: str) -> dict | None:
+        path = os.path.join(self.root, concept_path(cik, concept))
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+
+def parse_concept(j: dict | None) -> pd.DataFrame:
+    """Quarterly (period_end, value) facts, latest filing per period."""
+    if not j:
+        return pd.DataFrame()
+    rows = []
+    for unit, vals in (j.get("units") or {}).items():
+        for v in vals:
+            # keep quarterly facts
+            if v.get("fp") in {"Q1", "Q2", "Q3", "Q4"} and v.get("end"):
+                rows.append(
+                    {
+                        "period_end": v["end"],
+                        "value": v.get("val"),
+                        "filed": v.get("filed"),
+                    }
+                )
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    df["period_end"] = pd.to_datetime(df["period_end"])
+    df["filed"] = pd.to_datetime(df["filed"])
+    # keep the latest filed value per period_end
+    df = df.sort_values(["period_end", "filed"]).drop_duplicates(
+        "period_end", keep="last"
+    )
+    return df[["period_end", "value", "filed"]]
+
+
+def pick_best_series(series: list[pd.DataFrame]) -> pd.DataFrame:
+    """Longest candidate series; tie-breaker = latest last date."""
+    series = [s for s in series if not s.empty]
+    if not series:
+        return pd.DataFrame()
+    return max(series, key=lambda d: (len(d), d["period_end"].max()))
+
+
+def assemble_quarterlies(
+    metric_series: dict[str, pd.DataFrame], since: str = "2008-01-01"
+) -> pd.DataFrame:
+    """One wide quarterly frame (as ba_q / luv_q) from per-metric series.
+
+    ``filed`` is the latest filing date among the metrics of that quarter,
+    i.e. when the full row became public.
+    """
+    out = None
+    for metric, df in metric_series.items():
+        if df.empty:
+            continue
+        df = df.rename(columns={"value": metric, "filed": f"_filed_{metric}"})
+        out = df if out is None else out.merge(df, on="period_end", how="outer")
+    if out is None or out.empty:
+        return pd.DataFrame()
+    filed_cols = [c for c in out.columns if c.startswith("_filed_")]
+    out["filed"] = out[filed_cols].max(axis=1)
+    out = out.drop(columns=filed_cols).sort_values("period_end")
+    # derived metrics
+    if {"cfo", "capex"}.issubset(out.columns):
+        out["fcf"] = out["cfo"] - out["capex"]
+    # net debt = (short + long) - cash
+    if {"long_term_debt", "short_term_debt", "cash_and_equiv"}.issubset(out.columns):
+        out["net_debt"] = (
+            out["long_term_debt"].fillna(0)
+            + out["short_term_debt"].fillna(0)
+            - out["cash_and_equiv"].fillna(0)
+        )
+    return out[out["period_end"] >= since].reset_index(drop=True)
+
+
+def fetch_fundamentals(
+    tickers: list[str] | None = None,
+    source: SecClient | FixtureSource | None = None,
+    max_workers: int = 8,
+) -> dict[str, pd.DataFrame]:
+    """Quarterly fundamentals for every ticker, all concepts fetched at once.
+
+    Parameters
+    ----------
+    tickers : list[str] or None
+        Defaults to every ticker in :data:`CIK`.
+    source : SecClient | FixtureSource | None
+        Where JSON comes from; a default :class:`SecClient` when None.
+    max_workers : int
+        Concurrent requests in flight (the rate limiter still applies).
+
+    Returns
+    -------
+    dict[str, pd.DataFrame]
+        ticker -> ba_q-style quarterly frame (empty if nothing was found).
+    """
+    tickers = list(CIK) if tickers is None else [t for t in tickers if t in CIK]
+    source = SecClient() if source is None else source
+
+    jobs = [
+        (tkr, metric, concept)
+        for tkr in tickers
+        for metric, concepts in CONCEPTS.items()
+        for concept in concepts
+    ]
+
+    def _fetch(job):
+        tkr, _, concept = job
+        try:
+            return source.fetch(CIK[tkr], concept)
+        except requests.RequestException as e:
+            print(f"⚠️  Skipping {concept} for {tkr}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        parsed = [parse_concept(b) for b in pool.map(_fetch, jobs)]
+
+    candidates: dict[tuple[str, str], list[pd.DataFrame]] = {}
+    for (tkr, metric, _), df in zip(jobs, parsed):
+        candidates.setdefault((tkr, metric), []).append(df)
+
+    return {
+        tkr: assemble_quarterlies(
+            {m: pick_best_series(candidates[(tkr, m)]) for m in CONCEPTS}
+        )
+        for tkr in tickers
+    }
+
+
+def sec_quarterlies(ticker: str, source: SecClient | FixtureSource | None = None):
+    """Single-ticker wrapper kept for the financials notebook."""
+    return fetch_fundamentals([ticker], source=source)[ticker]
+
+
+def fundamentals_panel(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Stack per-ticker quarterlies into one long panel with a ``ticker`` column."""
+    parts = [df.assign(ticker=tkr) for tkr, df in frames.items() if not df.empty]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def _file_stem(tkr: str) -> str:
+    return tkr.lower().replace(".", "_")
+
+
+def write_quarterlies(frames: dict[str, pd.DataFrame], out_dir: str = FINANCIALS_DIR):
+    """Persist as ``<ticker>_q.parquet`` (ba_q.parquet, af_pa_q.parquet, ...).
+
+    The file name is only a label; the ticker itself is stored in a
+    ``ticker`` column, which :func:`load_quarterlies` reads back.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for tkr, df in frames.items():
+        if not df.empty:
+            path = os.path.join(out_dir, f"{_file_stem(tkr)}_q.parquet")
+            df.assign(ticker=tkr).to_parquet(path)
+
+
+# ---- as-of attachment to events ----
+
+# columns attached to every (event, ticker); leverage/cash are derived below
+ASOF_COLUMNS = ("leverage", "net_debt", "fcf", "cash")
+
+# 10-Q deadline for large filers; stands in for ``filed`` on older parquets
+FILING_LAG_DAYS = 45
+
+
+def load_quarterlies(fin_dir: str = FINANCIALS_DIR) -> pl.DataFrame:
+    """Every ``<ticker>_q.parquet`` in ``fin_dir`` as one long polars panel.
+
+    The ticker comes from the file's ``ticker`` column. Files saved before
+    that column existed (the notebook's ba_q / luv_q) are matched to a known
+    ticker by file name; unknown ones are skipped.
+    """
+    legacy = {_file_stem(t): t for t in (*CIK, *STOCK_MARKET_MAP)}
+    parts = []
+    for name in sorted(os.listdir(fin_dir)) if os.path.isdir(fin_dir) else []:
+        if not name.endswith("_q.parquet"):
+            continue
+        frame = pl.read_parquet(os.path.join(fin_dir, name))
+        if "ticker" not in frame.columns:
+            ticker = legacy.get(name.removesuffix("_q.parquet"))
+            if ticker is None:
+                print(f"⚠️  Skipping {name}: no ticker column and no known ticker")
+                continue
+            frame = frame.with_columns(ticker=pl.lit(ticker))
+        parts.append(frame)
+    return pl.concat(parts, how="diagonal_relaxed") if parts else pl.DataFrame()
+
+
+def _asof_panel(panel: pl.DataFrame | pd.DataFrame) -> pl.DataFrame:
+    if isinstance(panel, pd.DataFrame):
+        panel = pl.from_pandas(panel)
+    names = panel.columns
+    known = (
+        pl.col("filed").cast(pl.Date)
+        if "filed" in names
+        else pl.col("period_end").cast(pl.Date).dt.offset_by(f"{FILING_LAG_DAYS}d")
+    )
+    derived = []
+    if {"total_liabilities", "total_assets"}.issubset(names):
+        derived.append(
+            (pl.col("total_liabilities") / pl.col("total_assets")).alias("leverage")
+        )
+    if "cash_and_equiv" in names:
+        derived.append(pl.col("cash_and_equiv").alias("cash"))
+    panel = panel.with_columns(derived, known_date=known)
+    keep = [c for c in ASOF_COLUMNS if c in panel.columns]
+    return (
+        panel.select(
+            pl.col("ticker").alias("tkr"),
+            "known_date",
+            pl.col("period_end").cast(pl.Date).alias("fin_period_end"),
+            *[pl.col(c).cast(pl.Float64) for c in keep],
+        )
+        .drop_nulls("known_date")
+        .sort("known_date")
+    )
+
+
+def attach_fundamentals(
+    events: pl.DataFrame, panel: pl.DataFrame | pd.DataFrame
+) -> pl.DataFrame:
+    """Latest fundamentals public strictly before each event, per ticker.
+
+    One sorted ``join_asof`` keyed by ticker and filing date (no
+    look-ahead: a quarter only counts once it was filed before ``ev_date``).
+
+    Parameters
+    ----------
+    events : pl.DataFrame
+        df_ev_anal-style table, or an existing (ev_id, ev_date, stock_type,
+        tkr) work list.
+    panel : pl.DataFrame | pd.DataFrame
+        Long fundamentals with 'ticker', 'period_end' and ideally 'filed'
+        (falls back to period_end + FILING_LAG_DAYS).
+
+    Returns
+    -------
+    pl.DataFrame
+        (ev_id, tkr, stock_type) rows with fin_period_end, known_date and
+        leverage / net_debt / fcf / cash; nulls where nothing was filed yet.
+    """
+    from .features import event_ticker_pairs
+
+    pairs = events if "tkr" in events.columns else event_ticker_pairs(events)
+    pairs = pairs.with_columns(_ev_day=pl.col("ev_date").cast(pl.Date)).sort("_ev_day")
+    return (
+        pairs.join_asof(
+            _asof_panel(panel),
+            left_on="_ev_day",
+            right_on="known_date",
+            by="tkr",
+            strategy="backward",
+            allow_exact_matches=False,
+            check_sortedness=False,  # both sides globally sorted on the key
+        )
+        .drop("_ev_day")
+        .sort(["ev_id", "stock_type"])
+    )
+
+
+def with_fundamentals(results: pl.DataFrame, features: pl.DataFrame) -> pl.DataFrame:
+    """Join attached fundamentals onto MAE_CACHE / TTR_CACHE style rows."""
+    cols = [
+        c for c in features.columns if c not in ("ev_date", "category", "market_tkr")
+    ]
+    return results.join(
+        features.select(cols), on=["ev_id", "tkr", "stock_type"], how="left"
+    )
@@ -0,0 +1,218 @@
+"""Counterfactual fundamentals impact for every (event, ticker, metric) at once.
+
+Batch version of ``fundamentals_event_impact_simple`` (data/financials.ipynb).
+That helper took one quarterly frame and one crash date, fitted a pre-event
+linear trend per metric with ``np.polyfit`` in a loop and always built the
+plotnine figures. Here the fundamentals panel is padded into a
+(ticker, quarter, metric) cube, each event gathers its ticker's slice, and
+every pre-trend is solved at once from the batched normal equations of
+``y = b0 + b1 * q_idx``. Plots are only built on request via
+:func:`plot_impact`.
+"""
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from .features import event_ticker_pairs
+
+DEFAULT_METRICS = ("revenue", "net_income", "oper_income", "cfo", "fcf")
+
+IMPACT_SCHEMA = {
+    "ev_id": pl.Utf8,
+    "tkr": pl.Utf8,
+    "stock_type": pl.Utf8,
+    "metric": pl.Utf8,
+    "quarter_start": pl.Date,
+    "actual": pl.Float64,
+    "predicted": pl.Float64,
+    "delta": pl.Float64,
+    "intercept": pl.Float64,
+    "slope": pl.Float64,
+    "n_pre": pl.Int32,
+}
+
+
+def quarterly_cube(
+    panel: pl.DataFrame | pd.DataFrame, metrics: tuple[str, ...]
+) -> tuple[pl.DataFrame, list[str], np.ndarray, np.ndarray]:
+    """Pad the long fundamentals panel into dense per-ticker arrays.
+
+    Returns the deduplicated quarters (with ``q_idx`` per ticker, as the
+    notebook's ``np.arange(len(df))``), the ticker axis, values
+    ``Y[ticker, q_idx, metric]`` and quarter starts ``QS[ticker, q_idx]`` in
+    epoch days (padding = int64 max so it is never "pre-event").
+    """
+    if isinstance(panel, pd.DataFrame):
+        panel = pl.from_pandas(panel)
+    q = (
+        panel.with_columns(
+            quarter_start=pl.col("period_end").cast(pl.Date).dt.truncate("1q")
+        )
+        .sort(["ticker", "period_end"])
+        .unique(["ticker", "quarter_start"], keep="first", maintain_order=True)
+        .with_columns(q_idx=pl.int_range(pl.len()).over("ticker"))
+    )
+    tickers = sorted(q["ticker"].unique().to_list())
+    n_q = int(q["q_idx"].max()) + 1 if q.height else 0
+
+    k = q["ticker"].replace_strict(tickers, list(range(len(tickers)))).to_numpy()
+    t = q["q_idx"].to_numpy()
+    Y = np.full((len(tickers), n_q, len(metrics)), np.nan)
+    Y[k, t, :] = q.select(pl.col(m).cast(pl.Float64) for m in metrics).to_numpy()
+    QS = np.full((len(tickers), n_q), np.iinfo(np.int64).max, dtype=np.int64)
+    QS[k, t] = q["quarter_start"].cast(pl.Int32).to_numpy()
+    return q, tickers, Y, QS
+
+
+def fundamentals_impact_batch(
+    events: pl.DataFrame,
+    panel: pl.DataFrame | pd.DataFrame,
+    metrics: tuple[str, ...] = DEFAULT_METRICS,
+    post_horiz_quarters: int | None = 8,
+    min_pre_points: int = 6,
+) -> pl.DataFrame:
+    """Actual vs. pre-trend counterfactual for every event, ticker and metric.
+
+    Parameters
+    ----------
+    events : pl.DataFrame
+        Event table (df_ev_anal-style: ev_id, ev_date and either the mapped
+        ``*_tkr`` columns or acft_make/oper_name).
+    panel : pl.DataFrame | pd.DataFrame
+        Long fundamentals with 'ticker', 'period_end' and metric columns
+        (``fundamentals.fundamentals_panel``).
+    metrics : tuple[str]
+        Columns to analyze (missing ones are skipped).
+    post_horiz_quarters : int
+        Number of post-event quarters to report (None = all available).
+    min_pre_points : int
+        Minimum number of pre-event data points to fit a trend.
+
+    Returns
+    -------
+    pl.DataFrame
+        Tidy table: ev_id, tkr, stock_type, metric, quarter_start, actual,
+        predicted, delta plus the fitted intercept/slope and n_pre.
+    """
+    metrics = tuple(m for m in metrics if m in panel.columns)
+    pairs = event_ticker_pairs(events)
+    if not metrics or pairs.height == 0:
+        return pl.DataFrame(schema=IMPACT_SCHEMA)
+
+    _, tickers, Y, QS = quarterly_cube(panel, metrics)
+    pairs = pairs.filter(pl.col("tkr").is_in(tickers))
+    if pairs.height == 0:
+        return pl.DataFrame(schema=IMPACT_SCHEMA)
+
+    ke = pairs["tkr"].replace_strict(tickers, list(range(len(tickers)))).to_numpy()
+    ed = pairs["ev_date"].cast(pl.Date).cast(pl.Int32).to_numpy()[:, None]
+
+    # ---- pre / post masks per (event, quarter) ----
+    qs = QS[ke]  # [E, T]
+    padded = qs == np.iinfo(np.int64).max
+    pre = (qs < ed) & ~padded
+    post = (qs >= ed) & ~padded
+    if post_horiz_quarters is not None:
+        post &= np.cumsum(post, axis=1) <= post_horiz_quarters
+
+    # ---- batched simple OLS: y = b0 + b1 * q_idx on pre-event points ----
+    Ye = Y[ke]  # [E, T, M]
+    W = pre[:, :, None] & ~np.isnan(Ye)
+    x = np.arange(Ye.shape[1], dtype=float)[None, :, None]
+    Yz = np.where(W, Ye, 0.0)
+    n = W.sum(axis=1)
+    Sx = (W * x).sum(axis=1)
+    Sxx = (W * x * x).sum(axis=1)
+    Sy = Yz.sum(axis=1)
+    Sxy = (Yz * x).sum(axis=1)
+    den = n * Sxx - Sx**2
+    ok = (n >= min_pre_points) & (den > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        b1 = np.where(ok, (n * Sxy - Sx * Sy) / den, np.nan)
+        b0 = np.where(ok, (Sy - b1 * Sx) / n, np.nan)
+    pred = b0[:, None, :] + b1[:, None, :] * x
+
+    e_i, t_i, m_i = np.nonzero(post[:, :, None] & ok[:, None, :])
+    actual = Ye[e_i, t_i, m_i]
+    predicted = pred[e_i, t_i, m_i]
+    return (
+        pl.DataFrame(
+            {
+                "ev_id": pairs["ev_id"].to_numpy()[e_i],
+                "tkr": pairs["tkr"].to_numpy()[e_i],
+                "stock_type": pairs["stock_type"].to_numpy()[e_i],
+                "metric": np.asarray(metrics)[m_i],
+                "quarter_start": qs[e_i, t_i].astype("datetime64[D]"),
+                "actual": actual,
+                "predicted": predicted,
+                "delta": actual - predicted,
+                "intercept": b0[e_i, m_i],
+                "slope": b1[e_i, m_i],
+                "n_pre": n[e_i, m_i].astype(np.int32),
+            },
+            schema_overrides=IMPACT_SCHEMA,
+        )
+        .fill_nan(None)
+        .sort(["ev_id", "tkr", "metric", "quarter_start"])
+    )
+
+
+def plot_impact(
+    panel: pl.DataFrame | pd.DataFrame,
+    impact: pl.DataFrame,
+    ev_id: str,
+    ticker: str,
+    event_date: str | pd.Timestamp,
+) -> dict:
+    """Overlay plots (actual vs. pre-trend, crash marker) for one event/ticker.
+
+    Built from the fitted intercept/slope in ``impact`` so nothing is refit.
+    """
+    from plotnine import (
+        aes,
+        annotate,
+        geom_line,
+        geom_point,
+        geom_vline,
+        ggplot,
+        labs,
+        theme_minimal,
+    )
+
+    event_date = pd.Timestamp(event_date)
+    fits = (
+        impact.filter((pl.col("ev_id") == ev_id) & (pl.col("tkr") == ticker))
+        .group_by("metric", maintain_order=True)
+        .agg(pl.col("intercept").first(), pl.col("slope").first())
+    )
+    metrics = tuple(fits["metric"].to_list())
+    if isinstance(panel, pd.DataFrame):
+        panel = pl.from_pandas(panel)
+    q, _, _, _ = quarterly_cube(panel.filter(pl.col("ticker") == ticker), metrics)
+    df = q.to_pandas()
+    df["quarter_start"] = pd.to_datetime(df["quarter_start"])
+
+    plots = {}
+    for m, b0, b1 in fits.iter_rows():
+        df[f"{m}_pred"] = b0 + b1 * df["q_idx"]
+        plots[m] = (
+            ggplot(df, aes(x="quarter_start"))
+            + geom_line(aes(y=m), size=1.0)
+            + geom_point(aes(y=m), size=1.6)
+            + geom_line(aes(y=f"{m}_pred"), linetype="dashed")
+            + geom_vline(xintercept=event_date, color="red", linetype="dotted")
+            + annotate(
+                "text",
+                x=event_date,
+                y=df[m].max(),
+                label="Crash",
+                color="red",
+                ha="left",
+                va="bottom",
+                size=8,
+            )
+            + labs(title=f"{m}: Actual vs. Pre-trend Counterfactual", x="Quarter", y=m)
+            + theme_minimal()
+        )
+    return plots
@@ -0,0 +1,414 @@
+"""Incremental CAR / MAE / TTR: fold in new trading days without a rebuild.
+
+The notebook recomputes CAR_CACHE, MAE_CACHE and TTR_CACHE from scratch. Here
+each (event, ticker, stock_type) keeps a small state row instead:
+
+* ``alpha`` / ``beta`` fitted once on the estimation window when the event is
+  added (:func:`add_events`);
+* last stock / index close seen inside the event window, so the next day's
+  return needs no history;
+* the running ``CAR``, the short-window ``CAR_min`` / ``CAR_max`` behind
+  ``MAE_signed``, and the (rel_day, CAR) path of the short window so TTR can
+  be re-evaluated if MAE moves;
+* ``TTR_full`` / ``TTR_half``, null while censored.
+
+:func:`update` takes only the new price rows, touches only the open events
+whose tickers appear in them and returns the new CAR rows to append. With a
+``horizon`` past the event window, censored events keep being tracked and
+resolve as soon as they recover. Semantics match ``compute_car`` /
+``compute_TTR`` in data/final.ipynb.
+"""
+
+import os
+from datetime import date
+
+import polars as pl
+
+from .config import EST_WINDOW, EVT_WINDOW, SHORT_WINDOW, STOCKS_DIR, TTR_DEFAULT
+from .features import event_ticker_pairs
+from .instrument import count, current_span, timed
+
+STATE_PATH = os.path.join(STOCKS_DIR, "car_state.parquet")
+
+KEY = ["ev_id", "tkr", "stock_type"]
+
+STATE_SCHEMA = {
+    "ev_id": pl.Utf8,
+    "tkr": pl.Utf8,
+    "stock_type": pl.Utf8,
+    "market_tkr": pl.Utf8,
+    "ev_date": pl.Date,
+    "evt_start": pl.Date,
+    "horizon_end": pl.Date,
+    "alpha": pl.Float64,
+    "beta": pl.Float64,
+    "n_est": pl.UInt32,
+    "stock_last_date": pl.Date,
+    "stock_prev": pl.Float64,
+    "mkt_last_date": pl.Date,
+    "mkt_prev": pl.Float64,
+    "CAR": pl.Float64,
+    "CAR_min": pl.Float64,
+    "CAR_max": pl.Float64,
+    "MAE_signed": pl.Float64,
+    "path_rel": pl.List(pl.Int32),
+    "path_car": pl.List(pl.Float64),
+    "TTR_full": pl.Int32,
+    "TTR_half": pl.Int32,
+}
+
+
+CAR_SCHEMA = {
+    "date": pl.Date,
+    "AR": pl.Float64,
+    "CAR": pl.Float64,
+    "tkr": pl.Utf8,
+    "ev_id": pl.Utf8,
+    "stock_type": pl.Utf8,
+    "flavor": pl.Utf8,
+}
+
+
+def empty_state() -> pl.DataFrame:
+    return pl.DataFrame(schema=STATE_SCHEMA)
+
+
+def load_state(path: str = STATE_PATH) -> pl.DataFrame:
+    return pl.read_parquet(path) if os.path.exists(path) else empty_state()
+
+
+def save_state(state: pl.DataFrame, path: str = STATE_PATH):
+    state.write_parquet(path)
+
+
+def _prices(prices: pl.DataFrame) -> pl.DataFrame:
+    if "tkr" not in prices.columns:
+        prices = prices.rename({"ticker": "tkr"})
+    return prices.select(
+        pl.col("date").cast(pl.Date), pl.col("tkr").cast(pl.Utf8), pl.col("close")
+    )
+
+
+def _window_returns(
+    pairs: pl.DataFrame, prices: pl.DataFrame, on: str, lo: str, hi: str
+) -> pl.DataFrame:
+    """pct_change of ``on``'s closes inside [lo, hi] per pair, first row dropped."""
+    return (
+        pairs.select(*KEY, lo, hi, _on=on)
+        .join(prices, left_on="_on", right_on="tkr")
+        .filter(pl.col("date").is_between(pl.col(lo), pl.col(hi)))
+        .sort([*KEY, "date"])
+        .with_columns(r=pl.col("close").pct_change().over(KEY))
+        .drop_nulls("r")
+        .select(*KEY, "date", "r")
+    )
+
+
+@timed("car.add_events")
+def add_events(
+    state: pl.DataFrame,
+    events: pl.DataFrame,
+    prices: pl.DataFrame,
+    est_window: tuple[int, int] = EST_WINDOW,
+    evt_window: tuple[int, int] = EVT_WINDOW,
+    horizon: int | None = None,
+    exclusions: pl.DataFrame | None = None,
+) -> pl.DataFrame:
+    """Register new events: fit their market models and open their state.
+
+    Parameters
+    ----------
+    state : pl.DataFrame
+        Current state (``empty_state()`` to start).
+    events : pl.DataFrame
+        df_ev_anal-style events or an event_ticker_pairs list; pairs already
+        in ``state`` are skipped.
+    prices : pl.DataFrame
+        Long (date, tkr, close) covering the estimation windows.
+    horizon : int or None
+        Last rel_day to track; defaults to the event window end. Use a larger
+        value to monitor recovery of live crashes past the event window.
+        Pairs with a ``horizon_end`` date (``resolve_overlaps(...,
+        policy="merge")`` clusters) are tracked at least up to it.
+    exclusions : pl.DataFrame or None
+        ev_id, tkr, start, end day ranges to leave out of the estimation
+        window (``resolve_overlaps(..., policy="exclude")``).
+    """
+    horizon = evt_window[1] if horizon is None else horizon
+    pairs = events if "tkr" in events.columns else event_ticker_pairs(events)
+    day = pl.col("ev_date").cast(pl.Date)
+    horizon_end = day.dt.offset_by(f"{horizon}d")
+    if "horizon_end" in pairs.columns:
+        horizon_end = pl.max_horizontal(horizon_end, pl.col("horizon_end"))
+    pairs = pairs.unique(KEY, keep="first")
+    # pairs already in the state are CAR-state cache hits
+    n_requested = pairs.height
+    pairs = pairs.join(state.select(KEY), on=KEY, how="anti").select(
+        *KEY,
+        "market_tkr",
+        ev_date=day,
+        est_start=day.dt.offset_by(f"{est_window[0]}d"),
+        est_end=day.dt.offset_by(f"{est_window[1]}d"),
+        evt_start=day.dt.offset_by(f"{evt_window[0]}d"),
+        horizon_end=horizon_end,
+    )
+    count("car_state.hit", n_requested - pairs.height)
+    count("car_state.miss", pairs.height)
+    current_span().rows = pairs.height
+    if pairs.height == 0:
+        return state
+
+    # ---- batched OLS over every new pair's estimation window ----
+    prices = _prices(prices)
+    est = _window_returns(pairs, prices, "tkr", "est_start", "est_end").join(
+        _window_returns(pairs, prices, "market_tkr", "est_start", "est_end").rename(
+            {"r": "r_mkt"}
+        ),
+        on=[*KEY, "date"],
+    )
+    if exclusions is not None and exclusions.height:
+        contaminated = (
+            est.join(
+                exclusions.select("ev_id", "tkr", "start", "end"), on=["ev_id", "tkr"]
+            )
+            .filter(pl.col("date").is_between("start", "end"))
+            .select(*KEY, "date")
+        )
+        est = est.join(contaminated, on=[*KEY, "date"], how="anti")
+    new = pairs.join(_market_model(est), on=KEY, how="left").with_columns(
+        CAR=pl.lit(0.0),
+        path_rel=pl.lit([], dtype=pl.List(pl.Int32)),
+        path_car=pl.lit([], dtype=pl.List(pl.Float64)),
+    )
+    return pl.concat([state, new], how="diagonal_relaxed").select(
+        pl.col(c).cast(t) for c, t in STATE_SCHEMA.items()
+    )
+
+
+def _market_model(est: pl.DataFrame) -> pl.DataFrame:
+    """Per-pair OLS of ``r`` on ``r_mkt``: KEY, alpha, beta, n_est."""
+    x, y = pl.col("r_mkt"), pl.col("r")
+    return (
+        est.group_by(KEY)
+        .agg(
+            n_est=pl.len(),
+            Sx=x.sum(),
+            Sy=y.sum(),
+            Sxx=(x * x).sum(),
+            Sxy=(x * y).sum(),
+        )
+        .with_columns(den=pl.col("n_est") * pl.col("Sxx") - pl.col("Sx") ** 2)
+        .with_columns(
+            beta=pl.when(pl.col("den") > 0).then(
+                (pl.col("n_est") * pl.col("Sxy") - pl.col("Sx") * pl.col("Sy"))
+                / pl.col("den")
+            )
+        )
+        .with_columns(
+            alpha=(pl.col("Sy") - pl.col("beta") * pl.col("Sx")) / pl.col("n_est")
+        )
+        .select(*KEY, "alpha", "beta", pl.col("n_est").cast(pl.UInt32))
+    )
+
+
+def _side_returns(
+    open_: pl.DataFrame, new: pl.DataFrame, on: str, last: str, prev: str
+) -> pl.DataFrame:
+    """Returns of ``on`` on new in-window days, chained from the stored close."""
+    return (
+        open_.select(*KEY, "evt_start", "horizon_end", last, prev, _on=on)
+        .join(new, left_on="_on", right_on="tkr")
+        .filter(
+            pl.col("date").is_between(pl.col("evt_start"), pl.col("horizon_end"))
+            & (pl.col(last).is_null() | (pl.col("date") > pl.col(last)))
+        )
+        .sort([*KEY, "date"])
+        .with_columns(
+            r=pl.col("close")
+            / pl.coalesce(pl.col("close").shift(1).over(KEY), pl.col(prev))
+            - 1.0
+        )
+    )
+
+
+def _first_hit(rows: pl.DataFrame, t: str = "rel_day") -> pl.DataFrame:
+    """First ``t`` >= 0 where CAR recovered fully / halfway toward zero."""
+    mae = pl.col("MAE_signed")
+    full = pl.when(mae < 0).then(pl.col("CAR") >= 0).otherwise(pl.col("CAR") <= 0)
+    half = (
+        pl.when(mae < 0)
+        .then(pl.col("CAR") >= mae * 0.5)
+        .otherwise(pl.col("CAR") <= mae * 0.5)
+    )
+    return (
+        rows.filter((pl.col(t) >= 0) & mae.is_not_null())
+        .sort([*KEY, t])
+        .group_by(KEY)
+        .agg(
+            hit_full=pl.col(t).filter(full).first(),
+            hit_half=pl.col(t).filter(half).first(),
+        )
+    )
+
+
+@timed("car.update")
+def update(
+    state: pl.DataFrame, new_prices: pl.DataFrame
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Fold new (complete) trading days into the state.
+
+    Parameters
+    ----------
+    state : pl.DataFrame
+        From :func:`add_events` / a previous update.
+    new_prices : pl.DataFrame
+        Long (date, tkr, close) rows not seen before; rows at or before a
+        pair's last processed date are ignored.
+
+    Returns
+    -------
+    (state, car_rows)
+        Updated state and the CAR_CACHE rows (date, AR, CAR, tkr, ev_id,
+        stock_type, flavor) produced by this batch.
+    """
+    new = _prices(new_prices)
+    if new.height == 0 or state.height == 0:
+        return state, pl.DataFrame(schema=CAR_SCHEMA)
+
+    tickers = new["tkr"].unique().to_list()
+    open_ = state.filter(
+        (pl.col("horizon_end") >= new["date"].min())
+        & (pl.col("tkr").is_in(tickers) | pl.col("market_tkr").is_in(tickers))
+    )
+
+    stock = _side_returns(open_, new, "tkr", "stock_last_date", "stock_prev")
+    mkt = _side_returns(open_, new, "market_tkr", "mkt_last_date", "mkt_prev")
+
+    # ---- 1) new AR / CAR rows ----
+    rows = (
+        stock.drop_nulls("r")
+        .select(*KEY, "date", r_stock="r")
+        .join(mkt.drop_nulls("r").select(*KEY, "date", r_mkt="r"), on=[*KEY, "date"])
+        .join(open_.select(*KEY, "ev_date", "alpha", "beta", "CAR"), on=KEY)
+        .sort([*KEY, "date"])
+        .with_columns(
+            AR=pl.col("r_stock") - (pl.col("alpha") + pl.col("beta") * pl.col("r_mkt")),
+            rel_day=(pl.col("date") - pl.col("ev_date")).dt.total_days().cast(pl.Int32),
+        )
+        .with_columns(CAR=pl.col("CAR") + pl.col("AR").cum_sum().over(KEY))
+        .drop_nulls("AR")
+    )
+
+    # ---- 2) per-pair summaries of this batch ----
+    short = pl.col("rel_day").abs() <= SHORT_WINDOW
+    in_path = pl.col("rel_day").is_between(0, SHORT_WINDOW)
+    batch = rows.group_by(KEY).agg(
+        _car=pl.col("CAR").last(),
+        _min=pl.col("CAR").filter(short).min(),
+        _max=pl.col("CAR").filter(short).max(),
+        _path_rel=pl.col("rel_day").filter(in_path),
+        _path_car=pl.col("CAR").filter(in_path),
+    )
+    last_close = lambda df, side: df.group_by(KEY).agg(  # noqa: E731
+        pl.col("date").last().alias(f"_{side}_date"),
+        pl.col("close").last().alias(f"_{side}_close"),
+    )
+
+    touched = (
+        open_.join(batch, on=KEY, how="left")
+        .join(last_close(stock, "stock"), on=KEY, how="left")
+        .join(last_close(mkt, "mkt"), on=KEY, how="left")
+        .with_columns(
+            stock_last_date=pl.coalesce("_stock_date", "stock_last_date"),
+            stock_prev=pl.coalesce("_stock_close", "stock_prev"),
+            mkt_last_date=pl.coalesce("_mkt_date", "mkt_last_date"),
+            mkt_prev=pl.coalesce("_mkt_close", "mkt_prev"),
+            CAR=pl.coalesce("_car", "CAR"),
+            CAR_min=pl.min_horizontal("CAR_min", "_min"),
+            CAR_max=pl.max_horizontal("CAR_max", "_max"),
+            path_rel=pl.concat_list("path_rel", pl.col("_path_rel").fill_null([])),
+            path_car=pl.concat_list("path_car", pl.col("_path_car").fill_null([])),
+        )
+        .with_columns(
+            _mae=pl.when(pl.col("CAR_max").abs() >= pl.col("CAR_min").abs())
+            .then(pl.col("CAR_max"))
+            .otherwise(pl.col("CAR_min"))
+        )
+        .with_columns(
+            _mae_moved=pl.col("_mae").ne_missing(pl.col("MAE_signed")),
+            MAE_signed=pl.col("_mae"),
+        )
+    )
+
+    # ---- 3) TTR: re-scan the short path where MAE moved, else only new rows ----
+    path = (
+        touched.filter("_mae_moved")
+        .select(*KEY, "MAE_signed", rel_day="path_rel", CAR="path_car")
+        .explode(["rel_day", "CAR"])
+    )
+    # (rows past the short window are never in the path; they always count)
+    fresh = (
+        rows.join(touched.select(*KEY, "MAE_signed", "_mae_moved"), on=KEY)
+        .filter(~pl.col("_mae_moved") | (pl.col("rel_day") > SHORT_WINDOW))
+        .select(*KEY, "MAE_signed", "rel_day", "CAR")
+    )
+    hits = _first_hit(pl.concat([path.cast(fresh.schema), fresh]))
+    touched = (
+        touched.join(hits, on=KEY, how="left")
+        .with_columns(
+            TTR_full=pl.when("_mae_moved")
+            .then(pl.col("hit_full"))
+            .otherwise(pl.coalesce("TTR_full", "hit_full")),
+            TTR_half=pl.when("_mae_moved")
+            .then(pl.col("hit_half"))
+            .otherwise(pl.coalesce("TTR_half", "hit_half")),
+        )
+        .select(pl.col(c).cast(t) for c, t in STATE_SCHEMA.items())
+    )
+
+    state = pl.concat(
+        [state.join(touched.select(KEY), on=KEY, how="anti"), touched]
+    ).sort(KEY)
+    current_span().rows = rows.height
+    return state, _car_rows(rows)
+
+
+def _car_rows(rows: pl.DataFrame) -> pl.DataFrame:
+    return rows.select(
+        "date",
+        pl.col("AR", "CAR").cast(pl.Float64),
+        "tkr",
+        "ev_id",
+        "stock_type",
+        flavor=pl.when(
+            (pl.col("date") - pl.col("ev_date")).dt.total_days().abs() <= SHORT_WINDOW
+        )
+        .then(pl.lit("short"))
+        .otherwise(pl.lit("extended")),
+    )
+
+
+def mae_table(state: pl.DataFrame) -> pl.DataFrame:
+    """MAE_CACHE view of the state."""
+    return state.filter(pl.col("MAE_signed").is_not_null()).select(
+        *KEY, "CAR_min", "CAR_max", "MAE_signed"
+    )
+
+
+def ttr_table(
+    state: pl.DataFrame, as_of=None, ttr_default: int = TTR_DEFAULT
+) -> pl.DataFrame:
+    """TTR_CACHE view: unresolved TTRs become ``ttr_default`` as in the notebook.
+
+    ``censored_*`` flags pairs not yet recovered; ``open`` pairs (horizon not
+    reached by ``as_of``, default: today) may still resolve.
+    """
+    as_of = date.today() if as_of is None else as_of
+    return state.select(
+        *KEY,
+        TTR_full=pl.col("TTR_full").fill_null(ttr_default),
+        TTR_half=pl.col("TTR_half").fill_null(ttr_default),
+        censored_full=pl.col("TTR_full").is_null(),
+        censored_half=pl.col("TTR_half").is_null(),
+        open=pl.col("horizon_end") > pl.lit(as_of).cast(pl.Date),
+    )
@@ -0,0 +1,270 @@
+"""Lightweight timers, counters and peak-memory probes for the hot paths.
+
+::
+
+    from aviation.instrument import count, timed
+
+    with timed("prices.read_parquet", path=path) as span:
+        df = pl.read_parquet(path)
+        span.rows = df.height
+
+    @timed("car.update")
+    def update(...): ...
+
+    count("car_state.hit", n_skipped)
+
+Every finished span goes to the process-wide :data:`RECORDER`, which keeps
+
+* a rolling window of durations per span name (:meth:`Recorder.percentiles`),
+* cumulative counters (cache hits / misses, fetched tickers, ...),
+* the spans of the current *run* (one pipeline invocation or one dashboard
+  rerun, see :meth:`Recorder.start_run`),
+
+and emits one JSON log record per span on the ``aviation.perf`` logger
+(silent unless :func:`log_json` or your own handler is attached). Peak RSS is
+sampled in a background thread only for spans opened with ``memory=True``
+(or everywhere with ``AVIATION_PERF_MEMORY=1``).
+"""
+
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ContextDecorator
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import polars as pl
+
+logger = logging.getLogger("aviation.perf")
+
+_MEMORY_DEFAULT = os.environ.get("AVIATION_PERF_MEMORY", "") not in ("", "0")
+
+
+# ---- memory probe ----
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), else the process high-water mark."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class PeakRSS:
+    """Peak resident set size above the starting RSS while the block runs."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes() - self._base)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._base = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes() - self._base)
+
+
+# ---- spans ----
+
+
+@dataclass
+class Span:
+    name: str
+    parent: str | None = None
+    started: float = 0.0  # epoch seconds
+    seconds: float = 0.0
+    rows: int | None = None
+    peak_mb: float | None = None
+    error: str | None = None
+    meta: dict = field(default_factory=dict)
+
+
+_current_span = contextvars.ContextVar("aviation_perf_span", default=None)
+_current_run = contextvars.ContextVar("aviation_perf_run", default=None)
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, recorder, name, rows, memory, meta):
+        self._recorder = recorder
+        self._args = (name, rows, memory, meta)
+
+    def _recreate_cm(self):
+        # a fresh timer per decorated call, so recursion and threads are safe
+        return _Timer(self._recorder, *self._args)
+
+    def __enter__(self) -> Span:
+        name, rows, memory, meta = self._args
+        parent = _current_span.get()
+        self.span = Span(
+            name=name,
+            parent=parent.name if parent is not None else None,
+            started=time.time(),
+            rows=rows,
+            meta=dict(meta),
+        )
+        self._token = _current_span.set(self.span)
+        self._probe = PeakRSS().__enter__() if memory else None
+        self._t0 = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.seconds = time.perf_counter() - self._t0
+        if self._probe is not None:
+            self._probe.__exit__(None, None, None)
+            self.span.peak_mb = self._probe.peak / 2**20
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+        _current_span.reset(self._token)
+        self._recorder.record(self.span)
+        return False
+
+
+class Recorder:
+    """Collects spans and counters; thread-safe, cheap enough for hot paths."""
+
+    def __init__(self, window: int = 500, memory: bool = _MEMORY_DEFAULT):
+        self.window = window
+        self.memory = memory
+        self._lock = threading.Lock()
+        self._durations = {}
+        self.counters = Counter()
+
+    def timed(
+        self, name: str, rows: int | None = None, memory: bool | None = None, **meta
+    ):
+        """Context manager / decorator timing ``name``; yields the :class:`Span`."""
+        return _Timer(self, name, rows, self.memory if memory is None else memory, meta)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+        run = _current_run.get()
+        if run is not None:
+            run["counters"][name] += n
+
+    def record(self, span: Span):
+        with self._lock:
+            hist = self._durations.get(span.name)
+            if hist is None:
+                hist = self._durations[span.name] = deque(maxlen=self.window)
+            hist.append(span.seconds)
+        run = _current_run.get()
+        if run is not None:
+            run["spans"].append(span)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "span", **asdict(span)}, default=str))
+
+    def start_run(self, label: str = "run") -> dict:
+        """Scope following spans / counters (in this context) to a new run."""
+        run = {
+            "label": label,
+            "started": time.time(),
+            "spans": [],
+            "counters": Counter(),
+        }
+        _current_run.set(run)
+        return run
+
+    def run_spans(self, run: dict | None = None) -> pl.DataFrame:
+        """Spans of ``run`` (default: the current one) in completion order."""
+        run = _current_run.get() if run is None else run
+        spans = [] if run is None else run["spans"]
+        return pl.DataFrame(
+            [
+                {
+                    "name": s.name,
+                    "parent": s.parent,
+                    "ms": s.seconds * 1e3,
+                    "rows": s.rows,
+                    "peak_mb": s.peak_mb,
+                    "error": s.error,
+                }
+                for s in spans
+            ],
+            schema={
+                "name": pl.Utf8,
+                "parent": pl.Utf8,
+                "ms": pl.Float64,
+                "rows": pl.Int64,
+                "peak_mb": pl.Float64,
+                "error": pl.Utf8,
+            },
+        )
+
+    def percentiles(self, q: tuple[int, ...] = (50, 90, 99)) -> pl.DataFrame:
+        """Rolling per-name percentiles (ms) over the last ``window`` spans."""
+        with self._lock:
+            snapshot = {k: np.fromiter(v, float) for k, v in self._durations.items()}
+        rows = []
+        for name, d in sorted(snapshot.items()):
+            pct = np.percentile(d, q) * 1e3
+            rows.append(
+                {"name": name, "n": len(d), **{f"p{p}_ms": v for p, v in zip(q, pct)}}
+            )
+        schema = {"name": pl.Utf8, "n": pl.Int64, **{f"p{p}_ms": pl.Float64 for p in q}}
+        return pl.DataFrame(rows, schema=schema)
+
+    def counter_table(self) -> pl.DataFrame:
+        with self._lock:
+            items = sorted(self.counters.items())
+        return pl.DataFrame(
+            items, schema={"counter": pl.Utf8, "value": pl.Int64}, orient="row"
+        )
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self.counters.clear()
+
+
+RECORDER = Recorder()
+
+
+def timed(name: str, rows: int | None = None, memory: bool | None = None, **meta):
+    """:meth:`Recorder.timed` on the process-wide :data:`RECORDER`."""
+    return RECORDER.timed(name, rows=rows, memory=memory, **meta)
+
+
+def count(name: str, n: int = 1):
+    """:meth:`Recorder.count` on the process-wide :data:`RECORDER`."""
+    RECORDER.count(name, n)
+
+
+def current_span() -> Span:
+    """The innermost open span, so a ``@timed`` function can set ``rows``.
+
+    Outside any span a throw-away :class:`Span` is returned.
+    """
+    span = _current_span.get()
+    return Span(name="") if span is None else span
+
+
+def log_json(stream=None, level: int = logging.INFO) -> logging.Handler:
+    """Attach a handler writing the ``aviation.perf`` records as JSON lines."""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return handler
@@ -0,0 +1,587 @@
+"""Intraday event study on minute (or coarser) bars.
+
+Daily closes blur the first hours after a crash, and a crash in the evening
+or on a weekend only shows up a session later. This mode anchors the event
+window at the crash time itself (``ev_date`` + ``ev_time``) and measures
+AR / CAR, MAE and time-to-recovery in trading minutes::
+
+    python -m aviation.intraday ingest vendor/*.csv --tz America/New_York
+    python -m aviation.intraday run data/ntbs/event_features.parquet
+
+Storage
+    :func:`ingest_bars` splits vendor files (CSV or parquet, one or many
+    tickers per file) into ``<root>/<tkr>/<YYYY-MM>.parquet``: one month of
+    (ts, close, volume) per file, zstd-compressed and sorted by UTC
+    timestamp. A study reads only the months its windows touch
+    (:func:`scan_bars`), so the store can hold years of bars for every
+    ticker.
+
+Event time
+    Offset 0 is the first bar at or after the crash and offsets count bars,
+    so ``rel_min = offset * bar_minutes`` is in trading minutes: nights,
+    weekends and holidays take no time. A crash outside market hours starts
+    at the next open, and the overnight gap return into that bar is the
+    first return of the event window.
+
+Processing
+    :func:`intraday_study` works through one (ticker, market, crash month)
+    group at a time, cut further so no batch expands to more than
+    ``max_rows`` window rows. Each batch joins stock and market bars on
+    timestamp, fits the market model on the estimation window and scores all
+    its pairs with the group-bys of the daily engine
+    (:mod:`aviation.incremental`).
+"""
+
+import argparse
+import glob
+import math
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable
+
+import polars as pl
+
+from .config import (
+    BARS_TZ,
+    INTRADAY_DIR,
+    INTRADAY_EST_WINDOW,
+    INTRADAY_EVT_WINDOW,
+    INTRADAY_SHORT_WINDOW,
+    MINUTE_BARS_DIR,
+    NTSB_DIR,
+)
+from .features import event_ticker_pairs, read_ntsb_table
+from .incremental import KEY, _first_hit, _market_model
+from .instrument import count, current_span, timed
+
+BAR_SCHEMA = {
+    "ts": pl.Datetime("us", "UTC"),
+    "close": pl.Float64,
+    "volume": pl.Float64,
+}
+
+SUMMARY_SCHEMA = {
+    "ev_id": pl.Utf8,
+    "tkr": pl.Utf8,
+    "stock_type": pl.Utf8,
+    "market_tkr": pl.Utf8,
+    "crash_ts": pl.Datetime("us", "UTC"),
+    "bar0_ts": pl.Datetime("us", "UTC"),
+    "n_est": pl.UInt32,
+    "alpha": pl.Float64,
+    "beta": pl.Float64,
+    "n_bars": pl.UInt32,
+    "CAR_min": pl.Float64,
+    "CAR_max": pl.Float64,
+    "MAE_signed": pl.Float64,
+    "TTR_full_min": pl.Int32,
+    "TTR_half_min": pl.Int32,
+    "censored_full": pl.Boolean,
+    "censored_half": pl.Boolean,
+}
+
+# NTSB ev_tmzn codes with a fixed UTC offset (hours); other codes fall back
+# to the ``tz`` zone
+TZ_OFFSETS = {
+    "UTC": 0,
+    "GMT": 0,
+    "Z": 0,
+    "ADT": -3,
+    "AST": -4,
+    "EDT": -4,
+    "EST": -5,
+    "CDT": -5,
+    "CST": -6,
+    "MDT": -6,
+    "MST": -7,
+    "PDT": -7,
+    "PST": -8,
+    "AKDT": -8,
+    "AKST": -9,
+    "HDT": -9,
+    "HST": -10,
+}
+
+_TS_NAMES = ("ts", "timestamp", "datetime", "date_time", "time", "date")
+_TKR_NAMES = ("tkr", "ticker", "symbol")
+_CLOSE_NAMES = ("close", "price", "last")
+_VOLUME_NAMES = ("volume", "vol")
+
+# shortest trading day assumed when turning a window in trading minutes into
+# the calendar span to load; too short only costs reading extra bars
+_MIN_SESSION_MINUTES = 240
+# a crash whose next bar is further away than this has no usable bars
+MAX_GAP = timedelta(days=7)
+
+
+# ---- storage ----
+
+
+def _read_source(path: str, tkr: str | None, tz: str) -> pl.LazyFrame:
+    """One vendor file as (tkr, ts [UTC], close, volume)."""
+    if path.endswith(".parquet"):
+        lf = pl.scan_parquet(path)
+    else:
+        lf = pl.scan_csv(path, try_parse_dates=True, infer_schema_length=10000)
+    schema = lf.collect_schema()
+    names = {c.lower(): c for c in schema.names()}
+    pick = lambda options: next(  # noqa: E731
+        (names[c] for c in options if c in names), None
+    )
+    ts_col, close_col = pick(_TS_NAMES), pick(_CLOSE_NAMES)
+    tkr_col, volume_col = pick(_TKR_NAMES), pick(_VOLUME_NAMES)
+    if ts_col is None or close_col is None:
+        raise ValueError(
+            f"{path}: need a timestamp and a close column, got {schema.names()}"
+        )
+    if tkr_col is None and tkr is None:
+        raise ValueError(f"{path}: no ticker column; pass tkr=")
+
+    ts = pl.col(ts_col)
+    dtype = schema[ts_col]
+    if dtype == pl.Utf8:
+        ts = ts.str.to_datetime(time_unit="us")
+    elif not isinstance(dtype, pl.Datetime):
+        raise ValueError(f"{path}: {ts_col} is {dtype}, not a timestamp")
+    if not (isinstance(dtype, pl.Datetime) and dtype.time_zone):
+        # naive vendor timestamps are exchange-local wall time
+        ts = ts.dt.replace_time_zone(tz, ambiguous="earliest", non_existent="null")
+    return lf.select(
+        tkr=pl.col(tkr_col).cast(pl.Utf8) if tkr_col else pl.lit(tkr),
+        ts=ts.dt.convert_time_zone("UTC").dt.cast_time_unit("us"),
+        close=pl.col(close_col).cast(pl.Float64),
+        volume=(
+            pl.col(volume_col).cast(pl.Float64)
+            if volume_col
+            else pl.lit(None, pl.Float64)
+        ),
+    )
+
+
+def _write_chunk(root: str, tkr: str, month: str, bars: pl.DataFrame) -> int:
+    """Merge ``bars`` into ``<root>/<tkr>/<month>.parquet``; rows after."""
+    folder = os.path.join(root, tkr)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{month}.parquet")
+    if os.path.exists(path):
+        bars = pl.concat([pl.read_parquet(path), bars], how="vertical_relaxed")
+    bars = bars.unique("ts", keep="last").sort("ts")
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    bars.write_parquet(tmp, compression="zstd", statistics=True)
+    os.replace(tmp, path)
+    return bars.height
+
+
+@timed("intraday.ingest")
+def ingest_bars(
+    sources: str | Iterable[str],
+    root: str = MINUTE_BARS_DIR,
+    tkr: str | None = None,
+    tz: str = BARS_TZ,
+) -> pl.DataFrame:
+    """Add vendor bar files to the chunked store.
+
+    Parameters
+    ----------
+    sources : str or iterable of str
+        CSV or parquet files with a timestamp, a close and optionally a
+        ticker and a volume column (names are matched case-insensitively,
+        e.g. ``timestamp`` / ``Close`` / ``symbol``).
+    tkr : str, optional
+        Ticker of files without a ticker column.
+    tz : str
+        Zone of naive timestamps; zone-aware ones are only converted.
+
+    Returns
+    -------
+    pl.DataFrame
+        (tkr, month, rows) of every chunk written. Bars already stored are
+        replaced by the incoming bar with the same timestamp, so re-ingesting
+        a corrected file is safe. One source file is in memory at a time.
+    """
+    written = []
+    for path in [sources] if isinstance(sources, str) else sources:
+        bars = (
+            _read_source(path, tkr, tz)
+            .drop_nulls(["tkr", "ts", "close"])
+            .with_columns(month=pl.col("ts").dt.strftime("%Y-%m"))
+            .collect()
+        )
+        for (t, month), chunk in bars.partition_by(
+            ["tkr", "month"], as_dict=True
+        ).items():
+            n = _write_chunk(root, t, month, chunk.drop("tkr", "month"))
+            written.append((t, month, n))
+        count("intraday.ingest.rows", bars.height)
+    return pl.DataFrame(
+        written,
+        schema={"tkr": pl.Utf8, "month": pl.Utf8, "rows": pl.Int64},
+        orient="row",
+    )
+
+
+def bar_files(tkr: str, start: datetime, end: datetime, root=MINUTE_BARS_DIR):
+    """Month files of ``tkr`` overlapping ``start .. end``, in order."""
+    lo, hi = f"{start:%Y-%m}", f"{end:%Y-%m}"
+    files = sorted(glob.glob(os.path.join(root, glob.escape(tkr), "*.parquet")))
+    return [f for f in files if lo <= os.path.basename(f)[:7] <= hi]
+
+
+def scan_bars(
+    tkr: str, start: datetime, end: datetime, root: str = MINUTE_BARS_DIR
+) -> pl.LazyFrame:
+    """Bars of ``tkr`` with ``start <= ts <= end`` (UTC-aware datetimes)."""
+    files = bar_files(tkr, start, end, root)
+    if not files:
+        return pl.LazyFrame(schema=BAR_SCHEMA)
+    return pl.scan_parquet(files).filter(pl.col("ts").is_between(start, end))
+
+
+# ---- crash timestamps ----
+
+
+def crash_timestamps(
+    events: pl.DataFrame, ntsb_dir: str = NTSB_DIR, tz: str = BARS_TZ
+) -> pl.DataFrame:
+    """(ev_id, crash_ts) with crash_ts in UTC, for events with an ev_time.
+
+    ``ev_time`` is the NTSB local time as HHMM (``930``, ``"0930"`` and
+    ``"9:30"`` all work); ``ev_tmzn`` (e.g. ``"CST"``) gives its UTC offset,
+    else it is read as ``tz`` wall time. Columns ``events`` lacks are taken
+    from the NTSB ``events`` table.
+    """
+    ev = events.select(
+        c for c in ("ev_id", "ev_date", "ev_time", "ev_tmzn") if c in events.columns
+    ).unique("ev_id")
+    missing = [c for c in ("ev_time", "ev_tmzn") if c not in ev.columns]
+    if missing:
+        raw = read_ntsb_table("events", ["ev_id", *missing], ntsb_dir)
+        if raw is not None:
+            ev = ev.join(raw.collect().unique("ev_id"), on="ev_id", how="left")
+    ev = ev.with_columns(
+        pl.lit(None, pl.Utf8).alias(c)
+        for c in ("ev_time", "ev_tmzn")
+        if c not in ev.columns
+    )
+
+    hhmm = pl.col("ev_time")
+    if ev.schema["ev_time"].is_float():
+        hhmm = hhmm.cast(pl.Int64)
+    hhmm = hhmm.cast(pl.Utf8).str.replace_all(r"\D", "").cast(pl.Int32, strict=False)
+    hh, mm = hhmm // 100, hhmm % 100
+    local = pl.col("ev_date").cast(pl.Date).cast(pl.Datetime("us")) + pl.duration(
+        hours=hh, minutes=mm
+    )
+    offset = (
+        pl.col("ev_tmzn")
+        .cast(pl.Utf8)
+        .str.strip_chars()
+        .str.to_uppercase()
+        .replace_strict(TZ_OFFSETS, default=None, return_dtype=pl.Int32)
+    )
+    return (
+        ev.filter((hh < 24) & (mm < 60))
+        .select(
+            "ev_id",
+            crash_ts=pl.when(offset.is_not_null())
+            .then((local - pl.duration(hours=offset)).dt.replace_time_zone("UTC"))
+            .otherwise(
+                local.dt.replace_time_zone(
+                    tz, ambiguous="earliest", non_existent="null"
+                ).dt.convert_time_zone("UTC")
+            ),
+        )
+        .drop_nulls("crash_ts")
+    )
+
+
+# ---- event study ----
+
+
+def _bars(minutes: int, bar_minutes: int) -> int:
+    return int(minutes / bar_minutes)
+
+
+def _calendar(minutes: int) -> timedelta:
+    """Calendar span that surely holds ``minutes`` trading minutes."""
+    sessions = math.ceil(minutes / _MIN_SESSION_MINUTES)
+    return timedelta(days=math.ceil(sessions * 7 / 5) + 4)
+
+
+def _study_batch(
+    batch: pl.DataFrame,
+    root: str,
+    bar_minutes: int,
+    est: tuple[int, int],
+    evt: tuple[int, int],
+    short_window: int,
+    before: timedelta,
+    after: timedelta,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Summaries and CAR rows of pairs sharing one (tkr, market_tkr)."""
+    tkr, mkt = batch["tkr"][0], batch["market_tkr"][0]
+    start = batch["crash_ts"].min() - before
+    end = batch["crash_ts"].max() + after
+
+    # ---- 1) common bars of stock and market, indexed in trading order ----
+    series = (
+        scan_bars(tkr, start, end, root)
+        .select("ts", "close")
+        .join(
+            scan_bars(mkt, start, end, root).select("ts", mkt_close="close"),
+            on="ts",
+        )
+        .sort("ts")
+        .select(
+            "ts",
+            r=pl.col("close").pct_change(),
+            r_mkt=pl.col("mkt_close").pct_change(),
+        )
+        .slice(1)
+        .with_row_index("i")
+        .with_columns(pl.col("i").cast(pl.Int64))
+        .collect()
+    )
+
+    # ---- 2) bar 0 = first bar at or after the crash ----
+    anchored = (
+        batch.sort("crash_ts")
+        .join_asof(
+            series.select(bar0_ts="ts", i0="i"),
+            left_on="crash_ts",
+            right_on="bar0_ts",
+            strategy="forward",
+        )
+        .with_columns(
+            pl.when(pl.col("bar0_ts") - pl.col("crash_ts") <= MAX_GAP)
+            .then(pl.col(c))
+            .alias(c)
+            for c in ("bar0_ts", "i0")
+        )
+    )
+
+    def window(lo: int, hi: int) -> pl.DataFrame:
+        return (
+            anchored.drop_nulls("i0")
+            .select(*KEY, "i0", k=pl.int_ranges(lo, hi + 1, dtype=pl.Int32))
+            .explode("k")
+            .with_columns(i=pl.col("i0") + pl.col("k"))
+            .join(series, on="i")
+        )
+
+    # ---- 3) market model, AR / CAR, MAE, TTR ----
+    fits = _market_model(window(*est))
+    rows = (
+        window(*evt)
+        .join(fits, on=KEY)
+        .with_columns(
+            AR=pl.col("r") - (pl.col("alpha") + pl.col("beta") * pl.col("r_mkt")),
+            rel_min=pl.col("k") * bar_minutes,
+        )
+        .drop_nulls("AR")
+        .sort([*KEY, "k"])
+        .with_columns(CAR=pl.col("AR").cum_sum().over(KEY))
+    )
+    short = pl.col("rel_min").abs() <= short_window
+    mae = (
+        rows.group_by(KEY)
+        .agg(
+            n_bars=pl.len(),
+            CAR_min=pl.col("CAR").filter(short).min(),
+            CAR_max=pl.col("CAR").filter(short).max(),
+        )
+        .with_columns(
+            MAE_signed=pl.when(pl.col("CAR_max").abs() >= pl.col("CAR_min").abs())
+            .then(pl.col("CAR_max"))
+            .otherwise(pl.col("CAR_min"))
+        )
+    )
+    hits = _first_hit(rows.join(mae.select(*KEY, "MAE_signed"), on=KEY), t="rel_min")
+
+    summary = (
+        anchored.join(fits, on=KEY, how="left")
+        .join(mae, on=KEY, how="left")
+        .join(hits, on=KEY, how="left")
+        .with_columns(
+            pl.col("n_bars").fill_null(0),
+            TTR_full_min="hit_full",
+            TTR_half_min="hit_half",
+            censored_full=pl.col("hit_full").is_null(),
+            censored_half=pl.col("hit_half").is_null(),
+        )
+        .select(pl.col(c).cast(t) for c, t in SUMMARY_SCHEMA.items())
+    )
+    car = rows.select(*KEY, "ts", pl.col("rel_min").cast(pl.Int32), "AR", "CAR")
+    return summary, car
+
+
+@timed("intraday.study")
+def intraday_study(
+    events: pl.DataFrame,
+    root: str = MINUTE_BARS_DIR,
+    bar_minutes: int = 1,
+    est_window: tuple[int, int] = INTRADAY_EST_WINDOW,
+    evt_window: tuple[int, int] = INTRADAY_EVT_WINDOW,
+    short_window: int = INTRADAY_SHORT_WINDOW,
+    max_rows: int = 2_000_000,
+    car_dir: str | None = None,
+    ntsb_dir: str = NTSB_DIR,
+    tz: str = BARS_TZ,
+) -> pl.DataFrame:
+    """Intraday MAE / TTR of every (event, ticker) pair.
+
+    Parameters
+    ----------
+    events : pl.DataFrame
+        df_ev_anal-style events (or their :func:`event_ticker_pairs`) with
+        ``ev_date`` and, if available, ``ev_time`` / ``ev_tmzn``.
+    bar_minutes : int
+        Bar length in the store (1 for minute bars, 5 for 5-minute bars).
+    est_window, evt_window, short_window
+        In trading minutes relative to the crash bar.
+    max_rows : int
+        Upper bound on window rows expanded at once; memory stays flat
+        however many events and years are studied.
+    car_dir : str, optional
+        Write the AR / CAR rows there as ``part-NNNNN.parquet`` (existing
+        parts are replaced).
+
+    Returns
+    -------
+    pl.DataFrame
+        One row per pair (:data:`SUMMARY_SCHEMA`). ``TTR_*_min`` are trading
+        minutes from the crash bar; pairs that do not recover within the
+        event window keep a null TTR and ``censored_*`` set. Pairs without
+        bars around the crash have null results and ``n_bars == 0``.
+    """
+    pairs = events if "tkr" in events.columns else event_ticker_pairs(events)
+    pairs = (
+        pairs.unique(KEY, keep="first")
+        .select(*KEY, "market_tkr")
+        .join(crash_timestamps(events, ntsb_dir, tz), on="ev_id", how="left")
+    )
+    untimed = pairs.filter(pl.col("crash_ts").is_null()).height
+    if untimed:
+        print(f"⚠️  Skipping {untimed:,} pairs without an event time (ev_time)")
+    pairs = pairs.drop_nulls("crash_ts")
+
+    est = tuple(_bars(m, bar_minutes) for m in est_window)
+    evt = tuple(_bars(m, bar_minutes) for m in evt_window)
+    short = _bars(short_window, bar_minutes) * bar_minutes
+    before = _calendar(-min(est[0], evt[0], 0) * bar_minutes)
+    after = _calendar(max(evt[1], 0) * bar_minutes)
+    per_pair = (est[1] - est[0] + 1) + (evt[1] - evt[0] + 1)
+    per_batch = max(1, max_rows // per_pair)
+
+    if car_dir is not None:
+        os.makedirs(car_dir, exist_ok=True)
+        for old in glob.glob(os.path.join(car_dir, "part-*.parquet")):
+            os.remove(old)
+
+    summaries, n_rows = [], 0
+    groups = pairs.with_columns(
+        _month=pl.col("crash_ts").dt.strftime("%Y-%m")
+    ).partition_by(["tkr", "market_tkr", "_month"], maintain_order=False)
+    for group in groups:
+        group = group.drop("_month")
+        for offset in range(0, group.height, per_batch):
+            summary, car = _study_batch(
+                group.slice(offset, per_batch),
+                root,
+                bar_minutes,
+                est,
+                evt,
+                short,
+                before,
+                after,
+            )
+            summaries.append(summary)
+            n_rows += car.height
+            if car_dir is not None and car.height:
+                car.write_parquet(
+                    os.path.join(car_dir, f"part-{len(summaries):05d}.parquet"),
+                    compression="zstd",
+                )
+
+    result = (
+        pl.concat(summaries) if summaries else pl.DataFrame(schema=SUMMARY_SCHEMA)
+    ).sort(KEY)
+    no_bars = result.filter(pl.col("n_bars") == 0).height
+    if no_bars:
+        print(f"⚠️  Skipping {no_bars:,} pairs without bars around the crash")
+    count("intraday.pairs", result.height - no_bars)
+    current_span().rows = n_rows
+    return result
+
+
+# ---- command line ----
+
+
+def _window(text: str) -> tuple[int, int]:
+    lo, hi = (int(v) for v in text.split(","))
+    return lo, hi
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m aviation.intraday",
+        description="Minute-bar event study around the crash time.",
+    )
+    parser.add_argument("--root", default=MINUTE_BARS_DIR, help="bar store")
+    parser.add_argument("--tz", default=BARS_TZ, help="zone of naive timestamps")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    i = sub.add_parser("ingest", help="add vendor bar files to the store")
+    i.add_argument("files", nargs="+", help="CSV or parquet bar files")
+    i.add_argument("--tkr", default=None, help="ticker of files without one")
+
+    r = sub.add_parser("run", help="score events against the stored bars")
+    r.add_argument("events", help="df_ev_anal-style events or pairs parquet")
+    r.add_argument("--out", default=INTRADAY_DIR)
+    r.add_argument("--bar-minutes", type=int, default=1)
+    r.add_argument(
+        "--est-window", type=_window, default=INTRADAY_EST_WINDOW, metavar="LO,HI"
+    )
+    r.add_argument(
+        "--evt-window", type=_window, default=INTRADAY_EVT_WINDOW, metavar="LO,HI"
+    )
+    r.add_argument("--short-window", type=int, default=INTRADAY_SHORT_WINDOW)
+    r.add_argument("--max-rows", type=int, default=2_000_000)
+    r.add_argument("--ntsb-dir", default=NTSB_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        written = ingest_bars(args.files, args.root, args.tkr, args.tz)
+        print(
+            f"wrote {written.height} month files for "
+            f"{written['tkr'].n_unique()} tickers"
+        )
+        return 0
+
+    os.makedirs(args.out, exist_ok=True)
+    summary = intraday_study(
+        pl.read_parquet(args.events),
+        args.root,
+        bar_minutes=args.bar_minutes,
+        est_window=args.est_window,
+        evt_window=args.evt_window,
+        short_window=args.short_window,
+        max_rows=args.max_rows,
+        car_dir=os.path.join(args.out, "car"),
+        ntsb_dir=args.ntsb_dir,
+        tz=args.tz,
+    )
+    path = os.path.join(args.out, "intraday_summary.parquet")
+    summary.write_parquet(path)
+    scored = summary.filter(pl.col("n_bars") > 0)
+    print(
+        f"scored {scored.height:,} pairs, "
+        f"{scored['censored_full'].sum():,} not recovered -> {path}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Expected-return models for the event study, fitted for all events at once.
+
+``compute_car`` (data/final.ipynb) only knows the market model
+``alpha + beta * r_mkt``, solved per event with ``np.linalg.lstsq``. Here the
+estimation and event windows of every (event, ticker) pair are gathered from
+the :class:`~aviation.panel.ReturnPanel` once, as one design tensor
+``[1, r_mkt, r_sector, r_fx]``, and every model reads from it:
+
+* ``constant_mean``   - AR = r - mean(r over the estimation window)
+* ``market_adjusted`` - AR = r - r_mkt (nothing to estimate)
+* ``market``          - AR = r - (alpha + beta * r_mkt), as compute_car
+* ``multi_factor``    - market + sector ETF (``SECTOR_MAP``) + USD rate for
+  local-currency listings (``FX_MAP``)
+
+Coefficients come from batched normal equations (``X'X b = X'y`` per pair),
+so scoring all models costs about one design build plus a few small solves.
+"""
+
+import numpy as np
+import polars as pl
+
+from .config import (
+    EST_WINDOW,
+    EVT_WINDOW,
+    FX_MAP,
+    SECTOR_MAP,
+    SHORT_WINDOW,
+    STOCK_MARKET_MAP,
+)
+from .features import event_ticker_pairs
+from .panel import ReturnPanel, window_index
+
+MODELS = ("constant_mean", "market_adjusted", "market", "multi_factor")
+
+FACTORS = ("const", "mkt", "sector", "fx")
+
+# design columns each model regresses on (market_adjusted fixes beta = 1)
+_MODEL_COLUMNS = {
+    "constant_mean": (0,),
+    "market": (0, 1),
+    "multi_factor": (0, 1, 2, 3),
+}
+
+
+def _design(panel: ReturnPanel, factor_rows: np.ndarray, idx, lo, inside):
+    """[N, L, F] factor returns + [N, L, F] validity (const always valid)."""
+    N, L = idx.shape
+    X = np.ones((N, L, len(FACTORS)))
+    ok = np.ones((N, L, len(FACTORS)), dtype=bool)
+    for f in range(1, len(FACTORS)):
+        rows = factor_rows[:, f]
+        has = rows >= 0
+        x, x_ok = panel.gather(np.maximum(rows, 0)[:, None], idx, lo[:, None], inside)
+        # a factor a pair does not use is all-zero and never masks a day out
+        X[:, :, f] = np.where(has[:, None], x, 0.0)
+        ok[:, :, f] = np.where(has[:, None], x_ok, True)
+    return X, ok
+
+
+def _solve(X, y, w, cols, active):
+    """Batched OLS of ``y`` on ``X[..., cols]`` over rows where ``w``.
+
+    Inactive columns get a unit diagonal and zero right-hand side, so their
+    coefficient is exactly 0 and the remaining system is the reduced OLS.
+    """
+    Xc = X[:, :, cols] * w[:, :, None]
+    XtX = np.einsum("nlp,nlq->npq", Xc, X[:, :, cols])
+    Xty = np.einsum("nlp,nl->np", Xc, y)
+    act = active[:, cols]
+    XtX = np.where(act[:, :, None] & act[:, None, :], XtX, 0.0)
+    diag = np.arange(len(cols))
+    XtX[:, diag, diag] = np.where(act, XtX[:, diag, diag], 1.0)
+    Xty = np.where(act, Xty, 0.0)
+
+    n = w.sum(axis=1)
+    ok = (n > act.sum(axis=1)) & (np.linalg.cond(XtX) < 1e12)
+    XtX[~ok] = np.eye(len(cols))
+    coef = np.linalg.solve(XtX, Xty[:, :, None])[:, :, 0]
+    coef[~ok] = np.nan
+    return coef, n
+
+
+def fit_models(
+    events: pl.DataFrame,
+    panel: ReturnPanel,
+    models: tuple[str, ...] = MODELS,
+    est_window: tuple[int, int] = EST_WINDOW,
+    evt_window: tuple[int, int] = EVT_WINDOW,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """AR/CAR of every (event, ticker) pair under each expected-return model.
+
+    Parameters
+    ----------
+    events : pl.DataFrame
+        df_ev_anal-style events or an event_ticker_pairs list.
+    panel : ReturnPanel
+        Must hold the stocks and their indices; sector ETFs / FX rates are
+        used when present (a missing factor simply drops out of that pair's
+        multi-factor fit).
+    models : tuple[str]
+        Subset of MODELS.
+
+    Returns
+    -------
+    (rows, params)
+        rows : model, date, AR, CAR, tkr, ev_id, stock_type, flavor, rel_day
+        params : model, ev_id, tkr, stock_type, const, mkt, sector, fx, n_est
+    """
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise ValueError(f"unknown models {sorted(unknown)}; choose from {MODELS}")
+
+    pairs = events if "tkr" in events.columns else event_ticker_pairs(events)
+    pairs = pairs.unique(
+        ["ev_id", "tkr", "stock_type"], keep="first", maintain_order=True
+    )
+    tkr = pairs["tkr"].to_list()
+    factor_rows = np.stack(
+        [
+            panel.index(tkr),
+            panel.index([STOCK_MARKET_MAP.get(t) for t in tkr]),
+            panel.index([SECTOR_MAP.get(t) for t in tkr]),
+            panel.index([FX_MAP.get(t) for t in tkr]),
+        ],
+        axis=1,
+    )
+    keep = (factor_rows[:, 0] >= 0) & (factor_rows[:, 1] >= 0)
+    pairs, factor_rows = pairs.filter(pl.Series(keep)), factor_rows[keep]
+    active = factor_rows >= 0  # column 0 of factor_rows is the stock -> const
+    N = pairs.height
+
+    ev_dates = pairs["ev_date"].cast(pl.Date).to_numpy().astype("datetime64[D]")
+    days, ev_days = panel.days, ev_dates.astype(np.int64)
+
+    # ---- one gather per window, shared by every model ----
+    lo, idx, inside = window_index(days, ev_days, est_window)
+    y_est, y_ok_est = panel.gather(factor_rows[:, :1], idx, lo[:, None], inside)
+    X_est, X_ok_est = _design(panel, factor_rows, idx, lo, inside)
+    lo, idx, inside = window_index(days, ev_days, evt_window)
+    y_evt, y_ok_evt = panel.gather(factor_rows[:, :1], idx, lo[:, None], inside)
+    X_evt, X_ok_evt = _design(panel, factor_rows, idx, lo, inside)
+    evt_dates = panel.dates[idx]
+
+    rows, params = [], []
+    for model in models:
+        coef = np.zeros((N, len(FACTORS)))
+        if model == "market_adjusted":
+            cols = (1,)
+            coef[:, 1] = 1.0
+            n = np.zeros(N, dtype=np.int64)
+        else:
+            cols = _MODEL_COLUMNS[model]
+            w = y_ok_est & X_ok_est[:, :, list(cols)].all(axis=2)
+            coef[:, list(cols)], n = _solve(X_est, y_est, w, list(cols), active)
+
+        w = (
+            y_ok_evt
+            & X_ok_evt[:, :, list(cols)].all(axis=2)
+            & ~np.isnan(coef).any(axis=1)[:, None]
+        )
+        ar = np.where(
+            w, y_evt - np.einsum("nlf,nf->nl", X_evt, np.nan_to_num(coef)), 0.0
+        )
+        car = np.cumsum(ar, axis=1)
+
+        i, l = np.nonzero(w)
+        rel = (evt_dates[i, l] - ev_dates[i]).astype("timedelta64[D]").astype(np.int16)
+        rows.append(
+            pl.DataFrame(
+                {
+                    "model": model,
+                    "date": evt_dates[i, l],
+                    "AR": ar[i, l],
+                    "CAR": car[i, l],
+                    "tkr": pairs["tkr"].to_numpy()[i],
+                    "ev_id": pairs["ev_id"].to_numpy()[i],
+                    "stock_type": pairs["stock_type"].to_numpy()[i],
+                    "flavor": np.where(
+                        np.abs(rel) <= SHORT_WINDOW, "short", "extended"
+                    ),
+                    "rel_day": rel,
+                }
+            )
+        )
+        # report factors outside the model (or unused by the pair) as null
+        shown = np.where(np.isin(np.arange(len(FACTORS)), cols) & active, coef, np.nan)
+        params.append(
+            pairs.select("ev_id", "tkr", "stock_type").with_columns(
+                model=pl.lit(model),
+                **{f: shown[:, j] for j, f in enumerate(FACTORS)},
+                n_est=n,
+            )
+        )
+
+    return (
+        pl.concat(rows).with_columns(pl.col("model").cast(pl.Enum(list(MODELS)))),
+        pl.concat(params)
+        .with_columns(pl.col("model").cast(pl.Enum(list(MODELS))))
+        .fill_nan(None),
+    )
+
+
+def model_caar(rows: pl.DataFrame) -> pl.DataFrame:
+    """CAAR by model and rel_day, for comparing models over the whole event set."""
+    return (
+        rows.group_by(["model", "rel_day"])
+        .agg(CAAR=pl.col("CAR").mean(), AAR=pl.col("AR").mean(), n=pl.len())
+        .sort(["model", "rel_day"])
+    )
@@ -0,0 +1,251 @@
+"""Overlapping event windows: detection, clustering and resolution policies.
+
+Crashes that hit the same ticker within weeks of each other (BA especially)
+contaminate each other's event study: the later event's estimation window
+contains the earlier event's abnormal returns, or the two event windows
+overlap outright. :class:`WindowIndex` finds every overlapping pair of
+(ticker, interval) in O(n log n + overlaps) from two sorted endpoint arrays,
+and :func:`resolve_overlaps` applies one of three policies:
+
+* ``"drop"``    - remove every (event, ticker) with any overlap;
+* ``"merge"``   - chain overlapping event windows into clusters, scored once
+  from the first event's date through the cluster's last window day;
+* ``"exclude"`` - keep every event but list the contaminated days to leave out
+  of its estimation window.
+
+The pairs and exclusions it returns feed ``incremental.add_events`` (and so
+the pipeline's ``car`` stage and batch runs) as well as
+``spillover_tensor(..., exclude=...)``.
+"""
+
+import numpy as np
+import polars as pl
+
+from .config import EST_WINDOW, EVT_WINDOW
+from .features import event_ticker_pairs
+
+POLICIES = ("drop", "merge", "exclude")
+
+EXCLUSION_SCHEMA = {
+    "ev_id": pl.Utf8,
+    "tkr": pl.Utf8,
+    "start": pl.Date,
+    "end": pl.Date,
+    "other_ev_id": pl.Utf8,
+}
+
+
+class WindowIndex:
+    """Static interval index over closed integer intervals, grouped by key.
+
+    Groups are folded into the coordinate (``group * stride + day``) so one
+    sorted array serves every ticker and intervals of different groups never
+    meet.
+    """
+
+    def __init__(self, group: np.ndarray, start: np.ndarray, end: np.ndarray):
+        group, start, end = (np.asarray(a, dtype=np.int64) for a in (group, start, end))
+        self._origin = int(start.min()) if len(start) else 0
+        self._stride = int(end.max() - self._origin + 2) if len(end) else 1
+        self._lo, self._hi = self._encode(group, start, end)
+        self._order = np.argsort(self._lo, kind="stable")
+        self._lo_sorted = self._lo[self._order]
+
+    def __len__(self):
+        return len(self._lo)
+
+    def _encode(self, group, start, end):
+        group = np.asarray(group, dtype=np.int64)
+        # clip queries into the indexed span so they cannot spill into a neighbour group
+        s = np.clip(
+            np.asarray(start, dtype=np.int64) - self._origin, -1, self._stride - 1
+        )
+        e = np.clip(
+            np.asarray(end, dtype=np.int64) - self._origin, -1, self._stride - 1
+        )
+        base = group * (self._stride + 1)
+        return base + s, base + e
+
+    @staticmethod
+    def _starting_within(sorted_lo, order, lo, hi, right_open_lo: bool):
+        a = np.searchsorted(sorted_lo, lo, side="right" if right_open_lo else "left")
+        b = np.searchsorted(sorted_lo, hi, side="right")
+        counts = np.maximum(b - a, 0)
+        q = np.repeat(np.arange(len(lo)), counts)
+        offs = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return q, order[np.repeat(a, counts) + offs]
+
+    def query(
+        self, group: np.ndarray, start: np.ndarray, end: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """All (query row, indexed row) pairs whose intervals intersect."""
+        qlo, qhi = self._encode(group, start, end)
+        # indexed intervals that start inside a query ...
+        q1, r1 = self._starting_within(self._lo_sorted, self._order, qlo, qhi, False)
+        # ... plus queries that start strictly inside an indexed interval
+        q_order = np.argsort(qlo, kind="stable")
+        r2, q2 = self._starting_within(qlo[q_order], q_order, self._lo, self._hi, True)
+        return np.concatenate([q1, q2]), np.concatenate([r1, r2])
+
+    def self_overlaps(self) -> tuple[np.ndarray, np.ndarray]:
+        """Every overlapping pair among the indexed intervals, each reported once."""
+        a, b = self._starting_within(
+            self._lo_sorted, self._order, self._lo, self._hi, False
+        )
+        keep = (self._lo[b] > self._lo[a]) | ((self._lo[b] == self._lo[a]) & (a < b))
+        return a[keep], b[keep]
+
+
+def event_windows(
+    events: pl.DataFrame,
+    est_window: tuple[int, int] = EST_WINDOW,
+    evt_window: tuple[int, int] = EVT_WINDOW,
+) -> pl.DataFrame:
+    """(ev_id, tkr) pairs with their calendar-day estimation / event windows."""
+    pairs = events if "tkr" in events.columns else event_ticker_pairs(events)
+    day = pl.col("ev_date").cast(pl.Date)
+    return pairs.unique(
+        ["ev_id", "tkr"], keep="first", maintain_order=True
+    ).with_columns(
+        est_start=day.dt.offset_by(f"{est_window[0]}d"),
+        est_end=day.dt.offset_by(f"{est_window[1]}d"),
+        evt_start=day.dt.offset_by(f"{evt_window[0]}d"),
+        evt_end=day.dt.offset_by(f"{evt_window[1]}d"),
+    )
+
+
+def _days(s: pl.Series) -> np.ndarray:
+    return s.cast(pl.Int32).to_numpy().astype(np.int64)
+
+
+def find_overlaps(windows: pl.DataFrame) -> pl.DataFrame:
+    """Every contaminated (event, ticker): which other event, how, and when.
+
+    Returns
+    -------
+    pl.DataFrame
+        ev_id, tkr, other_ev_id, kind ("event": the two event windows overlap;
+        "estimation": the other event's window falls in this estimation
+        window), start, end (the overlapping days).
+    """
+    tk = windows["tkr"].cast(pl.Categorical).to_physical().to_numpy()
+    es, ee = _days(windows["evt_start"]), _days(windows["evt_end"])
+    idx = WindowIndex(tk, es, ee)
+
+    i, j = idx.self_overlaps()
+    q, r = idx.query(tk, _days(windows["est_start"]), _days(windows["est_end"]))
+    q, r = q[q != r], r[q != r]
+
+    ids = windows["ev_id"].to_numpy()
+    tkr = windows["tkr"].cast(pl.Utf8).to_numpy()
+    est_s, est_e = _days(windows["est_start"]), _days(windows["est_end"])
+    parts = {
+        "ev_id": np.concatenate([ids[i], ids[j], ids[q]]),
+        "tkr": np.concatenate([tkr[i], tkr[j], tkr[q]]),
+        "other_ev_id": np.concatenate([ids[j], ids[i], ids[r]]),
+        "kind": np.repeat(["event", "event", "estimation"], [len(i), len(j), len(q)]),
+        "start": np.concatenate(
+            [
+                np.maximum(es[i], es[j]),
+                np.maximum(es[i], es[j]),
+                np.maximum(est_s[q], es[r]),
+            ]
+        ),
+        "end": np.concatenate(
+            [
+                np.minimum(ee[i], ee[j]),
+                np.minimum(ee[i], ee[j]),
+                np.minimum(est_e[q], ee[r]),
+            ]
+        ),
+    }
+    return (
+        pl.DataFrame(parts)
+        .with_columns(pl.col("start", "end").cast(pl.Int32).cast(pl.Date))
+        .sort(["tkr", "ev_id", "start"])
+    )
+
+
+def event_clusters(windows: pl.DataFrame) -> pl.DataFrame:
+    """Chain overlapping event windows per ticker into clusters.
+
+    Adds cluster_id (``<tkr>:<first ev_id>``), cluster_start / cluster_end and
+    n_events. A sort plus running max of window ends per ticker is enough
+    since intervals on a line overlap transitively only through that chain.
+    """
+    return (
+        windows.sort(["tkr", "evt_start", "ev_id"])
+        .with_columns(
+            _prev_end=pl.col("evt_end").cum_max().shift(1).over("tkr"),
+        )
+        .with_columns(
+            _new=(
+                pl.col("_prev_end").is_null()
+                | (pl.col("evt_start") > pl.col("_prev_end"))
+            )
+        )
+        .with_columns(_cluster=pl.col("_new").cum_sum().over("tkr"))
+        .with_columns(
+            cluster_id=pl.concat_str(
+                [pl.col("tkr"), pl.col("ev_id").first().over(["tkr", "_cluster"])],
+                separator=":",
+            ),
+            cluster_start=pl.col("evt_start").min().over(["tkr", "_cluster"]),
+            cluster_end=pl.col("evt_end").max().over(["tkr", "_cluster"]),
+            n_events=pl.len().over(["tkr", "_cluster"]),
+        )
+        .drop("_prev_end", "_new", "_cluster")
+    )
+
+
+def resolve_overlaps(
+    events: pl.DataFrame,
+    policy: str = "exclude",
+    est_window: tuple[int, int] = EST_WINDOW,
+    evt_window: tuple[int, int] = EVT_WINDOW,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Apply an overlap policy to the (event, ticker) work list.
+
+    Parameters
+    ----------
+    events : pl.DataFrame
+        df_ev_anal-style events, or an existing event_ticker_pairs list.
+    policy : str
+        "drop", "merge" or "exclude" (see module docstring).
+
+    Returns
+    -------
+    (pairs, exclusions)
+        pairs : work list to score (for "merge", one anchor row per cluster
+        with its member ``cluster_ev_ids`` and a ``horizon_end`` at the
+        cluster's last window day, which ``add_events`` tracks up to).
+        exclusions : ev_id, tkr, start, end, other_ev_id day ranges to leave
+        out of estimation (empty unless policy == "exclude").
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+    windows = event_windows(events, est_window, evt_window)
+    no_exclusions = pl.DataFrame(schema=EXCLUSION_SCHEMA)
+
+    if policy == "merge":
+        clusters = event_clusters(windows)
+        merged = (
+            clusters.group_by("cluster_id", maintain_order=True)
+            .agg(
+                pl.all().first(),
+                cluster_ev_ids=pl.col("ev_id"),
+            )
+            .with_columns(horizon_end=pl.col("cluster_end"))
+        )
+        return merged, no_exclusions
+
+    overlaps = find_overlaps(windows)
+    if policy == "drop":
+        return windows.join(overlaps, on=["ev_id", "tkr"], how="anti"), no_exclusions
+
+    exclusions = (
+        overlaps.filter(pl.col("kind") == "estimation")
+        .select(EXCLUSION_SCHEMA.keys())
+        .cast(EXCLUSION_SCHEMA)
+    )
+    return windows, exclusions
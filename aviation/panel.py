@@ -0,0 +1,287 @@
+"""Aligned (ticker x trading day) price / return panel.
+
+``compute_car`` re-fetches and ``pct_change``s one stock and one index per
+call. Cross-sectional work (every event against every ticker) instead wants
+all series on one calendar: :func:`build_return_panel` pivots the long price
+frames once into dense arrays with a validity mask.
+
+:func:`materialize_panel` writes those arrays as plain ``.npy`` files plus a
+``labels.json`` sidecar; :func:`open_panel` maps them read-only, so pipeline
+workers, notebooks and dashboard sessions share the same OS pages instead of
+each holding a deserialized copy.
+
+Every build goes to its own ``build-<id>/`` directory and is published by
+replacing the ``CURRENT`` pointer file in one rename, so a reader sees either
+the previous set of arrays or the new one, never a mix of both.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+import polars as pl
+
+from .compact import cache_exists, read_cache
+from .config import MARKET_INDEX_PATH, PRICE_CACHE_PATH, PRICES_PATH, RETURN_PANEL_DIR
+from .instrument import current_span, timed
+
+LABELS_FILE = "labels.json"
+CURRENT_FILE = "CURRENT"
+KEEP_BUILDS = 2  # the current build and the previous one, which readers may still map
+_ARRAYS = ("dates", "close", "returns", "valid", "prev")
+
+
+@dataclass(frozen=True)
+class ReturnPanel:
+    """Dense close / return arrays on a shared trading-day calendar.
+
+    ``returns[k, t]`` is the simple return of ``tickers[k]`` from its previous
+    valid close (at calendar index ``prev[k, t]``) to ``dates[t]``; ``valid``
+    marks where it exists.
+    """
+
+    tickers: tuple[str, ...]
+    dates: np.ndarray  # datetime64[D], [D]
+    close: np.ndarray  # [K, D], NaN where not traded
+    returns: np.ndarray  # [K, D]
+    valid: np.ndarray  # [K, D] bool
+    prev: np.ndarray  # [K, D] int32, -1 before the first close
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @property
+    def days(self) -> np.ndarray:
+        """Calendar as int epoch days (what ``np.searchsorted`` wants)."""
+        return self.dates.astype("datetime64[D]").astype(np.int64)
+
+    def index(self, tickers) -> np.ndarray:
+        """Row index per ticker (-1 when the ticker is not in the panel)."""
+        pos = {t: i for i, t in enumerate(self.tickers)}
+        return np.array([pos.get(t, -1) for t in tickers], dtype=np.int64)
+
+    def gather(self, rows, idx, lo, inside) -> tuple[np.ndarray, np.ndarray]:
+        """Window returns ``returns[rows, idx]`` and their validity.
+
+        ``rows``, ``idx``, ``lo`` and ``inside`` broadcast together (e.g.
+        [K, 1, 1] x [E, L] for every ticker around every event, or [N, 1] x
+        [N, L] for one ticker per event). A return only counts when its
+        previous close also lies inside the window (index >= ``lo``), as with
+        ``pct_change`` on a window slice; invalid entries are 0.
+        """
+        ok = self.valid[rows, idx] & (self.prev[rows, idx] >= lo) & inside
+        return np.where(ok, self.returns[rows, idx], 0.0), ok
+
+    def to_long(self) -> pl.DataFrame:
+        """Back to the long (date, tkr, close, ret) layout."""
+        k, t = np.nonzero(~np.isnan(self.close))
+        return pl.DataFrame(
+            {
+                "date": self.dates[t],
+                "tkr": np.asarray(self.tickers)[k],
+                "close": self.close[k, t],
+                "ret": np.where(self.valid[k, t], self.returns[k, t], np.nan),
+            }
+        ).fill_nan(None)
+
+
+def window_index(days: np.ndarray, ev_days: np.ndarray, window: tuple[int, int]):
+    """Calendar-day window around each event as padded trading-day indices.
+
+    Returns ``lo`` [E] (first index inside), ``idx`` [E, L] (clipped to the
+    calendar) and ``inside`` [E, L] marking real window days.
+    """
+    lo = np.searchsorted(days, ev_days + window[0], side="left")
+    hi = np.searchsorted(days, ev_days + window[1], side="right")
+    width = int((hi - lo).max()) if len(lo) else 0
+    idx = lo[:, None] + np.arange(width)[None, :]
+    inside = idx < hi[:, None]
+    return lo, np.minimum(idx, len(days) - 1), inside
+
+
+@timed("prices.long_prices")
+def long_prices(
+    paths: tuple[str, ...] = (PRICES_PATH, MARKET_INDEX_PATH, PRICE_CACHE_PATH),
+) -> pl.DataFrame:
+    """Every stored close as one (date, tkr, close) frame.
+
+    Later paths win on duplicate (date, tkr), so by default the
+    ``price_cache`` rows that ``compute_car`` actually used are preferred.
+    Compact copies are read when current (:func:`aviation.compact.read_cache`).
+    """
+    frames = []
+    for path in paths:
+        if not cache_exists(path):
+            continue
+        df = read_cache(path)
+        tkr = "tkr" if "tkr" in df.columns else "ticker"
+        frames.append(
+            df.select(
+                pl.col("date").cast(pl.Date),
+                pl.col(tkr).cast(pl.Utf8).alias("tkr"),
+                pl.col("close").cast(pl.Float64),
+            )
+        )
+    if not frames:
+        return pl.DataFrame(
+            schema={"date": pl.Date, "tkr": pl.Utf8, "close": pl.Float64}
+        )
+    prices = (
+        pl.concat(frames, how="vertical")
+        .drop_nulls()
+        .unique(subset=["date", "tkr"], keep="last", maintain_order=True)
+        .sort(["tkr", "date"])
+    )
+    current_span().rows = prices.height
+    return prices
+
+
+@timed("panel.build")
+def build_return_panel(
+    prices: pl.DataFrame | None = None, tickers: list[str] | None = None
+) -> ReturnPanel:
+    """Pivot long closes into a :class:`ReturnPanel`.
+
+    Parameters
+    ----------
+    prices : pl.DataFrame or None
+        date, tkr (or ticker), close; defaults to :func:`long_prices`.
+    tickers : list[str] or None
+        Restrict / order the ticker axis (missing ones are dropped).
+    """
+    prices = long_prices() if prices is None else prices
+    if "tkr" not in prices.columns:
+        prices = prices.rename({"ticker": "tkr"})
+    prices = prices.select(
+        pl.col("date").cast(pl.Date), pl.col("tkr").cast(pl.Utf8), pl.col("close")
+    ).unique(subset=["date", "tkr"], keep="last")
+
+    present = set(prices["tkr"].unique().to_list())
+    tickers = (
+        sorted(present) if tickers is None else [t for t in tickers if t in present]
+    )
+    prices = prices.filter(pl.col("tkr").is_in(tickers))
+    current_span().rows = prices.height
+
+    dates = np.sort(prices["date"].unique().to_numpy()).astype("datetime64[D]")
+    k = prices["tkr"].replace_strict(tickers, list(range(len(tickers)))).to_numpy()
+    t = np.searchsorted(dates, prices["date"].to_numpy().astype("datetime64[D]"))
+    close = np.full((len(tickers), len(dates)), np.nan)
+    close[k, t] = prices["close"].to_numpy()
+
+    # ---- previous valid close per (ticker, day), then simple returns ----
+    has = ~np.isnan(close)
+    last = np.where(has, np.arange(len(dates))[None, :], -1)
+    last = np.maximum.accumulate(last, axis=1)
+    prev = np.full_like(last, -1)
+    prev[:, 1:] = last[:, :-1]
+    prev_close = np.take_along_axis(close, np.maximum(prev, 0), axis=1)
+    valid = has & (prev >= 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.where(valid, close / prev_close - 1.0, np.nan)
+
+    return ReturnPanel(
+        tickers=tuple(tickers),
+        dates=dates,
+        close=close,
+        returns=returns,
+        valid=valid,
+        prev=prev.astype(np.int32),
+    )
+
+
+def write_panel(panel: ReturnPanel, out_dir: str = RETURN_PANEL_DIR, **meta) -> str:
+    """Persist ``panel`` as a new build of ``<array>.npy`` files + ``labels.json``.
+
+    The build is written to a temporary directory, renamed to
+    ``build-<id>/`` and then published by swapping the ``CURRENT`` pointer,
+    so :func:`open_panel` never mixes arrays of two builds. Builds older
+    than the last ``KEEP_BUILDS`` are removed. Returns the build directory.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    build_id = f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    tmp = os.path.join(out_dir, f".build-{build_id}.tmp")
+    os.makedirs(tmp)
+    for name in _ARRAYS:
+        np.save(
+            os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(getattr(panel, name))
+        )
+    labels = {
+        "build": build_id,
+        "tickers": list(panel.tickers),
+        "shape": [len(panel.tickers), len(panel.dates)],
+        "first_date": str(panel.dates[0]) if len(panel.dates) else None,
+        "last_date": str(panel.dates[-1]) if len(panel.dates) else None,
+        "built": now.isoformat(timespec="seconds"),
+        **meta,
+    }
+    with open(os.path.join(tmp, LABELS_FILE), "w") as f:
+        json.dump(labels, f, indent=2)
+    build = os.path.join(out_dir, f"build-{build_id}")
+    os.rename(tmp, build)
+
+    pointer = os.path.join(out_dir, f".{CURRENT_FILE}.tmp-{build_id}")
+    with open(pointer, "w") as f:
+        f.write(os.path.basename(build))
+    os.replace(pointer, os.path.join(out_dir, CURRENT_FILE))
+    _prune_builds(out_dir, os.path.basename(build))
+    return build
+
+
+def _prune_builds(out_dir: str, current: str, keep: int = KEEP_BUILDS):
+    """Remove all but ``current`` and the newest ``keep - 1`` other builds."""
+    older = [
+        os.path.join(out_dir, d)
+        for d in os.listdir(out_dir)
+        if d.startswith("build-") and d != current
+    ]
+    older.sort(key=lambda d: os.stat(d).st_mtime_ns, reverse=True)
+    for d in older[keep - 1 :]:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def panel_build_dir(panel_dir: str = RETURN_PANEL_DIR) -> str:
+    """Directory of the build ``CURRENT`` points at.
+
+    A panel written before builds were versioned keeps its arrays directly in
+    ``panel_dir``, which is returned as is.
+    """
+    try:
+        with open(os.path.join(panel_dir, CURRENT_FILE)) as f:
+            return os.path.join(panel_dir, f.read().strip())
+    except FileNotFoundError:
+        return panel_dir
+
+
+def materialize_panel(
+    paths: tuple[str, ...] = (PRICES_PATH, MARKET_INDEX_PATH, PRICE_CACHE_PATH),
+    out_dir: str = RETURN_PANEL_DIR,
+) -> ReturnPanel:
+    """Build step: long price parquets -> memory-mappable panel on disk."""
+    panel = build_return_panel(long_prices(paths))
+    write_panel(panel, out_dir, sources=[os.path.basename(p) for p in paths])
+    return open_panel(out_dir)
+
+
+def open_panel(panel_dir: str = RETURN_PANEL_DIR, mmap: bool = True) -> ReturnPanel:
+    """Map the current build of a panel (read-only, zero-copy when ``mmap``)."""
+    build = panel_build_dir(panel_dir)
+    with open(os.path.join(build, LABELS_FILE)) as f:
+        labels = json.load(f)
+    mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(build, f"{name}.npy"), mmap_mode=mode)
+        for name in _ARRAYS
+    }
+    return ReturnPanel(tickers=tuple(labels["tickers"]), **arrays)
+
+
+def panel_labels(panel_dir: str = RETURN_PANEL_DIR) -> dict:
+    """The current build's ``labels.json`` (build id, tickers, shape, date range)."""
+    with open(os.path.join(panel_build_dir(panel_dir), LABELS_FILE)) as f:
+        return json.load(f)
@@ -0,0 +1,693 @@
+"""Headless pipeline: ingest -> events -> prices -> car -> mae_ttr -> aggregates
+-> report.
+
+Replaces running data/ntbs.ipynb and data/final.ipynb top to bottom. Every
+stage writes its outputs to ``<cache_dir>/<stage>/<key>/`` where ``key`` is a
+SHA-256 over
+
+* the stage's parameters (windows, thresholds, ticker maps, price source),
+* the content digests of the raw files it reads (NTSB CSVs, price parquets),
+* the output digests of the stages it depends on.
+
+A rerun recomputes a stage only when one of those changed, and downstream
+stages only when the upstream *outputs* actually differ. Raw-file digests are
+memoized by (size, mtime) in ``digests.json`` so unchanged CSVs are not
+re-hashed. Run ``python -m aviation.pipeline --help``.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import polars as pl
+
+from .car_matrix import car_matrix
+from .compact import cache_files
+from .config import (
+    AIRLINES,
+    DATA_ROOT,
+    EST_WINDOW,
+    EVT_WINDOW,
+    INJURY_COUNT_THRESH,
+    MANUFACTURER,
+    MODERATE_THRESH,
+    SEVERE_THRESH,
+    SHORT_WINDOW,
+    STOCK_MARKET_MAP,
+    TICKER_MAP,
+    TTR_DEFAULT,
+)
+from .decimate import write_crash_index
+from .features import build_feature_store, event_ticker_pairs, map_tickers
+from .incremental import add_events, empty_state, mae_table, ttr_table, update
+from .instrument import RECORDER, count, log_json, timed
+from .overlap import POLICIES, resolve_overlaps
+from .panel import long_prices
+from .report import RENDER_VERSION, REPORT_INDEX, STYLE, render_reports
+from .survival import km_summary
+
+MANIFEST = "manifest.json"
+DIGESTS_FILE = "digests.json"
+
+PRICE_SOURCES = ("store", "yahoo")
+
+# bump when a stage's code changes in a way its parameters do not capture
+STAGE_VERSION = 3
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Roots and parameters of one pipeline run."""
+
+    data_root: str = DATA_ROOT
+    cache_dir: str | None = None
+    price_source: str = "store"
+    est_window: tuple[int, int] = EST_WINDOW
+    evt_window: tuple[int, int] = EVT_WINDOW
+    overlap_policy: str | None = None  # overlap.POLICIES; None scores every pair
+    workers: int | None = None  # report rendering pool (default: CPU count)
+
+    @property
+    def ntsb_dir(self) -> str:
+        return os.path.join(self.data_root, "ntbs")
+
+    @property
+    def stocks_dir(self) -> str:
+        return os.path.join(self.data_root, "stocks")
+
+    @property
+    def cache(self) -> str:
+        return self.cache_dir or os.path.join(self.data_root, "pipeline")
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    deps: tuple[str, ...]
+    outputs: tuple[str, ...]
+    run: Callable  # (settings, inputs: {file name: path}, out_dir) -> None
+    params: Callable = lambda s: {}
+    sources: Callable = lambda s: []
+    publish_to: Callable = lambda s: None  # where --publish copies the outputs
+
+
+# ---- stage bodies ----
+
+
+def _ingest(s: Settings, inputs: dict, out: str):
+    build_feature_store(
+        os.path.join(s.ntsb_dir, "processed.parquet"),
+        s.ntsb_dir,
+        out_path=os.path.join(out, "event_features.parquet"),
+    )
+
+
+def _events(s: Settings, inputs: dict, out: str):
+    """df_ev_anal: airline operators flying Boeing / Airbus, tickers re-mapped."""
+    features = pl.read_parquet(inputs["event_features.parquet"])
+    events = (
+        features.with_columns(pl.col("oper_name", "acft_make").cast(pl.Utf8))
+        .filter(
+            pl.col("oper_name").is_in(AIRLINES)
+            & pl.col("acft_make").is_in(MANUFACTURER)
+        )
+        .select(
+            "ev_date",
+            "ev_id",
+            "acft_make",
+            "oper_name",
+            "inj_tot_f",
+            "inj_all_tot",
+            "ev_city",
+            "ev_country",
+            pl.col("category").cast(pl.Utf8),
+        )
+        .with_columns(pl.col("ev_date").cast(pl.Date))
+        .pipe(map_tickers)
+        .sort("ev_date", "ev_id")
+    )
+    events.write_parquet(os.path.join(out, "events.parquet"))
+    event_ticker_pairs(events).write_parquet(os.path.join(out, "pairs.parquet"))
+
+
+def _price_range(pairs: pl.DataFrame, s: Settings):
+    day = pl.col("ev_date").cast(pl.Date)
+    lo = min(s.est_window[0], s.evt_window[0])
+    hi = max(s.est_window[1], s.evt_window[1])
+    r = pairs.select(
+        start=day.min().dt.offset_by(f"{lo}d"), end=day.max().dt.offset_by(f"{hi}d")
+    )
+    return r["start"][0], r["end"][0]
+
+
+def _yahoo_prices(tickers: list[str], start, end) -> pl.DataFrame:
+    """Adjusted closes from Yahoo Finance, as ``load_tkr_price`` fetches them."""
+    import yfinance as yf
+
+    frames = []
+    for tkr in tickers:
+        with timed("prices.yfinance", tkr=tkr) as span:
+            df = yf.Ticker(tkr).history(
+                start=start, end=end + timedelta(days=1), auto_adjust=True
+            )
+            span.rows = len(df)
+        if df.empty:
+            count("prices.yfinance_empty")
+            print(f"⚠️  Skipping {tkr}: no price data between {start} and {end}")
+            continue
+        frames.append(
+            pl.from_pandas(df.reset_index()[["Date", "Close"]]).select(
+                date=pl.col("Date").cast(pl.Date),
+                tkr=pl.lit(tkr),
+                close=pl.col("Close").cast(pl.Float64),
+            )
+        )
+    return pl.concat(frames) if frames else long_prices(())
+
+
+def _prices(s: Settings, inputs: dict, out: str):
+    pairs = pl.read_parquet(inputs["pairs.parquet"])
+    tickers = sorted(set(pairs["tkr"]) | set(pairs["market_tkr"]))
+    start, end = _price_range(pairs, s)
+    if s.price_source == "yahoo":
+        prices = _yahoo_prices(tickers, start, end)
+    else:
+        prices = long_prices(tuple(_price_files(s)))
+    prices.filter(
+        pl.col("tkr").is_in(tickers) & pl.col("date").is_between(start, end)
+    ).sort(["tkr", "date"]).write_parquet(os.path.join(out, "prices.parquet"))
+
+
+def _price_files(s: Settings) -> list[str]:
+    names = ("prices.parquet", "market_index.parquet", "price_cache.parquet")
+    return [os.path.join(s.stocks_dir, n) for n in names]
+
+
+def _car(s: Settings, inputs: dict, out: str):
+    pairs = pl.read_parquet(inputs["pairs.parquet"])
+    prices = pl.read_parquet(inputs["prices.parquet"])
+    exclusions = None
+    if s.overlap_policy is not None:
+        pairs, exclusions = resolve_overlaps(
+            pairs, s.overlap_policy, s.est_window, s.evt_window
+        )
+    state = add_events(
+        empty_state(), pairs, prices, s.est_window, s.evt_window, exclusions=exclusions
+    )
+    state, car = update(state, prices)
+    car.sort(["ev_id", "stock_type", "date"]).write_parquet(
+        os.path.join(out, "car_cache.parquet")
+    )
+    state.sort(["ev_id", "tkr", "stock_type"]).write_parquet(
+        os.path.join(out, "car_state.parquet")
+    )
+
+
+def _mae_ttr(s: Settings, inputs: dict, out: str):
+    state = pl.read_parquet(inputs["car_state.parquet"])
+    # "open" is judged against the last price seen, so the output is reproducible
+    as_of = state["stock_last_date"].max()
+    mae_table(state).write_parquet(os.path.join(out, "mae_cache.parquet"))
+    ttr_table(state, as_of=as_of).write_parquet(os.path.join(out, "ttr_cache.parquet"))
+
+
+def _aggregates(s: Settings, inputs: dict, out: str):
+    events = pl.read_parquet(inputs["events.parquet"])
+    car = pl.read_parquet(inputs["car_cache.parquet"])
+    matrix = car_matrix(car, events, window=s.evt_window)
+    matrix.save(os.path.join(out, "car_matrix.npz"))
+    matrix.caar().write_parquet(os.path.join(out, "caar.parquet"))
+    write_crash_index(
+        pl.read_parquet(inputs["pairs.parquet"]),
+        os.path.join(out, "crash_days.parquet"),
+    )
+
+    keys = ["ev_id", "tkr", "stock_type"]
+    groups = ["category", "stock_type"]
+    pairs = (
+        pl.read_parquet(inputs["mae_cache.parquet"])
+        .join(
+            pl.read_parquet(inputs["ttr_cache.parquet"]),
+            on=keys,
+            how="full",
+            coalesce=True,
+        )
+        .join(events.select("ev_id", "category"), on="ev_id", how="left")
+    )
+    # TTR of a censored pair is ttr_default, so report Kaplan-Meier medians
+    # rather than means over those placeholders
+    (
+        pairs.group_by(groups)
+        .agg(
+            n=pl.len(),
+            MAE_mean=pl.col("MAE_signed").mean(),
+            MAE_median=pl.col("MAE_signed").median(),
+            censored_full=pl.col("censored_full").sum(),
+        )
+        .join(km_summary(pairs, groups, "TTR_full", "censored_full"), on=groups)
+        .join(km_summary(pairs, groups, "TTR_half", "censored_half"), on=groups)
+        .sort(groups)
+        .write_parquet(os.path.join(out, "summary.parquet"))
+    )
+
+
+def _report(s: Settings, inputs: dict, out: str):
+    """Per-event figures under ``<data_root>/<category>_events/``.
+
+    Figures live outside the stage directory so that unchanged ones survive a
+    stage rebuild; :func:`render_reports` only redraws those whose input
+    slice changed, and the stage keeps a copy of the index.
+    """
+    render_reports(
+        pl.read_parquet(inputs["car_cache.parquet"]),
+        pl.read_parquet(inputs["car_state.parquet"]),
+        pl.read_parquet(inputs["events.parquet"]),
+        root=s.data_root,
+        workers=s.workers,
+    )
+    shutil.copyfile(
+        os.path.join(s.data_root, REPORT_INDEX), os.path.join(out, REPORT_INDEX)
+    )
+
+
+def _ticker_params(s: Settings) -> dict:
+    return {
+        "TICKER_MAP": TICKER_MAP,
+        "STOCK_MARKET_MAP": STOCK_MARKET_MAP,
+        "MANUFACTURER": sorted(MANUFACTURER),
+    }
+
+
+def _window_params(s: Settings) -> dict:
+    return {
+        "est_window": s.est_window,
+        "evt_window": s.evt_window,
+        "SHORT_WINDOW": SHORT_WINDOW,
+    }
+
+
+STAGES = {
+    stage.name: stage
+    for stage in (
+        Stage(
+            "ingest",
+            deps=(),
+            outputs=("event_features.parquet",),
+            run=_ingest,
+            params=lambda s: {
+                "INJURY_COUNT_THRESH": INJURY_COUNT_THRESH,
+                "SEVERE_THRESH": SEVERE_THRESH,
+                "MODERATE_THRESH": MODERATE_THRESH,
+            },
+            sources=lambda s: [os.path.join(s.ntsb_dir, "processed.parquet")]
+            + sorted(
+                os.path.join(s.ntsb_dir, f)
+                for f in os.listdir(s.ntsb_dir)
+                if f.endswith(".csv")
+            ),
+            publish_to=lambda s: s.ntsb_dir,
+        ),
+        Stage(
+            "events",
+            deps=("ingest",),
+            outputs=("events.parquet", "pairs.parquet"),
+            run=_events,
+            params=_ticker_params,
+        ),
+        Stage(
+            "prices",
+            deps=("events",),
+            outputs=("prices.parquet",),
+            run=_prices,
+            params=lambda s: {"price_source": s.price_source, **_window_params(s)},
+            # a Yahoo pull is keyed on what was asked for; --force prices refreshes it
+            sources=lambda s: (
+                [f for p in _price_files(s) for f in cache_files(p)]
+                if s.price_source == "store"
+                else []
+            ),
+        ),
+        Stage(
+            "car",
+            deps=("events", "prices"),
+            outputs=("car_cache.parquet", "car_state.parquet"),
+            run=_car,
+            params=lambda s: {**_window_params(s), "overlap_policy": s.overlap_policy},
+            publish_to=lambda s: s.stocks_dir,
+        ),
+        Stage(
+            "mae_ttr",
+            deps=("car",),
+            outputs=("mae_cache.parquet", "ttr_cache.parquet"),
+            run=_mae_ttr,
+            params=lambda s: {"TTR_DEFAULT": TTR_DEFAULT},
+            publish_to=lambda s: s.stocks_dir,
+        ),
+        Stage(
+            "aggregates",
+            deps=("events", "car", "mae_ttr"),
+            outputs=(
+                "car_matrix.npz",
+                "caar.parquet",
+                "summary.parquet",
+                "crash_days.parquet",
+            ),
+            run=_aggregates,
+            params=lambda s: {"evt_window": s.evt_window},
+            publish_to=lambda s: s.stocks_dir,
+        ),
+        Stage(
+            "report",
+            deps=("events", "car"),
+            outputs=(REPORT_INDEX,),
+            run=_report,
+            params=lambda s: {"style": STYLE, "RENDER_VERSION": RENDER_VERSION},
+        ),
+    )
+}
+
+
+# ---- hashing ----
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DigestCache:
+    """File digests memoized by (size, mtime_ns) across runs."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._memo = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._memo = json.load(f)
+        self._dirty = False
+
+    def __call__(self, path: str) -> str | None:
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        hit = self._memo.get(path)
+        if hit and hit["stamp"] == stamp:
+            count("digest.hit")
+            return hit["sha256"]
+        count("digest.miss")
+        digest = _sha256(path)
+        self._memo[path] = {"stamp": stamp, "sha256": digest}
+        self._dirty = True
+        return digest
+
+    def save(self):
+        if self._dirty:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            _write_json(self.path, self._memo)
+            self._dirty = False
+
+
+def _write_json(path: str, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def stage_key(stage: Stage, s: Settings, upstream: dict, digest: DigestCache) -> dict:
+    """Everything the stage's output depends on, and its hash."""
+    spec = {
+        "stage": stage.name,
+        "version": STAGE_VERSION,
+        "params": stage.params(s),
+        "sources": {
+            os.path.relpath(p, s.data_root): digest(p) for p in stage.sources(s)
+        },
+        "upstream": {d: upstream[d]["outputs"] for d in stage.deps},
+    }
+    blob = json.dumps(spec, sort_keys=True, default=str).encode()
+    return {"key": hashlib.sha256(blob).hexdigest(), **spec}
+
+
+# ---- runner ----
+
+
+def _output_rows(out_dir: str, outputs: tuple[str, ...]) -> int:
+    """Total rows over a stage's parquet outputs (footer metadata only)."""
+    return sum(
+        pl.scan_parquet(os.path.join(out_dir, f)).select(pl.len()).collect().item()
+        for f in outputs
+        if f.endswith(".parquet")
+    )
+
+
+def _stage_dir(s: Settings, name: str, key: str) -> str:
+    return os.path.join(s.cache, name, key[:16])
+
+
+def _read_manifest(out_dir: str) -> dict | None:
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _selected(until: str | None) -> list[str]:
+    names = list(STAGES)
+    if until is None:
+        return names
+    if until not in STAGES:
+        raise ValueError(f"unknown stage {until!r}; choose from {names}")
+    return names[: names.index(until) + 1]
+
+
+def run_pipeline(
+    settings: Settings = Settings(),
+    until: str | None = None,
+    force: tuple[str, ...] = (),
+    publish: bool = False,
+) -> dict[str, dict]:
+    """Run stages in order, reusing every stage whose key is already cached.
+
+    Parameters
+    ----------
+    until : str or None
+        Last stage to run (all by default).
+    force : tuple[str]
+        Stages to recompute even when cached; their dependents then rerun
+        only if the recomputed outputs differ.
+    publish : bool
+        Copy the final artifacts to the paths the notebooks and dashboard
+        read (``data/ntbs/event_features.parquet``, ``data/stocks/*_cache``,
+        ``car_matrix.npz``, ...).
+
+    Returns
+    -------
+    dict
+        Stage name -> manifest (key, params, source / output digests, dir,
+        cached flag, seconds / rows / peak_mb of the build).
+
+    Notes
+    -----
+    Stage timings, output rows, peak RSS and cache hits are also recorded as
+    a run on :data:`aviation.instrument.RECORDER`.
+    """
+    unknown = set(force) - set(STAGES)
+    if unknown:
+        raise ValueError(
+            f"unknown stages {sorted(unknown)}; choose from {list(STAGES)}"
+        )
+    RECORDER.start_run("pipeline")
+    digest = DigestCache(os.path.join(settings.cache, DIGESTS_FILE))
+    done = {}
+    for name in _selected(until):
+        stage = STAGES[name]
+        spec = stage_key(stage, settings, done, digest)
+        out_dir = _stage_dir(settings, name, spec["key"])
+        manifest = None if name in force else _read_manifest(out_dir)
+        if manifest is not None:
+            count("pipeline.cache_hit")
+            print(f"✓ {name:<10} cached   {spec['key'][:12]}")
+            done[name] = {**manifest, "dir": out_dir, "cached": True}
+            continue
+
+        inputs = {
+            f: os.path.join(done[d]["dir"], f)
+            for d in stage.deps
+            for f in STAGES[d].outputs
+        }
+        count("pipeline.cache_miss")
+        tmp = f"{out_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        try:
+            with timed(f"pipeline.{name}", memory=True, key=spec["key"][:12]) as span:
+                stage.run(settings, inputs, tmp)
+                span.rows = _output_rows(tmp, stage.outputs)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        manifest = {
+            **spec,
+            "outputs": {f: _sha256(os.path.join(tmp, f)) for f in stage.outputs},
+            "seconds": round(span.seconds, 3),
+            "rows": span.rows,
+            "peak_mb": round(span.peak_mb, 1),
+            "built": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        _write_json(os.path.join(tmp, MANIFEST), manifest)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp, out_dir)
+        print(f"▶ {name:<10} built    {spec['key'][:12]}  {manifest['seconds']:.1f}s")
+        done[name] = {**manifest, "dir": out_dir, "cached": False}
+
+    digest.save()
+    _write_json(
+        os.path.join(settings.cache, "latest.json"),
+        {name: m["dir"] for name, m in done.items()},
+    )
+    if publish:
+        publish_outputs(settings, done)
+    return done
+
+
+def publish_outputs(settings: Settings, done: dict[str, dict]):
+    """Copy stage outputs to their well-known locations (atomic per file)."""
+    for name, manifest in done.items():
+        dest = STAGES[name].publish_to(settings)
+        if dest is None:
+            continue
+        os.makedirs(dest, exist_ok=True)
+        for f in STAGES[name].outputs:
+            tmp = os.path.join(dest, f".{f}.tmp")
+            shutil.copyfile(os.path.join(manifest["dir"], f), tmp)
+            os.replace(tmp, os.path.join(dest, f))
+            print(f"  published {os.path.join(dest, f)}")
+
+
+def pipeline_status(settings: Settings = Settings()) -> pl.DataFrame:
+    """Which stages would be reused by a run now (without running anything)."""
+    digest = DigestCache(os.path.join(settings.cache, DIGESTS_FILE))
+    done, rows = {}, []
+    for name, stage in STAGES.items():
+        if any(d not in done for d in stage.deps):
+            rows.append(
+                {"stage": name, "status": "pending", "key": None, "built": None}
+            )
+            continue
+        spec = stage_key(stage, settings, done, digest)
+        out_dir = _stage_dir(settings, name, spec["key"])
+        manifest = _read_manifest(out_dir)
+        if manifest is None:
+            rows.append(
+                {
+                    "stage": name,
+                    "status": "stale",
+                    "key": spec["key"][:12],
+                    "built": None,
+                }
+            )
+            continue
+        done[name] = {**manifest, "dir": out_dir}
+        rows.append(
+            {
+                "stage": name,
+                "status": "cached",
+                "key": spec["key"][:12],
+                "built": manifest["built"],
+            }
+        )
+    digest.save()
+    return pl.DataFrame(rows)
+
+
+# ---- CLI ----
+
+
+def _window(text: str) -> tuple[int, int]:
+    lo, hi = (int(v) for v in text.split(","))
+    return lo, hi
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m aviation.pipeline",
+        description="Build the event-study datasets with content-hashed stage caching.",
+    )
+    parser.add_argument("command", choices=("run", "status"))
+    parser.add_argument("--data-root", default=DATA_ROOT)
+    parser.add_argument(
+        "--cache-dir", default=None, help="default: <data-root>/pipeline"
+    )
+    parser.add_argument("--until", choices=list(STAGES), default=None)
+    parser.add_argument(
+        "--force", nargs="*", default=[], choices=list(STAGES), metavar="STAGE"
+    )
+    parser.add_argument("--prices", choices=PRICE_SOURCES, default="store")
+    parser.add_argument(
+        "--est-window",
+        type=_window,
+        default=EST_WINDOW,
+        metavar="LO,HI",
+        help="calendar days, e.g. --est-window=-120,-21",
+    )
+    parser.add_argument(
+        "--evt-window",
+        type=_window,
+        default=EVT_WINDOW,
+        metavar="LO,HI",
+        help="calendar days, e.g. --evt-window=-5,20",
+    )
+    parser.add_argument(
+        "--overlap",
+        choices=POLICIES,
+        default=None,
+        help="how the car stage treats overlapping event windows (default: ignore)",
+    )
+    parser.add_argument("--publish", action="store_true")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="report rendering processes"
+    )
+    parser.add_argument(
+        "--perf",
+        action="store_true",
+        help="log one JSON record per timed span to stderr and print a summary",
+    )
+    args = parser.parse_args(argv)
+
+    settings = Settings(
+        data_root=os.path.abspath(args.data_root),
+        cache_dir=args.cache_dir,
+        price_source=args.prices,
+        est_window=args.est_window,
+        evt_window=args.evt_window,
+        overlap_policy=args.overlap,
+        workers=args.workers,
+    )
+    if args.command == "status":
+        with pl.Config(tbl_rows=-1):
+            print(pipeline_status(settings))
+        return 0
+    if args.perf:
+        log_json()
+    run_pipeline(settings, args.until, tuple(args.force), args.publish)
+    if args.perf:
+        with pl.Config(tbl_rows=-1, fmt_str_lengths=40):
+            print(RECORDER.run_spans())
+            print(RECORDER.counter_table())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Background reloading of datasets that are rewritten while being served.
+
+A :class:`DatasetWatcher` owns the loaded copy of some input files (the
+"snapshot") and a daemon thread that polls their :func:`dataset_version`.
+When the version changes and then holds still for one more poll (so a
+pipeline that writes several files is not caught half-way), the new files
+are loaded on the watcher thread and the snapshot reference is swapped in
+one assignment.
+
+Readers call :meth:`DatasetWatcher.current` once per request and use that
+snapshot throughout, so a request that started before a swap finishes on
+the version it started with and no request ever waits for a load. At most
+two versions are held by the watcher while a reload runs; the old snapshot
+is dropped at the swap and freed once the last request using it returns,
+at the latest by the next poll (:meth:`DatasetWatcher.retired` lists the
+ones still alive).
+"""
+
+import gc
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from .instrument import count, timed
+from .results import dataset_version
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: str
+    data: Any
+    loaded_at: float  # time.time() when the swap happened
+    load_seconds: float
+
+
+class DatasetWatcher:
+    """Loads ``load(version)`` whenever the files from ``files()`` change.
+
+    Parameters
+    ----------
+    files
+        Returns the paths to watch; called on every poll, so it may glob.
+    load
+        Builds the served object from the files (runs on the watcher thread,
+        except for the first load, which happens in the constructor).
+    interval
+        Seconds between polls.
+    on_swap
+        Called as ``on_swap(old, new)`` on the watcher thread after each
+        swap, e.g. to drop cache entries of the old version.
+    """
+
+    def __init__(
+        self,
+        files: Callable[[], Iterable[str]],
+        load: Callable[[str], Any],
+        interval: float = 5.0,
+        on_swap: Callable[[Snapshot, Snapshot], None] | None = None,
+        name: str = "dataset",
+    ):
+        self.files = files
+        self.load = load
+        self.interval = interval
+        self.on_swap = on_swap
+        self.name = name
+        self.reloads = 0
+        self.last_error: str | None = None
+        self._pending = None  # changed version waiting for one quiet poll
+        self._failed = None  # version whose load raised; not retried
+        self._retired: list[weakref.ref] = []
+        self._stop = threading.Event()
+        self._snapshot = self._load(dataset_version(self.files()))
+        self._thread = threading.Thread(
+            target=self._run, name=f"{name}-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def current(self) -> Snapshot:
+        """The snapshot to use for one whole request."""
+        return self._snapshot
+
+    def _load(self, version: str) -> Snapshot:
+        t0 = time.perf_counter()
+        with timed(f"{self.name}.load", memory=True, version=version):
+            data = self.load(version)
+        return Snapshot(version, data, time.time(), time.perf_counter() - t0)
+
+    def poll(self) -> bool:
+        """One check of the files; True when a new version was swapped in."""
+        if self._retired:
+            self._collect_retired()
+        version = dataset_version(self.files())
+        if version in (self._snapshot.version, self._failed):
+            self._pending = None
+            return False
+        if version != self._pending:
+            self._pending = version
+            return False
+        self._pending = None
+        try:
+            new = self._load(version)
+        except Exception as e:
+            self._failed = version
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️  Skipping reload of {self.name} {version}: {self.last_error}")
+            return False
+        old, self._snapshot = self._snapshot, new
+        self._retired.append(weakref.ref(old))
+        self.reloads += 1
+        self.last_error = None
+        count(f"{self.name}.reload")
+        if self.on_swap is not None:
+            self.on_swap(old, new)
+        return True
+
+    def _collect_retired(self):
+        # a finished request often leaves its snapshot in a reference cycle
+        # (a Streamlit script run's globals hold functions that point back
+        # at them), which plain refcounting never frees; collect explicitly
+        # so old versions go within one poll instead of at the next full GC
+        self._retired = [r for r in self._retired if r() is not None]
+        if self._retired:
+            gc.collect()
+            self._retired = [r for r in self._retired if r() is not None]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # e.g. a file vanished between listing and stat
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def retired(self) -> list[str]:
+        """Versions swapped out but still referenced by some request."""
+        return [s.version for s in (r() for r in self._retired) if s is not None]
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
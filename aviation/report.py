@@ -0,0 +1,342 @@
+"""Per-event CAR / recovery figures, rendered in parallel and incrementally.
+
+data/stocks.ipynb's ``plot_recovery`` / ``plot_event`` cells drew
+``data/severe_events/{ev_id}_{role}.png`` one matplotlib figure at a time.
+:func:`render_reports` draws the same chart (CAR path per ticker, crash line,
+MAE point, TTR marker) for every (event, stock_type) in every severity bucket
+into ``<root>/<category>_events/``, spread over a process pool.
+
+Each figure is keyed by a SHA-256 of its input slice (CAR rows, MAE, TTR,
+event date) and of :data:`STYLE`. Keys are kept in ``<root>/report_index.json``;
+figures whose key is unchanged are not redrawn, so re-rendering after a small
+data update only touches the affected events. matplotlib is imported in the
+workers only.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import polars as pl
+
+from .config import DATA_ROOT
+from .features import severity_category
+from .instrument import count, timed
+
+REPORT_INDEX = "report_index.json"
+
+# bump when the drawing code changes in a way STYLE does not capture
+RENDER_VERSION = 1
+
+STYLE = {
+    "figsize": (10, 4),
+    "dpi": 150,
+    "line_width": 1.8,
+    "colors": ["#1f77b4", "#ff7f0e", "#9467bd", "#8c564b"],
+    "crash_color": "red",
+    "mae_color": "black",
+    "ttr_color": "green",
+}
+
+KEY = ["ev_id", "tkr", "stock_type"]
+
+
+def _style_hash(style: dict) -> str:
+    blob = json.dumps({"version": RENDER_VERSION, **style}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def figure_specs(
+    car: pl.DataFrame,
+    metrics: pl.DataFrame,
+    events: pl.DataFrame,
+    categories: tuple[str, ...] | None = None,
+    style: dict = STYLE,
+) -> list[dict]:
+    """One drawable spec per (event, stock_type), with its content hash.
+
+    Parameters
+    ----------
+    car : pl.DataFrame
+        CAR_CACHE rows: date, CAR, tkr, ev_id, stock_type.
+    metrics : pl.DataFrame
+        ev_id, tkr, stock_type, MAE_signed, TTR_full (null = not recovered),
+        e.g. ``car_state.parquet`` or mae_cache joined with ttr_cache (rows
+        flagged ``censored_full`` get no recovery marker).
+    events : pl.DataFrame
+        ev_id, ev_date and category (or inj_all_tot).
+    categories : tuple[str] or None
+        Severity buckets to draw (all by default).
+    """
+    if "category" not in events.columns:
+        events = events.with_columns(severity_category())
+    events = events.select(
+        "ev_id",
+        ev_date=pl.col("ev_date").cast(pl.Date),
+        category=pl.col("category").cast(pl.Utf8).fill_null("unknown"),
+    ).unique("ev_id", keep="first")
+    if categories is not None:
+        events = events.filter(pl.col("category").is_in(list(categories)))
+
+    ttr = pl.col("TTR_full")
+    if "censored_full" in metrics.columns:
+        ttr = pl.when(pl.col("censored_full")).then(None).otherwise(ttr)
+    metrics = metrics.select(*KEY, "MAE_signed", TTR_full=ttr.cast(pl.Int32))
+
+    series = (
+        car.select(pl.col("date").cast(pl.Date), "CAR", *KEY)
+        .join(events, on="ev_id")
+        .sort([*KEY, "date"])
+        .group_by(KEY, maintain_order=True)
+        .agg("date", "CAR", pl.col("ev_date", "category").first())
+        .join(metrics, on=KEY, how="left")
+        .sort(["category", "ev_id", "stock_type", "tkr"])
+    )
+
+    style_hash = _style_hash(style)
+    specs = {}
+    for row in series.iter_rows(named=True):
+        path = os.path.join(
+            f"{row['category']}_events", f"{row['ev_id']}_{row['stock_type']}.png"
+        )
+        spec = specs.setdefault(
+            path,
+            {
+                "path": path,
+                "ev_id": row["ev_id"],
+                "stock_type": row["stock_type"],
+                "category": row["category"],
+                "ev_date": row["ev_date"].isoformat(),
+                "series": [],
+            },
+        )
+        spec["series"].append(
+            {
+                "tkr": row["tkr"],
+                "dates": [d.isoformat() for d in row["date"]],
+                "car": row["CAR"],
+                "mae": row["MAE_signed"],
+                "ttr": row["TTR_full"],
+            }
+        )
+    for spec in specs.values():
+        blob = json.dumps(spec, sort_keys=True).encode()
+        spec["hash"] = hashlib.sha256(blob + style_hash.encode()).hexdigest()
+    return list(specs.values())
+
+
+# ---- drawing (runs in the workers) ----
+
+
+def _render(job: tuple[dict, dict, str]) -> str:
+    """Draw one figure to ``out_path`` (atomically); returns the path."""
+    spec, style, out_path = job
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    ev_date = np.datetime64(spec["ev_date"])
+    fig, ax = plt.subplots(figsize=style["figsize"])
+    try:
+        for i, s in enumerate(spec["series"]):
+            dates = np.array(s["dates"], dtype="datetime64[D]")
+            car = np.asarray(s["car"], dtype=np.float64)
+            color = style["colors"][i % len(style["colors"])]
+            ax.plot(
+                dates,
+                car,
+                color=color,
+                linewidth=style["line_width"],
+                marker="o",
+                markersize=3,
+                label=f"CAR - {s['tkr']}",
+            )
+            if s["mae"] is not None and len(car):
+                # the MAE is the CAR extreme of the short window: mark that day
+                k = int(np.argmin(np.abs(car - s["mae"])))
+                ax.scatter(
+                    dates[k],
+                    s["mae"],
+                    color=style["mae_color"],
+                    s=50,
+                    zorder=3,
+                    label=f"MAE {s['tkr']} ({s['mae']:.3f})",
+                )
+            if s["ttr"] is not None:
+                day = ev_date + np.timedelta64(s["ttr"], "D")
+                hit = np.flatnonzero(dates == day)
+                ax.scatter(
+                    day,
+                    car[hit[0]] if len(hit) else 0.0,
+                    color=style["ttr_color"],
+                    s=60,
+                    marker="^",
+                    zorder=3,
+                    label=f"Recovery {s['tkr']} (TTR={s['ttr']})",
+                )
+        ax.axvline(ev_date, linestyle="--", color=style["crash_color"], label="Crash")
+        ax.axhline(0.0, color="gray", linewidth=0.8)
+        ax.set_title(
+            f"{spec['stock_type'].capitalize()} CAR Window — Event {spec['ev_id']}"
+            f" ({spec['category']})"
+        )
+        ax.set_xlabel("Date")
+        ax.set_ylabel("CAR")
+        ax.grid(True)
+        ax.legend(fontsize=8)
+        fig.autofmt_xdate()
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        tmp = f"{out_path}.tmp.png"
+        fig.savefig(tmp, dpi=style["dpi"], bbox_inches="tight")
+        os.replace(tmp, out_path)
+    finally:
+        plt.close(fig)
+    return out_path
+
+
+# ---- incremental runner ----
+
+
+def read_report_index(root: str = DATA_ROOT) -> dict:
+    path = os.path.join(root, REPORT_INDEX)
+    if not os.path.exists(path):
+        return {"version": RENDER_VERSION, "figures": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_index(root: str, index: dict):
+    path = os.path.join(root, REPORT_INDEX)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def render_reports(
+    car: pl.DataFrame,
+    metrics: pl.DataFrame,
+    events: pl.DataFrame,
+    root: str = DATA_ROOT,
+    categories: tuple[str, ...] | None = None,
+    workers: int | None = None,
+    style: dict = STYLE,
+    force: bool = False,
+) -> pl.DataFrame:
+    """Draw every changed per-event figure and update ``report_index.json``.
+
+    Parameters
+    ----------
+    car, metrics, events
+        See :func:`figure_specs`.
+    root : str
+        Figures go to ``<root>/<category>_events/{ev_id}_{stock_type}.png``.
+    categories : tuple[str] or None
+        Severity buckets to draw; index entries of other buckets are kept.
+    workers : int or None
+        Process pool size (default: CPU count); 1 draws in this process.
+    force : bool
+        Redraw every figure even when its key is unchanged.
+
+    Returns
+    -------
+    pl.DataFrame
+        path, ev_id, stock_type, category, hash, status ("rendered",
+        "cached" or "removed").
+    """
+    specs = figure_specs(car, metrics, events, categories, style)
+    index = read_report_index(root)
+    old = index["figures"] if index.get("version") == RENDER_VERSION else {}
+
+    todo, status = [], {}
+    for spec in specs:
+        prev = old.get(spec["path"])
+        fresh = (
+            not force
+            and prev is not None
+            and prev["hash"] == spec["hash"]
+            and os.path.exists(os.path.join(root, spec["path"]))
+        )
+        status[spec["path"]] = "cached" if fresh else "rendered"
+        if not fresh:
+            todo.append((spec, style, os.path.join(root, spec["path"])))
+
+    # figures of the drawn buckets that no longer have data
+    wanted = {s["path"] for s in specs}
+    removed = [
+        (path, entry)
+        for path, entry in old.items()
+        if path not in wanted
+        and (categories is None or entry["category"] in categories)
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    with timed("report.render", rows=len(todo), workers=workers):
+        if workers == 1 or len(todo) < 2:
+            for job in todo:
+                _render(job)
+        else:
+            # spawn: forking a process with polars' thread pool running can hang
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(min(workers, len(todo)), mp_context=ctx) as pool:
+                chunk = max(1, len(todo) // (workers * 4))
+                for _ in pool.map(_render, todo, chunksize=chunk):
+                    pass
+    for path, _ in removed:
+        try:
+            os.remove(os.path.join(root, path))
+        except FileNotFoundError:
+            pass
+    count("report.rendered", len(todo))
+    count("report.cached", len(specs) - len(todo))
+
+    now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    gone = {path for path, _ in removed}
+    figures = {p: e for p, e in old.items() if p not in wanted and p not in gone}
+    for spec in specs:
+        prev = old.get(spec["path"], {})
+        figures[spec["path"]] = {
+            "ev_id": spec["ev_id"],
+            "stock_type": spec["stock_type"],
+            "category": spec["category"],
+            "tickers": [s["tkr"] for s in spec["series"]],
+            "hash": spec["hash"],
+            "rendered": (
+                now if status[spec["path"]] == "rendered" else prev.get("rendered")
+            ),
+        }
+    _write_index(root, {"version": RENDER_VERSION, "figures": figures})
+
+    rows = [
+        {
+            "path": s["path"],
+            "ev_id": s["ev_id"],
+            "stock_type": s["stock_type"],
+            "category": s["category"],
+            "hash": s["hash"][:12],
+            "status": status[s["path"]],
+        }
+        for s in specs
+    ] + [
+        {
+            "path": path,
+            "ev_id": e["ev_id"],
+            "stock_type": e["stock_type"],
+            "category": e["category"],
+            "hash": e["hash"][:12],
+            "status": "removed",
+        }
+        for path, e in removed
+    ]
+    return pl.DataFrame(
+        rows,
+        schema={
+            c: pl.Utf8
+            for c in ("path", "ev_id", "stock_type", "category", "hash", "status")
+        },
+    )
@@ -0,0 +1,123 @@
+"""Event-study results (MAE, TTR, CAR) with event metadata, as one object.
+
+The dashboard, the query API and the raw viewer all need the same thing:
+the per-(event, ticker, stock_type) MAE / TTR rows with severity category,
+manufacturer and year attached, plus the CAR matrix for CAAR slices.
+:func:`load_results` builds that from the published caches
+(``mae_cache`` / ``ttr_cache`` / ``car_cache`` or ``car_matrix.npz``) and the
+feature store; :func:`synthetic_results` builds it from
+:mod:`aviation.synthetic` data when the LFS files are not available.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+
+import polars as pl
+
+from .car_matrix import CarMatrix, car_matrix, event_meta
+from .compact import cache_files, read_cache
+from .config import (
+    CAR_CACHE_PATH,
+    CAR_MATRIX_PATH,
+    EVT_WINDOW,
+    FEATURE_STORE_PATH,
+    MAE_CACHE_PATH,
+    TTR_CACHE_PATH,
+)
+from .incremental import KEY, add_events, empty_state, mae_table, ttr_table, update
+
+# filterable metadata of a result row
+FIELDS = ("category", "manufacturer", "tkr", "stock_type")
+
+
+@dataclass(frozen=True)
+class ResultSet:
+    pairs: pl.DataFrame  # KEY + FIELDS + year + MAE / TTR columns
+    matrix: CarMatrix
+    version: str  # changes whenever an input file changes
+
+
+def dataset_version(paths) -> str:
+    """Short digest of (path, size, mtime) of every existing input file."""
+    h = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+
+def result_pairs(
+    mae: pl.DataFrame, ttr: pl.DataFrame, events: pl.DataFrame
+) -> pl.DataFrame:
+    """mae_cache + ttr_cache rows joined with category / manufacturer / year."""
+    meta = event_meta(events)
+    return (
+        mae.join(ttr, on=KEY, how="full", coalesce=True)
+        .join(meta, on="ev_id", how="inner")
+        .with_columns(
+            pl.col("tkr", "stock_type").cast(pl.Utf8),
+            year=pl.col("ev_date").dt.year().cast(pl.Int32),
+        )
+        .sort(["ev_date", *KEY])
+    )
+
+
+def read_car_matrix(
+    car_path: str = CAR_CACHE_PATH,
+    events_path: str = FEATURE_STORE_PATH,
+    matrix_path: str = CAR_MATRIX_PATH,
+    events: pl.DataFrame | None = None,
+) -> CarMatrix:
+    """The CAR matrix of the published caches.
+
+    Read from ``matrix_path`` when it is at least as new as ``car_path``,
+    else pivoted from the CAR rows (``events`` saves re-reading the feature
+    store when the caller has it already).
+    """
+    if os.path.exists(matrix_path) and (
+        not os.path.exists(car_path)
+        or os.path.getmtime(matrix_path) >= os.path.getmtime(car_path)
+    ):
+        return CarMatrix.load(matrix_path)
+    if events is None:
+        events = pl.read_parquet(events_path)
+    return car_matrix(read_cache(car_path), events)
+
+
+def load_results(
+    mae_path: str = MAE_CACHE_PATH,
+    ttr_path: str = TTR_CACHE_PATH,
+    car_path: str = CAR_CACHE_PATH,
+    events_path: str = FEATURE_STORE_PATH,
+    matrix_path: str = CAR_MATRIX_PATH,
+) -> ResultSet:
+    """The published caches as a :class:`ResultSet` (see :func:`read_car_matrix`).
+
+    Caches are read through their compact copies when those are current.
+    """
+    events = pl.read_parquet(events_path)
+    pairs = result_pairs(read_cache(mae_path), read_cache(ttr_path), events)
+    matrix = read_car_matrix(car_path, events_path, matrix_path, events)
+    caches = [f for p in (mae_path, ttr_path, car_path) for f in cache_files(p)]
+    version = dataset_version([*caches, events_path, matrix_path])
+    return ResultSet(pairs=pairs, matrix=matrix, version=version)
+
+
+def synthetic_results(
+    n_events: int = 5_000, n_tickers: int = 10, seed: int = 0
+) -> ResultSet:
+    """A :class:`ResultSet` computed from :func:`synthetic_dataset` data."""
+    from .synthetic import synthetic_dataset
+
+    data = synthetic_dataset(n_events, n_tickers, seed)
+    state = add_events(empty_state(), data.pairs, data.prices)
+    state, car = update(state, data.prices)
+    as_of = state["stock_last_date"].max()
+    events = data.events.join(
+        data.pairs.select("ev_id", "category").unique("ev_id"), on="ev_id"
+    )
+    pairs = result_pairs(mae_table(state), ttr_table(state, as_of=as_of), events)
+    matrix = car_matrix(car, events, window=EVT_WINDOW)
+    return ResultSet(pairs=pairs, matrix=matrix, version=f"synthetic-{seed}")
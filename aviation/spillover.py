@@ -0,0 +1,306 @@
+"""Cross-firm spillovers: every event scored against every mapped ticker.
+
+``compute_car_all`` only scores a crash's own manufacturer and operator. Here
+each event is run against every ``TICKER_MAP`` firm (with its
+``STOCK_MARKET_MAP`` index as the market) on the aligned
+:class:`~aviation.panel.ReturnPanel`. The market model of ``compute_car`` is
+fitted for all (event, ticker) pairs at once from batched normal equations,
+and the result is kept as a dense, labeled (events x tickers x window day)
+tensor rather than long rows.
+
+Window semantics follow ``compute_car``: calendar-day windows around
+``ev_date``, returns computed from closes inside the window only (the first
+day of each window drops out as with ``pct_change().drop_nulls()``), stock
+and market rows matched on date.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import polars as pl
+
+from .config import (
+    EST_WINDOW,
+    EVT_WINDOW,
+    MANUFACTURER,
+    SHORT_WINDOW,
+    STOCK_MARKET_MAP,
+    TICKER_MAP,
+)
+from .features import map_tickers
+from .panel import ReturnPanel, window_index
+
+PEER_GROUPS = ["own", "manufacturer", "competitor"]
+
+MANUFACTURER_TICKERS = sorted({TICKER_MAP[m] for m in MANUFACTURER})
+
+
+@dataclass(frozen=True)
+class SpilloverTensor:
+    """AR / CAR for ``ev_ids x tickers x window position``.
+
+    ``dates[e, l]`` is the trading day at window position ``l`` of event
+    ``e`` (NaT past the end of that event's window); AR/CAR are NaN where the
+    ticker or its index did not trade.
+    """
+
+    ev_ids: tuple[str, ...]
+    ev_dates: np.ndarray  # datetime64[D], [E]
+    tickers: tuple[str, ...]
+    markets: tuple[str, ...]
+    dates: np.ndarray  # datetime64[D], [E, L]
+    ar: np.ndarray  # [E, K, L]
+    car: np.ndarray  # [E, K, L]
+    alpha: np.ndarray  # [E, K]
+    beta: np.ndarray  # [E, K]
+    n_est: np.ndarray  # [E, K] estimation-window observations
+
+    @property
+    def rel_day(self) -> np.ndarray:
+        """Calendar days from ``ev_date`` per (event, window position)."""
+        return (
+            (self.dates - self.ev_dates[:, None])
+            .astype("timedelta64[D]")
+            .astype(np.float64)
+        )
+
+    def save(self, path: str):
+        """Write all arrays and labels to one ``.npz`` file."""
+        np.savez_compressed(
+            path,
+            ev_ids=np.asarray(self.ev_ids),
+            ev_dates=self.ev_dates,
+            tickers=np.asarray(self.tickers),
+            markets=np.asarray(self.markets),
+            dates=self.dates,
+            ar=self.ar,
+            car=self.car,
+            alpha=self.alpha,
+            beta=self.beta,
+            n_est=self.n_est,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SpilloverTensor":
+        with np.load(path) as z:
+            return cls(
+                ev_ids=tuple(z["ev_ids"].tolist()),
+                ev_dates=z["ev_dates"],
+                tickers=tuple(z["tickers"].tolist()),
+                markets=tuple(z["markets"].tolist()),
+                dates=z["dates"],
+                ar=z["ar"],
+                car=z["car"],
+                alpha=z["alpha"],
+                beta=z["beta"],
+                n_est=z["n_est"],
+            )
+
+    def to_long(self) -> pl.DataFrame:
+        """CAR_CACHE-style rows (date, AR, CAR, tkr, ev_id, flavor, rel_day)."""
+        e, k, l = np.nonzero(~np.isnan(self.car))
+        rel = self.rel_day[e, l].astype(np.int16)
+        return pl.DataFrame(
+            {
+                "date": self.dates[e, l],
+                "AR": self.ar[e, k, l],
+                "CAR": self.car[e, k, l],
+                "tkr": np.asarray(self.tickers)[k],
+                "ev_id": np.asarray(self.ev_ids)[e],
+                "flavor": np.where(np.abs(rel) <= SHORT_WINDOW, "short", "extended"),
+                "rel_day": rel,
+            }
+        )
+
+
+def spillover_tickers(panel: ReturnPanel) -> tuple[list[str], list[str]]:
+    """Every mapped firm whose own and index series are both in ``panel``."""
+    present = set(panel.tickers)
+    firms = [
+        t
+        for t in sorted(set(TICKER_MAP.values()))
+        if t in present and STOCK_MARKET_MAP.get(t) in present
+    ]
+    return firms, [STOCK_MARKET_MAP[t] for t in firms]
+
+
+def _excluded(exclude: pl.DataFrame, start: int, n: int, K: int, day_idx) -> np.ndarray:
+    """[K, n, L] mask of estimation days listed in ``exclude`` for this chunk."""
+    mask = np.zeros((K, n, day_idx.shape[1]), dtype=bool)
+    rows = exclude.filter(pl.col("_e").is_between(start, start + n - 1))
+    if rows.height:
+        e = rows["_e"].to_numpy() - start
+        dd = day_idx[e]
+        hit = (dd >= rows["start"].to_numpy()[:, None]) & (
+            dd <= rows["end"].to_numpy()[:, None]
+        )
+        np.logical_or.at(mask, (rows["_k"].to_numpy(), e), hit)
+    return mask
+
+
+def spillover_tensor(
+    events: pl.DataFrame,
+    panel: ReturnPanel,
+    tickers: list[str] | None = None,
+    est_window: tuple[int, int] = EST_WINDOW,
+    evt_window: tuple[int, int] = EVT_WINDOW,
+    chunk_size: int = 1024,
+    dtype=np.float32,
+    exclude: pl.DataFrame | None = None,
+) -> SpilloverTensor:
+    """Market-model AR/CAR of every ticker around every event.
+
+    Parameters
+    ----------
+    events : pl.DataFrame
+        ev_id, ev_date (one row per event).
+    panel : ReturnPanel
+        Aligned closes for the firms and their indices.
+    tickers : list[str] or None
+        Firms to score; defaults to :func:`spillover_tickers`.
+    chunk_size : int
+        Events per batch; bounds the [K, chunk, window] temporaries.
+    dtype : numpy dtype
+        Storage dtype of AR/CAR/alpha/beta (math runs in float64).
+    exclude : pl.DataFrame or None
+        ev_id, tkr, start, end day ranges left out of estimation
+        (``overlap.resolve_overlaps(..., policy="exclude")``).
+
+    Returns
+    -------
+    SpilloverTensor
+    """
+    if tickers is None:
+        tickers, markets = spillover_tickers(panel)
+    else:
+        markets = [STOCK_MARKET_MAP[t] for t in tickers]
+    k_rows, m_rows = panel.index(tickers), panel.index(markets)
+    if (k_rows < 0).any() or (m_rows < 0).any():
+        raise ValueError("every ticker and its market index must be in the panel")
+
+    ev = events.select("ev_id", pl.col("ev_date").cast(pl.Date)).unique(
+        "ev_id", keep="first", maintain_order=True
+    )
+    ev_dates = ev["ev_date"].to_numpy().astype("datetime64[D]")
+    ev_days = ev_dates.astype(np.int64)
+    days = panel.days
+
+    _, _, evt_inside = window_index(days, ev_days, evt_window)
+    width = evt_inside.shape[1]
+    E, K = len(ev_days), len(tickers)
+    ar = np.full((E, K, width), np.nan, dtype=dtype)
+    car = np.full((E, K, width), np.nan, dtype=dtype)
+    alpha = np.full((E, K), np.nan, dtype=dtype)
+    beta = np.full((E, K), np.nan, dtype=dtype)
+    n_est = np.zeros((E, K), dtype=np.int16)
+    dates = np.full((E, width), np.datetime64("NaT"), dtype="datetime64[D]")
+
+    if exclude is not None and exclude.height:
+        exclude = (
+            exclude.join(
+                pl.DataFrame({"ev_id": ev["ev_id"], "_e": np.arange(E)}), on="ev_id"
+            )
+            .join(pl.DataFrame({"tkr": list(tickers), "_k": np.arange(K)}), on="tkr")
+            .with_columns(pl.col("start", "end").cast(pl.Date).cast(pl.Int64))
+        )
+    else:
+        exclude = None
+
+    for start in range(0, E, chunk_size):
+        sl = slice(start, start + chunk_size)
+        d = ev_days[sl]
+
+        # ---- 1) estimation window: batched OLS r_stock = a + b * r_mkt ----
+        lo, idx, inside = window_index(days, d, est_window)
+        y, y_ok = panel.gather(k_rows[:, None, None], idx, lo[:, None], inside)
+        x, x_ok = panel.gather(m_rows[:, None, None], idx, lo[:, None], inside)
+        w = y_ok & x_ok  # inner join on date
+        if exclude is not None:
+            w &= ~_excluded(exclude, start, len(d), K, days[idx])
+        n = w.sum(axis=2)
+        Sx = (w * x).sum(axis=2)
+        Sy = (w * y).sum(axis=2)
+        Sxx = (w * x * x).sum(axis=2)
+        Sxy = (w * x * y).sum(axis=2)
+        den = n * Sxx - Sx**2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            b = np.where(den > 0, (n * Sxy - Sx * Sy) / den, np.nan)
+            a = np.where(den > 0, (Sy - b * Sx) / n, np.nan)
+
+        # ---- 2) event window: AR and running CAR ----
+        lo, idx, inside = window_index(days, d, evt_window)
+        y, y_ok = panel.gather(k_rows[:, None, None], idx, lo[:, None], inside)
+        x, x_ok = panel.gather(m_rows[:, None, None], idx, lo[:, None], inside)
+        w = y_ok & x_ok & ~np.isnan(b)[:, :, None]
+        r = np.where(w, y - (a[:, :, None] + b[:, :, None] * x), 0.0)
+        c = np.cumsum(r, axis=2)
+
+        L = idx.shape[1]
+        ar[sl, :, :L] = np.where(w, r, np.nan).transpose(1, 0, 2)
+        car[sl, :, :L] = np.where(w, c, np.nan).transpose(1, 0, 2)
+        alpha[sl], beta[sl] = a.T, b.T
+        n_est[sl] = n.T
+        dates[sl, :L] = np.where(inside, panel.dates[idx], np.datetime64("NaT"))
+
+    return SpilloverTensor(
+        ev_ids=tuple(ev["ev_id"].to_list()),
+        ev_dates=ev_dates,
+        tickers=tuple(tickers),
+        markets=tuple(markets),
+        dates=dates,
+        ar=ar,
+        car=car,
+        alpha=alpha,
+        beta=beta,
+        n_est=n_est,
+    )
+
+
+def peer_groups(tensor: SpilloverTensor, events: pl.DataFrame) -> np.ndarray:
+    """[E, K] index into PEER_GROUPS for each (event, ticker).
+
+    ``own`` = the event's mapped manufacturer or operator, ``manufacturer`` =
+    any other airframer, ``competitor`` = any other listed firm.
+    """
+    if "manufacturer_tkr" not in events.columns:
+        events = map_tickers(events)
+    own = pl.DataFrame({"ev_id": list(tensor.ev_ids)}).join(
+        events.select("ev_id", "manufacturer_tkr", "airline_tkr").unique(
+            "ev_id", keep="first"
+        ),
+        on="ev_id",
+        how="left",
+    )
+    tk = np.asarray(tensor.tickers)[None, :]
+    is_own = (own["manufacturer_tkr"].to_numpy().astype(str)[:, None] == tk) | (
+        own["airline_tkr"].to_numpy().astype(str)[:, None] == tk
+    )
+    is_manu = np.isin(tk, MANUFACTURER_TICKERS)
+    return np.where(is_own, 0, np.where(is_manu, 1, 2)).astype(np.int8)
+
+
+def peer_caar(tensor: SpilloverTensor, events: pl.DataFrame) -> pl.DataFrame:
+    """CAAR by rel_day for own vs. manufacturer vs. competitor tickers.
+
+    Returns
+    -------
+    pl.DataFrame
+        peer_group, rel_day, CAAR (mean CAR), AAR (mean AR), n (pairs)
+    """
+    groups = peer_groups(tensor, events)
+    e, k, l = np.nonzero(~np.isnan(tensor.car))
+    return (
+        pl.DataFrame(
+            {
+                "peer_group": pl.Series(
+                    np.asarray(PEER_GROUPS)[groups[e, k]], dtype=pl.Enum(PEER_GROUPS)
+                ),
+                "rel_day": tensor.rel_day[e, l].astype(np.int16),
+                "AR": tensor.ar[e, k, l].astype(np.float64),
+                "CAR": tensor.car[e, k, l].astype(np.float64),
+            }
+        )
+        .group_by(["peer_group", "rel_day"])
+        .agg(CAAR=pl.col("CAR").mean(), AAR=pl.col("AR").mean(), n=pl.len())
+        .sort(["peer_group", "rel_day"])
+    )
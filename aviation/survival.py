@@ -0,0 +1,160 @@
+"""Kaplan–Meier estimates of time-to-recovery with right-censoring.
+
+A pair that has not recovered by the end of its event window has no TTR:
+``ttr_table`` stores ``ttr_default`` (21) and sets ``censored_*``. Averaging
+that 21 as if it were a recovery understates how long recoveries take. Here
+such pairs are right-censored at that time instead: they count as "still
+down" up to it and then leave the risk set.
+
+The work is split so that any filter combination is cheap:
+
+* :func:`survival_counts` reduces the TTR rows, in one group-by, to the
+  number of recoveries ``d`` and censorings ``c`` per
+  (category, manufacturer, stock_type, year, t). These counts add up across
+  cells, so they are all a filter needs;
+* :func:`kaplan_meier` sums the cells a filter keeps and computes every
+  curve in one sorted pass (cumulative sums over each ``by`` group), with
+  Greenwood variance and log-log confidence bands;
+* :func:`median_ttr` reads the median and its confidence interval off the
+  curves.
+
+::
+
+    counts = survival_counts(ttr_rows)              # once per dataset
+    km = kaplan_meier(counts.filter(pl.col("year") >= 2015), by=["category"])
+    median_ttr(km, by=["category"])
+"""
+
+from statistics import NormalDist
+from typing import Sequence
+
+import polars as pl
+
+DIMENSIONS = ("category", "manufacturer", "stock_type", "year")
+
+
+def survival_counts(
+    ttr: pl.DataFrame | pl.LazyFrame,
+    time: str = "TTR_full",
+    censored: str = "censored_full",
+    by: Sequence[str] = DIMENSIONS,
+) -> pl.DataFrame:
+    """Recoveries ``d`` and censorings ``c`` per (``by``..., t).
+
+    ``ttr`` has one row per pair with its TTR in ``time`` and the
+    not-recovered flag in ``censored`` (for censored rows ``time`` is the
+    last time observed, e.g. ``ttr_default``). ``by`` columns the table
+    lacks are skipped.
+    """
+    lf = ttr.lazy()
+    names = lf.collect_schema().names()
+    by = [c for c in by if c in names]
+    flag = pl.col(censored).fill_null(False)
+    return (
+        lf.drop_nulls(time)
+        .group_by(*by, pl.col(time).alias("t"))
+        .agg(
+            d=(~flag).sum().cast(pl.UInt32),
+            c=flag.sum().cast(pl.UInt32),
+        )
+        .sort([*by, "t"])
+        .collect()
+    )
+
+
+def kaplan_meier(
+    counts: pl.DataFrame, by: Sequence[str] = (), alpha: float = 0.05
+) -> pl.DataFrame:
+    """Survival curves ``S(t)`` = share of pairs not yet recovered after t.
+
+    Parameters
+    ----------
+    counts : pl.DataFrame
+        From :func:`survival_counts`, possibly filtered; cells are summed
+        over every column not in ``by``.
+    by : sequence of str
+        One curve per value combination; empty for a single pooled curve.
+    alpha : float
+        ``1 - alpha`` pointwise confidence bands (log-log transform, which
+        keeps them inside [0, 1]).
+
+    Returns
+    -------
+    pl.DataFrame
+        (by..., t, n_risk, d, c, S, S_lo, S_hi), sorted by ``by`` and t.
+        Censored-only times are kept (S does not drop there) so plots can
+        mark them.
+    """
+    by = list(by)
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    over = (lambda e: e.over(by)) if by else (lambda e: e)
+    log_s = over(pl.col("_q").log1p().cum_sum())
+    greenwood = over(
+        (pl.col("d") / (pl.col("n_risk") * (pl.col("n_risk") - pl.col("d")))).cum_sum()
+    )
+    # se of log(-log S); undefined where S is 1 (nothing recovered yet) or 0
+    se = greenwood.sqrt() / log_s.abs()
+    return (
+        counts.group_by(*by, "t")
+        .agg(pl.col("d").sum(), pl.col("c").sum())
+        .sort([*by, "t"])
+        .with_columns(
+            n_risk=over((pl.col("d") + pl.col("c")).cum_sum(reverse=True)).cast(
+                pl.UInt32
+            )
+        )
+        .with_columns(_q=-(pl.col("d") / pl.col("n_risk")))
+        .with_columns(S=log_s.exp(), _se=se)
+        .with_columns(
+            S_lo=pl.when(pl.col("S").is_between(0, 1, closed="none"))
+            .then(pl.col("S") ** (z * pl.col("_se")).exp())
+            .otherwise(pl.col("S")),
+            S_hi=pl.when(pl.col("S").is_between(0, 1, closed="none"))
+            .then(pl.col("S") ** (-z * pl.col("_se")).exp())
+            .otherwise(pl.col("S")),
+        )
+        .drop("_q", "_se")
+    )
+
+
+def median_ttr(curves: pl.DataFrame, by: Sequence[str] = ()) -> pl.DataFrame:
+    """Median TTR per curve with its confidence interval.
+
+    The median is the first t where ``S <= 0.5``; the interval bounds are
+    where the lower / upper band first cross 0.5. Each is null when the
+    curve (band) never gets there, i.e. fewer than half the pairs were seen
+    to recover.
+    """
+    by = list(by)
+    first_below = lambda s: pl.col("t").filter(pl.col(s) <= 0.5).first()  # noqa: E731
+    aggs = [
+        pl.col("n_risk").first().alias("n"),
+        pl.col("d").sum().alias("recovered"),
+        pl.col("c").sum().alias("censored"),
+        first_below("S").alias("median"),
+        first_below("S_lo").alias("median_lo"),
+        first_below("S_hi").alias("median_hi"),
+    ]
+    if not by:
+        return curves.select(aggs)
+    return curves.group_by(by, maintain_order=True).agg(aggs)
+
+
+def km_summary(
+    ttr: pl.DataFrame | pl.LazyFrame,
+    by: Sequence[str] = (),
+    time: str = "TTR_full",
+    censored: str = "censored_full",
+) -> pl.DataFrame:
+    """(by..., <time>_median, <time>_median_lo, <time>_median_hi) from TTR rows.
+
+    :func:`survival_counts`, :func:`kaplan_meier` and :func:`median_ttr` in
+    one call, for summaries that should report a censoring-aware median
+    instead of a mean over ``ttr_default`` values.
+    """
+    by = list(by)
+    curves = kaplan_meier(survival_counts(ttr, time, censored, by), by)
+    return median_ttr(curves, by).select(
+        *by,
+        pl.col("median", "median_lo", "median_hi").name.prefix(f"{time}_"),
+    )
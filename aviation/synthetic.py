@@ -0,0 +1,181 @@
+"""Seeded synthetic NTSB events and price panels at configurable scale.
+
+Stand-ins for ``data/ntbs/processed.parquet`` and the price parquets, for
+benchmarks and for running the pipeline without the LFS data. Columns and
+dtypes follow the real tables; distributions are only roughly realistic:
+
+* injuries are zero-inflated and heavy-tailed, so the minor / moderate /
+  severe split resembles the real one;
+* most events are general aviation (no listed operator), the rest fly for a
+  mapped airline on a Boeing or Airbus airframe;
+* closes are geometric random walks with a market factor per index, plus a
+  crash-day shock for the involved tickers and a few missing sessions.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import polars as pl
+
+from .config import AIRLINES, STOCK_MARKET_MAP, TICKER_MAP
+from .features import severity_category
+
+_MAKES = ["BOEING", "AIRBUS", "AIRBUS INDUSTRIE", "CESSNA", "PIPER", "BEECH", "EMBRAER"]
+_MAKE_P = [0.22, 0.1, 0.03, 0.3, 0.2, 0.1, 0.05]
+_COUNTRIES = ["USA", "CAN", "BRA", "GBR", "FRA", "CHN", "IND", "JPN"]
+
+
+@dataclass(frozen=True)
+class SyntheticData:
+    events: pl.DataFrame  # processed.parquet-shaped
+    pairs: pl.DataFrame  # ev_id, ev_date, category, stock_type, tkr, market_tkr
+    prices: pl.DataFrame  # long date, tkr, close
+
+
+def synthetic_tickers(n_tickers: int) -> dict[str, str]:
+    """``n_tickers`` stock -> index map: the mapped firms first, then SYNnnn."""
+    real = list(STOCK_MARKET_MAP)[:n_tickers]
+    extra = [f"SYN{i:03d}" for i in range(n_tickers - len(real))]
+    return {t: STOCK_MARKET_MAP.get(t, "^GSPC") for t in real + extra}
+
+
+def synthetic_events(
+    n_events: int,
+    seed: int = 0,
+    start: date = date(2008, 1, 1),
+    end: date = date(2025, 6, 30),
+    listed_share: float = 0.3,
+) -> pl.DataFrame:
+    """processed.parquet-shaped events (one row per event)."""
+    rng = np.random.default_rng(seed)
+    span = (end - start).days
+    days = np.sort(rng.integers(0, span, n_events))
+    ev_date = np.datetime64(start, "D") + days
+    ymd = np.datetime_as_string(ev_date, unit="D")
+    ev_id = np.char.add(
+        np.char.add(np.char.replace(ymd, "-", ""), "X"),
+        np.char.zfill(np.arange(n_events).astype(str), 5),
+    )
+
+    listed = rng.random(n_events) < listed_share
+    oper = np.where(
+        listed,
+        rng.choice(AIRLINES, n_events),
+        rng.choice(["PRIVATE", "FLIGHT SCHOOL", "CHARTER"], n_events),
+    )
+    make = rng.choice(_MAKES, n_events, p=_MAKE_P)
+    # airliners carry more people: scale the tail for listed operators
+    scale = np.where(listed, 25.0, 1.5)
+    inj = (rng.pareto(1.6, (3, n_events)) * scale).astype(np.int64)
+    inj *= rng.random((3, n_events)) < 0.4
+
+    return pl.DataFrame(
+        {
+            "ev_id": ev_id,
+            "ev_date": ev_date,
+            "acft_make": make,
+            "oper_name": oper,
+            "inj_tot_f": inj[0],
+            "inj_tot_m": inj[1],
+            "inj_tot_s": inj[2],
+            "inj_all_tot": inj.sum(axis=0),
+            "ev_city": np.char.add("CITY", rng.integers(0, 500, n_events).astype(str)),
+            "ev_country": rng.choice(_COUNTRIES, n_events),
+        }
+    ).with_columns(pl.col("ev_date").cast(pl.Date))
+
+
+def synthetic_prices(
+    tickers: dict[str, str],
+    start: date,
+    end: date,
+    seed: int = 0,
+    shocks: pl.DataFrame | None = None,
+    missing: float = 0.01,
+) -> pl.DataFrame:
+    """Long (date, tkr, close) for every stock in ``tickers`` and its index.
+
+    ``shocks`` (tkr, ev_date) adds a negative jump on the first session on or
+    after each crash.
+    """
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    dates = dates[np.is_busday(dates)]
+    D = len(dates)
+
+    markets = sorted(set(tickers.values()))
+    mkt_r = rng.normal(0.0003, 0.011, (len(markets), D))
+    stocks = list(tickers)
+    beta = rng.uniform(0.6, 1.6, len(stocks))
+    m_idx = np.array([markets.index(tickers[t]) for t in stocks], dtype=np.int64)
+    r = beta[:, None] * mkt_r[m_idx] + rng.normal(0, 0.018, (len(stocks), D))
+
+    if shocks is not None and shocks.height:
+        pos = {t: i for i, t in enumerate(stocks)}
+        s = shocks.filter(pl.col("tkr").is_in(stocks))
+        k = np.array([pos[t] for t in s["tkr"].to_list()], dtype=np.int64)
+        t = np.searchsorted(
+            dates, s["ev_date"].to_numpy().astype("datetime64[D]"), side="left"
+        )
+        ok = t < D
+        np.add.at(r, (k[ok], t[ok]), rng.normal(-0.03, 0.02, ok.sum()))
+
+    names = markets + stocks
+    close = 100 * np.exp(np.cumsum(np.vstack([mkt_r, r]), axis=1))
+    keep = rng.random(close.shape) >= missing
+    k, t = np.nonzero(keep)
+    return pl.DataFrame(
+        {
+            "date": dates[t],
+            "tkr": np.asarray(names)[k],
+            "close": close[k, t],
+        }
+    ).with_columns(pl.col("date").cast(pl.Date))
+
+
+def synthetic_dataset(
+    n_events: int = 1_000,
+    n_tickers: int = 10,
+    seed: int = 0,
+    start: date = date(2008, 1, 1),
+    end: date = date(2025, 6, 30),
+) -> SyntheticData:
+    """Events, one manufacturer + one operator pair per listed event, and prices.
+
+    Operators are drawn from the ``n_tickers`` universe (so the scale of the
+    ticker axis is independent of ``TICKER_MAP``); manufacturers are BA/EADSY.
+    """
+    rng = np.random.default_rng(seed + 1)
+    events = synthetic_events(n_events, seed, start, end)
+    universe = synthetic_tickers(n_tickers)
+    manufacturers = {TICKER_MAP["BOEING"], TICKER_MAP["AIRBUS"]}
+    universe.update({t: STOCK_MARKET_MAP[t] for t in manufacturers})
+    operators = [t for t in universe if t not in manufacturers]
+
+    listed = events.filter(
+        pl.col("acft_make").is_in(["BOEING", "AIRBUS", "AIRBUS INDUSTRIE"])
+        & pl.col("oper_name").is_in(AIRLINES)
+    )
+    base = listed.select("ev_id", "ev_date", severity_category())
+    pairs = pl.concat(
+        [
+            base.with_columns(
+                stock_type=pl.lit("manufacturer"),
+                tkr=listed["acft_make"].replace_strict(
+                    TICKER_MAP, return_dtype=pl.Utf8
+                ),
+            ),
+            base.with_columns(
+                stock_type=pl.lit("operator"),
+                tkr=pl.Series(rng.choice(operators, listed.height), dtype=pl.Utf8),
+            ),
+        ]
+    ).with_columns(
+        market_tkr=pl.col("tkr").replace_strict(universe, return_dtype=pl.Utf8)
+    )
+
+    prices = synthetic_prices(
+        universe, start.replace(year=start.year - 1), end, seed, shocks=pairs
+    )
+    return SyntheticData(events=events, pairs=pairs, prices=prices)
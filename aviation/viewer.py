@@ -0,0 +1,167 @@
+"""Paged, sorted and searched views over tables too large to send whole.
+
+The dashboard's raw data viewer never collects a full table: filters and
+the search term become predicates on a lazy (parquet) scan, and a page is
+``sort -> slice`` on that scan, which polars runs as a top-k over the
+filtered rows. :func:`export` streams the filtered rows straight from the
+scan into a CSV or parquet file without building a DataFrame.
+
+::
+
+    lf = filter_rows(car_rows(), {"category": ["severe"]}, search="BA")
+    count_rows(lf)                                        # 12_345
+    page(lf, sort="CAR", descending=True, offset=50, limit=50)
+    export(lf, "csv")                                     # -> open file
+
+A lazy scan opens its file again on every collect. A server that swaps in
+new data while pages are being read (``aviation.reload``) scans a per-version
+:func:`pin_files` directory instead of the published path, so every page of
+a snapshot comes from the same file.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Sequence
+
+import polars as pl
+
+from .car_matrix import event_meta
+from .compact import scan_cache
+from .config import CAR_CACHE_PATH, FEATURE_STORE_PATH
+
+EXPORT_FORMATS = ("csv", "parquet")
+# unique per row of the viewer's tables; breaks sort ties so pages are stable
+ROW_KEY = ("ev_id", "tkr", "stock_type", "date")
+
+
+def car_rows(
+    car: str | pl.DataFrame | pl.LazyFrame = CAR_CACHE_PATH,
+    events: str | pl.DataFrame = FEATURE_STORE_PATH,
+) -> pl.LazyFrame:
+    """Daily CAR rows with category, manufacturer and year, as a lazy frame.
+
+    ``car`` is a CAR_CACHE-style parquet path (scanned, not read, through its
+    compact copy when current) or frame;
+    ``events`` a path or frame of df_ev_anal-style events.
+    """
+    if isinstance(events, str):
+        events = pl.read_parquet(events)
+    meta = event_meta(events).with_columns(
+        year=pl.col("ev_date").dt.year().cast(pl.Int32)
+    )
+    rows = scan_cache(car) if isinstance(car, str) else car.lazy()
+    return rows.join(meta.lazy(), on="ev_id", how="inner", maintain_order="left")
+
+
+def pin_files(paths: Sequence[str], pin_dir: str) -> str:
+    """Hard-link the existing ``paths`` into ``pin_dir`` and return it.
+
+    The links keep the loaded version's bytes after a publish renames a new
+    file over the original (a copy is made across filesystems). Names and
+    mtimes are kept, so :func:`aviation.compact.scan_cache` picks the same
+    file in ``pin_dir`` as it would next to the originals.
+    """
+    os.makedirs(pin_dir, exist_ok=True)
+    for path in paths:
+        dest = os.path.join(pin_dir, os.path.basename(path))
+        if not os.path.exists(path) or os.path.exists(dest):
+            continue
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copy2(path, dest)
+    return pin_dir
+
+
+def prune_pins(root: str, keep: set[str] | frozenset[str]):
+    """Remove the :func:`pin_files` directories under ``root`` not in ``keep``."""
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        if name not in keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def filter_rows(
+    lf: pl.LazyFrame,
+    filters: dict[str, Sequence[str]] | None = None,
+    years: tuple[int, int] | None = None,
+    search: str | None = None,
+) -> pl.LazyFrame:
+    """Rows matching every filter and containing ``search``.
+
+    ``filters`` maps a column to the accepted values (case-insensitive;
+    columns the table lacks are ignored). ``search`` is a case-insensitive
+    substring looked for in every text column.
+    """
+    schema = lf.collect_schema()
+    cond = pl.lit(True)
+    for column, values in (filters or {}).items():
+        if column in schema:
+            wanted = [v.lower() for v in values]
+            cond &= pl.col(column).cast(pl.Utf8).str.to_lowercase().is_in(wanted)
+    if years is not None and "year" in schema:
+        cond &= pl.col("year").is_between(*years)
+    if search:
+        text = [c for c, dtype in schema.items() if dtype in (pl.Utf8, pl.Categorical)]
+        if not text:
+            return lf.clear()
+        cond &= pl.any_horizontal(
+            pl.col(c)
+            .cast(pl.Utf8)
+            .str.to_lowercase()
+            .str.contains(search.lower(), literal=True)
+            for c in text
+        )
+    return lf.filter(cond)
+
+
+def count_rows(lf: pl.LazyFrame) -> int:
+    return lf.select(pl.len()).collect(engine="streaming").item()
+
+
+def page(
+    lf: pl.LazyFrame,
+    sort: str | None = None,
+    descending: bool = False,
+    offset: int = 0,
+    limit: int = 50,
+) -> pl.DataFrame:
+    """Rows ``offset .. offset + limit`` of ``lf`` in ``sort`` order.
+
+    Rows are ordered by ``sort`` and then by the :data:`ROW_KEY` columns the
+    table has (by the key alone without ``sort``), so every row has one place
+    and consecutive pages neither repeat nor skip rows; nulls sort last
+    either way.
+    """
+    key = [c for c in ROW_KEY if c in lf.collect_schema() and c != sort]
+    by = ([sort] if sort is not None else []) + key
+    if by:
+        lf = lf.sort(
+            by,
+            descending=[descending] * (sort is not None) + [False] * len(key),
+            nulls_last=True,
+            maintain_order=True,
+        )
+    return lf.slice(offset, limit).collect(engine="streaming")
+
+
+def export(lf: pl.LazyFrame, fmt: str = "csv"):
+    """Stream ``lf`` into a temporary ``fmt`` file and return it opened.
+
+    The file is already unlinked, so it disappears once the handle is
+    closed (``st.download_button`` reads and closes it).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"fmt must be one of {EXPORT_FORMATS}, got {fmt!r}")
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}", prefix="aviation-export-")
+    os.close(fd)
+    try:
+        if fmt == "csv":
+            lf.sink_csv(path)
+        else:
+            lf.sink_parquet(path)
+        return open(path, "rb")
+    finally:
+        os.remove(path)
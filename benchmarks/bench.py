@@ -0,0 +1,419 @@
+"""Benchmarks for the event-study hot paths on seeded synthetic data.
+
+Run from the repo root::
+
+    python -m benchmarks.bench --events 10000 --tickers 50
+    python -m benchmarks.bench --preset large --cases car.* caar.*
+    python -m benchmarks.bench --compare            # vs. the previous run
+
+Every case is timed ``--repeat`` times (min and median wall time) and run once
+more under a peak-memory probe (RSS sampled in a background thread, plus the
+``tracemalloc`` peak for Python / numpy allocations; polars' own allocator
+only shows up in RSS). One JSON line per case is appended to
+``benchmarks/history.jsonl`` with the git commit, versions and scale, so
+``--compare`` can flag regressions between versions.
+
+The notebook functions (``load_tkr_price``, ``compute_car_all``,
+``compute_TTR``) are not importable; their batched package equivalents are
+timed instead.
+"""
+
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import polars as pl
+
+from aviation.car_matrix import car_matrix
+from aviation.incremental import add_events, empty_state, mae_table, ttr_table, update
+from aviation.instrument import PeakRSS
+from aviation.models import fit_models
+from aviation.panel import build_return_panel, long_prices, open_panel, write_panel
+from aviation.synthetic import synthetic_dataset
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.jsonl")
+
+PRESETS = {
+    "small": (1_000, 10),
+    "medium": (10_000, 50),
+    "large": (100_000, 200),
+    "xl": (1_000_000, 500),
+}
+
+
+# ---- cases ----
+
+
+class Context:
+    """Lazily built inputs shared by the cases of one run."""
+
+    def __init__(self, n_events: int, n_tickers: int, seed: int, tmp: str):
+        self.n_events = n_events
+        self.n_tickers = n_tickers
+        self.seed = seed
+        self.tmp = tmp
+        self._memo = {}
+
+    def get(self, name: str):
+        if name not in self._memo:
+            self._memo[name] = getattr(self, f"_{name}")()
+        return self._memo[name]
+
+    def _data(self):
+        return synthetic_dataset(self.n_events, self.n_tickers, self.seed)
+
+    def _prices_path(self):
+        path = os.path.join(self.tmp, "prices.parquet")
+        self.get("data").prices.write_parquet(path)
+        return path
+
+    def _panel(self):
+        return build_return_panel(self.get("data").prices)
+
+    def _state_car(self):
+        d = self.get("data")
+        state = add_events(empty_state(), d.pairs, d.prices)
+        return update(state, d.prices)
+
+    def _car(self):
+        return self.get("state_car")[1]
+
+    def _events(self):
+        d = self.get("data")
+        return d.events.join(
+            d.pairs.select("ev_id", "category").unique("ev_id"), on="ev_id"
+        )
+
+    def _matrix(self):
+        return car_matrix(self.get("car"), self.get("events"))
+
+    def _mae_pd(self):
+        """Dashboard-shaped MAE frame (pandas, title-case labels)."""
+        mae = mae_table(self.get("state_car")[0])
+        return (
+            mae.join(self.get("events"), on="ev_id")
+            .select(
+                "MAE_signed",
+                manufacturer=pl.col("acft_make")
+                .str.split(" ")
+                .list.first()
+                .str.to_titlecase(),
+                category=pl.col("category").cast(pl.Utf8).str.to_titlecase(),
+                date=pl.col("ev_date").cast(pl.Datetime),
+                fatalities="inj_tot_f",
+                injuries="inj_all_tot",
+            )
+            .to_pandas()
+        )
+
+
+def _case_load_parquet(ctx):
+    path = ctx.get("prices_path")
+    return lambda: long_prices((path,))
+
+
+def _case_build_panel(ctx):
+    prices = ctx.get("data").prices
+    return lambda: build_return_panel(prices)
+
+
+def _case_panel_roundtrip(ctx):
+    panel = ctx.get("panel")
+    out = os.path.join(ctx.tmp, "panel")
+
+    def run():
+        write_panel(panel, out)
+        p = open_panel(out)
+        return float(np.nansum(p.close[:, -1]))
+
+    return run
+
+
+def _case_car_incremental(ctx):
+    d = ctx.get("data")
+
+    def run():
+        state = add_events(empty_state(), d.pairs, d.prices)
+        return update(state, d.prices)
+
+    return run
+
+
+def _case_car_fit_models(ctx):
+    pairs, panel = ctx.get("data").pairs, ctx.get("panel")
+    return lambda: fit_models(pairs, panel, ("market",))
+
+
+def _case_mae_group_by(ctx):
+    car = ctx.get("car")
+    # MAE_CACHE exactly as data/final.ipynb builds it
+    return lambda: (
+        car.filter(pl.col("flavor") == "short")
+        .group_by(["ev_id", "tkr", "stock_type"])
+        .agg(CAR_min=pl.col("CAR").min(), CAR_max=pl.col("CAR").max())
+        .with_columns(
+            MAE_signed=pl.when(pl.col("CAR_max").abs() >= pl.col("CAR_min").abs())
+            .then(pl.col("CAR_max"))
+            .otherwise(pl.col("CAR_min"))
+        )
+    )
+
+
+def _case_ttr_table(ctx):
+    state = ctx.get("state_car")[0]
+    as_of = state["stock_last_date"].max()
+    return lambda: ttr_table(state, as_of=as_of)
+
+
+def _case_caar_group_by(ctx):
+    car, events = ctx.get("car"), ctx.get("events")
+    return lambda: (
+        car.join(events.select("ev_id", "ev_date"), on="ev_id", how="left")
+        .with_columns(rel_day=(pl.col("date") - pl.col("ev_date")).dt.total_days())
+        .group_by("rel_day")
+        .agg(CAAR=pl.col("CAR").mean())
+        .sort("rel_day")
+    )
+
+
+def _case_caar_matrix_build(ctx):
+    car, events = ctx.get("car"), ctx.get("events")
+    return lambda: car_matrix(car, events)
+
+
+def _case_caar_matrix_slice(ctx):
+    m = ctx.get("matrix")
+
+    def run():
+        mask = m.select(categories=["moderate", "severe"], years=(2012, 2020))
+        return m.caar(mask), m.caar_by("tkr", mask)
+
+    return run
+
+
+def _case_dashboard_filter_figure(ctx):
+    import plotly.express as px
+
+    df = ctx.get("mae_pd")
+
+    def run():
+        f = df[
+            df["category"].isin(["Moderate", "Severe"])
+            & df["manufacturer"].isin(["Boeing", "Airbus"])
+            & (df["date"].dt.year >= 2012)
+            & (df["date"].dt.year <= 2020)
+        ]
+        fig = px.histogram(f, x="MAE_signed", color="category", nbins=50)
+        return len(fig.to_json())
+
+    return run
+
+
+CASES = {
+    "prices.load_parquet": _case_load_parquet,
+    "prices.build_panel": _case_build_panel,
+    "prices.panel_roundtrip": _case_panel_roundtrip,
+    "car.incremental": _case_car_incremental,
+    "car.fit_models": _case_car_fit_models,
+    "mae.group_by": _case_mae_group_by,
+    "ttr.table": _case_ttr_table,
+    "caar.group_by": _case_caar_group_by,
+    "caar.matrix_build": _case_caar_matrix_build,
+    "caar.matrix_slice": _case_caar_matrix_slice,
+    "dashboard.filter_figure": _case_dashboard_filter_figure,
+}
+
+
+# ---- runner ----
+
+
+def _git(*args) -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True, timeout=10
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _environment() -> dict:
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_case(name: str, ctx: Context, repeat: int) -> dict:
+    run = CASES[name](ctx)
+    run()  # warm-up (imports, lazily built caches)
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    with PeakRSS() as rss:
+        result = run()
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rows = result.height if isinstance(result, pl.DataFrame) else None
+    return {
+        "case": name,
+        "repeat": repeat,
+        "seconds_min": min(times),
+        "seconds_median": statistics.median(times),
+        "peak_rss_mb": rss.peak / 2**20,
+        "traced_peak_mb": traced / 2**20,
+        "rows": rows,
+    }
+
+
+def run_benchmarks(
+    n_events: int,
+    n_tickers: int,
+    cases: list[str],
+    repeat: int = 5,
+    seed: int = 0,
+    history: str | None = HISTORY_PATH,
+) -> pl.DataFrame:
+    """Time ``cases`` at one scale; append the results to ``history``."""
+    run_id = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    env = _environment()
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = Context(n_events, n_tickers, seed, tmp)
+        t0 = time.perf_counter()
+        ctx.get("data")
+        print(
+            f"generated {n_events:,} events / {n_tickers} tickers in {time.perf_counter() - t0:.1f}s"
+        )
+        for name in cases:
+            try:
+                rec = run_case(name, ctx, repeat)
+            except ImportError as e:
+                print(f"⚠️  Skipping {name}: {e}")
+                continue
+            print(
+                f"{name:<26} {rec['seconds_median'] * 1e3:>10.2f} ms"
+                f"  (min {rec['seconds_min'] * 1e3:.2f})"
+                f"  rss +{rec['peak_rss_mb']:.1f} MB"
+            )
+            records.append(
+                {
+                    "run": run_id,
+                    **env,
+                    "n_events": n_events,
+                    "n_tickers": n_tickers,
+                    "seed": seed,
+                    **rec,
+                }
+            )
+    if history and records:
+        with open(history, "a") as f:
+            for rec in records:
+                f.write(json.dumps(rec) + "\n")
+    return pl.DataFrame(records)
+
+
+def read_history(path: str = HISTORY_PATH) -> pl.DataFrame:
+    if not os.path.exists(path):
+        return pl.DataFrame()
+    return pl.read_ndjson(path, infer_schema_length=None)
+
+
+def compare(history: pl.DataFrame, threshold: float = 1.25) -> pl.DataFrame:
+    """Latest run vs. the previous run at the same scale, per case.
+
+    ``ratio`` is latest / previous median time; ``regressed`` when above
+    ``threshold``.
+    """
+    keys = ["case", "n_events", "n_tickers"]
+    runs = history.select(*keys, "run", "commit", "seconds_median").sort("run")
+    latest = runs.group_by(keys).agg(pl.all().last())
+    previous = (
+        runs.join(latest.select(*keys, last_run="run"), on=keys)
+        .filter(pl.col("run") < pl.col("last_run"))
+        .group_by(keys)
+        .agg(pl.all().last())
+        .select(*keys, prev_commit="commit", prev_median="seconds_median")
+    )
+    return (
+        latest.join(previous, on=keys)
+        .with_columns(ratio=pl.col("seconds_median") / pl.col("prev_median"))
+        .with_columns(regressed=pl.col("ratio") > threshold)
+        .sort(keys)
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench")
+    parser.add_argument("--preset", choices=list(PRESETS), default=None)
+    parser.add_argument("--events", type=int, default=PRESETS["small"][0])
+    parser.add_argument("--tickers", type=int, default=PRESETS["small"][1])
+    parser.add_argument("--cases", nargs="*", default=["*"], help="glob patterns")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--no-history", action="store_true")
+    parser.add_argument(
+        "--compare", action="store_true", help="compare with the previous run"
+    )
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    n_events, n_tickers = (
+        PRESETS[args.preset] if args.preset else (args.events, args.tickers)
+    )
+    cases = [c for c in CASES if any(fnmatch.fnmatch(c, p) for p in args.cases)]
+    if not cases:
+        parser.error(f"no case matches {args.cases}; cases: {list(CASES)}")
+
+    history = None if args.no_history else args.history
+    run_benchmarks(n_events, n_tickers, cases, args.repeat, args.seed, history)
+
+    if args.compare and history:
+        hist = read_history(history).filter(
+            (pl.col("n_events") == n_events) & (pl.col("n_tickers") == n_tickers)
+        )
+        cmp = compare(hist, args.threshold)
+        if cmp.height == 0:
+            print("no previous run at this scale to compare with")
+            return 0
+        with pl.Config(tbl_rows=-1, tbl_cols=-1):
+            print(
+                cmp.select(
+                    "case",
+                    "prev_commit",
+                    "commit",
+                    "prev_median",
+                    "seconds_median",
+                    "ratio",
+                    "regressed",
+                )
+            )
+        return 1 if cmp["regressed"].any() else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
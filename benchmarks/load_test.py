@@ -0,0 +1,209 @@
+"""Load test for the query API (``python -m aviation.api``).
+
+Run from the repo root::
+
+    python -m benchmarks.load_test --spawn --synthetic 20000
+    python -m benchmarks.load_test --url http://127.0.0.1:8765 --concurrency 64
+
+``--concurrency`` keep-alive connections send ``--requests`` GETs in total,
+drawn from a pool of ``--distinct`` dashboard-style queries with Zipf-like
+popularity (a few filter combinations are very common, most are rare), so
+the run exercises both the LRU cache and the miss path. Reports throughput,
+latency percentiles, status codes and the server's cache counters.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+CATEGORIES = ["minor", "moderate", "severe"]
+MANUFACTURERS = ["boeing", "airbus"]
+STOCK_TYPES = ["manufacturer", "operator"]
+TICKERS = ["BA", "EADSY", "AAL", "DAL", "UAL", "LUV"]
+
+
+def query_pool(n: int, seed: int = 0) -> list[str]:
+    """``n`` distinct request targets over the three endpoints."""
+    rng = random.Random(seed)
+    pool, seen = [], set()
+    while len(pool) < n:
+        endpoint = rng.choice(["mae", "ttr", "caar"])
+        params = []
+        if rng.random() < 0.7:
+            params.append(
+                ("category", ",".join(rng.sample(CATEGORIES, rng.randint(1, 3))))
+            )
+        if rng.random() < 0.5:
+            params.append(("manufacturer", rng.choice(MANUFACTURERS)))
+        if rng.random() < 0.3:
+            params.append(("stock_type", rng.choice(STOCK_TYPES)))
+        if rng.random() < 0.3:
+            params.append(("tkr", ",".join(rng.sample(TICKERS, rng.randint(1, 3)))))
+        if rng.random() < 0.6:
+            lo = rng.randint(2008, 2020)
+            params.append(("years", f"{lo}-{rng.randint(lo, 2025)}"))
+        if rng.random() < 0.3:
+            params.append(("group_by", rng.choice(["category", "manufacturer", "tkr"])))
+        target = f"/v1/{endpoint}?{urlencode(params)}"
+        if target not in seen:
+            seen.add(target)
+            pool.append(target)
+    return pool
+
+
+async def _request(reader, writer, host: str, target: str) -> tuple[int, int]:
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = next(
+        int(line.split(":", 1)[1])
+        for line in lines[1:]
+        if line.lower().startswith("content-length:")
+    )
+    body = await reader.readexactly(length)
+    return status, len(body)
+
+
+async def _get_json(host: str, port: int, target: str) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    return json.loads(raw.split(b"\r\n\r\n", 1)[1])
+
+
+async def run_load(
+    host: str,
+    port: int,
+    targets: list[str],
+    concurrency: int,
+) -> dict:
+    queue = asyncio.Queue()
+    for t in targets:
+        queue.put_nowait(t)
+    latencies, statuses, errors = [], {}, 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while True:
+                try:
+                    target = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                t0 = time.perf_counter()
+                try:
+                    status, _ = await _request(reader, writer, host, target)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    errors += 1
+                    reader, writer = await asyncio.open_connection(host, port)
+                    continue
+                latencies.append(time.perf_counter() - t0)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1e3
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+        "p99_ms": round(float(np.percentile(lat, 99)), 2),
+        "max_ms": round(float(lat.max()), 2),
+        "statuses": statuses,
+        "errors": errors,
+    }
+
+
+async def _wait_ready(host: str, port: int, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await _get_json(host, port, "/health")
+        except (ConnectionError, OSError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.25)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load_test", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--zipf", type=float, default=1.2, help="popularity skew")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--spawn", action="store_true", help="start a server for the duration"
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=None,
+        metavar="N_EVENTS",
+        help="with --spawn: serve generated results",
+    )
+    args = parser.parse_args(argv)
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    server = None
+    if args.spawn:
+        cmd = [
+            sys.executable,
+            "-m",
+            "aviation.api",
+            "--host",
+            host,
+            "--port",
+            str(port),
+        ]
+        if args.synthetic is not None:
+            cmd += ["--synthetic", str(args.synthetic)]
+        server = subprocess.Popen(cmd, env=os.environ.copy())
+    try:
+        health = asyncio.run(_wait_ready(host, port))
+        print(f"server version {health['version']}, {health['pairs']:,} result rows")
+
+        pool = query_pool(args.distinct, args.seed)
+        rng = np.random.default_rng(args.seed)
+        weights = 1.0 / np.arange(1, len(pool) + 1) ** args.zipf
+        picks = rng.choice(len(pool), args.requests, p=weights / weights.sum())
+        targets = [pool[i] for i in picks]
+
+        report = asyncio.run(run_load(host, port, targets, args.concurrency))
+        report["server_cache"] = asyncio.run(_get_json(host, port, "/health"))["cache"]
+        print(json.dumps(report, indent=2))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
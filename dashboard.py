@@ -1,10 +1,53 @@
+import glob
+import os
+import time
+from functools import partial
+
 import streamlit as st
 import pandas as pd
 import numpy as np
+import polars as pl
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 
+from aviation.cache import FRAME, JSON, Codec, TieredCache
+from aviation.compact import cache_exists, cache_files
+from aviation.car_matrix import car_matrix
+from aviation.config import (
+    CAR_CACHE_PATH,
+    CAR_MATRIX_PATH,
+    CRASH_INDEX_PATH,
+    DASHBOARD_CACHE_DIR,
+    FEATURE_STORE_PATH,
+    RETURN_PANEL_DIR,
+    SNAPSHOT_DIR,
+    TTR_DEFAULT,
+)
+from aviation.decimate import (
+    METHODS,
+    crash_day_index,
+    crash_markers,
+    price_view,
+    read_crash_index,
+    view_range,
+)
+from aviation.instrument import RECORDER, count, timed
+from aviation.panel import build_return_panel, open_panel
+from aviation.reload import DatasetWatcher
+from aviation.results import read_car_matrix
+from aviation.survival import kaplan_meier, km_summary, median_ttr, survival_counts
+from aviation.viewer import (
+    car_rows,
+    count_rows,
+    export,
+    filter_rows,
+    page,
+    pin_files,
+    prune_pins,
+)
+
 # Page configuration
 st.set_page_config(
     page_title="Aviation Incidents & Stock Market Impact Analysis",
@@ -13,6 +56,31 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Per-rerun timings and cache counters; the Performance tab showing them is
+# hidden unless the URL has ?perf=1 (or AVIATION_PERF=1 is set)
+show_perf = st.query_params.get("perf") == "1" or os.environ.get("AVIATION_PERF") == "1"
+perf_run = RECORDER.start_run("dashboard")
+
+
+def cached(name, fn, *args):
+    """Call an ``st.cache_*`` function, timing it and counting hit / miss.
+
+    The cached body counts ``<name>.miss`` itself, so a call that did not
+    bump it was served from the cache.
+    """
+    misses = perf_run["counters"][f"{name}.miss"]
+    with timed(f"data.{name}"):
+        out = fn(*args)
+    if perf_run["counters"][f"{name}.miss"] == misses:
+        count(f"{name}.hit")
+    return out
+
+
+FIGURE = Codec(
+    lambda fig: fig.to_json().encode(), lambda b: pio.from_json(b.decode()), ".json"
+)
+
+
 # Custom CSS for better styling
 st.markdown(
     """
@@ -112,7 +180,8 @@ def generate_mae_data():
     )
 
 
-# TTR (Time to Recovery) data
+# TTR (Time to Recovery) data, shaped like TTR_CACHE: whole days, and pairs
+# not recovered within the event window censored at TTR_DEFAULT
 def generate_ttr_data():
     ttr_full = np.random.gamma(3, 8, 200)  # Skewed distribution
     ttr_half = ttr_full * 0.6
@@ -126,11 +195,16 @@ def generate_ttr_data():
     )
     fatalities = np.random.randint(0, 200, 200)
     injuries = np.random.randint(0, 300, 200)
+    # own generator, so the global draws above and below stay as they were
+    stock_types = np.random.default_rng(7).choice(["manufacturer", "operator"], 200)
 
     return pd.DataFrame(
         {
-            "TTR_full": ttr_full,
-            "TTR_half": ttr_half,
+            "TTR_full": np.minimum(np.ceil(ttr_full), TTR_DEFAULT).astype(int),
+            "TTR_half": np.minimum(np.ceil(ttr_half), TTR_DEFAULT).astype(int),
+            "censored_full": ttr_full > TTR_DEFAULT,
+            "censored_half": ttr_half > TTR_DEFAULT,
+            "stock_type": stock_types,
             "manufacturer": manufacturers,
             "category": categories,
             "date": dates,
@@ -141,35 +215,191 @@ def generate_ttr_data():
     )
 
 
-# CAR/CAAR (Cumulative Abnormal Returns) data
-def generate_car_data():
-    rel_days = range(-10, 21)
-    data = []
+# CAR/CAAR (Cumulative Abnormal Returns) data: one CAR path per (event, ticker)
+def generate_car_rows(events):
+    rng = np.random.default_rng(42)
+    rel_days = np.arange(-10, 21)
+    drift = np.where(
+        rel_days < 0,
+        0.0,
+        np.where(
+            rel_days <= 5, -0.02 - rel_days * 0.004, -0.035 + (rel_days - 5) * 0.001
+        ),
+    )
+    severity = {"Minor": 0.5, "Moderate": 1.0, "Severe": 1.8}
+    multiplier = {"BA": 1.2, "EADSY": 0.8, "AAL": 1.5, "DAL": 1.0}
+    frames = []
+    for stock_type, tickers in [
+        (
+            "manufacturer",
+            events["manufacturer"].map({"Boeing": "BA", "Airbus": "EADSY"}),
+        ),
+        ("operator", pd.Series(rng.choice(["AAL", "DAL"], len(events)))),
+    ]:
+        scale = (
+            events["category"].map(severity).to_numpy()
+            * tickers.map(multiplier).to_numpy()
+        )
+        car = scale[:, None] * drift[None, :] + np.cumsum(
+            rng.normal(0, 0.004, (len(events), len(rel_days))), axis=1
+        )
+        frames.append(
+            pl.DataFrame(
+                {
+                    "ev_id": np.repeat(events["ev_id"].to_numpy(), len(rel_days)),
+                    "tkr": np.repeat(tickers.to_numpy(), len(rel_days)),
+                    "stock_type": stock_type,
+                    "rel_day": np.tile(rel_days, len(events)),
+                    "CAR": car.ravel(),
+                }
+            )
+        )
+    return pl.concat(frames)
+
+
+# Generate all datasets
+with timed("data.generate", memory=True) as span:
+    mae_df = generate_mae_data()
+    ttr_df = generate_ttr_data()
+    span.rows = len(mae_df) + len(ttr_df)
+
+
+# CAR matrix: dense (event x rel_day) CAR + metadata, so every filter
+# combination is a masked mean rather than a group-by over long rows. The
+# long rows stay a lazy scan for the raw data viewer (None when only the
+# matrix was published), over links pinned to this version so a republished
+# cache never shows up half-way through a snapshot's pages.
+def load_car_data(version):
+    published = cache_exists(CAR_CACHE_PATH) and os.path.exists(FEATURE_STORE_PATH)
+    if os.path.exists(CAR_MATRIX_PATH) or published:
+        rows = None
+        if published:
+            pinned = pin_files(
+                cache_files(CAR_CACHE_PATH), os.path.join(SNAPSHOT_DIR, version)
+            )
+            rows = car_rows(os.path.join(pinned, os.path.basename(CAR_CACHE_PATH)))
+        return read_car_matrix(), rows
+    events = mae_df.assign(ev_id=[f"SYN{i:04d}" for i in range(len(mae_df))])
+    car = generate_car_rows(events)
+    events = pl.from_pandas(events[["ev_id", "date", "category", "manufacturer"]])
+    events = events.select(
+        "ev_id",
+        ev_date=pl.col("date").cast(pl.Date),
+        category=pl.col("category").str.to_lowercase(),
+        acft_make=pl.col("manufacturer").str.to_uppercase(),
+    )
+    return car_matrix(car, events, window=(-10, 20)), car_rows(car, events)
+
+
+# Price history: the materialized return panel (memory-mapped, shared by all
+# sessions) and its crash-day index, or random walks when it was not built yet
+def generate_price_panel():
+    rng = np.random.default_rng(42)
+    dates = pd.bdate_range("2015-01-01", "2023-12-31")
+    prices = pl.concat(
+        [
+            pl.DataFrame(
+                {
+                    "date": dates.values,
+                    "tkr": ticker,
+                    "close": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates)))),
+                }
+            )
+            for ticker in ["BA", "EADSY", "AAL", "DAL"]
+        ]
+    )
+    panel = build_return_panel(prices)
+    events = pl.from_pandas(mae_df[["manufacturer", "category", "date"]]).select(
+        ev_id=pl.format("SYN{}", pl.int_range(pl.len())),
+        tkr=pl.col("manufacturer").replace({"Boeing": "BA", "Airbus": "EADSY"}),
+        stock_type=pl.lit("manufacturer"),
+        category=pl.col("category"),
+        ev_date=pl.col("date").cast(pl.Date),
+    )
+    return panel, crash_day_index(events, panel)
+
+
+def load_price_panel():
+    try:
+        panel = open_panel()
+        return panel, read_crash_index(panel), True
+    except FileNotFoundError:
+        return (*generate_price_panel(), False)
+
+
+# Served data, loaded off the request path: a watcher thread polls the files
+# below and, when they change, loads and indexes the new version and swaps it
+# in. Each rerun pins one snapshot, so a rerun that started before a swap
+# finishes on the old data and no rerun waits for a reload.
+def dashboard_files():
+    panel_files = sorted(glob.glob(os.path.join(RETURN_PANEL_DIR, "*")))
+    # this script generates the sample MAE / TTR data, so it is an input too
+    return [
+        os.path.abspath(__file__),
+        CAR_MATRIX_PATH,
+        *cache_files(CAR_CACHE_PATH),
+        CRASH_INDEX_PATH,
+        FEATURE_STORE_PATH,
+        *panel_files,
+    ]
+
+
+# Recovery / censoring counts per (category, manufacturer, stock_type, year,
+# day); they add up across cells, so the Kaplan-Meier curves of any filter
+# combination come from summing a few hundred rows
+def load_ttr_counts():
+    ttr = pl.from_pandas(ttr_df).with_columns(year=pl.col("date").dt.year())
+    return {
+        metric: survival_counts(ttr, f"TTR_{metric}", f"censored_{metric}")
+        for metric in ("full", "half")
+    }
 
-    for day in rel_days:
-        # Overall CAAR
-        if day < 0:
-            caar = np.random.normal(0.001, 0.005)
-        elif day <= 5:
-            caar = np.random.normal(-0.02 - day * 0.004, 0.01)
-        else:
-            caar = np.random.normal(-0.035 + (day - 5) * 0.001, 0.01)
 
-        data.append({"rel_day": day, "CAAR": caar, "ticker": "Overall"})
+def load_dataset(version):
+    car_mat, car_long = load_car_data(version)
+    panel, crash_index, from_store = load_price_panel()
+    return {
+        "car_mat": car_mat,
+        "car_rows": car_long,
+        "ttr_counts": load_ttr_counts(),
+        "panel": panel,
+        "crash_index": crash_index,
+        "from_store": from_store,
+    }
 
-        # Individual tickers
-        for ticker in ["BA", "EADSY", "AAL", "DAL"]:
-            multiplier = {"BA": 1.2, "EADSY": 0.8, "AAL": 1.5, "DAL": 1.0}[ticker]
-            ticker_caar = caar * multiplier + np.random.normal(0, 0.005)
-            data.append({"rel_day": day, "CAAR": ticker_caar, "ticker": ticker})
 
-    return pd.DataFrame(data)
+# Figures and aggregate tables are cached across sessions and restarts, keyed
+# by (dataset version, filter state, figure id); a swap deletes the entries of
+# the version it replaced. Pinned CAR rows of the replaced version stay until
+# the next swap, for reruns still paging through it.
+@st.cache_resource
+def dataset_watcher():
+    """One watcher and figure cache per server process, shared by all sessions."""
+    cache = TieredCache(DASHBOARD_CACHE_DIR, name="figures")
 
+    def on_swap(old, new):
+        cache.prune({new.version})
+        prune_pins(SNAPSHOT_DIR, {old.version, new.version})
+
+    watcher = DatasetWatcher(
+        dashboard_files, load_dataset, interval=5.0, on_swap=on_swap
+    )
+    cache.prune({watcher.current().version})
+    prune_pins(SNAPSHOT_DIR, {watcher.current().version})
+    return watcher, cache
+
+
+watcher, figure_cache = dataset_watcher()
+snapshot = watcher.current()
+version = snapshot.version
+car_mat = snapshot.data["car_mat"]
+
+
+@st.cache_data(max_entries=64)
+def price_series(version, _panel, ticker, start, end, n_points, method):
+    count("price_series.miss")
+    return price_view(_panel, ticker, start, end, n_points, method).to_pandas()
 
-# Generate all datasets
-mae_df = generate_mae_data()
-ttr_df = generate_ttr_data()
-car_df = generate_car_data()
 
 # Title and Introduction
 st.title("✈️ Aviation Incidents & Stock Market Impact Analysis")
@@ -194,19 +424,55 @@ year_range = st.sidebar.slider(
 )
 
 # Filter data based on sidebar selections
-mae_filtered = mae_df[
-    (mae_df["category"].isin(severity_filter))
-    & (mae_df["manufacturer"].isin(manufacturer_filter))
-    & (mae_df["date"].dt.year >= year_range[0])
-    & (mae_df["date"].dt.year <= year_range[1])
-]
-
-ttr_filtered = ttr_df[
-    (ttr_df["category"].isin(severity_filter))
-    & (ttr_df["manufacturer"].isin(manufacturer_filter))
-    & (ttr_df["date"].dt.year >= year_range[0])
-    & (ttr_df["date"].dt.year <= year_range[1])
-]
+with timed("filter.sidebar") as span:
+    mae_filtered = mae_df[
+        (mae_df["category"].isin(severity_filter))
+        & (mae_df["manufacturer"].isin(manufacturer_filter))
+        & (mae_df["date"].dt.year >= year_range[0])
+        & (mae_df["date"].dt.year <= year_range[1])
+    ]
+
+    ttr_filtered = ttr_df[
+        (ttr_df["category"].isin(severity_filter))
+        & (ttr_df["manufacturer"].isin(manufacturer_filter))
+        & (ttr_df["date"].dt.year >= year_range[0])
+        & (ttr_df["date"].dt.year <= year_range[1])
+    ]
+    span.rows = len(mae_filtered) + len(ttr_filtered)
+
+filter_state = (
+    tuple(sorted(severity_filter)),
+    tuple(sorted(manufacturer_filter)),
+    tuple(year_range),
+)
+
+
+def cached_figure(fig_id, build, *extra):
+    """``build()`` for the current filters, or its cached result."""
+    return figure_cache.get_or_build(
+        version, (fig_id, filter_state, extra), build, FIGURE
+    )
+
+
+def cached_table(table_id, build, *extra):
+    """A polars table for the current filters, or its cached copy."""
+    return figure_cache.get_or_build(
+        version, (table_id, filter_state, extra), build, FRAME
+    )
+
+
+def survival_curves(metric, group=None):
+    """Kaplan-Meier curves of TTR_<metric> for the current filters."""
+    counts = filter_rows(
+        snapshot.data["ttr_counts"][metric].lazy(),
+        {"category": severity_filter, "manufacturer": manufacturer_filter},
+        years=year_range,
+    ).collect()
+    by = [] if group is None else [group]
+    return cached_table(
+        "survival_curves", lambda: kaplan_meier(counts, by=by), metric, group
+    )
+
 
 # Key Metrics
 st.header("📈 Key Metrics")
@@ -218,9 +484,9 @@ with col1:
     st.metric(
         label="Total Events Analyzed",
         value=str(total_events),
-        delta=f"{baseline_diff:+d} vs baseline"
-        if baseline_diff != 0
-        else "0 vs baseline",
+        delta=(
+            f"{baseline_diff:+d} vs baseline" if baseline_diff != 0 else "0 vs baseline"
+        ),
     )
 
 with col2:
@@ -241,16 +507,25 @@ with col2:
     )
 
 with col3:
-    if len(ttr_filtered) > 0:
-        avg_ttr = ttr_filtered["TTR_full"].mean()
-        ttr_display = f"{avg_ttr:.0f} days"
-        ttr_delta = f"{avg_ttr - 25:+.0f} days"
-    else:
-        avg_ttr = 0
+    # censored pairs have not recovered by TTR_DEFAULT; averaging that value
+    # as a recovery time would understate it, so report the KM median
+    ttr_median = median_ttr(survival_curves("full"))["median"][0]
+    if len(ttr_filtered) == 0:
         ttr_display = "0 days"
-        ttr_delta = "0 days"
+    elif ttr_median is None:
+        ttr_display = f"> {TTR_DEFAULT} days"
+    else:
+        ttr_display = f"{ttr_median} days"
+    censored_share = ttr_filtered["censored_full"].mean() if len(ttr_filtered) else 0
 
-    st.metric(label="Avg Recovery Time", value=ttr_display, delta=ttr_delta)
+    st.metric(
+        label="Median Recovery Time",
+        value=ttr_display,
+        delta=f"{censored_share:.0%} not recovered",
+        delta_color="off",
+        help="Kaplan-Meier median; pairs not recovered within the event window "
+        "are censored, not counted as recoveries.",
+    )
 
 with col4:
     if len(mae_filtered) > 0:
@@ -266,17 +541,20 @@ with col4:
     st.metric(label="Severe Incidents", value=pct_display, delta=pct_delta)
 
 # Create tabs for different analysis sections
-tab1, tab2, tab3, tab4 = st.tabs(
+tabs = st.tabs(
     [
         "📉 Market Impact (MAE)",
         "⏱️ Recovery Time (TTR)",
         "📊 Cumulative Returns (CAR)",
         "🔍 Deep Dive",
+        "💹 Price History",
     ]
+    + (["⚙️ Performance"] if show_perf else [])
 )
+tab1, tab2, tab3, tab4, tab5 = tabs[:5]
 
 # TAB 1: MAE Analysis
-with tab1:
+with tab1, timed("figures.mae"):
     st.header("Maximum Absolute Effect (MAE) Analysis")
     st.markdown("""
     MAE represents the maximum absolute deviation in stock returns during the event window.
@@ -288,32 +566,42 @@ with tab1:
 
     with col1:
         st.subheader("Distribution of MAE")
-        fig1 = px.histogram(
-            mae_filtered,
-            x="MAE_signed",
-            nbins=30,
-            title="Distribution of Signed MAE",
-            labels={"MAE_signed": "MAE (Signed)", "count": "Frequency"},
-            color_discrete_sequence=["#1f77b4"],
-        )
-        fig1.add_vline(
-            x=0, line_dash="dash", line_color="red", annotation_text="Zero Impact"
-        )
-        fig1.update_layout(showlegend=False, height=400)
+
+        def mae_histogram():
+            fig1 = px.histogram(
+                mae_filtered,
+                x="MAE_signed",
+                nbins=30,
+                title="Distribution of Signed MAE",
+                labels={"MAE_signed": "MAE (Signed)", "count": "Frequency"},
+                color_discrete_sequence=["#1f77b4"],
+            )
+            fig1.add_vline(
+                x=0, line_dash="dash", line_color="red", annotation_text="Zero Impact"
+            )
+            fig1.update_layout(showlegend=False, height=400)
+            return fig1
+
+        fig1 = cached_figure("mae_histogram", mae_histogram)
         st.plotly_chart(fig1, use_container_width=True)
 
     with col2:
         st.subheader("MAE by Manufacturer")
-        fig2 = px.box(
-            mae_filtered,
-            x="manufacturer",
-            y="MAE_signed",
-            color="manufacturer",
-            title="MAE by Aircraft Manufacturer",
-            labels={"MAE_signed": "MAE (Signed)", "manufacturer": "Manufacturer"},
-        )
-        fig2.add_hline(y=0, line_dash="dash", line_color="gray")
-        fig2.update_layout(showlegend=False, height=400)
+
+        def mae_by_manufacturer():
+            fig2 = px.box(
+                mae_filtered,
+                x="manufacturer",
+                y="MAE_signed",
+                color="manufacturer",
+                title="MAE by Aircraft Manufacturer",
+                labels={"MAE_signed": "MAE (Signed)", "manufacturer": "Manufacturer"},
+            )
+            fig2.add_hline(y=0, line_dash="dash", line_color="gray")
+            fig2.update_layout(showlegend=False, height=400)
+            return fig2
+
+        fig2 = cached_figure("mae_by_manufacturer", mae_by_manufacturer)
         st.plotly_chart(fig2, use_container_width=True)
 
     # MAE by Severity
@@ -321,36 +609,46 @@ with tab1:
 
     with col1:
         st.subheader("MAE by Accident Severity")
-        fig3 = px.box(
-            mae_filtered,
-            x="category",
-            y="MAE_signed",
-            color="category",
-            title="MAE by Severity Category",
-            labels={"MAE_signed": "MAE (Signed)", "category": "Severity"},
-            category_orders={"category": ["Minor", "Moderate", "Severe"]},
-        )
-        fig3.add_hline(y=0, line_dash="dash", line_color="gray")
-        fig3.update_layout(showlegend=False, height=400)
+
+        def mae_by_severity():
+            fig3 = px.box(
+                mae_filtered,
+                x="category",
+                y="MAE_signed",
+                color="category",
+                title="MAE by Severity Category",
+                labels={"MAE_signed": "MAE (Signed)", "category": "Severity"},
+                category_orders={"category": ["Minor", "Moderate", "Severe"]},
+            )
+            fig3.add_hline(y=0, line_dash="dash", line_color="gray")
+            fig3.update_layout(showlegend=False, height=400)
+            return fig3
+
+        fig3 = cached_figure("mae_by_severity", mae_by_severity)
         st.plotly_chart(fig3, use_container_width=True)
 
     with col2:
         st.subheader("MAE Over Time")
-        mae_by_year = (
-            mae_filtered.groupby(mae_filtered["date"].dt.year)["MAE_signed"]
-            .mean()
-            .reset_index()
-        )
-        mae_by_year.columns = ["Year", "Average MAE"]
-        fig4 = px.line(
-            mae_by_year,
-            x="Year",
-            y="Average MAE",
-            title="Average MAE Over Time",
-            markers=True,
-        )
-        fig4.add_hline(y=0, line_dash="dash", line_color="gray")
-        fig4.update_layout(height=400)
+
+        def mae_over_time():
+            mae_by_year = (
+                mae_filtered.groupby(mae_filtered["date"].dt.year)["MAE_signed"]
+                .mean()
+                .reset_index()
+            )
+            mae_by_year.columns = ["Year", "Average MAE"]
+            fig4 = px.line(
+                mae_by_year,
+                x="Year",
+                y="Average MAE",
+                title="Average MAE Over Time",
+                markers=True,
+            )
+            fig4.add_hline(y=0, line_dash="dash", line_color="gray")
+            fig4.update_layout(height=400)
+            return fig4
+
+        fig4 = cached_figure("mae_over_time", mae_over_time)
         st.plotly_chart(fig4, use_container_width=True)
 
     # MAE vs Fatalities
@@ -358,71 +656,278 @@ with tab1:
 
     with col1:
         st.subheader("MAE vs Fatalities")
-        fig5 = px.scatter(
-            mae_filtered,
-            x="fatalities",
-            y="MAE_signed",
-            color="category",
-            title="MAE vs Total Fatalities",
-            labels={"fatalities": "Number of Fatalities", "MAE_signed": "MAE (Signed)"},
-            trendline="ols",
-            trendline_scope="overall",
-        )
-        fig5.add_hline(y=0, line_dash="dash", line_color="gray")
-        fig5.update_layout(height=400)
+
+        def mae_vs_fatalities():
+            fig5 = px.scatter(
+                mae_filtered,
+                x="fatalities",
+                y="MAE_signed",
+                color="category",
+                title="MAE vs Total Fatalities",
+                labels={
+                    "fatalities": "Number of Fatalities",
+                    "MAE_signed": "MAE (Signed)",
+                },
+                trendline="ols",
+                trendline_scope="overall",
+            )
+            fig5.add_hline(y=0, line_dash="dash", line_color="gray")
+            fig5.update_layout(height=400)
+            return fig5
+
+        fig5 = cached_figure("mae_vs_fatalities", mae_vs_fatalities)
         st.plotly_chart(fig5, use_container_width=True)
 
     with col2:
         st.subheader("MAE vs Total Injuries")
-        fig6 = px.scatter(
-            mae_filtered,
-            x="injuries",
-            y="MAE_signed",
-            color="category",
-            title="MAE vs Total Injuries",
-            labels={"injuries": "Number of Injuries", "MAE_signed": "MAE (Signed)"},
-            trendline="ols",
-            trendline_scope="overall",
-        )
-        fig6.add_hline(y=0, line_dash="dash", line_color="gray")
-        fig6.update_layout(height=400)
+
+        def mae_vs_injuries():
+            fig6 = px.scatter(
+                mae_filtered,
+                x="injuries",
+                y="MAE_signed",
+                color="category",
+                title="MAE vs Total Injuries",
+                labels={"injuries": "Number of Injuries", "MAE_signed": "MAE (Signed)"},
+                trendline="ols",
+                trendline_scope="overall",
+            )
+            fig6.add_hline(y=0, line_dash="dash", line_color="gray")
+            fig6.update_layout(height=400)
+            return fig6
+
+        fig6 = cached_figure("mae_vs_injuries", mae_vs_injuries)
         st.plotly_chart(fig6, use_container_width=True)
 
 # TAB 2: TTR Analysis
-with tab2:
+with tab2, timed("figures.ttr"):
     st.header("Time to Recovery (TTR) Analysis")
     st.markdown("""
     TTR measures the number of days it takes for stock prices to recover after an incident.
     Lower values indicate faster market recovery.
     """)
 
+    # Survival curves: share of pairs still below their pre-crash level
+    st.subheader("Recovery Curves (Kaplan-Meier)")
+    st.caption(
+        f"Pairs not recovered by day {TTR_DEFAULT} are censored there (marked +) "
+        "rather than counted as recoveries. Bands are 95% confidence intervals."
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        km_metric = st.radio(
+            "Recovery",
+            ["full", "half"],
+            format_func=lambda m: f"{m.title()} recovery",
+            horizontal=True,
+        )
+    with col2:
+        km_group = st.selectbox(
+            "Curves by",
+            [None, "category", "manufacturer", "stock_type"],
+            format_func=lambda g: (
+                "All pairs" if g is None else g.replace("_", " ").title()
+            ),
+        )
+    km_curves = survival_curves(km_metric, km_group)
+
+    def km_figure():
+        fig = go.Figure()
+        colors = px.colors.qualitative.Plotly
+        groups = (
+            [("All pairs", km_curves)]
+            if km_group is None
+            else [
+                (name, df)
+                for (name,), df in km_curves.partition_by(
+                    km_group, as_dict=True, maintain_order=True
+                ).items()
+            ]
+        )
+        for i, (name, df) in enumerate(groups):
+            color = colors[i % len(colors)]
+            t = [0, *df["t"]]
+            for band, fill in (("S_hi", None), ("S_lo", "tonexty")):
+                fig.add_trace(
+                    go.Scatter(
+                        x=t,
+                        y=[1.0, *df[band]],
+                        line_shape="hv",
+                        line_width=0,
+                        fill=fill,
+                        fillcolor=f"{color}33",
+                        hoverinfo="skip",
+                        showlegend=False,
+                    )
+                )
+            fig.add_trace(
+                go.Scatter(
+                    x=t,
+                    y=[1.0, *df["S"]],
+                    line_shape="hv",
+                    line_color=color,
+                    name=str(name),
+                )
+            )
+            censored = df.filter(pl.col("c") > 0)
+            fig.add_trace(
+                go.Scatter(
+                    x=censored["t"],
+                    y=censored["S"],
+                    mode="markers",
+                    marker=dict(symbol="cross-thin", size=9, line_color=color),
+                    customdata=censored["c"],
+                    hovertemplate="day %{x}: %{customdata} censored",
+                    name=f"{name} (censored)",
+                    showlegend=False,
+                )
+            )
+        fig.add_hline(y=0.5, line_dash="dot", line_color="gray")
+        fig.update_layout(
+            title=f"Share of Pairs Not Yet Recovered ({km_metric.title()} Recovery)",
+            xaxis_title="Days Since Crash",
+            yaxis_title="Not Yet Recovered",
+            yaxis_range=[0, 1.02],
+            height=450,
+        )
+        return fig
+
+    fig_km = cached_figure("km_curves", km_figure, km_metric, km_group)
+    st.plotly_chart(fig_km, use_container_width=True)
+
+    km_medians = median_ttr(km_curves, [] if km_group is None else [km_group])
+    st.dataframe(
+        km_medians.rename(
+            {
+                "n": "Pairs",
+                "recovered": "Recovered",
+                "censored": "Censored",
+                "median": "Median TTR (days)",
+                "median_lo": "95% CI low",
+                "median_hi": "95% CI high",
+            }
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    # The views below keep every pair but never treat a censored TTR (the
+    # TTR_DEFAULT placeholder) as a recovery time: histograms and scatters
+    # mark censored pairs, and summaries are Kaplan-Meier medians.
+    censored_label = f"Not recovered by day {TTR_DEFAULT}"
+    status_colors = {"Recovered": None, censored_label: "#9e9e9e"}
+    ttr_view = ttr_filtered.assign(
+        status_full=np.where(
+            ttr_filtered["censored_full"], censored_label, "Recovered"
+        ),
+        status_half=np.where(
+            ttr_filtered["censored_half"], censored_label, "Recovered"
+        ),
+    )
+
+    def median_bars(group, title, label):
+        """KM median TTR (full) per ``group`` value with its 95% interval."""
+        # a median (or bound) that was never reached is drawn at the window
+        # end, hatched: the true value lies beyond it
+        y = pl.col("median").fill_null(TTR_DEFAULT)
+        medians = median_ttr(survival_curves("full", group), [group]).with_columns(
+            y=y,
+            err_hi=(pl.col("median_hi").fill_null(TTR_DEFAULT) - y).clip(0),
+            err_lo=(y - pl.col("median_lo").fill_null(y)).clip(0),
+            label=pl.when(pl.col("median").is_null())
+            .then(pl.lit(f"> {TTR_DEFAULT} d"))
+            .otherwise(pl.format("{} d", "median")),
+            pattern=pl.when(pl.col("median").is_null())
+            .then(pl.lit("/"))
+            .otherwise(pl.lit("")),
+        )
+        fig = go.Figure(
+            go.Bar(
+                x=medians[group].to_list(),
+                y=medians["y"].to_list(),
+                text=medians["label"].to_list(),
+                marker_pattern_shape=medians["pattern"].to_list(),
+                marker_color=px.colors.qualitative.Plotly[: medians.height],
+                error_y=dict(
+                    type="data",
+                    symmetric=False,
+                    array=medians["err_hi"].to_list(),
+                    arrayminus=medians["err_lo"].to_list(),
+                ),
+                customdata=medians.select("n", "censored").rows(),
+                hovertemplate="%{x}: median %{text}<br>%{customdata[0]} pairs, "
+                "%{customdata[1]} censored<extra></extra>",
+            )
+        )
+        fig.update_layout(
+            title=title,
+            xaxis_title=label,
+            yaxis_title="Median Days to Full Recovery (KM)",
+            showlegend=False,
+            height=400,
+        )
+        return fig
+
+    def km_trend(fig, medians, x):
+        """Overlay KM medians on a TTR scatter in place of a fitted trend."""
+        fig.add_trace(
+            go.Scatter(
+                x=medians[x],
+                y=medians["median"],
+                mode="lines+markers",
+                line=dict(color="black", width=2),
+                name="KM median",
+            )
+        )
+        return fig
+
     # TTR Distributions
     col1, col2 = st.columns(2)
 
     with col1:
         st.subheader("Distribution of TTR (Full Recovery)")
-        fig7 = px.histogram(
-            ttr_filtered,
-            x="TTR_full",
-            nbins=20,
-            title="Distribution of TTR (Full Recovery)",
-            labels={"TTR_full": "Days to Full Recovery", "count": "Frequency"},
-            color_discrete_sequence=["#2ca02c"],
-        )
-        fig7.update_layout(showlegend=False, height=400)
+
+        def ttr_full_histogram():
+            fig7 = px.histogram(
+                ttr_view,
+                x="TTR_full",
+                color="status_full",
+                nbins=20,
+                title="Distribution of TTR (Full Recovery)",
+                labels={
+                    "TTR_full": "Days to Full Recovery",
+                    "count": "Frequency",
+                    "status_full": "",
+                },
+                color_discrete_map={**status_colors, "Recovered": "#2ca02c"},
+            )
+            fig7.update_layout(height=400)
+            return fig7
+
+        fig7 = cached_figure("ttr_full_histogram", ttr_full_histogram)
         st.plotly_chart(fig7, use_container_width=True)
 
     with col2:
         st.subheader("Distribution of TTR (Half Recovery)")
-        fig8 = px.histogram(
-            ttr_filtered,
-            x="TTR_half",
-            nbins=20,
-            title="Distribution of TTR (Half Recovery)",
-            labels={"TTR_half": "Days to Half Recovery", "count": "Frequency"},
-            color_discrete_sequence=["#ff7f0e"],
-        )
-        fig8.update_layout(showlegend=False, height=400)
+
+        def ttr_half_histogram():
+            fig8 = px.histogram(
+                ttr_view,
+                x="TTR_half",
+                color="status_half",
+                nbins=20,
+                title="Distribution of TTR (Half Recovery)",
+                labels={
+                    "TTR_half": "Days to Half Recovery",
+                    "count": "Frequency",
+                    "status_half": "",
+                },
+                color_discrete_map={**status_colors, "Recovered": "#ff7f0e"},
+            )
+            fig8.update_layout(height=400)
+            return fig8
+
+        fig8 = cached_figure("ttr_half_histogram", ttr_half_histogram)
         st.plotly_chart(fig8, use_container_width=True)
 
     # TTR by Category and Manufacturer
@@ -430,32 +935,24 @@ with tab2:
 
     with col1:
         st.subheader("TTR by Severity")
-        fig9 = px.box(
-            ttr_filtered,
-            x="category",
-            y="TTR_full",
-            color="category",
-            title="TTR (Full) by Crash Severity",
-            labels={"TTR_full": "Days to Full Recovery", "category": "Severity"},
-            category_orders={"category": ["Minor", "Moderate", "Severe"]},
-        )
-        fig9.update_layout(showlegend=False, height=400)
+
+        def ttr_by_severity():
+            return median_bars(
+                "category", "Median TTR (Full) by Crash Severity", "Severity"
+            )
+
+        fig9 = cached_figure("ttr_by_severity", ttr_by_severity)
         st.plotly_chart(fig9, use_container_width=True)
 
     with col2:
         st.subheader("TTR by Manufacturer")
-        fig10 = px.box(
-            ttr_filtered,
-            x="manufacturer",
-            y="TTR_full",
-            color="manufacturer",
-            title="TTR by Aircraft Manufacturer",
-            labels={
-                "TTR_full": "Days to Full Recovery",
-                "manufacturer": "Manufacturer",
-            },
-        )
-        fig10.update_layout(showlegend=False, height=400)
+
+        def ttr_by_manufacturer():
+            return median_bars(
+                "manufacturer", "Median TTR by Aircraft Manufacturer", "Manufacturer"
+            )
+
+        fig10 = cached_figure("ttr_by_manufacturer", ttr_by_manufacturer)
         st.plotly_chart(fig10, use_container_width=True)
 
     # TTR Over Time
@@ -463,116 +960,188 @@ with tab2:
 
     with col1:
         st.subheader("TTR Over Time")
-        fig11 = px.scatter(
-            ttr_filtered,
-            x="date",
-            y="TTR_full",
-            color="category",
-            title="TTR Over Time (Linear Trend)",
-            labels={"date": "Event Date", "TTR_full": "Days to Full Recovery"},
-            trendline="ols",
-            trendline_scope="overall",
-        )
-        fig11.update_layout(height=400)
+
+        def ttr_over_time():
+            fig11 = px.scatter(
+                ttr_view,
+                x="date",
+                y="TTR_full",
+                color="category",
+                symbol="status_full",
+                title="TTR Over Time (Kaplan-Meier Median per Year)",
+                labels={
+                    "date": "Event Date",
+                    "TTR_full": "Days to Full Recovery",
+                    "status_full": "",
+                },
+            )
+            yearly = median_ttr(survival_curves("full", "year"), ["year"])
+            yearly = yearly.with_columns(date=pl.date(pl.col("year"), 7, 1))
+            fig11.update_layout(height=400)
+            return km_trend(fig11, yearly, "date")
+
+        fig11 = cached_figure("ttr_over_time", ttr_over_time)
         st.plotly_chart(fig11, use_container_width=True)
 
     with col2:
         st.subheader("TTR vs Fatalities")
-        fig12 = px.scatter(
-            ttr_filtered,
-            x="fatalities",
-            y="TTR_full",
-            color="category",
-            title="TTR vs Total Fatalities",
-            labels={
-                "fatalities": "Number of Fatalities",
-                "TTR_full": "Days to Full Recovery",
-            },
-            trendline="ols",
-            trendline_scope="overall",
-        )
-        fig12.update_layout(height=400)
+
+        def ttr_vs_fatalities():
+            fig12 = px.scatter(
+                ttr_view,
+                x="fatalities",
+                y="TTR_full",
+                color="category",
+                symbol="status_full",
+                title="TTR vs Total Fatalities (Kaplan-Meier Median per Band)",
+                labels={
+                    "fatalities": "Number of Fatalities",
+                    "TTR_full": "Days to Full Recovery",
+                    "status_full": "",
+                },
+            )
+            # bands of 40 fatalities, plotted at their midpoints
+            bands = km_summary(
+                pl.from_pandas(
+                    ttr_view[["TTR_full", "censored_full", "fatalities"]]
+                ).with_columns(band=pl.col("fatalities") // 40 * 40 + 20),
+                ["band"],
+            ).rename({"TTR_full_median": "median"})
+            fig12.update_layout(height=400)
+            return km_trend(fig12, bands.sort("band"), "band")
+
+        fig12 = cached_figure("ttr_vs_fatalities", ttr_vs_fatalities)
         st.plotly_chart(fig12, use_container_width=True)
 
 # TAB 3: CAR/CAAR Analysis
-with tab3:
+with tab3, timed("figures.car"):
     st.header("Cumulative Abnormal Returns (CAR/CAAR) Analysis")
     st.markdown("""
     CAR represents the cumulative abnormal return around an event. CAAR is the average CAR across all events.
     Day 0 represents the event date.
     """)
 
+    # sidebar filters -> one row mask over the CAR matrix
+    with timed("filter.car_matrix") as span:
+        car_mask = car_mat.select(
+            categories=severity_filter,
+            manufacturers=manufacturer_filter,
+            years=year_range,
+        )
+        span.rows = int(car_mask.sum())
+    caar_by_ticker = cached_table(
+        "caar_by_ticker", lambda: car_mat.caar_by("tkr", car_mask)
+    ).to_pandas()
+
     # Overall CAAR
     st.subheader("Average CAR Across All Events (CAAR)")
-    caar_overall = car_df[car_df["ticker"] == "Overall"]
-    fig13 = px.line(
-        caar_overall,
-        x="rel_day",
-        y="CAAR",
-        title="CAAR: Average Cumulative Abnormal Returns",
-        labels={"rel_day": "Days Relative to Event", "CAAR": "CAAR"},
-        markers=True,
-    )
-    fig13.add_hline(
-        y=0, line_dash="dash", line_color="red", annotation_text="Zero Line"
-    )
-    fig13.add_vline(
-        x=0, line_dash="dash", line_color="gray", annotation_text="Event Date"
-    )
-    fig13.update_layout(height=500)
+    caar_overall = cached_table("caar", lambda: car_mat.caar(car_mask)).to_pandas()
+
+    def caar_line():
+        fig13 = px.line(
+            caar_overall,
+            x="rel_day",
+            y="CAAR",
+            error_y="SE",
+            hover_data=["n"],
+            title="CAAR: Average Cumulative Abnormal Returns",
+            labels={"rel_day": "Days Relative to Event", "CAAR": "CAAR"},
+            markers=True,
+        )
+        fig13.add_hline(
+            y=0, line_dash="dash", line_color="red", annotation_text="Zero Line"
+        )
+        fig13.add_vline(
+            x=0, line_dash="dash", line_color="gray", annotation_text="Event Date"
+        )
+        fig13.update_layout(height=500)
+        return fig13
+
+    fig13 = cached_figure("caar_line", caar_line)
     st.plotly_chart(fig13, use_container_width=True)
 
     # CAAR by Ticker
     st.subheader("CAAR by Selected Tickers")
-    caar_by_ticker = car_df[car_df["ticker"] != "Overall"]
-    fig14 = px.line(
-        caar_by_ticker,
-        x="rel_day",
-        y="CAAR",
-        color="ticker",
-        title="CAAR Comparison by Stock Ticker",
-        labels={
-            "rel_day": "Days Relative to Event",
-            "CAAR": "CAAR",
-            "ticker": "Ticker",
-        },
-        markers=True,
-    )
-    fig14.add_hline(y=0, line_dash="dash", line_color="gray")
-    fig14.add_vline(
-        x=0, line_dash="dash", line_color="gray", annotation_text="Event Date"
-    )
-    fig14.update_layout(height=500)
+
+    def caar_by_ticker_lines():
+        fig14 = px.line(
+            caar_by_ticker[caar_by_ticker["tkr"].isin(["BA", "EADSY", "AAL", "DAL"])],
+            x="rel_day",
+            y="CAAR",
+            color="tkr",
+            title="CAAR Comparison by Stock Ticker",
+            labels={
+                "rel_day": "Days Relative to Event",
+                "CAAR": "CAAR",
+                "tkr": "Ticker",
+            },
+            markers=True,
+        )
+        fig14.add_hline(y=0, line_dash="dash", line_color="gray")
+        fig14.add_vline(
+            x=0, line_dash="dash", line_color="gray", annotation_text="Event Date"
+        )
+        fig14.update_layout(height=500)
+        return fig14
+
+    fig14 = cached_figure("caar_by_ticker_lines", caar_by_ticker_lines)
     st.plotly_chart(fig14, use_container_width=True)
 
     # Individual ticker analysis
     st.subheader("Individual Ticker Analysis")
-    selected_ticker = st.selectbox("Select Ticker", ["BA", "EADSY", "AAL", "DAL"])
-    ticker_data = car_df[car_df["ticker"] == selected_ticker]
-
-    fig15 = go.Figure()
-    fig15.add_trace(
-        go.Scatter(
-            x=ticker_data["rel_day"],
-            y=ticker_data["CAAR"],
-            mode="lines+markers",
-            name=selected_ticker,
-            line=dict(width=3),
-            marker=dict(size=8),
+    selected_ticker = st.selectbox("Select Ticker", car_mat.labels["tkr"])
+
+    def ticker_caar_band():
+        ticker_data = caar_by_ticker[caar_by_ticker["tkr"] == selected_ticker]
+
+        fig15 = go.Figure()
+        fig15.add_trace(
+            go.Scatter(
+                x=ticker_data["rel_day"],
+                y=ticker_data["CAAR"] + 1.96 * ticker_data["SE"],
+                mode="lines",
+                line=dict(width=0),
+                showlegend=False,
+                hoverinfo="skip",
+            )
         )
-    )
-    fig15.add_hline(y=0, line_dash="dash", line_color="red")
-    fig15.add_vline(x=0, line_dash="dash", line_color="gray")
-    fig15.update_layout(
-        title=f"CAAR for {selected_ticker}",
-        xaxis_title="Days Relative to Event",
-        yaxis_title="CAAR",
-        height=400,
-    )
+        fig15.add_trace(
+            go.Scatter(
+                x=ticker_data["rel_day"],
+                y=ticker_data["CAAR"] - 1.96 * ticker_data["SE"],
+                mode="lines",
+                line=dict(width=0),
+                fill="tonexty",
+                fillcolor="rgba(31, 119, 180, 0.2)",
+                name="95% CI",
+                hoverinfo="skip",
+            )
+        )
+        fig15.add_trace(
+            go.Scatter(
+                x=ticker_data["rel_day"],
+                y=ticker_data["CAAR"],
+                mode="lines+markers",
+                name=selected_ticker,
+                line=dict(width=3),
+                marker=dict(size=8),
+            )
+        )
+        fig15.add_hline(y=0, line_dash="dash", line_color="red")
+        fig15.add_vline(x=0, line_dash="dash", line_color="gray")
+        fig15.update_layout(
+            title=f"CAAR for {selected_ticker}",
+            xaxis_title="Days Relative to Event",
+            yaxis_title="CAAR",
+            height=400,
+        )
+        return fig15
+
+    fig15 = cached_figure("ticker_caar_band", ticker_caar_band, selected_ticker)
     st.plotly_chart(fig15, use_container_width=True)
 
 # TAB 4: Deep Dive
-with tab4:
+with tab4, timed("figures.deep_dive"):
     st.header("🔍 Deep Dive Analysis")
 
     # Summary statistics
@@ -585,9 +1154,16 @@ with tab4:
         st.dataframe(mae_stats, use_container_width=True)
 
     with col2:
-        st.write("**TTR Statistics**")
-        ttr_stats = ttr_filtered["TTR_full"].describe()
-        st.dataframe(ttr_stats, use_container_width=True)
+        st.write("**TTR Statistics (Kaplan-Meier)**")
+        ttr_stats = pl.concat(
+            [
+                median_ttr(survival_curves(metric)).select(
+                    pl.lit(metric.title()).alias("recovery"), pl.all()
+                )
+                for metric in ("full", "half")
+            ]
+        )
+        st.dataframe(ttr_stats, use_container_width=True, hide_index=True)
 
     # By Severity breakdown
     st.subheader("Analysis by Severity Category")
@@ -621,39 +1197,310 @@ with tab4:
 
     # Geographic distribution
     st.subheader("Geographic Distribution of Incidents")
-    country_counts = mae_filtered["country"].value_counts().reset_index()
-    country_counts.columns = ["Country", "Count"]
-    fig16 = px.bar(
-        country_counts,
-        x="Country",
-        y="Count",
-        title="Incidents by Country",
-        color="Count",
-        color_continuous_scale="Blues",
-    )
-    fig16.update_layout(height=400)
+
+    def incidents_by_country():
+        country_counts = mae_filtered["country"].value_counts().reset_index()
+        country_counts.columns = ["Country", "Count"]
+        fig16 = px.bar(
+            country_counts,
+            x="Country",
+            y="Count",
+            title="Incidents by Country",
+            color="Count",
+            color_continuous_scale="Blues",
+        )
+        fig16.update_layout(height=400)
+        return fig16
+
+    fig16 = cached_figure("incidents_by_country", incidents_by_country)
     st.plotly_chart(fig16, use_container_width=True)
 
     # Correlation analysis
     st.subheader("Correlation Analysis")
-    correlation_data = mae_filtered[["MAE_signed", "fatalities", "injuries"]].corr()
-    fig17 = px.imshow(
-        correlation_data,
-        text_auto=".3f",
-        title="Correlation Matrix",
-        color_continuous_scale="RdBu_r",
-        aspect="auto",
-    )
-    fig17.update_layout(height=400)
+
+    def correlation_matrix():
+        correlation_data = mae_filtered[["MAE_signed", "fatalities", "injuries"]].corr()
+        fig17 = px.imshow(
+            correlation_data,
+            text_auto=".3f",
+            title="Correlation Matrix",
+            color_continuous_scale="RdBu_r",
+            aspect="auto",
+        )
+        fig17.update_layout(height=400)
+        return fig17
+
+    fig17 = cached_figure("correlation_matrix", correlation_matrix)
     st.plotly_chart(fig17, use_container_width=True)
 
-    # Raw data viewer
+    # Raw data viewer: filters, search and sort run on a lazy scan and only
+    # the visible page is collected, so the daily CAR rows stay browsable
     st.subheader("Raw Data Viewer")
-    if st.checkbox("Show MAE Data"):
-        st.dataframe(mae_filtered.head(100), use_container_width=True)
+    raw_tables = {
+        "MAE": pl.from_pandas(mae_filtered).lazy(),
+        "TTR": pl.from_pandas(ttr_filtered).lazy(),
+    }
+    if snapshot.data["car_rows"] is not None:
+        raw_tables["CAR (daily)"] = filter_rows(
+            snapshot.data["car_rows"],
+            {"category": severity_filter, "manufacturer": manufacturer_filter},
+            years=year_range,
+        )
+
+    col1, col2, col3, col4 = st.columns([1, 2, 1, 1])
+    with col1:
+        raw_table = st.radio("Table", list(raw_tables))
+    with col2:
+        raw_search = st.text_input(
+            "Search", placeholder="text in any column, e.g. DAL or severe"
+        ).strip()
+    raw_rows = filter_rows(raw_tables[raw_table], search=raw_search or None)
+    with col3:
+        raw_sort = st.selectbox(
+            "Sort by", ["(table order)", *raw_rows.collect_schema().names()]
+        )
+        raw_descending = st.toggle("Descending")
+    with col4:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+
+    n_rows = figure_cache.get_or_build(
+        version,
+        ("raw_count", filter_state, raw_table, raw_search),
+        partial(count_rows, raw_rows),
+        JSON,
+    )
+    n_pages = max(1, -(-n_rows // page_size))
+    # the label changes with the page count, which resets the page to 1
+    page_no = st.number_input(
+        f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1
+    )
+    sort_column = None if raw_sort == "(table order)" else raw_sort
+    offset = (page_no - 1) * page_size
+    raw_page = cached_table(
+        "raw_page",
+        partial(page, raw_rows, sort_column, raw_descending, offset, page_size),
+        raw_table,
+        raw_search,
+        sort_column,
+        raw_descending,
+        offset,
+        page_size,
+    )
+    st.dataframe(raw_page, use_container_width=True, hide_index=True)
+    st.caption(
+        f"Rows {min(offset + 1, n_rows):,}-{offset + raw_page.height:,} "
+        f"of {n_rows:,}"
+    )
+
+    # exports are written by a streaming sink when the button is clicked
+    col1, col2 = st.columns(2)
+    export_name = raw_table.split()[0].lower()
+    with col1:
+        st.download_button(
+            "⬇️ Export CSV",
+            data=partial(export, raw_rows, "csv"),
+            file_name=f"{export_name}.csv",
+            mime="text/csv",
+        )
+    with col2:
+        st.download_button(
+            "⬇️ Export Parquet",
+            data=partial(export, raw_rows, "parquet"),
+            file_name=f"{export_name}.parquet",
+            mime="application/octet-stream",
+        )
 
-    if st.checkbox("Show TTR Data"):
-        st.dataframe(ttr_filtered.head(100), use_container_width=True)
+# TAB 5: Price History
+with tab5, timed("figures.price_history"):
+    st.header("💹 Price History")
+    st.markdown("""
+    Daily closes with crash markers colored by severity. The series is decimated to the
+    point budget on the server and re-decimated for every zoom range, so long histories
+    stay responsive.
+    """)
+
+    panel = snapshot.data["panel"]
+    crash_index = snapshot.data["crash_index"]
+    if not snapshot.data["from_store"]:
+        st.info("No materialized return panel found - showing simulated prices.")
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        tickers = list(panel.tickers)
+        price_ticker = st.selectbox(
+            "Ticker",
+            tickers,
+            index=tickers.index("BA") if "BA" in tickers else 0,
+        )
+    with col2:
+        method = st.radio(
+            "Decimation",
+            METHODS,
+            horizontal=True,
+            format_func={"lttb": "LTTB", "minmax": "Min/Max"}.get,
+        )
+    with col3:
+        n_points = st.select_slider(
+            "Point budget", options=[500, 1000, 1500, 2000, 3000], value=1500
+        )
+
+    first_day, last_day = panel.dates[0].item(), panel.dates[-1].item()
+    view = st.slider(
+        "Zoom",
+        min_value=first_day,
+        max_value=last_day,
+        value=(first_day, last_day),
+        format="YYYY-MM-DD",
+    )
+
+    series = cached(
+        "price_series",
+        price_series,
+        version,
+        panel,
+        price_ticker,
+        view[0],
+        view[1],
+        n_points,
+        method,
+    )
+    markers = crash_markers(
+        crash_index, panel, price_ticker, view[0], view[1], max_markers=n_points // 4
+    ).to_pandas()
+    markers["category"] = markers["category"].fillna("unknown").str.title()
+    markers = markers[
+        markers["category"].isin(severity_filter) | (markers["category"] == "Unknown")
+    ]
+
+    def price_history():
+        fig18 = go.Figure()
+        fig18.add_trace(
+            go.Scattergl(
+                x=series["date"],
+                y=series["close"],
+                mode="lines",
+                name=price_ticker,
+                line=dict(color="#1f77b4", width=1.5),
+            )
+        )
+        severity_colors = {
+            "Minor": "#2ca02c",
+            "Moderate": "#ff7f0e",
+            "Severe": "#d62728",
+            "Unknown": "gray",
+        }
+        for category, color in severity_colors.items():
+            crashes = markers[markers["category"] == category]
+            if crashes.empty:
+                continue
+            fig18.add_trace(
+                go.Scatter(
+                    x=crashes["date"],
+                    y=crashes["close"],
+                    mode="markers",
+                    name=f"{category} crash",
+                    marker=dict(color=color, size=9, symbol="x"),
+                    customdata=crashes[["ev_id", "ev_date"]],
+                    hovertemplate="%{customdata[0]}<br>event %{customdata[1]}"
+                    "<br>close %{y:.2f}<extra></extra>",
+                )
+            )
+        fig18.update_layout(
+            title=f"{price_ticker} Close Price",
+            xaxis_title="Date",
+            yaxis_title="Close",
+            height=500,
+        )
+        return fig18
+
+    fig18 = cached_figure(
+        "price_history", price_history, price_ticker, view, n_points, method
+    )
+    st.plotly_chart(fig18, use_container_width=True)
+    lo, hi = view_range(panel, view[0], view[1])
+    st.caption(
+        f"{len(series):,} of {hi - lo:,} trading days drawn, "
+        f"{len(markers):,} crash markers"
+    )
+
+# Performance (hidden): rendered last so it covers every phase of this rerun
+if show_perf:
+    with tabs[5]:
+        st.header("⚙️ Performance")
+        st.markdown("""
+        Phase timings of this rerun (data loading, filtering, figure building per tab),
+        cache hits / misses, and rolling percentiles over the last 500 timings of each
+        phase in this server process.
+        """)
+        spans = RECORDER.run_spans(perf_run).to_pandas()
+        counters = perf_run["counters"]
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            top = spans[spans["parent"].isna()]
+            st.metric("Timed phases this rerun", f"{top['ms'].sum():,.0f} ms")
+        with col2:
+            hits = sum(v for k, v in counters.items() if k.endswith(".hit"))
+            misses = sum(v for k, v in counters.items() if k.endswith(".miss"))
+            st.metric("Cache hits / misses", f"{hits} / {misses}")
+        with col3:
+            peak = spans["peak_mb"].max()
+            st.metric(
+                "Peak RSS (data phase)", "n/a" if pd.isna(peak) else f"{peak:,.1f} MB"
+            )
+
+        info = figure_cache.info()
+        retired = watcher.retired()
+        st.caption(
+            f"Dataset {version}: loaded in {snapshot.load_seconds:.2f} s, "
+            f"{time.time() - snapshot.loaded_at:,.0f} s ago; "
+            f"{watcher.reloads} background reloads"
+            + (
+                f"; previous versions still in use: {', '.join(retired)}"
+                if retired
+                else ""
+            )
+            + (
+                f"; last reload failed: {watcher.last_error}"
+                if watcher.last_error
+                else ""
+            )
+        )
+        st.caption(
+            f"Figure cache (version {version}): {info['memory_items']} in memory, "
+            f"{(info['disk_bytes'] or 0) / 1024**2:,.1f} of "
+            f"{info['max_bytes'] / 1024**2:,.0f} MB on disk; "
+            f"{info['memory_hits']} memory hits, {info['disk_hits']} disk hits, "
+            f"{info['misses']} builds since the server started"
+        )
+
+        fig19 = px.bar(
+            spans,
+            x="ms",
+            y="name",
+            orientation="h",
+            color="parent",
+            hover_data=["rows"],
+            title="Phase Timings (this rerun)",
+        )
+        fig19.update_layout(height=max(300, 28 * len(spans)), yaxis_title="")
+        st.plotly_chart(fig19, use_container_width=True)
+
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.subheader("Rolling Percentiles (ms)")
+            st.dataframe(
+                RECORDER.percentiles().to_pandas(),
+                use_container_width=True,
+                hide_index=True,
+            )
+        with col2:
+            st.subheader("Counters (this rerun)")
+            st.dataframe(
+                pd.DataFrame(sorted(counters.items()), columns=["counter", "value"]),
+                use_container_width=True,
+                hide_index=True,
+            )
 
 # Footer
 st.markdown("---")
@@ -666,3 +1513,8 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+
+# The watcher's callbacks keep the globals of the rerun that created them
+# alive, so drop this rerun's references to the snapshot: a swapped-out
+# version must only be held by reruns still in flight
+del snapshot, car_mat, panel, crash_index, raw_tables, raw_rows
@@ -0,0 +1,112 @@
+"""Direct, per-pair versions of the batched numeric cores, for the tests.
+
+They follow the notebook's loops (data/final.ipynb ``compute_car`` /
+``compute_TTR``) one (event, ticker) at a time and are kept deliberately
+simple: slow and obviously right.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+
+
+def random_closes(
+    loadings: dict[str, dict[str, float]],
+    start: date,
+    end: date,
+    seed: int = 0,
+    gaps: dict[str, list[date]] | None = None,
+) -> pl.DataFrame:
+    """Weekday (date, tkr, close) random walks.
+
+    ``loadings`` maps each ticker to its betas on other tickers; one with
+    none is a factor (an index, ETF or FX rate) and must come before the
+    tickers loading on it. ``gaps`` lists days a ticker does not trade.
+    """
+    rng = np.random.default_rng(seed)
+    days = pl.date_range(start, end, eager=True)
+    days = days.filter(days.dt.weekday() <= 5)
+    returns = {}
+    for tkr, betas in loadings.items():
+        r = rng.normal(0.0002, 0.01 if not betas else 0.015, len(days))
+        returns[tkr] = r + sum(b * returns[f] for f, b in betas.items())
+    out = pl.concat(
+        pl.DataFrame({"date": days, "tkr": tkr, "close": 50 * np.cumprod(1 + r)})
+        for tkr, r in returns.items()
+    )
+    for tkr, skip in (gaps or {}).items():
+        out = out.filter(~((pl.col("tkr") == tkr) & pl.col("date").is_in(skip)))
+    return out
+
+
+def window_returns(
+    prices: pl.DataFrame, tkr: str, start: date, end: date, name: str
+) -> pl.DataFrame:
+    """pct_change of ``tkr``'s closes sliced to [start, end], first row dropped."""
+    return (
+        prices.filter((pl.col("tkr") == tkr) & pl.col("date").is_between(start, end))
+        .sort("date")
+        .select("date", pl.col("close").pct_change().alias(name))
+        .drop_nulls()
+    )
+
+
+def event_study(
+    prices: pl.DataFrame,
+    tkr: str,
+    factors: list[str],
+    ev_date: date,
+    est_window: tuple[int, int],
+    evt_window: tuple[int, int],
+    skip: tuple[tuple[date, date], ...] = (),
+):
+    """OLS of ``tkr``'s returns on a constant and ``factors`` via ``lstsq``.
+
+    Returns the coefficients (constant first), the number of estimation
+    days and the event-window (date, AR, CAR, rel_day) rows. ``skip`` lists
+    estimation day ranges to leave out.
+    """
+
+    def joined(lo, hi):
+        lo, hi = ev_date + timedelta(days=lo), ev_date + timedelta(days=hi)
+        df = window_returns(prices, tkr, lo, hi, "r")
+        for i, f in enumerate(factors):
+            df = df.join(window_returns(prices, f, lo, hi, f"x{i}"), on="date")
+        return df.sort("date")
+
+    est = joined(*est_window)
+    for lo, hi in skip:
+        est = est.filter(~pl.col("date").is_between(lo, hi))
+    X = np.column_stack(
+        [np.ones(est.height)] + [est[f"x{i}"].to_numpy() for i in range(len(factors))]
+    )
+    coef = np.linalg.lstsq(X, est["r"].to_numpy(), rcond=None)[0]
+
+    evt = joined(*evt_window)
+    expected = coef[0] + sum(
+        coef[i + 1] * evt[f"x{i}"].to_numpy() for i in range(len(factors))
+    )
+    car = (
+        evt.select("date", AR=evt["r"].to_numpy() - expected)
+        .with_columns(CAR=pl.col("AR").cum_sum())
+        .with_columns(rel_day=(pl.col("date") - ev_date).dt.total_days())
+    )
+    return coef, est.height, car
+
+
+def compute_ttr(car: pl.DataFrame, mae: float | None, ttr_default: int):
+    """compute_TTR's per-pair loop: first rel_day >= 0 of full / half recovery."""
+    df = car.filter(pl.col("rel_day") >= 0).sort("rel_day")
+    if df.height == 0 or mae is None:
+        return ttr_default, ttr_default
+    c, rel = df["CAR"].to_numpy(), df["rel_day"].to_numpy()
+    full = c >= 0 if mae < 0 else c <= 0
+    half = c >= mae * 0.5 if mae < 0 else c <= mae * 0.5
+    return tuple(int(rel[hit][0]) if hit.any() else ttr_default for hit in (full, half))
+
+
+def signed_mae(car: pl.DataFrame, short_window: int) -> float:
+    """The short-window CAR extreme with the larger magnitude."""
+    short = car.filter(pl.col("rel_day").abs() <= short_window)["CAR"]
+    return short.max() if abs(short.max()) >= abs(short.min()) else short.min()
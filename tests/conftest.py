@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the aviation package is used from the checkout, not installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,141 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from aviation.attention import AttentionStore, FileSource, attention_xcorr, peak_lags
+
+EV_DATE = date(2019, 3, 10)
+DAYS = [EV_DATE + timedelta(days=d) for d in range(-10, 21)]
+
+
+def test_file_source_reads_wide_csv_and_long_parquet(tmp_path):
+    wide = pl.DataFrame({"date": DAYS, "Boeing crash": range(len(DAYS)), "other": 1.0})
+    wide.write_csv(tmp_path / "E1.csv")
+    long = wide.unpivot(
+        index="date",
+        on=["Boeing crash"],
+        variable_name="keyword",
+        value_name="interest",
+    )
+    long.write_parquet(tmp_path / "E2.parquet")
+
+    source = FileSource(str(tmp_path))
+    start, end = EV_DATE - timedelta(days=2), EV_DATE + timedelta(days=2)
+    for ev_id in ("E1", "E2"):
+        got = source.fetch(ev_id, ["Boeing crash", "plane crash"], start, end)
+        assert got.columns == ["date", "keyword", "interest"]
+        assert got["keyword"].unique().to_list() == ["Boeing crash"]
+        assert got["date"].to_list() == [start + timedelta(days=d) for d in range(5)]
+        assert got["interest"].to_list() == [8.0, 9.0, 10.0, 11.0, 12.0]
+
+    with pytest.raises(FileNotFoundError):
+        source.fetch("E3", ["Boeing crash"], start, end)
+
+
+def test_store_fill_skips_stored_events_and_reports_missing(tmp_path):
+    files = tmp_path / "trends"
+    files.mkdir()
+    pl.DataFrame({"date": DAYS, "plane crash": 50.0}).write_csv(files / "E1.csv")
+    events = pl.DataFrame({"ev_id": ["E1", "E2"], "ev_date": [EV_DATE, EV_DATE]})
+    store = AttentionStore(str(tmp_path / "store"))
+
+    failed = store.fill(
+        events, FileSource(str(files)), keywords=lambda row: ["plane crash"]
+    )
+    assert failed == ["E2"]
+    assert store.has("E1") and not store.has("E2")
+    stored = store.read()
+    assert stored.height == len(DAYS)
+    assert stored["ev_id"].unique().to_list() == ["E1"]
+
+    # already stored: not fetched again, even from a source that would fail
+    assert store.fill(events.head(1), FileSource(str(tmp_path / "none"))) == []
+
+
+def test_store_fill_does_not_store_empty_answers(tmp_path):
+    files = tmp_path / "trends"
+    files.mkdir()
+    # a blank answer: the file exists but has no days in the window
+    pl.DataFrame(
+        {"date": [EV_DATE - timedelta(days=400)], "plane crash": 0.0}
+    ).write_csv(files / "E1.csv")
+    events = pl.DataFrame({"ev_id": ["E1"], "ev_date": [EV_DATE]})
+    store = AttentionStore(str(tmp_path / "store"))
+    source = FileSource(str(files))
+
+    assert store.fill(events, source, keywords=lambda row: ["plane crash"]) == ["E1"]
+    assert not store.has("E1")
+    assert store.read().height == 0
+
+    # fetched again once the answer has data
+    pl.DataFrame({"date": DAYS, "plane crash": 50.0}).write_csv(files / "E1.csv")
+    assert store.fill(events, source, keywords=lambda row: ["plane crash"]) == []
+    assert store.read().height == len(DAYS)
+
+
+def _direct_xcorr(a: np.ndarray, x: np.ndarray, lag: int) -> float:
+    """sum_t a[t] * x[t + lag] over demeaned series, missing days at the mean."""
+    a = np.where(np.isnan(a), 0.0, a - np.nanmean(a))
+    x = np.where(np.isnan(x), 0.0, x - np.nanmean(x))
+    if lag >= 0:
+        c = np.dot(a[: len(a) - lag], x[lag:])
+    else:
+        c = np.dot(a[-lag:], x[: len(x) + lag])
+    return c / np.sqrt((a**2).sum() * (x**2).sum())
+
+
+def test_fft_xcorr_matches_direct_computation():
+    rng = np.random.default_rng(0)
+    window, max_lag = (-5, 20), 7
+    rel = np.arange(window[0], window[1] + 1)
+    events = pl.DataFrame({"ev_id": ["E1", "E2"], "ev_date": [EV_DATE, EV_DATE]})
+
+    series, att, car = {}, [], []
+    for ev_id in ("E1", "E2"):
+        for kw in ("k1", "k2"):
+            a = rng.normal(50, 10, len(rel))
+            a[rng.choice(len(rel), 3, replace=False)] = np.nan
+            series[(ev_id, kw)] = a
+            att.append(
+                pl.DataFrame(
+                    {
+                        "ev_id": ev_id,
+                        "keyword": kw,
+                        "date": [EV_DATE + timedelta(days=int(d)) for d in rel],
+                        "interest": a,
+                    }
+                ).filter(pl.col("interest").is_not_nan())
+            )
+        x = rng.normal(0, 0.02, len(rel))
+        x[rng.choice(len(rel), 2, replace=False)] = np.nan
+        series[(ev_id, "BA")] = x
+        car.append(
+            pl.DataFrame(
+                {
+                    "date": [EV_DATE + timedelta(days=int(d)) for d in rel],
+                    "AR": x,
+                    "tkr": "BA",
+                    "ev_id": ev_id,
+                    "stock_type": "manufacturer",
+                }
+            ).filter(pl.col("AR").is_not_nan())
+        )
+
+    out = attention_xcorr(
+        pl.concat(att), pl.concat(car), events, window=window, max_lag=max_lag
+    )
+    # only same-event pairs, every lag once
+    assert out.height == 2 * 2 * (2 * max_lag + 1)
+    for row in out.iter_rows(named=True):
+        want = _direct_xcorr(
+            series[(row["ev_id"], row["keyword"])],
+            series[(row["ev_id"], "BA")],
+            row["lag"],
+        )
+        assert row["xcorr"] == pytest.approx(want, abs=1e-9)
+
+    peaks = peak_lags(out)
+    assert peaks.height == 4
+    assert (peaks["peak_xcorr"].abs() <= 1 + 1e-9).all()
@@ -0,0 +1,84 @@
+from datetime import date
+
+import numpy as np
+import polars as pl
+
+from aviation import batch
+
+
+def _prices(tickers) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    days = pl.date_range(date(2019, 1, 1), date(2020, 12, 31), eager=True)
+    return pl.concat(
+        pl.DataFrame(
+            {
+                "date": days,
+                "tkr": tkr,
+                "close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days)))),
+            }
+        )
+        for tkr in tickers
+    )
+
+
+def _items(ev_ids, tkrs) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "ev_id": ev_ids,
+            "ev_date": date(2020, 6, 1),
+            "stock_type": "operator",
+            "tkr": tkrs,
+            "market_tkr": "^GSPC",
+        }
+    )
+
+
+def test_retry_requeues_failed_items_after_prices_arrive(tmp_path):
+    root, prices = str(tmp_path / "queue"), tmp_path / "prices.parquet"
+    _prices(["DAL", "^GSPC"]).write_parquet(prices)
+    batch.plan_batch(
+        root, _items(["E1", "E2"], ["DAL", "AAL"]), (str(prices),), shard_size=1
+    )
+
+    assert batch.run_worker(root, worker="w1") == 2
+    state, _, failed = batch.collect(root)
+    assert state["ev_id"].to_list() == ["E1"]
+    assert failed.select("ev_id", "reason").rows() == [("E2", "no price data for AAL")]
+
+    # once the prices exist, retry requeues the item and clears its failure
+    _prices(["DAL", "AAL", "^GSPC"]).write_parquet(prices)
+    assert batch.retry_failed(root) == 1
+    assert batch.collect(root)[2].height == 0
+    assert batch.read_plan(root)["retries"] == 1
+
+    assert batch.run_worker(root, worker="w2") == 1
+    state, car, failed = batch.collect(root)
+    assert state["ev_id"].to_list() == ["E1", "E2"]
+    assert set(car["ev_id"]) == {"E1", "E2"} and failed.height == 0
+    assert batch.retry_failed(root) == 0
+
+
+def test_raising_shard_is_retried_then_run_item_by_item(tmp_path, monkeypatch):
+    root, prices = str(tmp_path / "queue"), tmp_path / "prices.parquet"
+    _prices(["DAL", "AAL", "^GSPC"]).write_parquet(prices)
+    batch.plan_batch(
+        root, _items(["E1", "BAD"], ["DAL", "AAL"]), (str(prices),), max_attempts=2
+    )
+
+    add_events = batch.add_events
+
+    def flaky(state, items, *args):
+        if "BAD" in items["ev_id"].to_list():
+            raise RuntimeError("corrupt item")
+        return add_events(state, items, *args)
+
+    monkeypatch.setattr(batch, "add_events", flaky)
+    assert batch.run_worker(root, worker="w1") == 1
+
+    status = batch.batch_status(root).row(0, named=True)
+    assert status["status"] == "done" and status["attempts"] == 2
+    state, _, failed = batch.collect(root)
+    assert state["ev_id"].to_list() == ["E1"]
+    assert failed.select("ev_id", "reason").rows() == [
+        ("BAD", "RuntimeError: corrupt item")
+    ]
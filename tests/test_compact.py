@@ -0,0 +1,69 @@
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from aviation.compact import compact_all, compact_path, read_cache, scan_cache
+
+
+@pytest.fixture
+def stocks_dir(tmp_path) -> str:
+    """Plain price / CAR / TTR caches in the pipeline's schemas."""
+    rng = np.random.default_rng(9)
+    days = [date(2019, 3, 1) + timedelta(days=i) for i in range(30)]
+    pl.DataFrame(
+        {
+            "date": days * 2,
+            "tkr": ["BA"] * 30 + ["DAL"] * 30,
+            "close": rng.uniform(20, 400, 60),
+        }
+    ).write_parquet(tmp_path / "price_cache.parquet")
+    pl.DataFrame(
+        {
+            "ev_id": ["E1"] * 20 + ["E2"] * 20,
+            "tkr": ["BA"] * 20 + ["DAL"] * 20,
+            "stock_type": ["manufacturer"] * 20 + ["operator"] * 20,
+            "date": days[:20] * 2,
+            "AR": rng.normal(0, 0.02, 40),
+            "CAR": rng.normal(0, 0.05, 40),
+        }
+    ).write_parquet(tmp_path / "car_cache.parquet")
+    pl.DataFrame(
+        {
+            "ev_id": ["E1", "E2"],
+            "tkr": ["BA", "DAL"],
+            "stock_type": ["manufacturer", "operator"],
+            "MAE_signed": [-0.04, 0.03],
+            "TTR_full": [12, 30],
+            "TTR_half": [4, 9],
+        }
+    ).write_parquet(tmp_path / "ttr_cache.parquet")
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("float32", [False, True])
+def test_compact_copy_reads_back_as_the_plain_cache(stocks_dir, float32):
+    events = pl.DataFrame(
+        {"ev_id": ["E1", "E2"], "ev_date": [date(2019, 3, 5), date(2019, 3, 6)]}
+    )
+    compact_all(stocks_dir, events, float32=float32)
+
+    for name in ("price_cache", "car_cache", "ttr_cache"):
+        path = os.path.join(stocks_dir, f"{name}.parquet")
+        assert os.path.exists(compact_path(path))
+        plain = pl.read_parquet(path)
+        got = read_cache(path)
+        # column order, dtypes and no derived rel_day
+        assert got.schema == plain.schema
+        assert scan_cache(path).collect_schema() == plain.schema
+        key = [c for c in ("ev_id", "tkr", "date") if c in plain.columns]
+        got, plain = got.sort(key), plain.sort(key)
+        for c, dtype in plain.schema.items():
+            if dtype == pl.Float64:
+                np.testing.assert_allclose(
+                    got[c], plain[c], rtol=1e-6 if float32 else 0
+                )
+            else:
+                assert got[c].to_list() == plain[c].to_list()
@@ -0,0 +1,165 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from aviation.decimate import (
+    crash_markers,
+    lttb,
+    minmax_buckets,
+    price_view,
+    read_crash_index,
+    write_crash_index,
+)
+from aviation.panel import build_return_panel
+
+START = date(2020, 1, 6)  # a Monday
+
+
+def _panel(n_days: int, skip=()):
+    """BA and DAL on weekdays; DAL does not trade on the ``skip`` days."""
+    days = [START + timedelta(days=d) for d in range(n_days)]
+    days = [d for d in days if d.weekday() < 5]
+    rng = np.random.default_rng(0)
+    return build_return_panel(
+        pl.DataFrame(
+            {
+                "date": days * 2,
+                "tkr": ["BA"] * len(days) + ["DAL"] * len(days),
+                "close": rng.uniform(50, 150, 2 * len(days)),
+            }
+        ).filter(~((pl.col("tkr") == "DAL") & pl.col("date").is_in(list(skip))))
+    )
+
+
+def _lttb_loop(x, y, n_out):
+    """The reference LTTB loop, one bucket at a time."""
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    out, a = [0], 0
+    for k in range(n_out - 2):
+        nxt_lo = int((k + 1) * every) + 1
+        nxt_hi = min(int((k + 2) * every) + 1, n)
+        mx, my = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        lo, hi = int(k * every) + 1, int((k + 1) * every) + 1
+        best = -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - mx) * (y[j] - y[a]) - (x[a] - x[j]) * (my - y[a]))
+            if area > best:
+                best, pick = area, j
+        out.append(pick)
+        a = pick
+    return np.array(out + [n - 1])
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 100), (997, 53), (50, 3)])
+def test_lttb_matches_reference_loop(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=np.float64)
+    y = np.cumsum(rng.normal(0, 1, n))
+    got = lttb(x, y, n_out)
+    assert len(got) == n_out
+    np.testing.assert_array_equal(got, _lttb_loop(x, y, n_out))
+
+
+def test_lttb_skips_nans_and_keeps_short_series():
+    y = np.array([1.0, np.nan, 3.0, 2.0, np.nan, 5.0])
+    np.testing.assert_array_equal(lttb(np.arange(6), y, 10), [0, 2, 3, 5])
+    y = np.r_[np.nan, np.sin(np.arange(200) / 10), np.nan]
+    got = lttb(np.arange(len(y)), y, 20)
+    assert got[0] == 1 and got[-1] == len(y) - 2
+    assert not np.isnan(y[got]).any()
+
+
+@pytest.mark.parametrize("n_out", [0, 1, 2])
+def test_lttb_below_three_points_keeps_the_endpoints(n_out):
+    y = np.r_[np.nan, np.arange(10.0), np.nan]
+    np.testing.assert_array_equal(lttb(np.arange(12), y, n_out), [1, 10])
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    rng = np.random.default_rng(1)
+    y = rng.normal(0, 1, 1000)
+    y[rng.choice(1000, 50, replace=False)] = np.nan
+    n_out = 42
+    got = set(minmax_buckets(y, n_out).tolist())
+
+    n_buckets = (n_out - 2) // 2
+    b = (np.arange(len(y)) * n_buckets) // len(y)
+    for k in range(n_buckets):
+        idx = np.flatnonzero((b == k) & ~np.isnan(y))
+        assert idx[np.argmin(y[idx])] in got and idx[np.argmax(y[idx])] in got
+    ok = np.flatnonzero(~np.isnan(y))
+    assert {ok[0], ok[-1]} <= got
+    assert len(got) <= n_out
+
+
+def test_price_view_is_bounded_at_any_zoom():
+    panel = _panel(2000)
+    full = price_view(panel, "BA", n_out=200)
+    assert full.height == 200
+    assert full["date"][0] == panel.dates[0] and full["date"][-1] == panel.dates[-1]
+
+    zoom = price_view(
+        panel, "BA", START + timedelta(days=30), START + timedelta(days=60)
+    )
+    assert zoom["date"][0] == date(2020, 2, 5) and zoom["date"][-1] == date(2020, 3, 6)
+    assert zoom.height == 23  # every trading day of the month, under the budget
+    with pytest.raises(KeyError):
+        price_view(panel, "XYZ")
+
+
+def test_crash_index_is_positioned_on_the_panel_it_is_read_with(tmp_path):
+    events = pl.DataFrame(
+        {
+            "ev_id": ["E1", "E2", "E3"],
+            "ev_date": [date(2020, 1, 11), date(2020, 1, 15), date(2030, 1, 1)],
+            "stock_type": "operator",
+            "tkr": "DAL",
+            "category": "severe",
+        }
+    )
+    path = write_crash_index(events, str(tmp_path / "crash_days.parquet"))
+
+    # a Saturday event lands on the following Monday, on either calendar
+    for panel in (_panel(20), _panel(60)):
+        index = read_crash_index(panel, path)
+        assert index["ev_id"].to_list() == ["E1", "E2"]  # E3 is past the panel
+        assert panel.dates[index["day_idx"]].tolist() == [
+            date(2020, 1, 13),
+            date(2020, 1, 15),
+        ]
+    assert read_crash_index(_panel(20), str(tmp_path / "none.parquet")).height == 0
+
+
+def test_crash_markers_use_the_previous_close_and_keep_the_most_severe(tmp_path):
+    panel = _panel(40, skip=[date(2020, 1, 15)])
+    dal = panel.index(["DAL"])[0]
+    days = [date(2020, 1, d) for d in (8, 9, 11, 14, 15, 16)]
+    events = pl.DataFrame(
+        {
+            "ev_id": [f"E{i}" for i in range(6)],
+            "ev_date": days,
+            "stock_type": "operator",
+            "tkr": "DAL",
+            "category": ["minor", "severe", "moderate", "minor", "severe", "minor"],
+        }
+    )
+    path = write_crash_index(events, str(tmp_path / "crash_days.parquet"))
+    index = read_crash_index(panel, path)
+
+    m = crash_markers(index, panel, "DAL")
+    assert m["ev_id"].to_list() == [f"E{i}" for i in range(6)]
+    assert m["date"][2] == date(2020, 1, 13)  # Saturday -> Monday
+    # DAL did not trade on the 15th: that marker sits on the 14th's close
+    t = np.searchsorted(panel.dates, np.array(["2020-01-14", "2020-01-15"], "M8[D]"))
+    assert m["date"][4] == date(2020, 1, 15)
+    assert np.isnan(panel.close[dal, t[1]])
+    assert m["close"][4] == m["close"][3] == panel.close[dal, t[0]]
+
+    top = crash_markers(index, panel, "DAL", max_markers=3)
+    assert top["ev_id"].to_list() == ["E1", "E2", "E4"]
+
+    view = crash_markers(index, panel, "DAL", date(2020, 1, 10), date(2020, 1, 14))
+    assert view["ev_id"].to_list() == ["E2", "E3"]
@@ -0,0 +1,103 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+
+from aviation.impact import fundamentals_impact_batch
+
+METRICS = ("revenue", "net_income", "cfo")
+
+
+def _impact_simple(df_quarterly, event_date, metrics, post_horiz_quarters, min_pre):
+    """fundamentals_event_impact_simple (data/financials.ipynb) without plots."""
+    event_date = pd.Timestamp(event_date)
+    df = df_quarterly.copy().sort_values("period_end")
+    df["quarter_start"] = (
+        pd.to_datetime(df["period_end"]).dt.to_period("Q").dt.start_time
+    )
+    df = df.drop_duplicates("quarter_start").reset_index(drop=True)
+    df["q_idx"] = np.arange(len(df))
+    pre = df[df["quarter_start"] < event_date]
+    post = df[df["quarter_start"] >= event_date]
+    if post_horiz_quarters is not None:
+        post = post.iloc[:post_horiz_quarters]
+
+    rows = []
+    for m in metrics:
+        pre_m = pre[["q_idx", m]].dropna()
+        if len(pre_m) < min_pre:
+            continue
+        b1, b0 = np.polyfit(pre_m["q_idx"].values, pre_m[m].values, 1)
+        for _, r in post.iterrows():
+            pred = b0 + b1 * r["q_idx"]
+            rows.append((m, r["quarter_start"].date(), r[m], pred, r[m] - pred))
+    return rows
+
+
+@pytest.fixture
+def panel() -> pd.DataFrame:
+    """Quarterly fundamentals with gaps, a restated quarter and a short history."""
+    rng = np.random.default_rng(6)
+    frames = []
+    for ticker, first, n_q in (
+        ("BA", "2014-03-31", 28),
+        ("DAL", "2014-03-31", 28),
+        ("AAL", "2017-06-30", 7),
+    ):
+        ends = pd.date_range(first, periods=n_q, freq="QE")
+        df = pd.DataFrame(
+            {
+                "ticker": ticker,
+                "period_end": ends,
+                **{
+                    m: 100 + np.arange(n_q) * rng.uniform(-3, 5) + rng.normal(0, 4, n_q)
+                    for m in METRICS
+                },
+            }
+        )
+        df.loc[rng.choice(n_q, 3, replace=False), "net_income"] = np.nan
+        frames.append(df)
+    # two filings for BA's 2016 Q3: the earlier period_end is kept
+    restated = frames[0].iloc[[10]].assign(period_end=pd.Timestamp("2016-08-15"))
+    restated[list(METRICS)] *= 1.5
+    return pd.concat([*frames, restated], ignore_index=True)
+
+
+@pytest.mark.parametrize("horizon", [8, None])
+def test_batch_matches_per_event_polyfit(panel, horizon):
+    events = pl.DataFrame(
+        {
+            "ev_id": ["E1", "E2", "E3"],
+            "ev_date": [date(2016, 2, 10), date(2018, 7, 1), date(2019, 5, 5)],
+            "acft_make": ["BOEING", "BOEING", "BOEING"],
+            "oper_name": ["DELTA AIR LINES INC", "AMERICAN AIRLINES INC", "X"],
+        }
+    )
+    got = fundamentals_impact_batch(events, panel, METRICS, horizon, min_pre_points=6)
+
+    pairs = [("E1", "BA"), ("E1", "DAL"), ("E2", "BA"), ("E2", "AAL"), ("E3", "BA")]
+    n_rows = 0
+    for ev_id, tkr in pairs:
+        ev_date = events.filter(pl.col("ev_id") == ev_id)["ev_date"].item()
+        want = _impact_simple(
+            panel[panel["ticker"] == tkr], ev_date, METRICS, horizon, 6
+        )
+        rows = got.filter((pl.col("ev_id") == ev_id) & (pl.col("tkr") == tkr))
+        assert sorted(rows.select("metric", "quarter_start").rows()) == sorted(
+            (m, q) for m, q, *_ in want
+        )
+        by_key = {(m, q): r for m, q, *r in want}
+        for row in rows.iter_rows(named=True):
+            actual, pred, delta = by_key[(row["metric"], row["quarter_start"])]
+            assert row["predicted"] == pytest.approx(pred, rel=1e-9)
+            if np.isnan(actual):
+                assert row["actual"] is None and row["delta"] is None
+            else:
+                assert row["actual"] == pytest.approx(actual)
+                assert row["delta"] == pytest.approx(delta, rel=1e-6, abs=1e-9)
+        n_rows += len(want)
+    # AAL has post-event quarters but only five points before E2
+    assert got.filter(pl.col("tkr") == "AAL").height == 0
+    assert got.height == n_rows > 0
@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+from _reference import compute_ttr, event_study, random_closes, signed_mae
+
+from aviation.incremental import (
+    KEY,
+    add_events,
+    empty_state,
+    mae_table,
+    ttr_table,
+    update,
+)
+
+EST_WINDOW, EVT_WINDOW, SHORT_WINDOW, TTR_DEFAULT = (-120, -21), (-5, 20), 5, 21
+
+
+@pytest.fixture(scope="module")
+def prices() -> pl.DataFrame:
+    return random_closes(
+        {"^GSPC": {}, "BA": {"^GSPC": 1.3}, "DAL": {"^GSPC": 0.8}},
+        date(2019, 1, 1),
+        date(2019, 12, 31),
+        seed=7,
+        gaps={"DAL": [date(2019, 7, 10), date(2019, 9, 3), date(2019, 9, 4)]},
+    )
+
+
+@pytest.fixture(scope="module")
+def pairs() -> pl.DataFrame:
+    ev_dates = [
+        date(2019, 6, 12),
+        date(2019, 7, 6),
+        date(2019, 9, 1),
+        date(2019, 10, 20),
+    ]
+    return pl.DataFrame(
+        {
+            "ev_id": [f"E{i}" for i in range(4) for _ in range(2)],
+            "ev_date": [d for d in ev_dates for _ in range(2)],
+            "stock_type": ["manufacturer", "operator"] * 4,
+            "tkr": ["BA", "DAL"] * 4,
+            "market_tkr": "^GSPC",
+        }
+    )
+
+
+def _fold(prices, pairs, cuts):
+    """add_events, then update() once per date range between ``cuts``."""
+    state = add_events(empty_state(), pairs, prices, EST_WINDOW, EVT_WINDOW)
+    rows = []
+    for lo, hi in zip(cuts[:-1], cuts[1:]):
+        state, car = update(
+            state, prices.filter(pl.col("date").is_between(lo, hi, closed="left"))
+        )
+        rows.append(car)
+    return state, pl.concat(rows)
+
+
+@pytest.mark.parametrize(
+    "cuts",
+    [
+        # one batch, then day-sized batches around the events, then odd sizes
+        [date(2019, 1, 1), date(2020, 1, 1)],
+        [date(2019, 1, 1)]
+        + [date(2019, 6, 1) + timedelta(days=i) for i in range(0, 214)],
+        [
+            date(2019, 1, 1),
+            date(2019, 6, 14),
+            date(2019, 7, 9),
+            date(2019, 9, 4),
+            date(2020, 1, 1),
+        ],
+    ],
+)
+def test_incremental_matches_per_pair_compute_car_and_ttr(prices, pairs, cuts):
+    state, car = _fold(prices, pairs, cuts)
+    ttr = ttr_table(state, as_of=date(2020, 1, 1), ttr_default=TTR_DEFAULT)
+    mae = mae_table(state)
+
+    for pair in pairs.iter_rows(named=True):
+        (alpha, beta), _, want = event_study(
+            prices,
+            pair["tkr"],
+            [pair["market_tkr"]],
+            pair["ev_date"],
+            EST_WINDOW,
+            EVT_WINDOW,
+        )
+        key = pl.all_horizontal(pl.col(k) == pair[k] for k in KEY)
+        s = state.filter(key).row(0, named=True)
+        assert s["alpha"] == pytest.approx(alpha, abs=1e-12)
+        assert s["beta"] == pytest.approx(beta, rel=1e-9)
+
+        got = car.filter(key).sort("date")
+        assert got["date"].to_list() == want["date"].to_list()
+        np.testing.assert_allclose(got["AR"], want["AR"], atol=1e-12)
+        np.testing.assert_allclose(got["CAR"], want["CAR"], atol=1e-12)
+        assert got["flavor"].to_list() == [
+            "short" if abs(r) <= SHORT_WINDOW else "extended" for r in want["rel_day"]
+        ]
+
+        want_mae = signed_mae(want, SHORT_WINDOW)
+        assert mae.filter(key)["MAE_signed"].item() == pytest.approx(
+            want_mae, abs=1e-12
+        )
+
+        t = ttr.filter(key).row(0, named=True)
+        full, half = compute_ttr(want, want_mae, TTR_DEFAULT)
+        assert (t["TTR_full"], t["TTR_half"]) == (full, half)
+        assert t["censored_full"] == (s["TTR_full"] is None)
+        assert not t["open"]
+
+
+def test_add_events_skips_known_pairs_and_update_ignores_old_rows(prices, pairs):
+    state, _ = _fold(prices, pairs.head(2), [date(2019, 1, 1), date(2020, 1, 1)])
+    grown = add_events(state, pairs, prices, EST_WINDOW, EVT_WINDOW)
+    assert grown.height == pairs.height
+    assert grown.filter(pl.col("ev_id") == "E0").equals(state)
+
+    # replaying days already folded in changes nothing
+    again, car = update(state, prices)
+    assert car.height == 0
+    assert again.equals(state)
+
+
+def test_horizon_keeps_tracking_past_the_event_window(prices, pairs):
+    pair = pairs.filter(pl.col("ev_id") == "E1")
+    state = add_events(empty_state(), pair, prices, EST_WINDOW, EVT_WINDOW, horizon=90)
+    state, car = update(state, prices)
+    ttr = ttr_table(state, as_of=date(2019, 8, 1))
+    assert car["date"].max() > date(2019, 7, 26)  # past rel_day 20
+    assert ttr["open"].all()  # 90 days after Jul 6 is still ahead
+    assert state.equals(
+        update(state, prices.filter(pl.col("date") < date(2019, 8, 1)))[0]
+    )
@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+from _reference import event_study, random_closes, window_returns
+
+from aviation.models import MODELS, fit_models, model_caar
+from aviation.panel import build_return_panel
+
+EST_WINDOW, EVT_WINDOW = (-120, -21), (-5, 20)
+
+# BA loads on its sector ETF, AF.PA on its index and the EUR rate; DAL's
+# sector ETF (JETS) is not in the panel, so it drops out of DAL's fit
+FACTORS = {"BA": ["^GSPC", "ITA"], "DAL": ["^GSPC"], "AF.PA": ["^FCHI", "EURUSD=X"]}
+
+
+@pytest.fixture(scope="module")
+def prices() -> pl.DataFrame:
+    return random_closes(
+        {
+            "^GSPC": {},
+            "^FCHI": {},
+            "ITA": {"^GSPC": 0.9},
+            "EURUSD=X": {},
+            "BA": {"^GSPC": 0.7, "ITA": 0.6},
+            "DAL": {"^GSPC": 0.8},
+            "AF.PA": {"^FCHI": 1.1, "EURUSD=X": -0.5},
+        },
+        date(2018, 6, 1),
+        date(2019, 12, 31),
+        seed=3,
+        gaps={"ITA": [date(2019, 3, 12)], "EURUSD=X": [date(2019, 4, 18)]},
+    )
+
+
+@pytest.fixture(scope="module")
+def pairs() -> pl.DataFrame:
+    rng = np.random.default_rng(8)
+    ev_dates = [
+        date(2019, 1, 1) + timedelta(days=int(d)) for d in rng.integers(0, 330, 4)
+    ]
+    return pl.DataFrame(
+        {
+            "ev_id": [f"E{i}" for i in range(4) for _ in FACTORS],
+            "ev_date": [d for d in ev_dates for _ in FACTORS],
+            "stock_type": "operator",
+            "tkr": list(FACTORS) * 4,
+        }
+    )
+
+
+def test_models_match_per_pair_lstsq(prices, pairs):
+    rows, params = fit_models(
+        pairs, build_return_panel(prices), MODELS, EST_WINDOW, EVT_WINDOW
+    )
+    factors = {
+        "constant_mean": lambda t: [],
+        "market": lambda t: FACTORS[t][:1],
+        "multi_factor": lambda t: FACTORS[t],
+    }
+    names = {"^GSPC": "mkt", "^FCHI": "mkt", "ITA": "sector", "EURUSD=X": "fx"}
+
+    for pair in pairs.iter_rows(named=True):
+        tkr, d = pair["tkr"], pair["ev_date"]
+        key = (pl.col("ev_id") == pair["ev_id"]) & (pl.col("tkr") == tkr)
+        for model in MODELS:
+            got = rows.filter(key & (pl.col("model") == model)).sort("date")
+            p = params.filter(key & (pl.col("model") == model)).row(0, named=True)
+            if model == "market_adjusted":
+                lo, hi = (d + timedelta(days=w) for w in EVT_WINDOW)
+                mkt = FACTORS[tkr][0]
+                want = window_returns(prices, tkr, lo, hi, "r").join(
+                    window_returns(prices, mkt, lo, hi, "m"), on="date"
+                )
+                want = want.with_columns(AR=pl.col("r") - pl.col("m")).with_columns(
+                    CAR=pl.col("AR").cum_sum()
+                )
+                assert (p["const"], p["mkt"], p["n_est"]) == (None, 1.0, 0)
+            else:
+                used = factors[model](tkr)
+                coef, n, want = event_study(
+                    prices, tkr, used, d, EST_WINDOW, EVT_WINDOW
+                )
+                assert p["n_est"] == n
+                assert p["const"] == pytest.approx(coef[0], abs=1e-12)
+                shown = {names[f]: c for f, c in zip(used, coef[1:])}
+                for f in ("mkt", "sector", "fx"):
+                    if f in shown:
+                        assert p[f] == pytest.approx(shown[f], rel=1e-8, abs=1e-12)
+                    else:
+                        assert p[f] is None
+
+            assert got["date"].to_list() == want["date"].to_list()
+            np.testing.assert_allclose(got["AR"], want["AR"], atol=1e-12)
+            np.testing.assert_allclose(got["CAR"], want["CAR"], atol=1e-12)
+            assert got["rel_day"].to_list() == [(x - d).days for x in want["date"]]
+
+    caar = model_caar(rows)
+    assert caar["model"].unique(maintain_order=True).to_list() == list(MODELS)
+    for row in caar.iter_rows(named=True):
+        car = rows.filter(
+            (pl.col("model") == row["model"]) & (pl.col("rel_day") == row["rel_day"])
+        )["CAR"]
+        assert (row["n"], row["CAAR"]) == (car.len(), pytest.approx(car.mean()))
+
+
+def test_unknown_model_is_rejected(prices, pairs):
+    with pytest.raises(ValueError):
+        fit_models(pairs, build_return_panel(prices), ("garch",))
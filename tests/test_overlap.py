@@ -0,0 +1,142 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from aviation.overlap import (
+    WindowIndex,
+    event_windows,
+    find_overlaps,
+    resolve_overlaps,
+)
+
+
+@pytest.fixture
+def pairs() -> pl.DataFrame:
+    """Random (event, ticker) pairs dense enough for many overlaps."""
+    rng = np.random.default_rng(4)
+    n = 120
+    return pl.DataFrame(
+        {
+            "ev_id": [f"E{i:03d}" for i in range(n)],
+            "ev_date": [
+                date(2015, 1, 1) + timedelta(days=int(d))
+                for d in rng.integers(0, 1500, n)
+            ],
+            "stock_type": "operator",
+            "tkr": rng.choice(["BA", "DAL", "AAL"], n),
+            "market_tkr": "^GSPC",
+        }
+    )
+
+
+def test_window_index_query_matches_pairwise_check():
+    rng = np.random.default_rng(0)
+    group = rng.integers(0, 3, 300)
+    start = rng.integers(0, 1000, 300)
+    end = start + rng.integers(0, 40, 300)
+    idx = WindowIndex(group, start, end)
+
+    # queries may reach outside the indexed span and must stay in their group
+    qg = rng.integers(0, 3, 200)
+    qs = rng.integers(-100, 1100, 200)
+    qe = qs + rng.integers(0, 80, 200)
+    got = set(zip(*idx.query(qg, qs, qe)))
+    want = {
+        (q, r)
+        for q in range(200)
+        for r in range(300)
+        if qg[q] == group[r] and qs[q] <= end[r] and start[r] <= qe[q]
+    }
+    assert got == want
+
+    got = {tuple(sorted(p)) for p in zip(*idx.self_overlaps())}
+    assert len(got) == len(idx.self_overlaps()[0])  # each pair once
+    want = {
+        (a, b)
+        for a in range(300)
+        for b in range(a + 1, 300)
+        if group[a] == group[b] and start[a] <= end[b] and start[b] <= end[a]
+    }
+    assert got == want
+
+
+def _pairwise(w: pl.DataFrame) -> set:
+    """find_overlaps rows by checking every pair of windows of a ticker."""
+    rows = w.to_dicts()
+    out = set()
+    for a in rows:
+        for b in rows:
+            if a["ev_id"] == b["ev_id"] or a["tkr"] != b["tkr"]:
+                continue
+            if a["evt_start"] <= b["evt_end"] and b["evt_start"] <= a["evt_end"]:
+                lo = max(a["evt_start"], b["evt_start"])
+                hi = min(a["evt_end"], b["evt_end"])
+                out.add((a["ev_id"], a["tkr"], b["ev_id"], "event", lo, hi))
+            if a["est_start"] <= b["evt_end"] and b["evt_start"] <= a["est_end"]:
+                lo = max(a["est_start"], b["evt_start"])
+                hi = min(a["est_end"], b["evt_end"])
+                out.add((a["ev_id"], a["tkr"], b["ev_id"], "estimation", lo, hi))
+    return out
+
+
+def test_find_overlaps_matches_pairwise_check(pairs):
+    windows = event_windows(pairs)
+    found = find_overlaps(windows)
+    got = set(
+        found.select("ev_id", "tkr", "other_ev_id", "kind", "start", "end").rows()
+    )
+    assert len(got) == found.height
+    want = _pairwise(windows)
+    assert {r[3] for r in want} == {"event", "estimation"}
+    assert got == want
+
+
+def test_policies(pairs):
+    windows = event_windows(pairs)
+    contaminated = {(r[0], r[1]) for r in _pairwise(windows)}
+
+    kept, excl = resolve_overlaps(pairs, "drop")
+    assert set(kept.select("ev_id", "tkr").rows()) == (
+        set(windows.select("ev_id", "tkr").rows()) - contaminated
+    )
+    assert excl.height == 0
+
+    kept, excl = resolve_overlaps(pairs, "exclude")
+    assert kept.height == pairs.height
+    assert set(excl.select("ev_id", "tkr", "other_ev_id", "start", "end").rows()) == {
+        (a, t, b, lo, hi)
+        for a, t, b, kind, lo, hi in _pairwise(windows)
+        if kind == "estimation"
+    }
+
+    # merge: clusters are the connected components of event-window overlaps
+    merged, _ = resolve_overlaps(pairs, "merge")
+    parent = {r: r for r in windows["ev_id"]}
+
+    def root(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    for a, _, b, kind, _, _ in _pairwise(windows):
+        if kind == "event":
+            parent[root(a)] = root(b)
+    by_id = {r["ev_id"]: r for r in windows.to_dicts()}
+    components = {}
+    for ev_id in by_id:
+        components.setdefault(root(ev_id), []).append(ev_id)
+    assert sorted(sorted(m) for m in merged["cluster_ev_ids"]) == sorted(
+        sorted(c) for c in components.values()
+    )
+    assert max(len(m) for m in merged["cluster_ev_ids"]) > 1
+    for row in merged.iter_rows(named=True):
+        members = [by_id[e] for e in row["cluster_ev_ids"]]
+        first = min(members, key=lambda m: (m["evt_start"], m["ev_id"]))
+        assert row["ev_id"] == first["ev_id"]
+        assert row["horizon_end"] == max(m["evt_end"] for m in members)
+        assert row["evt_end"] == first["evt_end"]
+
+    with pytest.raises(ValueError):
+        resolve_overlaps(pairs, "ignore")
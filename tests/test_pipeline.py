@@ -0,0 +1,92 @@
+from dataclasses import replace
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from aviation.pipeline import Settings, run_pipeline
+
+TICKERS = ["BA", "EADSY", "AAL", "DAL", "^GSPC"]
+
+
+def _prices(seed: int) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    days = pl.date_range(date(2011, 1, 1), date(2021, 12, 31), eager=True)
+    days = days.filter(days.dt.weekday() < 6)
+    return pl.concat(
+        pl.DataFrame(
+            {
+                "date": days,
+                "tkr": tkr,
+                "close": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days)))),
+            }
+        )
+        for tkr in TICKERS
+    )
+
+
+@pytest.fixture
+def settings(tmp_path):
+    """A data root with a few NTSB events and the stored prices."""
+    rng = np.random.default_rng(3)
+    n = 20
+    (tmp_path / "ntbs").mkdir()
+    (tmp_path / "stocks").mkdir()
+    inj = {k: rng.integers(0, 50, n) for k in ("inj_tot_f", "inj_tot_m", "inj_tot_s")}
+    pl.DataFrame(
+        {
+            "ev_id": [f"2010{i:04d}X" for i in range(n)],
+            "ev_date": [
+                date(2012, 1, 1) + timedelta(days=int(d))
+                for d in rng.integers(0, 3000, n)
+            ],
+            "acft_make": rng.choice(["BOEING", "AIRBUS"], n),
+            "oper_name": rng.choice(
+                ["DELTA AIR LINES INC", "AMERICAN AIRLINES INC"], n
+            ),
+            **inj,
+            "inj_all_tot": sum(inj.values()),
+            "ev_city": "X",
+            "ev_country": "USA",
+        }
+    ).write_parquet(tmp_path / "ntbs" / "processed.parquet")
+    _prices(0).write_parquet(tmp_path / "stocks" / "prices.parquet")
+    return Settings(data_root=str(tmp_path))
+
+
+def _built(done: dict) -> list[str]:
+    return [name for name, m in done.items() if not m["cached"]]
+
+
+def test_rerun_is_fully_cached(settings):
+    first = run_pipeline(settings, until="mae_ttr")
+    assert _built(first) == ["ingest", "events", "prices", "car", "mae_ttr"]
+    second = run_pipeline(settings, until="mae_ttr")
+    assert _built(second) == []
+    assert {n: m["key"] for n, m in first.items()} == {
+        n: m["key"] for n, m in second.items()
+    }
+
+
+def test_parameter_change_rebuilds_only_the_stages_it_reaches(settings):
+    run_pipeline(settings, until="mae_ttr")
+    # the overlap policy is a car-stage parameter only
+    done = run_pipeline(replace(settings, overlap_policy="drop"), until="car")
+    assert _built(done) == ["car"]
+    # the event window also decides which prices are pulled
+    done = run_pipeline(replace(settings, evt_window=(-5, 10)), until="car")
+    assert _built(done) == ["prices", "car"]
+
+
+def test_changed_source_file_invalidates_its_stage(settings, tmp_path):
+    run_pipeline(settings, until="mae_ttr")
+    _prices(1).write_parquet(tmp_path / "stocks" / "prices.parquet")
+    done = run_pipeline(settings, until="mae_ttr")
+    assert _built(done) == ["prices", "car", "mae_ttr"]
+
+
+def test_forced_stage_with_identical_output_keeps_downstream_cached(settings):
+    run_pipeline(settings, until="car")
+    done = run_pipeline(settings, until="car", force=("events",))
+    assert _built(done) == ["events"]
@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+from _reference import event_study, random_closes
+
+from aviation.panel import build_return_panel
+from aviation.spillover import peer_caar, spillover_tensor
+
+EST_WINDOW, EVT_WINDOW = (-120, -21), (-5, 20)
+TICKERS = ["AAL", "BA", "DAL"]
+
+
+@pytest.fixture(scope="module")
+def prices() -> pl.DataFrame:
+    return random_closes(
+        {
+            "^GSPC": {},
+            "AAL": {"^GSPC": 1.1},
+            "BA": {"^GSPC": 1.3},
+            "DAL": {"^GSPC": 0.8},
+        },
+        date(2018, 6, 1),
+        date(2019, 12, 31),
+        seed=2,
+        gaps={
+            "DAL": [date(2019, 5, 14), date(2019, 5, 15)],
+            "^GSPC": [date(2019, 8, 2)],
+        },
+    )
+
+
+@pytest.fixture(scope="module")
+def events() -> pl.DataFrame:
+    rng = np.random.default_rng(5)
+    return pl.DataFrame(
+        {
+            "ev_id": [f"E{i}" for i in range(9)],
+            "ev_date": [
+                date(2019, 1, 1) + timedelta(days=int(d))
+                for d in rng.integers(0, 340, 9)
+            ],
+            "acft_make": "BOEING",
+            "oper_name": "DELTA AIR LINES INC",
+        }
+    )
+
+
+def test_tensor_matches_per_pair_market_model(prices, events):
+    # E0 / BA and E3 / DAL leave their first 30 estimation days out
+    exclude = events.filter(pl.col("ev_id").is_in(["E0", "E3"])).select(
+        "ev_id",
+        tkr=pl.Series(["BA", "DAL"]),
+        start=pl.col("ev_date").dt.offset_by(f"{EST_WINDOW[0]}d"),
+        end=pl.col("ev_date").dt.offset_by(f"{EST_WINDOW[0] + 30}d"),
+    )
+    panel = build_return_panel(prices)
+    tensor = spillover_tensor(
+        events,
+        panel,
+        TICKERS,
+        EST_WINDOW,
+        EVT_WINDOW,
+        chunk_size=4,
+        dtype=np.float64,
+        exclude=exclude,
+    )
+    assert tensor.ar.shape[:2] == (events.height, len(TICKERS))
+
+    skips = {
+        (r["ev_id"], r["tkr"]): ((r["start"], r["end"]),) for r in exclude.to_dicts()
+    }
+    for e, ev in enumerate(events.iter_rows(named=True)):
+        for k, tkr in enumerate(TICKERS):
+            coef, n, want = event_study(
+                prices,
+                tkr,
+                ["^GSPC"],
+                ev["ev_date"],
+                EST_WINDOW,
+                EVT_WINDOW,
+                skips.get((ev["ev_id"], tkr), ()),
+            )
+            assert tensor.alpha[e, k] == pytest.approx(coef[0], abs=1e-12)
+            assert tensor.beta[e, k] == pytest.approx(coef[1], rel=1e-9)
+            assert tensor.n_est[e, k] == n
+
+            ok = ~np.isnan(tensor.car[e, k])
+            assert tensor.dates[e, ok].tolist() == want["date"].to_list()
+            np.testing.assert_allclose(tensor.ar[e, k, ok], want["AR"], atol=1e-12)
+            np.testing.assert_allclose(tensor.car[e, k, ok], want["CAR"], atol=1e-12)
+            np.testing.assert_array_equal(tensor.rel_day[e, ok], want["rel_day"])
+
+    full = spillover_tensor(events, panel, TICKERS, EST_WINDOW, EVT_WINDOW)
+    assert (full.n_est - tensor.n_est)[[0, 3], [1, 2]].min() >= 15
+    assert (full.n_est == tensor.n_est).sum() == full.n_est.size - 2
+
+
+def test_peer_caar_averages_the_tensor_by_group(prices, events):
+    tensor = spillover_tensor(
+        events, build_return_panel(prices), TICKERS, EST_WINDOW, EVT_WINDOW
+    )
+    # BOEING -> BA and DELTA -> DAL are "own"; AAL is another airline
+    groups = {"competitor": [0], "own": [1, 2]}
+    caar = peer_caar(tensor, events)
+    assert set(caar["peer_group"]) == set(groups)
+
+    for row in caar.iter_rows(named=True):
+        at = tensor.rel_day == row["rel_day"]  # [E, L]
+        car = tensor.car[:, groups[row["peer_group"]]].transpose(1, 0, 2)[:, at]
+        car = car[~np.isnan(car)]
+        assert row["n"] == len(car)
+        assert row["CAAR"] == pytest.approx(car.mean(), rel=1e-5)
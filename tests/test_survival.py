@@ -0,0 +1,96 @@
+from statistics import NormalDist
+
+import numpy as np
+import polars as pl
+import pytest
+
+from aviation.survival import kaplan_meier, km_summary, median_ttr, survival_counts
+
+
+def _ttr(times, censored, **columns) -> pl.DataFrame:
+    return pl.DataFrame(
+        {"TTR_full": times, "censored_full": censored, **columns},
+        schema_overrides={"TTR_full": pl.Int32},
+    )
+
+
+def _km_loop(times, censored, alpha=0.05):
+    """Product-limit estimate, Greenwood variance and log-log bands, per time."""
+    times, censored = np.asarray(times), np.asarray(censored)
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    out, s, gw = [], 1.0, 0.0
+    for t in np.unique(times):
+        n = (times >= t).sum()
+        d = ((times == t) & ~censored).sum()
+        s *= 1 - d / n
+        if d < n:
+            gw += d / (n * (n - d))
+        lo = hi = s
+        if 0 < s < 1:
+            se = np.sqrt(gw) / abs(np.log(s))
+            lo, hi = s ** np.exp(z * se), s ** np.exp(-z * se)
+        out.append((t, n, d, s, lo, hi))
+    return out
+
+
+def test_kaplan_meier_matches_hand_computed_curve():
+    ttr = _ttr([1, 2, 2, 3, 4, 4, 5], [False, False, True, False, True, False, False])
+    km = kaplan_meier(survival_counts(ttr))
+
+    assert km["t"].to_list() == [1, 2, 3, 4, 5]
+    assert km["n_risk"].to_list() == [7, 6, 4, 3, 1]
+    assert km["d"].to_list() == [1, 1, 1, 1, 1]
+    assert km["c"].to_list() == [0, 1, 0, 1, 0]
+    assert km["S"].to_list() == pytest.approx([6 / 7, 5 / 7, 15 / 28, 5 / 14, 0.0])
+
+    # Greenwood at t = 3, then the log-log band around S(3)
+    var = 1 / (7 * 6) + 1 / (6 * 5) + 1 / (4 * 3)
+    se = np.sqrt(var) / abs(np.log(15 / 28))
+    z = NormalDist().inv_cdf(0.975)
+    row = km.row(2, named=True)
+    assert row["S_lo"] == pytest.approx((15 / 28) ** np.exp(z * se))
+    assert row["S_hi"] == pytest.approx((15 / 28) ** np.exp(-z * se))
+    # S = 0 at the last time: the band collapses onto it
+    assert km.row(4, named=True)["S_lo"] == km.row(4, named=True)["S_hi"] == 0.0
+
+    med = median_ttr(km).row(0, named=True)
+    assert (med["n"], med["recovered"], med["censored"]) == (7, 5, 2)
+    assert med["median"] == 4
+
+
+def test_grouped_curves_match_a_loop_per_group():
+    rng = np.random.default_rng(0)
+    n = 400
+    ttr = _ttr(
+        rng.integers(0, 22, n),
+        rng.random(n) < 0.3,
+        category=rng.choice(["minor", "moderate", "severe"], n),
+        year=rng.integers(2010, 2015, n),
+    )
+    # counts are per (category, year, t) cells; the curves sum the years
+    km = kaplan_meier(survival_counts(ttr), by=["category"])
+    for (category,), curve in km.group_by(["category"]):
+        sub = ttr.filter(pl.col("category") == category)
+        want = _km_loop(sub["TTR_full"].to_numpy(), sub["censored_full"].to_numpy())
+        got = curve.sort("t").select("t", "n_risk", "d", "S", "S_lo", "S_hi").rows()
+        assert [r[:3] for r in got] == [w[:3] for w in want]
+        np.testing.assert_allclose(
+            np.array([r[3:] for r in got]), np.array([w[3:] for w in want])
+        )
+
+
+def test_median_is_null_when_fewer_than_half_recover():
+    ttr = _ttr(
+        [3, 21, 21, 21, 5, 8, 21],
+        [False, True, True, True, False, False, True],
+        category=["minor"] * 4 + ["severe"] * 3,
+    )
+    med = km_summary(ttr, by=["category"]).sort("category")
+    assert med.columns == [
+        "category",
+        "TTR_full_median",
+        "TTR_full_median_lo",
+        "TTR_full_median_hi",
+    ]
+    # minor: 1 of 4 recovered, S never reaches 0.5; severe: S(8) = 1/3
+    assert med["TTR_full_median"].to_list() == [None, 8]